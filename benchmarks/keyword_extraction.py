@@ -0,0 +1,72 @@
+from argparse import ArgumentParser
+import time
+
+from tas.analysis.keywords import KEYWORD_EXTRACTORS
+from tas.analysis.processors import HTMLContentProcessor
+from tas.corpus import load_corpus
+
+
+def get_arguments():
+    parser = ArgumentParser(
+        description="Compare the keyword extraction engines")
+    parser.add_argument("corpus", help="folder with the html files to use")
+    parser.add_argument(
+        "--stop-list", default="SmartStoplist.txt",
+        help="the keyword stop list to use")
+    parser.add_argument("--repeat", type=int, default=5)
+
+    return parser.parse_args()
+
+
+def measure(extractor, texts, repeat):
+    execution_times = []
+
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+
+        for text in texts:
+            extractor.run(text)
+
+        execution_times.append(time.perf_counter() - start_time)
+
+    return min(execution_times)
+
+
+def main():
+    args = get_arguments()
+
+    html_processor = HTMLContentProcessor()
+    texts = [
+        html_processor.process_content(document)["content"]["text"]
+        for document in load_corpus(args.corpus)
+    ]
+
+    extractors = [
+        extractor_class(args.stop_list)
+        for extractor_class in KEYWORD_EXTRACTORS.values()
+    ]
+    reference_extractor = extractors[0]
+
+    print("documents: {}".format(len(texts)))
+    print("{:<12} {:>10} {:>10} {:>12}".format(
+        "engine", "time(s)", "speedup", "mismatches"))
+
+    reference_time = None
+    for extractor in extractors:
+        mismatches = sum(
+            1
+            for text in texts
+            if extractor.run(text) != reference_extractor.run(text)
+        )
+
+        execution_time = measure(extractor, texts, args.repeat)
+        if reference_time is None:
+            reference_time = execution_time
+
+        print("{:<12} {:>10.4f} {:>9.1f}x {:>12}".format(
+            extractor.name, execution_time, reference_time / execution_time,
+            mismatches))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+from argparse import ArgumentParser
+import time
+
+from tas.analysis.processors import HTMLContentProcessor, HTMLMetadataProcessor
+from tas.corpus import load_corpus
+
+
+def get_arguments():
+    parser = ArgumentParser(
+        description="Compare the metadata extraction with the full web page "
+                    "analysis")
+    parser.add_argument("corpus", help="folder with the html files to use")
+    parser.add_argument("--repeat", type=int, default=3)
+
+    return parser.parse_args()
+
+
+def measure(processor, documents, repeat):
+    start_time = time.perf_counter()
+
+    for _ in range(repeat):
+        for document in documents:
+            processor.process_content(document)
+
+    return (time.perf_counter() - start_time) / repeat
+
+
+def main():
+    args = get_arguments()
+
+    documents = load_corpus(args.corpus)
+
+    html_processor = HTMLContentProcessor()
+    metadata_processor = HTMLMetadataProcessor()
+
+    # make sure that the models are loaded before the measurements
+    html_processor.analyser_state.warm_up()
+
+    mismatches = 0
+    for document in documents:
+        content = html_processor.process_content(document)["content"]
+        metadata = metadata_processor.process_content(document)["content"]
+
+        for field in ["title", "social", "top_image"]:
+            if content[field] != metadata[field]:
+                mismatches += 1
+                print("{} differs: url={}".format(field, document["url"]))
+
+    html_time = measure(html_processor, documents, args.repeat)
+    metadata_time = measure(metadata_processor, documents, args.repeat)
+
+    print("documents: {}".format(len(documents)))
+    print("field mismatches: {}".format(mismatches))
+    print("full analysis: {:.4f}s".format(html_time))
+    print("metadata only: {:.4f}s ({:.1f}%)".format(
+        metadata_time, 100 * metadata_time / html_time))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+from argparse import ArgumentParser
+import hashlib
+import json
+import tracemalloc
+
+from tas.analysis.schemas import WebPageSchema
+from tas.web.coalescing import create_request_key
+from tas.web.ingestion import load_json_body, read_request_body
+
+
+def get_arguments():
+    parser = ArgumentParser(
+        description="Compare the peak memory of the request payload "
+                    "ingestion with the previous ingestion")
+    parser.add_argument(
+        "--size", type=float, nargs="+", default=[1, 10],
+        help="the html sizes in MB")
+
+    return parser.parse_args()
+
+
+def create_payload(size):
+    paragraph = "<p>Lorem ipsum dolor sit amet, \"consectetur\" adipiscing " \
+                "elit. Nullam eget imperdiet ex.</p>\n"
+
+    html = "<html><body>{}</body></html>".format(
+        paragraph * (int(size * 1048576) // len(paragraph)))
+
+    return json.dumps({"url": "http://www.example.com", "html": html})\
+        .encode("utf8")
+
+
+class SocketStream(object):
+    """A request body stream that receives the body in packets like the
+    input stream of a WSGI server"""
+
+    def __init__(self, payload, packet_size=65536):
+        self.payload = memoryview(payload)
+        self.packet_size = packet_size
+        self.offset = 0
+
+    def _receive(self, size):
+        packet = bytes(self.payload[self.offset:self.offset + size])
+        self.offset += len(packet)
+
+        return packet
+
+    def read(self, size=None):
+        if size is not None:
+            return self._receive(min(size, self.packet_size))
+
+        packets = []
+
+        packet = self._receive(self.packet_size)
+        while packet:
+            packets.append(packet)
+            packet = self._receive(self.packet_size)
+
+        return b"".join(packets)
+
+
+def previous_request_key(endpoint, content):
+    encoded_content = json.dumps(content, sort_keys=True).encode("utf8")
+
+    return "{}-{}".format(
+        endpoint, hashlib.sha256(encoded_content).hexdigest())
+
+
+def previous_ingestion(payload):
+    stream = SocketStream(payload)
+
+    content = stream.read()
+    content = json.loads(content.decode("utf8"))
+    previous_request_key("processhtml", content)
+
+    return WebPageSchema().load(content).data
+
+
+def ingestion(payload):
+    stream = SocketStream(payload)
+
+    body = read_request_body(stream, len(payload))
+    content = load_json_body(body)
+
+    # the request key is only created when coalescing is enabled
+    create_request_key("processhtml", content)
+
+    return WebPageSchema().load(content).data
+
+
+def measure(function, payload):
+    tracemalloc.start()
+
+    try:
+        web_page = function(payload)
+        peak_memory = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return peak_memory, len(web_page.html)
+
+
+def main():
+    args = get_arguments()
+
+    print("{:>10} {:>14} {:>14} {:>10}".format(
+        "html(MB)", "previous(MB)", "current(MB)", "saved"))
+
+    for size in args.size:
+        payload = create_payload(size)
+
+        previous_peak, html_length = measure(previous_ingestion, payload)
+        peak, _ = measure(ingestion, payload)
+
+        print("{:>10.1f} {:>14.1f} {:>14.1f} {:>9.1f}%".format(
+            html_length / 1048576, previous_peak / 1048576, peak / 1048576,
+            100 * (previous_peak - peak) / previous_peak))
+
+
+if __name__ == "__main__":
+    main()
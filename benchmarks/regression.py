@@ -0,0 +1,364 @@
+from argparse import ArgumentParser
+import gc
+import json
+import os
+from os import path
+import platform
+import re
+import sys
+import time
+import tracemalloc
+
+from falcon.testing import simulate_request
+
+from tas.analysis.processors import HTMLContentProcessor
+from tas.corpus import load_corpus
+from tas.exceptions import TASError
+from tas.web import error_codes
+from tas.web.application import create_app
+
+
+BENCHMARKS_DIRECTORY = path.dirname(path.abspath(__file__))
+
+DEFAULT_CORPUS = path.join(BENCHMARKS_DIRECTORY, "corpus")
+DEFAULT_BASELINES = path.join(BENCHMARKS_DIRECTORY, "baselines.json")
+SETTINGS_FILE = path.join(BENCHMARKS_DIRECTORY, "regression_settings.py")
+
+
+def get_arguments():
+    parser = ArgumentParser(
+        description="Run the performance regression benchmarks and compare "
+                    "them with the stored baselines")
+    parser.add_argument(
+        "--corpus", default=DEFAULT_CORPUS,
+        help="folder with the html files to use")
+    parser.add_argument(
+        "--baselines", default=DEFAULT_BASELINES,
+        help="the baselines file")
+    parser.add_argument(
+        "--update", action="store_true",
+        help="store the results as the new baselines")
+    parser.add_argument(
+        "--filter",
+        help="run only the benchmarks whose name matches this regular "
+             "expression")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument(
+        "--time-tolerance", type=float, default=0.15,
+        help="the allowed fractional increase of the execution time")
+    parser.add_argument(
+        "--memory-tolerance", type=float, default=0.10,
+        help="the allowed fractional increase of the peak memory")
+    parser.add_argument(
+        "--cpu", type=int,
+        help="pin the benchmarks to this cpu")
+
+    return parser.parse_args()
+
+
+def stabilize(cpu=None):
+    """Reduce the variance of the measurements
+
+    The benchmarks are executed again with a fixed hash seed, so that the
+    iteration order of the sets and dicts is the same in every run, and
+    optionally pinned to a single cpu.
+
+    :param int|None cpu: the cpu to use
+    """
+    if os.environ.get("PYTHONHASHSEED") != "0":
+        environment = dict(os.environ, PYTHONHASHSEED="0")
+        os.execve(sys.executable, [sys.executable] + sys.argv, environment)
+
+    if cpu is not None and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, {cpu})
+
+
+def get_machine():
+    """Get the properties of the machine that affect the measurements
+
+    :rtype: dict
+    :return: the machine properties
+    """
+    return {
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version()
+    }
+
+
+def create_processor_benchmark(processor, document):
+    def benchmark():
+        try:
+            processor.process_content(document)
+        except TASError:
+            # the pages that aren't articles fail in the content extraction,
+            # which is also measured
+            pass
+
+    return benchmark
+
+
+def check_response(name, result):
+    """Check that a request benchmark receives the expected response
+
+    The articles must be analysed. The pages that aren't articles fail in
+    the content extraction, which the html endpoint reports as a TAS_ERROR.
+    A benchmark that receives any other response, like a validation error,
+    would measure a much shorter request path.
+
+    :param str name: the benchmark document name
+    :param Result result: the response of the benchmark request
+    :raises ValueError: if the response isn't the expected one
+    """
+    if name.startswith("article"):
+        expected = (200, None)
+        received = (result.status_code, None)
+    else:
+        expected = (404, error_codes.TAS_ERROR)
+        received = (result.status_code, result.json.get("code"))
+
+    if received != expected:
+        raise ValueError(
+            "unexpected response for {}: status={} body={}".format(
+                name, result.status, result.text)
+        )
+
+
+def create_request_benchmark(app, name, document):
+    body = json.dumps(document)
+
+    def send_request():
+        return simulate_request(
+            app, "POST", "/api/v2/process/html", body=body,
+            headers={"Content-Type": "application/json"}
+        )
+
+    # the response is checked before the benchmark is timed
+    check_response(name, send_request())
+
+    def benchmark():
+        send_request()
+
+    return benchmark
+
+
+def create_benchmarks(corpus_path):
+    """Create the benchmarks for every document of the corpus
+
+    :param str corpus_path: the corpus folder
+    :rtype: list[(str, callable)]
+    :return: the benchmark names and functions
+    """
+    processor = HTMLContentProcessor()
+    app = create_app(SETTINGS_FILE)
+
+    benchmarks = []
+
+    for document in load_corpus(corpus_path):
+        name = path.splitext(document["url"].rsplit("/", 1)[-1])[0]
+
+        benchmarks.append((
+            "processor/{}".format(name),
+            create_processor_benchmark(processor, document)
+        ))
+        benchmarks.append((
+            "request/{}".format(name),
+            create_request_benchmark(app, name, document)
+        ))
+
+    return benchmarks
+
+
+def measure(benchmark, repeat, warmup):
+    """Measure the execution time and the peak memory of a benchmark
+
+    The cpu time is used because it isn't affected by the other processes of
+    a shared machine as much as the wall clock time. The minimum of the
+    repetitions is used because the noise only ever makes a run slower. The
+    peak memory is measured with tracemalloc in a separate run, so that the
+    tracing overhead isn't included in the execution time.
+
+    :param callable benchmark: the benchmark function
+    :param int repeat: the number of measured runs
+    :param int warmup: the number of runs before the measured runs
+    :rtype: dict
+    :return: the execution time in seconds and the peak memory in bytes
+    """
+    for _ in range(warmup):
+        benchmark()
+
+    cpu_times = []
+    wall_times = []
+
+    for _ in range(repeat):
+        gc.collect()
+        gc.disable()
+
+        try:
+            wall_start_time = time.perf_counter()
+            cpu_start_time = time.process_time()
+
+            benchmark()
+
+            cpu_times.append(time.process_time() - cpu_start_time)
+            wall_times.append(time.perf_counter() - wall_start_time)
+        finally:
+            gc.enable()
+
+    gc.collect()
+    tracemalloc.start()
+
+    try:
+        benchmark()
+        peak_memory = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "time": min(cpu_times),
+        "wall_time": min(wall_times),
+        "peak_memory": peak_memory
+    }
+
+
+def load_baselines(filename):
+    if not path.exists(filename):
+        return {"machine": None, "benchmarks": {}}
+
+    with open(filename) as f:
+        return json.load(f)
+
+
+def save_baselines(filename, machine, results):
+    temporary_file = filename + ".tmp"
+
+    with open(temporary_file, "w") as f:
+        json.dump(
+            {"machine": machine, "benchmarks": results},
+            f, indent=4, sort_keys=True
+        )
+        f.write("\n")
+
+    os.replace(temporary_file, filename)
+
+
+def compare(name, result, baseline, time_tolerance, memory_tolerance):
+    """Compare a benchmark result with its baseline
+
+    The baseline of a benchmark can override the tolerances using the
+    `time_tolerance` and `memory_tolerance` keys.
+
+    :param str name: the benchmark name
+    :param dict result: the benchmark result
+    :param dict baseline: the benchmark baseline
+    :param float time_tolerance: the allowed fractional increase of the
+        execution time
+    :param float memory_tolerance: the allowed fractional increase of the
+        peak memory
+    :rtype: list[str]
+    :return: the regressions
+    """
+    regressions = []
+
+    checks = [
+        ("time", baseline.get("time_tolerance", time_tolerance)),
+        ("peak_memory", baseline.get("memory_tolerance", memory_tolerance))
+    ]
+
+    for metric, tolerance in checks:
+        limit = baseline[metric] * (1 + tolerance)
+
+        if result[metric] > limit:
+            regressions.append(
+                "{name} {metric}: {value:.4g} > {baseline:.4g} "
+                "(+{change:.1%}, tolerance {tolerance:.0%})".format(
+                    name=name,
+                    metric=metric,
+                    value=result[metric],
+                    baseline=baseline[metric],
+                    change=result[metric] / baseline[metric] - 1,
+                    tolerance=tolerance
+                )
+            )
+
+    return regressions
+
+
+def main():
+    args = get_arguments()
+
+    stabilize(args.cpu)
+
+    baselines = load_baselines(args.baselines)
+    machine = get_machine()
+
+    if baselines["machine"] is not None and baselines["machine"] != machine:
+        print("warning: the baselines were recorded on a different machine: "
+              "{}".format(baselines["machine"]))
+
+    benchmarks = create_benchmarks(args.corpus)
+    if args.filter is not None:
+        benchmarks = [
+            (name, benchmark)
+            for name, benchmark in benchmarks
+            if re.search(args.filter, name)
+        ]
+
+    results = {}
+    regressions = []
+    missing_baselines = []
+
+    print("{:<32} {:>10} {:>10} {:>14}".format(
+        "benchmark", "cpu(s)", "wall(s)", "peak memory(KB)"))
+
+    for name, benchmark in benchmarks:
+        result = measure(benchmark, args.repeat, args.warmup)
+        results[name] = result
+
+        print("{:<32} {:>10.4f} {:>10.4f} {:>14.1f}".format(
+            name, result["time"], result["wall_time"],
+            result["peak_memory"] / 1024))
+
+        baseline = baselines["benchmarks"].get(name)
+        if baseline is None:
+            missing_baselines.append(name)
+        elif not args.update:
+            regressions.extend(compare(
+                name, result, baseline,
+                args.time_tolerance, args.memory_tolerance
+            ))
+
+    if args.update:
+        # keep the tolerances that were set for specific benchmarks
+        for name, result in results.items():
+            baseline = baselines["benchmarks"].get(name, {})
+            for key in ("time_tolerance", "memory_tolerance"):
+                if key in baseline:
+                    result[key] = baseline[key]
+
+        stored_results = dict(baselines["benchmarks"])
+        stored_results.update(results)
+        save_baselines(args.baselines, machine, stored_results)
+
+        print("saved the baselines to {}".format(args.baselines))
+
+        return
+
+    if missing_baselines:
+        print("\nbenchmarks without a baseline: {}".format(
+            ", ".join(missing_baselines)))
+
+    if regressions:
+        print("\nperformance regressions:")
+        for regression in regressions:
+            print("  " + regression)
+
+        sys.exit(1)
+
+    print("\nno performance regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,12 @@
+# the settings of the application that the regression benchmarks send the
+# requests to. Everything that adds variance to the measurements, like the
+# slow request log, the lanes and the parallel named entity extraction, is
+# disabled
+TESTING = True
+
+HOST = "127.0.0.1"
+PORT = 8000
+
+SLOW_REQUESTS_DIRECTORY = None
+
+NER_WORKERS = 0
@@ -0,0 +1,71 @@
+from argparse import ArgumentParser
+import time
+
+from tas.analysis.processors import HTMLContentProcessor
+from tas.corpus import load_corpus
+from tas.web.encoders import get_available_encoders
+
+
+def get_arguments():
+    parser = ArgumentParser(
+        description="Compare the response encoders on a corpus of web pages")
+    parser.add_argument("corpus", help="folder with the html files to use")
+    parser.add_argument("--repeat", type=int, default=10)
+
+    return parser.parse_args()
+
+
+def benchmark_encoder(encoder, results, repeat):
+    payload_size = 0
+    start_time = time.perf_counter()
+
+    for _ in range(repeat):
+        for result in results:
+            payload_size += len(encoder.encode(result))
+
+    execution_time = time.perf_counter() - start_time
+
+    return execution_time / repeat, payload_size // repeat
+
+
+def main():
+    args = get_arguments()
+
+    processor = HTMLContentProcessor()
+    results = [
+        processor.process_content(document)
+        for document in load_corpus(args.corpus)
+    ]
+
+    encoders = {
+        encoder.media_type: encoder
+        for encoder in get_available_encoders().values()
+    }
+
+    print("documents: {}".format(len(results)))
+
+    measurements = {
+        media_type: benchmark_encoder(encoder, results, args.repeat)
+        for media_type, encoder in encoders.items()
+    }
+
+    json_time, json_size = measurements["application/json"]
+
+    for media_type in sorted(measurements):
+        execution_time, payload_size = measurements[media_type]
+
+        print(
+            "{media_type:<20} encode_time={execution_time:.6f}s "
+            "payload_size={payload_size} time_vs_json={time_ratio:.2f} "
+            "size_vs_json={size_ratio:.2f}".format(
+                media_type=media_type,
+                execution_time=execution_time,
+                payload_size=payload_size,
+                time_ratio=execution_time / json_time,
+                size_ratio=payload_size / json_size
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
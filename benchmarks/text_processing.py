@@ -0,0 +1,71 @@
+from argparse import ArgumentParser
+from html import escape
+import time
+
+from tas.analysis.processors import HTMLContentProcessor, TextContentProcessor
+from tas.corpus import load_corpus
+
+
+def get_arguments():
+    parser = ArgumentParser(
+        description="Compare plain text processing with processing the same "
+                    "text wrapped in html")
+    parser.add_argument("corpus", help="folder with the html files to use")
+    parser.add_argument("--repeat", type=int, default=3)
+
+    return parser.parse_args()
+
+
+def wrap_text_in_html(text):
+    paragraphs = "".join(
+        "<p>{}</p>".format(escape(paragraph))
+        for paragraph in text.split("\n")
+        if paragraph.strip()
+    )
+
+    return "<html><head></head><body>{}</body></html>".format(paragraphs)
+
+
+def measure(processor, payloads, repeat):
+    start_time = time.perf_counter()
+
+    for _ in range(repeat):
+        for payload in payloads:
+            processor.process_content(payload)
+
+    return (time.perf_counter() - start_time) / repeat
+
+
+def main():
+    args = get_arguments()
+
+    html_processor = HTMLContentProcessor()
+    text_processor = TextContentProcessor(
+        analyser_state=html_processor.analyser_state)
+
+    texts = [
+        html_processor.process_content(document)["content"]["text"]
+        for document in load_corpus(args.corpus)
+    ]
+
+    html_payloads = [
+        {
+            "url": "http://corpus.example.com/{}".format(i),
+            "html": wrap_text_in_html(text)
+        }
+        for i, text in enumerate(texts)
+    ]
+    text_payloads = [{"text": text} for text in texts]
+
+    html_time = measure(html_processor, html_payloads, args.repeat)
+    text_time = measure(text_processor, text_payloads, args.repeat)
+
+    print("documents: {}".format(len(texts)))
+    print("text wrapped in html: {:.4f}s".format(html_time))
+    print("plain text:           {:.4f}s".format(text_time))
+    print("saved:                {:.4f}s ({:.1f}%)".format(
+        html_time - text_time, 100 * (html_time - text_time) / html_time))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+from argparse import ArgumentParser
+import time
+
+from nltk import sent_tokenize, word_tokenize
+import numpy as np
+
+from tas.analysis.processors import HTMLContentProcessor
+from tas.analysis.text import (
+    calculate_batch_text_statistics, calculate_text_statistics
+)
+from tas.corpus import load_corpus
+
+
+def get_arguments():
+    parser = ArgumentParser(
+        description="Compare the text statistics calculation with the "
+                    "previous calculation")
+    parser.add_argument("corpus", help="folder with the html files to use")
+    parser.add_argument("--repeat", type=int, default=5)
+
+    return parser.parse_args()
+
+
+def previous_text_statistics(sentence_words):
+    sentence_word_counts = np.array(
+        [len(sentence) for sentence in sentence_words])
+
+    return {
+        "average_sentence_word_count": float(
+            np.average(sentence_word_counts)),
+        "max_sentence_word_count": int(sentence_word_counts.max()),
+        "mean_sentence_word_count": float(sentence_word_counts.mean()),
+        "median_sentence_word_count": float(np.median(sentence_word_counts)),
+        "min_sentence_word_count": int(sentence_word_counts.min()),
+        "sentence_count": len(sentence_words),
+        "sentence_word_count_std": float(sentence_word_counts.std()),
+        "sentence_word_count_variance": float(sentence_word_counts.var()),
+        "word_count": int(sentence_word_counts.sum())
+    }
+
+
+def measure(function, repeat):
+    execution_times = []
+
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        function()
+        execution_times.append(time.perf_counter() - start_time)
+
+    return min(execution_times)
+
+
+def main():
+    args = get_arguments()
+
+    html_processor = HTMLContentProcessor()
+    documents = [
+        [
+            word_tokenize(sentence)
+            for sentence in sent_tokenize(
+                html_processor.process_content(document)["content"]["text"])
+        ]
+        for document in load_corpus(args.corpus)
+    ]
+
+    previous_time = measure(
+        lambda: list(map(previous_text_statistics, documents)), args.repeat)
+    document_time = measure(
+        lambda: list(map(calculate_text_statistics, documents)), args.repeat)
+    batch_time = measure(
+        lambda: calculate_batch_text_statistics(documents), args.repeat)
+
+    print("documents: {}".format(len(documents)))
+    print("{:<12} {:>10} {:>10}".format("method", "time(s)", "speedup"))
+    for method, execution_time in [("previous", previous_time),
+                                   ("document", document_time),
+                                   ("batch", batch_time)]:
+        print("{:<12} {:>10.4f} {:>9.1f}x".format(
+            method, execution_time, previous_time / execution_time))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+from argparse import ArgumentParser
+import json
+from os import path
+import subprocess
+import sys
+from tempfile import TemporaryDirectory
+
+from tas.analysis.state import AnalyserState
+
+
+BOOT_SCRIPT = """
+import json
+import sys
+import time
+
+start_time = time.perf_counter()
+
+from tas.analysis.reports import get_peak_memory
+from tas.analysis.state import AnalyserState
+
+analyser_state = AnalyserState(snapshot_file=sys.argv[1] or None)
+analyser_state.warm_up()
+analyser_state.keyword_extractor.run(
+    "Warm state snapshots make the workers start faster.")
+
+print(json.dumps({
+    "boot_time": time.perf_counter() - start_time,
+    "peak_memory": get_peak_memory(),
+    "snapshot_used": analyser_state.loaded_from_snapshot
+}))
+"""
+
+
+def get_arguments():
+    parser = ArgumentParser(
+        description="Compare the worker boot time and memory usage when the "
+                    "analyser state is built with loading it from a snapshot")
+    parser.add_argument(
+        "--snapshot",
+        help="the snapshot to use. A temporary snapshot is created if it is "
+             "not given")
+    parser.add_argument("--repeat", type=int, default=3)
+
+    return parser.parse_args()
+
+
+def measure(snapshot_file, repeat):
+    results = []
+
+    for _ in range(repeat):
+        output = subprocess.check_output(
+            [sys.executable, "-c", BOOT_SCRIPT, snapshot_file or ""])
+        results.append(json.loads(output.decode("utf8")))
+
+    return {
+        "boot_time": min(result["boot_time"] for result in results),
+        "peak_memory": min(result["peak_memory"] for result in results),
+        "snapshot_used": all(result["snapshot_used"] for result in results)
+    }
+
+
+def main():
+    args = get_arguments()
+
+    with TemporaryDirectory() as directory:
+        snapshot_file = args.snapshot
+        if snapshot_file is None:
+            snapshot_file = path.join(directory, "analyser.snapshot")
+            AnalyserState().save_snapshot(snapshot_file)
+
+        snapshot_size = path.getsize(snapshot_file)
+
+        cold = measure(None, args.repeat)
+        warm = measure(snapshot_file, args.repeat)
+
+    if not warm["snapshot_used"]:
+        print("the snapshot could not be loaded, see the worker logs")
+
+    print("snapshot size: {:.1f}MB".format(snapshot_size / 1048576))
+    print("{:>10} {:>12} {:>16}".format("", "boot time(s)", "peak memory(MB)"))
+    for name, result in [("cold", cold), ("snapshot", warm)]:
+        print("{:>10} {:>12.3f} {:>16.1f}".format(
+            name, result["boot_time"], result["peak_memory"] / 1048576))
+    print("saved: {:.3f}s ({:.1f}%)".format(
+        cold["boot_time"] - warm["boot_time"],
+        100 * (cold["boot_time"] - warm["boot_time"]) / cold["boot_time"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -15,6 +15,10 @@ TESTING = bool(strtobool(os.getenv("TESTING", "False")))
 
 KEYWORD_STOP_LIST = "SmartStoplist.txt"
 
+# the keyword extraction engine. "fast_rake" returns the same keywords as
+# "rake" but it is faster
+KEYWORD_ENGINE = os.getenv("KEYWORD_ENGINE", "rake")
+
 # set the address that the server will listen to. With a bit of ugly hacking
 # we will get the address to use when the server runs inside a docker container
 host = os.getenv("HOST")
@@ -42,8 +46,69 @@ WORKER_MAX_REQUESTS = int(os.getenv("WORKER_MAX_REQUESTS", 500))
 # set the worker request jitte
 WORKER_MAX_REQUESTS_JITTER = int(os.getenv("WORKER_MAX_REQUESTS_JITTER", 30))
 
-# set the number of workers to start
-WORKERS = int(os.getenv("WORKERS", 4))
+# set the number of workers to start. Set it to "auto" to start one worker
+# for every available CPU, limited by the cgroup CPU quota, as long as the
+# workers fit in the memory limit. The memory of a worker is measured after
+# the application is loaded unless WORKER_MEMORY is set, and
+# WORKER_MEMORY_RESERVE is the fraction of the memory limit that is left free
+WORKERS = os.getenv("WORKERS", "4")
+WORKERS = WORKERS if WORKERS == "auto" else int(WORKERS)
+WORKERS_MIN = int(os.getenv("WORKERS_MIN", 1))
+WORKERS_MAX = (
+    int(os.getenv("WORKERS_MAX")) if os.getenv("WORKERS_MAX") else None
+)
+WORKER_MEMORY = (
+    int(os.getenv("WORKER_MEMORY")) if os.getenv("WORKER_MEMORY") else None
+)
+WORKER_MEMORY_RESERVE = float(os.getenv("WORKER_MEMORY_RESERVE", 0.2))
+
+# add or remove a worker every WORKER_SCALING_INTERVAL seconds while the
+# average CPU utilisation of the workers is above WORKER_SCALE_UP_UTILISATION
+# or below WORKER_SCALE_DOWN_UTILISATION. It is only used when WORKERS is
+# "auto" and the workers are kept between WORKERS_MIN and WORKERS_MAX, or the
+# calculated number of workers if it isn't set
+WORKER_SCALING_ENABLED = bool(
+    strtobool(os.getenv("WORKER_SCALING_ENABLED", "False")))
+WORKER_SCALING_INTERVAL = float(os.getenv("WORKER_SCALING_INTERVAL", 30))
+WORKER_SCALE_UP_UTILISATION = float(
+    os.getenv("WORKER_SCALE_UP_UTILISATION", 0.8))
+WORKER_SCALE_DOWN_UTILISATION = float(
+    os.getenv("WORKER_SCALE_DOWN_UTILISATION", 0.3))
+
+# the file where the server writes the process id of its master. Send SIGHUP
+# to the master, or run "tas-cli reload", to reload the settings and the
+# models without stopping the service. Every worker is replaced by a worker
+# with the new models only after the new worker is ready, which has to happen
+# within RELOAD_WORKER_TIMEOUT seconds
+PIDFILE = os.getenv("PIDFILE")
+RELOAD_WORKER_TIMEOUT = float(os.getenv("RELOAD_WORKER_TIMEOUT", 120))
+
+# process the requests in separate lanes so that small pages never wait
+# behind large ones. A request is processed in the lane that is named in the
+# X-TAS-Priority header or else in the first lane whose max_payload_size is
+# not smaller than the payload. Every lane processes up to "workers" requests
+# at the same time and queues up to "queue_size" more. The workers use
+# threads when lanes are enabled. WORKER_THREADS is calculated from the lane
+# sizes if it is not set
+if strtobool(os.getenv("LANES_ENABLED", "False")):
+    LANES = [
+        {
+            "name": "small",
+            "max_payload_size": int(os.getenv(
+                "LANE_SMALL_MAX_PAYLOAD_SIZE", 262144)),
+            "workers": int(os.getenv("LANE_SMALL_WORKERS", 2)),
+            "queue_size": int(os.getenv("LANE_SMALL_QUEUE_SIZE", 16))
+        },
+        {
+            "name": "large",
+            "max_payload_size": None,
+            "workers": int(os.getenv("LANE_LARGE_WORKERS", 1)),
+            "queue_size": int(os.getenv("LANE_LARGE_QUEUE_SIZE", 4))
+        }
+    ]
+
+if os.getenv("WORKER_THREADS"):
+    WORKER_THREADS = int(os.getenv("WORKER_THREADS"))
 
 # send statistics to this statsd server
 STATSD_HOST = os.getenv("STATSD_HOST")
@@ -57,6 +122,152 @@ CONSUL_VERIFY_SSL = bool(strtobool(os.getenv("CONSUL_VERIFY_SSL", "True")))
 CONSUL_HEALTH_INTERVAL = "10s"
 CONSUL_HEALTH_TIMEOUT = "5s"
 
+# profile a fraction of the html processing requests. Requests that have the
+# X-TAS-Profile header set to the profiling token are always profiled.
+# Profiling is disabled when the lanes are enabled
+PROFILING_ENABLED = bool(strtobool(os.getenv("PROFILING_ENABLED", "False")))
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", 0.0))
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN")
+PROFILING_INTERVAL = float(os.getenv("PROFILING_INTERVAL", 0.005))
+PROFILING_DIRECTORY = os.getenv("PROFILING_DIRECTORY", "/tmp/tas-profiles")
+PROFILING_MAX_FILES = int(os.getenv("PROFILING_MAX_FILES", 100))
+
+# track the memory that is allocated by every processing stage for a
+# fraction of the requests. The allocations are reported in the slow requests
+# and they are sent to statsd. Memory tracking is disabled when the lanes are
+# enabled
+MEMORY_TRACKING_SAMPLE_RATE = float(
+    os.getenv("MEMORY_TRACKING_SAMPLE_RATE", 0.0))
+
+# the number of the slowest recent requests to keep, the number of seconds to
+# keep them and the directory where the workers store them
+SLOW_REQUESTS_COUNT = int(os.getenv("SLOW_REQUESTS_COUNT", 20))
+SLOW_REQUESTS_MAX_AGE = int(os.getenv("SLOW_REQUESTS_MAX_AGE", 3600))
+SLOW_REQUESTS_DIRECTORY = os.getenv(
+    "SLOW_REQUESTS_DIRECTORY", "/tmp/tas-slow-requests")
+
+# the requests whose body is larger than MAX_REQUEST_BODY_SIZE bytes are
+# rejected with a 413 response
+MAX_REQUEST_BODY_SIZE = int(os.getenv("MAX_REQUEST_BODY_SIZE", 20971520))
+
+# the settings of the http client that downloads the web pages for the url
+# analysis endpoint. The analysis of FETCH_CACHE_SIZE web pages is cached in
+# every worker and it is reused while the web pages are not modified. The web
+# pages of the hosts that resolve to private, loopback or link local addresses
+# are only downloaded when FETCH_ALLOW_PRIVATE_ADDRESSES is set
+FETCH_TIMEOUT = float(os.getenv("FETCH_TIMEOUT", 10))
+FETCH_POOL_CONNECTIONS = int(os.getenv("FETCH_POOL_CONNECTIONS", 10))
+FETCH_POOL_MAXSIZE = int(os.getenv("FETCH_POOL_MAXSIZE", 10))
+FETCH_MAX_SIZE = int(os.getenv("FETCH_MAX_SIZE", 10485760))
+FETCH_USER_AGENT = os.getenv("FETCH_USER_AGENT")
+FETCH_CACHE_SIZE = int(os.getenv("FETCH_CACHE_SIZE", 100))
+FETCH_MAX_REDIRECTS = int(os.getenv("FETCH_MAX_REDIRECTS", 5))
+FETCH_ALLOW_PRIVATE_ADDRESSES = bool(
+    strtobool(os.getenv("FETCH_ALLOW_PRIVATE_ADDRESSES", "False")))
+
+# extract the named entities of texts that have at least NER_PARALLEL_THRESHOLD
+# sentences in parallel using NER_WORKERS processes for every worker. The
+# sentences are split into chunks of NER_CHUNK_SIZE sentences
+NER_WORKERS = int(os.getenv("NER_WORKERS", 0))
+NER_PARALLEL_THRESHOLD = int(os.getenv("NER_PARALLEL_THRESHOLD", 200))
+NER_CHUNK_SIZE = int(os.getenv("NER_CHUNK_SIZE", 50))
+
+# the spool directory that "tas-cli worker" processes. Every worker analyses
+# the batch lines using SPOOL_PROCESSES processes. The batches that a worker
+# claimed are returned to the spool if it doesn't renew its claim for
+# SPOOL_STALE_TIMEOUT seconds
+SPOOL_DIRECTORY = os.getenv("SPOOL_DIRECTORY", "/var/spool/tas")
+SPOOL_PROCESSES = int(os.getenv("SPOOL_PROCESSES", 2))
+SPOOL_POLL_INTERVAL = float(os.getenv("SPOOL_POLL_INTERVAL", 1.0))
+SPOOL_STALE_TIMEOUT = float(os.getenv("SPOOL_STALE_TIMEOUT", 300))
+
+# the format of the batch results files, which is "ndjson", "parquet" or
+# "arrow". The parquet and arrow files are written in compressed row groups of
+# up to SPOOL_RESULTS_ROW_GROUP_SIZE results and they require pyarrow. A row
+# group is written earlier when the buffered results reach
+# SPOOL_RESULTS_BUFFER_SIZE bytes
+SPOOL_RESULTS_FORMAT = os.getenv("SPOOL_RESULTS_FORMAT", "ndjson")
+SPOOL_RESULTS_ROW_GROUP_SIZE = int(
+    os.getenv("SPOOL_RESULTS_ROW_GROUP_SIZE", 500))
+SPOOL_RESULTS_BUFFER_SIZE = int(
+    os.getenv("SPOOL_RESULTS_BUFFER_SIZE", 67108864))
+
+# detect the language and the article-likeness of every web page before it is
+# analysed. The pages in languages other than TRIAGE_LANGUAGES and the pages
+# that aren't articles are processed using the configured actions, which are
+# "skip", "metadata", "extract" or "analyse"
+TRIAGE_ENABLED = bool(strtobool(os.getenv("TRIAGE_ENABLED", "False")))
+TRIAGE_LANGUAGES = os.getenv("TRIAGE_LANGUAGES", "en").split(",")
+TRIAGE_UNSUPPORTED_LANGUAGE_ACTION = os.getenv(
+    "TRIAGE_UNSUPPORTED_LANGUAGE_ACTION", "extract")
+TRIAGE_NON_ARTICLE_ACTION = os.getenv("TRIAGE_NON_ARTICLE_ACTION", "metadata")
+TRIAGE_MIN_TEXT_LENGTH = int(os.getenv("TRIAGE_MIN_TEXT_LENGTH", 500))
+TRIAGE_MAX_LINK_DENSITY = float(os.getenv("TRIAGE_MAX_LINK_DENSITY", 0.5))
+
+# share the result of a request with the identical requests that the workers
+# of this node receive while it is processed. The workers coordinate using
+# lock files in COALESCING_DIRECTORY. A request that waits for longer than
+# COALESCING_TIMEOUT seconds is processed independently. The directory must
+# only be accessible by the user that runs the service
+COALESCING_ENABLED = bool(strtobool(os.getenv("COALESCING_ENABLED", "False")))
+COALESCING_DIRECTORY = os.getenv(
+    "COALESCING_DIRECTORY", "/tmp/tas-coalescing")
+COALESCING_TIMEOUT = float(os.getenv("COALESCING_TIMEOUT", 30))
+
+# share the results between the nodes of the cluster. Every request key is
+# owned by one of the healthy nodes of the service in consul, or of the
+# SHARDING_NODES if they are set, which caches the results of its keys. The
+# other nodes forward the requests to the owner if SHARDING_MODE is "forward"
+# or get the cached result from it if SHARDING_MODE is "fetch". SHARDING_NODE
+# is the address of this node and it defaults to HOST:PORT. SHARDING_TOKEN is
+# the secret that the nodes use to access each other's cache and sharding is
+# disabled if it isn't set. The workers of a node share the cached results
+# using the files in SHARDING_CACHE_DIRECTORY, which must only be accessible
+# by the user that runs the service. Every worker has its own cache if it is
+# empty
+SHARDING_ENABLED = bool(strtobool(os.getenv("SHARDING_ENABLED", "False")))
+SHARDING_MODE = os.getenv("SHARDING_MODE", "forward")
+SHARDING_NODE = os.getenv("SHARDING_NODE")
+SHARDING_NODES = [
+    node for node in os.getenv("SHARDING_NODES", "").split(",") if node
+]
+SHARDING_CACHE_SIZE = int(os.getenv("SHARDING_CACHE_SIZE", 1000))
+SHARDING_CACHE_DIRECTORY = os.getenv(
+    "SHARDING_CACHE_DIRECTORY", "/tmp/tas-shard-cache") or None
+SHARDING_FORWARD_TIMEOUT = float(os.getenv("SHARDING_FORWARD_TIMEOUT", 30))
+SHARDING_FETCH_TIMEOUT = float(os.getenv("SHARDING_FETCH_TIMEOUT", 1))
+SHARDING_TOKEN = os.getenv("SHARDING_TOKEN")
+
+# skip the optional analysis stages, in the order of DEGRADATION_STAGES, while
+# the DEGRADATION_LATENCY_PERCENTILE of the request latency is higher than
+# DEGRADATION_LATENCY_SLO seconds or more than DEGRADATION_QUEUE_DEPTH_SLO
+# requests are queued in the lanes. One more stage is skipped or restored at
+# most every DEGRADATION_INTERVAL seconds. The latency includes the time the
+# request waited before a worker received it only if the reverse proxy sets
+# the X-Request-Start header
+DEGRADATION_ENABLED = bool(
+    strtobool(os.getenv("DEGRADATION_ENABLED", "False")))
+DEGRADATION_STAGES = os.getenv(
+    "DEGRADATION_STAGES", "summary,named_entities,readability").split(",")
+DEGRADATION_LATENCY_SLO = float(os.getenv("DEGRADATION_LATENCY_SLO", 2))
+DEGRADATION_LATENCY_PERCENTILE = float(
+    os.getenv("DEGRADATION_LATENCY_PERCENTILE", 95))
+DEGRADATION_QUEUE_DEPTH_SLO = (
+    int(os.getenv("DEGRADATION_QUEUE_DEPTH_SLO"))
+    if os.getenv("DEGRADATION_QUEUE_DEPTH_SLO") else None
+)
+DEGRADATION_INTERVAL = float(os.getenv("DEGRADATION_INTERVAL", 10))
+DEGRADATION_RECOVERY_RATIO = float(
+    os.getenv("DEGRADATION_RECOVERY_RATIO", 0.7))
+DEGRADATION_MIN_SAMPLES = int(os.getenv("DEGRADATION_MIN_SAMPLES", 20))
+
+# the analyser state snapshot that was created using "tas-cli snapshot". The
+# workers load the models from the snapshot instead of building them. Set
+# ANALYSER_LAZY_LOAD to load them when the first request is processed instead
+# of when the worker starts
+ANALYSER_SNAPSHOT = os.getenv("ANALYSER_SNAPSHOT")
+ANALYSER_LAZY_LOAD = bool(strtobool(os.getenv("ANALYSER_LAZY_LOAD", "False")))
+
 __handlers = {
     'console': {
         'level': os.getenv("CONSOLE_LOG_LEVEL", "INFO"),
@@ -10,18 +10,22 @@ def get_arguments():
     parser.add_argument("url")
     parser.add_argument("--output", default="result.json")
     parser.add_argument("--tas-address", default="http://192.168.1.103:8020")
+    parser.add_argument(
+        "--download-locally", action="store_true", default=False,
+        help="download the web page and upload its html to tas instead of "
+             "having tas download it"
+    )
 
     return parser.parse_args()
 
 
-def main():
-    args = get_arguments()
-
+def analyse_html(args):
     page_response = requests.get(args.url, timeout=10)
     page_response.raise_for_status()
 
     tas_process_url = urljoin(args.tas_address, "api/v2/process/html")
-    tas_response = requests.post(
+
+    return requests.post(
         tas_process_url,
         timeout=10,
         json={
@@ -30,6 +34,27 @@ def main():
         }
     )
 
+
+def analyse_url(args):
+    tas_process_url = urljoin(args.tas_address, "api/v2/process/url")
+
+    return requests.post(
+        tas_process_url,
+        timeout=20,
+        json={
+            "url": args.url
+        }
+    )
+
+
+def main():
+    args = get_arguments()
+
+    if args.download_locally:
+        tas_response = analyse_html(args)
+    else:
+        tas_response = analyse_url(args)
+
     tas_response.raise_for_status()
 
     with open(args.output, "w") as f:
@@ -0,0 +1,241 @@
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import ctypes
+import logging
+from multiprocessing import Barrier
+import os
+import signal
+from threading import BrokenBarrierError, Lock
+
+from tas.analysis.state import AnalyserState
+from tas.analysis.text import extract_named_entities
+
+
+logger = logging.getLogger(__name__)
+
+
+# the prctl option that sends a signal to a process when its parent exits
+PR_SET_PDEATHSIG = 1
+
+# the number of seconds that the pool processes wait for each other while
+# they are warmed up
+POOL_WARM_UP_TIMEOUT = 300.0
+
+try:
+    _prctl = ctypes.CDLL(None, use_errno=True).prctl
+except (OSError, AttributeError):
+    _prctl = None
+
+
+# the analyser state of a pool process. The pool processes that are forked
+# inherit the state of the worker, the others create it when they process
+# their first chunk
+_pool_analyser_state = None
+
+# the process id of the worker that started the pool and the barrier that
+# makes every pool process receive one warm up task
+_pool_parent_pid = None
+_pool_warm_up_barrier = None
+
+_pool_process_initialized = False
+
+
+def _initialize_pool_process():
+    global _pool_process_initialized
+
+    if _pool_process_initialized:
+        return
+
+    _pool_process_initialized = True
+
+    # the pool processes are killed when the worker exits, even when gunicorn
+    # kills it after a timeout, so that they are not left behind
+    if _prctl is not None:
+        _prctl(PR_SET_PDEATHSIG, signal.SIGKILL)
+
+    # the worker exited before the signal was set
+    if _pool_parent_pid is not None and os.getppid() != _pool_parent_pid:
+        os._exit(1)
+
+
+def _load_pool_analyser_state(state_arguments):
+    global _pool_analyser_state
+
+    _initialize_pool_process()
+
+    if _pool_analyser_state is None:
+        _pool_analyser_state = AnalyserState(*state_arguments)
+
+    _pool_analyser_state.warm_up()
+
+
+def _warm_up_pool_process(state_arguments):
+    _load_pool_analyser_state(state_arguments)
+
+    # a process that waits here can't receive another warm up task, so every
+    # pool process is initialized before the pool is used
+    if _pool_warm_up_barrier is not None:
+        try:
+            _pool_warm_up_barrier.wait(POOL_WARM_UP_TIMEOUT)
+        except BrokenBarrierError:
+            pass
+
+
+def _extract_chunk_named_entities(state_arguments, sentence_words):
+    _load_pool_analyser_state(state_arguments)
+
+    return extract_named_entities(
+        _pool_analyser_state.pos_tagger,
+        _pool_analyser_state.ne_chunker,
+        sentence_words
+    )
+
+
+class NamedEntityExtractor(object):
+    """Extract the named entities of a text
+
+    The named entities of the texts that have at least `parallel_threshold`
+    sentences are extracted in parallel. The sentences are split into chunks
+    of `chunk_size` sentences and every chunk is processed by a process of a
+    process pool. The named entities of the chunks are merged, so the result
+    is the same as when the sentences are processed sequentially.
+    """
+
+    def __init__(self, analyser_state, workers=0, parallel_threshold=200,
+                 chunk_size=50):
+        """Create a new NamedEntityExtractor object
+
+        :param AnalyserState analyser_state: the models to use
+        :param int workers: the number of pool processes. The named entities
+            are always extracted sequentially if it is 0
+        :param int parallel_threshold: the minimum number of sentences for
+            which the extraction is parallel
+        :param int chunk_size: the number of sentences in every chunk
+        """
+        self.analyser_state = analyser_state
+        self.workers = workers
+        self.parallel_threshold = parallel_threshold
+        self.chunk_size = chunk_size
+
+        self._executor = None
+        self._executor_pid = None
+        self._executor_lock = Lock()
+
+    @property
+    def _state_arguments(self):
+        return (
+            self.analyser_state.keyword_stop_list,
+            self.analyser_state.snapshot_file,
+            self.analyser_state.keyword_engine
+        )
+
+    def start(self):
+        """Start the process pool
+
+        The pool processes are started immediately, so that they inherit the
+        models that have been loaded. This must be called in the worker
+        process, before the worker starts any threads, because a process
+        that is forked from the process that started the pool inherits an
+        executor without the threads that manage it. Such an executor is
+        discarded and a new pool is started.
+
+        :rtype: ProcessPoolExecutor|None
+        :return: the process pool or None if the extraction is sequential
+        """
+        with self._executor_lock:
+            if self._executor is not None and \
+                    self._executor_pid != os.getpid():
+                self._executor = None
+                self._executor_pid = None
+
+            if self.workers > 0 and self._executor is None:
+                self._start_executor()
+
+            return self._executor
+
+    def _start_executor(self):
+        global _pool_analyser_state, _pool_parent_pid, _pool_warm_up_barrier
+
+        self.analyser_state.warm_up()
+        _pool_analyser_state = self.analyser_state
+        _pool_parent_pid = os.getpid()
+        _pool_warm_up_barrier = Barrier(self.workers)
+
+        logger.info(
+            "starting named entity extraction pool: workers=%s",
+            self.workers
+        )
+
+        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        self._executor_pid = os.getpid()
+
+        try:
+            warm_up_tasks = [
+                self._executor.submit(
+                    _warm_up_pool_process, self._state_arguments)
+                for _ in range(self.workers)
+            ]
+            for warm_up_task in warm_up_tasks:
+                warm_up_task.result()
+        finally:
+            _pool_warm_up_barrier = None
+
+    def shutdown(self):
+        """Stop the process pool
+
+        The pool is only stopped by the process that started it.
+        """
+        with self._executor_lock:
+            if self._executor is not None and \
+                    self._executor_pid == os.getpid():
+                self._executor.shutdown()
+
+            self._executor = None
+            self._executor_pid = None
+
+    def _extract_in_parallel(self, executor, sentence_words):
+        chunks = [
+            sentence_words[i:i + self.chunk_size]
+            for i in range(0, len(sentence_words), self.chunk_size)
+        ]
+
+        named_entities = defaultdict(set)
+
+        chunk_results = executor.map(
+            _extract_chunk_named_entities,
+            [self._state_arguments] * len(chunks),
+            chunks
+        )
+
+        for chunk_named_entities in chunk_results:
+            for entity_type, entities in chunk_named_entities.items():
+                named_entities[entity_type].update(entities)
+
+        return dict(named_entities)
+
+    def extract(self, sentence_words):
+        """Extract the named entities from the sentences
+
+        :param list[list[str]] sentence_words: a list with the sentences that
+            have been tokenized into separate words
+        :rtype: dict[str, set[str]]
+        :return: the named entity types and the named entities of every type
+        """
+        if self.workers > 0 and len(sentence_words) >= self.parallel_threshold:
+            executor = self.start()
+
+            try:
+                return self._extract_in_parallel(executor, sentence_words)
+            except BrokenProcessPool:
+                logger.exception(
+                    "named entity extraction pool failed, the pool will be "
+                    "restarted")
+
+                self.shutdown()
+
+        return extract_named_entities(
+            self.analyser_state.pos_tagger,
+            self.analyser_state.ne_chunker,
+            sentence_words
+        )
@@ -17,3 +17,54 @@ class InvalidHTMLContent(HTMLContentProcessorError):
 class HtmlContentProcessingError(HTMLContentProcessorError):
     """Exception that is raised when we fail to analyse the html contents"""
     pass
+
+
+class PageSkipped(HTMLContentProcessorError):
+    """Exception that is raised when the triage policy skips a web page"""
+    def __init__(self, reason=None, language=None):
+        super(PageSkipped, self).__init__(reason, language)
+
+        self.reason = reason
+        self.language = language
+
+
+class TextContentProcessorError(TASError):
+    """Exception that is raised when the text content could not be processed"""
+    pass
+
+
+class InvalidTextContent(TextContentProcessorError):
+    """Exception that is raised if the text content is invalid"""
+    def __init__(self, errors=None):
+        super(InvalidTextContent, self).__init__(errors)
+
+        self.errors = errors
+
+
+class TextContentProcessingError(TextContentProcessorError):
+    """Exception that is raised when we fail to analyse the text contents"""
+    pass
+
+
+class URLContentProcessorError(TASError):
+    """Exception that is raised when the web page of a url could not be
+    processed"""
+    pass
+
+
+class InvalidURLContent(URLContentProcessorError):
+    """Exception that is raised if the url content is invalid"""
+    def __init__(self, errors=None):
+        super(InvalidURLContent, self).__init__(errors)
+
+        self.errors = errors
+
+
+class WebPageFetchError(URLContentProcessorError):
+    """Exception that is raised when a web page could not be downloaded"""
+    def __init__(self, message=None, url=None, status_code=None):
+        super(WebPageFetchError, self).__init__(message, url, status_code)
+
+        self.message = message
+        self.url = url
+        self.status_code = status_code
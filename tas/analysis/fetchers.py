@@ -0,0 +1,376 @@
+from collections import OrderedDict, namedtuple
+import codecs
+import ipaddress
+import logging
+import re
+import socket
+from threading import Lock
+from urllib.parse import urljoin, urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.compat import chardet
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import NewConnectionError
+
+from tas import __VERSION__
+from tas.analysis.exceptions import WebPageFetchError
+
+
+logger = logging.getLogger(__name__)
+
+
+FetchResult = namedtuple(
+    "FetchResult",
+    ["url", "status_code", "html", "etag", "last_modified"]
+)
+
+CachedAnalysis = namedtuple(
+    "CachedAnalysis",
+    ["etag", "last_modified", "result"]
+)
+
+CHARSET_PATTERN = re.compile(r"charset\s*=\s*[\"']?([\w.:-]+)", re.IGNORECASE)
+META_CHARSET_PATTERN = re.compile(
+    br"<meta[^>]+charset\s*=\s*[\"']?([\w.:-]+)", re.IGNORECASE)
+
+# the number of bytes at the start of the page that are searched for the
+# meta charset tag
+META_CHARSET_SEARCH_SIZE = 4096
+
+
+def _find_encoding(pattern, value):
+    match = pattern.search(value)
+    if match is None:
+        return None
+
+    encoding = match.group(1)
+    if isinstance(encoding, bytes):
+        encoding = encoding.decode("ascii")
+
+    try:
+        return codecs.lookup(encoding).name
+    except LookupError:
+        return None
+
+
+def detect_encoding(content_type, content):
+    """Detect the encoding of a web page
+
+    The encoding is the charset of the Content-Type header, or the charset
+    of the meta tag of the page, or the encoding that is detected using the
+    page content.
+
+    :param str|None content_type: the Content-Type header
+    :param bytes content: the page content
+    :rtype: str
+    :return: the encoding
+    """
+    encoding = None
+    if content_type is not None:
+        encoding = _find_encoding(CHARSET_PATTERN, content_type)
+
+    if encoding is None:
+        encoding = _find_encoding(
+            META_CHARSET_PATTERN, content[:META_CHARSET_SEARCH_SIZE])
+
+    if encoding is None and content:
+        encoding = chardet.detect(content)["encoding"]
+
+    return encoding or "utf8"
+
+
+def is_public_address(address):
+    """Check if an ip address is a public internet address
+
+    :param str address: the ip address
+    :rtype: bool
+    :return: False for the private, loopback, link local and reserved
+        addresses
+    """
+    address = ipaddress.ip_address(address)
+
+    # the ipv4 addresses that are mapped to ipv6 addresses are checked as
+    # ipv4 addresses
+    if address.version == 6 and address.ipv4_mapped is not None:
+        address = address.ipv4_mapped
+
+    return not (
+        address.is_private or address.is_loopback or address.is_link_local or
+        address.is_reserved or address.is_multicast or
+        address.is_unspecified
+    )
+
+
+class PublicAddressConnectionMixin(object):
+    """Check that a connection is to a public address before it is used
+
+    The host name is resolved again when the connection is opened, so a host
+    whose address changes after the url has been checked could otherwise
+    make the service connect to an internal address.
+    """
+
+    def _new_conn(self):
+        sock = super(PublicAddressConnectionMixin, self)._new_conn()
+
+        address = sock.getpeername()[0]
+        if not is_public_address(address):
+            sock.close()
+
+            logger.warning(
+                "web page host connected to a private address: host=%s "
+                "address=%s", self.host, address
+            )
+
+            raise NewConnectionError(
+                self, "the web page address is not allowed: {}".format(
+                    address)
+            )
+
+        return sock
+
+
+class PublicAddressHTTPConnection(PublicAddressConnectionMixin,
+                                  HTTPConnection):
+    pass
+
+
+class PublicAddressHTTPSConnection(PublicAddressConnectionMixin,
+                                   HTTPSConnection):
+    pass
+
+
+class PublicAddressHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = PublicAddressHTTPConnection
+
+
+class PublicAddressHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = PublicAddressHTTPSConnection
+
+
+class PublicAddressAdapter(HTTPAdapter):
+    """A transport adapter that only connects to public addresses"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super(PublicAddressAdapter, self).init_poolmanager(*args, **kwargs)
+
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": PublicAddressHTTPConnectionPool,
+            "https": PublicAddressHTTPSConnectionPool
+        }
+
+
+class WebPageFetcher(object):
+    """Download web pages using a pool of keep-alive connections
+
+    The fetcher is thread safe and the connections to a host are reused
+    between requests.
+    """
+
+    def __init__(self, timeout=10, pool_connections=10, pool_maxsize=10,
+                 max_size=10485760, user_agent=None, max_redirects=5,
+                 allow_private_addresses=False):
+        """Create a new WebPageFetcher object
+
+        :param float timeout: the request timeout in seconds
+        :param int pool_connections: the number of hosts to keep connection
+            pools for
+        :param int pool_maxsize: the maximum number of connections to keep
+            for every host
+        :param int max_size: the maximum page size in bytes
+        :param str|None user_agent: the user agent to use
+        :param int max_redirects: the maximum number of redirects to follow
+        :param bool allow_private_addresses: download the web pages of the
+            hosts that resolve to private, loopback or link local addresses
+        """
+        self.timeout = timeout
+        self.max_size = max_size
+        self.max_redirects = max_redirects
+        self.allow_private_addresses = allow_private_addresses
+
+        # the address that the connection is made to is checked too, because
+        # the host can resolve to another address after the url is checked
+        adapter_class = HTTPAdapter if allow_private_addresses else \
+            PublicAddressAdapter
+        adapter = adapter_class(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize
+        )
+
+        self._session = requests.Session()
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        self._session.headers["User-Agent"] = \
+            user_agent or "tas/{}".format(__VERSION__)
+
+    def _read_content(self, url, response):
+        content_length = response.headers.get("Content-Length")
+        if content_length is not None and content_length.isdigit():
+            if int(content_length) > self.max_size:
+                raise WebPageFetchError(
+                    "the web page is too large", url, response.status_code)
+
+        content = bytearray()
+        for chunk in response.iter_content(chunk_size=65536):
+            content.extend(chunk)
+
+            if len(content) > self.max_size:
+                raise WebPageFetchError(
+                    "the web page is too large", url, response.status_code)
+
+        return bytes(content)
+
+    def _check_url(self, url):
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise WebPageFetchError("the web page url is not allowed", url)
+
+        if self.allow_private_addresses:
+            return
+
+        try:
+            addresses = socket.getaddrinfo(
+                parts.hostname, parts.port, proto=socket.IPPROTO_TCP)
+        except (socket.gaierror, UnicodeError, ValueError) as e:
+            raise WebPageFetchError(
+                "failed to resolve the web page host", url) from e
+
+        # the internal services and the cloud metadata endpoints must not be
+        # reachable through the service
+        for _, _, _, _, socket_address in addresses:
+            if not is_public_address(socket_address[0]):
+                logger.warning(
+                    "web page host resolves to a private address: url=%s "
+                    "address=%s", url, socket_address[0]
+                )
+
+                raise WebPageFetchError(
+                    "the web page address is not allowed", url)
+
+    def _get(self, url, headers):
+        # the redirects are followed one at a time, so that the address of
+        # every redirect target is checked
+        for _ in range(self.max_redirects + 1):
+            self._check_url(url)
+
+            response = self._session.get(
+                url, headers=headers, timeout=self.timeout, stream=True,
+                allow_redirects=False
+            )
+
+            location = self._session.get_redirect_target(response)
+            if location is None:
+                return response
+
+            response.close()
+            url = urljoin(url, location)
+
+        raise WebPageFetchError("too many redirects", url)
+
+    def fetch(self, url, etag=None, last_modified=None):
+        """Download a web page
+
+        The request is conditional when the etag or the last modification
+        date of a previously downloaded version of the page is given. The
+        pages of the hosts that resolve to private addresses are not
+        downloaded unless `allow_private_addresses` is set.
+
+        :param str url: the web page url
+        :param str|None etag: the etag of the previous version of the page
+        :param str|None last_modified: the last modification date of the
+            previous version of the page
+        :rtype: FetchResult
+        :return: the downloaded page. The html is None if the page has not
+            been modified
+        """
+        headers = {}
+        if etag is not None:
+            headers["If-None-Match"] = etag
+        if last_modified is not None:
+            headers["If-Modified-Since"] = last_modified
+
+        try:
+            with self._get(url, headers) as response:
+                if response.status_code == 304:
+                    html = None
+                elif response.status_code >= 400:
+                    raise WebPageFetchError(
+                        "failed to download the web page", url,
+                        response.status_code
+                    )
+                else:
+                    content = self._read_content(url, response)
+                    encoding = detect_encoding(
+                        response.headers.get("Content-Type"), content)
+                    html = content.decode(encoding, errors="replace")
+        except requests.RequestException as e:
+            logger.warning(
+                "failed to download web page: url=%s error=%s", url, e)
+
+            raise WebPageFetchError(
+                "failed to download the web page", url) from e
+
+        return FetchResult(
+            url=url,
+            status_code=response.status_code,
+            html=html,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified")
+        )
+
+    def close(self):
+        """Close the pooled connections"""
+        self._session.close()
+
+
+class AnalysisCache(object):
+    """A least recently used cache of the analysis results of web pages"""
+
+    def __init__(self, size=100):
+        """Create a new AnalysisCache object
+
+        :param int size: the maximum number of cached results
+        """
+        self.size = size
+
+        self._items = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, url):
+        """Get the cached analysis of a web page
+
+        :param str url: the web page url
+        :rtype: CachedAnalysis|None
+        :return: the cached analysis or None if the page is not cached
+        """
+        with self._lock:
+            cached_analysis = self._items.get(url)
+            if cached_analysis is not None:
+                self._items.move_to_end(url)
+
+            return cached_analysis
+
+    def set(self, url, cached_analysis):
+        """Add the analysis of a web page to the cache
+
+        :param str url: the web page url
+        :param CachedAnalysis cached_analysis: the analysis to cache
+        """
+        if self.size <= 0:
+            return
+
+        with self._lock:
+            self._items[url] = cached_analysis
+            self._items.move_to_end(url)
+
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+    def remove(self, url):
+        """Remove a web page from the cache
+
+        :param str url: the web page url
+        """
+        with self._lock:
+            self._items.pop(url, None)
@@ -0,0 +1,236 @@
+from abc import ABCMeta, abstractmethod
+from operator import itemgetter
+import re
+
+import numpy as np
+from rake.rake import Rake, is_number, load_stop_words
+from rake.stoplists import get_stoplist_file_path
+
+
+# the sentence delimiters of RAKE
+SENTENCE_DELIMITERS = \
+    "[.!?,;:\t\\\\\"\\(\\)\\'\u2019\u2013]|\\s\\-\\s"
+
+# the characters that can't be part of a sentence because RAKE splits the
+# text on them
+SENTENCE_DELIMITER_CHARACTERS = re.compile("[.!?,;:\t\\\\\"()'\u2019\u2013]")
+
+WORD_SPLITTER = re.compile("[^a-zA-Z0-9_\\+\\-/]")
+
+
+def _create_trie(words):
+    trie = {}
+
+    for word in words:
+        node = trie
+        for character in word:
+            node = node.setdefault(character, {})
+
+        # the empty key marks the end of a word
+        node[""] = {}
+
+    return trie
+
+
+def _create_trie_pattern(node):
+    branches = [
+        re.escape(character) + _create_trie_pattern(child)
+        for character, child in sorted(node.items())
+        if character
+    ]
+
+    if not branches:
+        return ""
+
+    word_ends_here = "" in node
+    if len(branches) == 1 and not word_ends_here:
+        return branches[0]
+
+    pattern = "(?:{})".format("|".join(branches))
+
+    return pattern + "?" if word_ends_here else pattern
+
+
+def create_stop_word_pattern(stop_words):
+    """Create the regular expression that splits a text into phrases
+
+    The text is split on the RAKE sentence delimiters and on the stop words.
+    The stop words are compiled into a prefix tree so the regular expression
+    engine doesn't have to try every stop word at every position of the
+    text. The stop words that contain a sentence delimiter are ignored
+    because RAKE never finds them in a sentence.
+
+    :param list[str] stop_words: the stop words
+    :rtype: re.Pattern
+    :return: the regular expression
+    """
+    stop_words = [
+        stop_word
+        for stop_word in stop_words
+        if SENTENCE_DELIMITER_CHARACTERS.search(stop_word) is None
+    ]
+
+    patterns = [SENTENCE_DELIMITERS, "\\|"]
+    if stop_words:
+        patterns.append("\\b{}(?![\\w-])".format(
+            _create_trie_pattern(_create_trie(stop_words))))
+
+    return re.compile("|".join(patterns), re.IGNORECASE)
+
+
+class KeywordExtractor(metaclass=ABCMeta):
+    """Base class for all the keyword extractors"""
+
+    name = None
+
+    @abstractmethod
+    def run(self, text):
+        """Extract the keywords of a text
+
+        :param str text: the text
+        :rtype: list[(str, float)]
+        :return: the keywords and their scores sorted by score
+        """
+        pass
+
+
+class RakeKeywordExtractor(KeywordExtractor):
+    """Keyword extractor that uses the RAKE implementation of the rake
+    package"""
+
+    name = "rake"
+
+    def __init__(self, stop_list="SmartStoplist.txt"):
+        """Create a new RakeKeywordExtractor object
+
+        :param str stop_list: the stop list to use
+        """
+        self.stop_list = stop_list
+
+        self._rake = Rake(get_stoplist_file_path(stop_list))
+
+    def run(self, text):
+        return self._rake.run(text)
+
+
+class FastRakeKeywordExtractor(KeywordExtractor):
+    """Keyword extractor that returns the same keywords as RAKE faster
+
+    The text is split into phrases with a single regular expression in which
+    the stop words are compiled into a prefix tree. Every distinct phrase is
+    split into words once and the word and phrase scores are calculated
+    using numpy.
+    """
+
+    name = "fast_rake"
+
+    def __init__(self, stop_list="SmartStoplist.txt"):
+        """Create a new FastRakeKeywordExtractor object
+
+        :param str stop_list: the stop list to use
+        """
+        self.stop_list = stop_list
+
+        self._phrase_splitter = create_stop_word_pattern(
+            load_stop_words(get_stoplist_file_path(stop_list)))
+
+    def _extract_phrases(self, text):
+        phrase_counts = {}
+
+        for phrase in self._phrase_splitter.split(text):
+            phrase = phrase.strip().lower()
+            if phrase:
+                phrase_counts[phrase] = phrase_counts.get(phrase, 0) + 1
+
+        return phrase_counts
+
+    def run(self, text):
+        phrase_counts = self._extract_phrases(text)
+        if not phrase_counts:
+            return []
+
+        word_ids = {}
+        word_count = 0
+        phrase_word_ids = []
+        phrase_indices = []
+
+        for phrase_index, phrase in enumerate(phrase_counts):
+            for word in WORD_SPLITTER.split(phrase):
+                if not word:
+                    continue
+
+                word_id = word_ids.get(word)
+                if word_id is None:
+                    # RAKE leaves the numbers in the phrases but it doesn't
+                    # score them
+                    if is_number(word):
+                        word_id = -1
+                    else:
+                        word_id = word_count
+                        word_count += 1
+
+                    word_ids[word] = word_id
+
+                if word_id >= 0:
+                    phrase_word_ids.append(word_id)
+                    phrase_indices.append(phrase_index)
+
+        phrase_word_ids = np.array(phrase_word_ids, dtype=np.intp)
+        phrase_indices = np.array(phrase_indices, dtype=np.intp)
+        counts = np.fromiter(
+            phrase_counts.values(), dtype=np.float64,
+            count=len(phrase_counts)
+        )
+        word_counts = np.bincount(phrase_indices, minlength=len(counts))
+
+        # the degree of a word is the number of words of the phrases it
+        # appears in, including itself
+        frequencies = np.bincount(
+            phrase_word_ids, weights=counts[phrase_indices],
+            minlength=word_count
+        )
+        degrees = np.bincount(
+            phrase_word_ids,
+            weights=(counts * word_counts)[phrase_indices],
+            minlength=word_count
+        )
+
+        word_scores = degrees / frequencies
+
+        # the scores are added in the order of the words in every phrase, so
+        # they are identical to the ones that RAKE calculates
+        phrase_scores = np.bincount(
+            phrase_indices, weights=word_scores[phrase_word_ids],
+            minlength=len(counts)
+        )
+
+        keywords = [
+            # RAKE scores the phrases without words with the integer 0
+            (phrase, score if phrase_word_count else 0)
+            for phrase, score, phrase_word_count in zip(
+                phrase_counts, phrase_scores.tolist(), word_counts.tolist())
+        ]
+
+        return sorted(keywords, key=itemgetter(1), reverse=True)
+
+
+KEYWORD_EXTRACTORS = {
+    extractor.name: extractor
+    for extractor in (RakeKeywordExtractor, FastRakeKeywordExtractor)
+}
+
+
+def create_keyword_extractor(engine="rake", stop_list="SmartStoplist.txt"):
+    """Create a keyword extractor
+
+    :param str engine: the keyword extraction engine, which is "rake" or
+        "fast_rake"
+    :param str stop_list: the stop list to use
+    :rtype: KeywordExtractor
+    :return: the keyword extractor
+    """
+    extractor_class = KEYWORD_EXTRACTORS.get(engine)
+    if extractor_class is None:
+        raise ValueError("invalid keyword engine: {}".format(engine))
+
+    return extractor_class(stop_list)
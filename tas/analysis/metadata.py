@@ -0,0 +1,182 @@
+from collections import namedtuple
+from html.parser import HTMLParser
+import logging
+import re
+from urllib.parse import urljoin
+
+
+logger = logging.getLogger(__name__)
+
+
+# the attributes that opengraph requires in order to consider the metadata
+# valid. An attribute with an empty value is the same as a missing one
+OPENGRAPH_REQUIRED_ATTRIBUTES = [
+    "title", "type", "image", "url", "description"
+]
+
+IMAGE_SOURCE_LINK = re.compile(r"img_src|image_src")
+
+
+WebPageMetadata = namedtuple(
+    "WebPageMetadata",
+    ["title", "opengraph", "twitter_card", "top_image"]
+)
+
+
+class _StopParsing(Exception):
+    pass
+
+
+class _MetadataParser(HTMLParser):
+    """Collect the metadata of a web page while its html is tokenized
+
+    The parser stops at the end of the document head. If the head doesn't
+    contain a top image candidate it continues until the first image of the
+    document body.
+    """
+
+    def __init__(self):
+        super(_MetadataParser, self).__init__(convert_charrefs=True)
+
+        self.title = None
+        self.opengraph = {}
+        self.twitter_card = {}
+
+        # the top image candidates in the order of preference of newspaper
+        self.opengraph_image = None
+        self.image_source_link = None
+        self.opengraph_image_name = None
+        self.icon_link = None
+        self.first_body_image = None
+
+        self._in_head = True
+        self._in_title = False
+        self._title_parts = []
+
+    def _has_head_image(self):
+        return any([
+            self.opengraph_image, self.image_source_link,
+            self.opengraph_image_name, self.icon_link
+        ])
+
+    def _end_head(self):
+        if not self._in_head:
+            return
+
+        self._in_head = False
+
+        if self._has_head_image():
+            raise _StopParsing()
+
+    def _handle_meta(self, attributes):
+        content = attributes.get("content")
+        meta_property = attributes.get("property") or ""
+        name = attributes.get("name") or ""
+
+        if self._in_head and meta_property.startswith("og") and \
+                content is not None:
+            self.opengraph[meta_property[3:]] = content
+
+        if meta_property == "og:image" and self.opengraph_image is None:
+            self.opengraph_image = content
+
+        if name == "og:image" and self.opengraph_image_name is None:
+            self.opengraph_image_name = content
+
+        if name.startswith("twitter:"):
+            self.twitter_card[":".join(name.split(":")[1:])] = content
+
+    def _handle_link(self, attributes):
+        rel = attributes.get("rel") or ""
+
+        if self.image_source_link is None and IMAGE_SOURCE_LINK.search(rel):
+            self.image_source_link = attributes.get("href")
+
+        if self.icon_link is None and rel == "icon":
+            self.icon_link = attributes.get("href")
+
+    def handle_starttag(self, tag, attrs):
+        attributes = dict(attrs)
+
+        if tag == "body":
+            self._end_head()
+        elif tag == "title" and self.title is None:
+            self._in_title = True
+        elif tag == "meta":
+            self._handle_meta(attributes)
+        elif tag == "link":
+            self._handle_link(attributes)
+        elif tag == "img" and not self._in_head and attributes.get("src"):
+            self.first_body_image = attributes["src"]
+
+            raise _StopParsing()
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+
+    def handle_endtag(self, tag):
+        if tag == "title" and self._in_title:
+            self._in_title = False
+            self.title = "".join(self._title_parts)
+        elif tag == "head":
+            self._end_head()
+
+    def handle_data(self, data):
+        if self._in_title:
+            self._title_parts.append(data)
+
+    def get_title(self):
+        if self.title is None and self._in_title:
+            # the document ended before the title was closed
+            return "".join(self._title_parts)
+
+        return self.title
+
+    def top_image(self):
+        return self.opengraph_image or self.image_source_link or \
+            self.opengraph_image_name or self.icon_link or \
+            self.first_body_image
+
+
+def extract_metadata(url, html, chunk_size=65536):
+    """Extract the metadata of a web page without parsing the whole document
+
+    The html is tokenized in chunks and the tokenization stops as soon as the
+    metadata has been found, which is usually at the end of the document
+    head. The metadata has the same format as the metadata of the full web
+    page analysis.
+
+    :param str url: the web page url
+    :param str html: the web page html
+    :param int chunk_size: the number of characters to tokenize at a time
+    :rtype: WebPageMetadata
+    :return: the web page metadata
+    """
+    parser = _MetadataParser()
+
+    try:
+        for i in range(0, len(html), chunk_size):
+            parser.feed(html[i:i + chunk_size])
+
+        parser.close()
+    except _StopParsing:
+        pass
+
+    opengraph = None
+    if all(parser.opengraph.get(attribute)
+           for attribute in OPENGRAPH_REQUIRED_ATTRIBUTES):
+        opengraph = dict(parser.opengraph)
+        opengraph["scrape"] = False
+
+    twitter_card = parser.twitter_card or None
+    if twitter_card is None:
+        logger.warning("failed to extract twitter card")
+
+    top_image = parser.top_image()
+
+    return WebPageMetadata(
+        title=parser.get_title(),
+        opengraph=opengraph,
+        twitter_card=twitter_card,
+        top_image=urljoin(url, top_image) if top_image else ""
+    )
@@ -1,13 +1,32 @@
 from abc import ABCMeta, abstractmethod
 import logging
 
-from text_analysis_helpers.exceptions import HtmlAnalysisError
-from text_analysis_helpers.html import HtmlAnalyser
+from bs4 import BeautifulSoup
+from nltk import sent_tokenize, word_tokenize
+from text_analysis_helpers.exceptions import (
+    HtmlAnalysisError, ContentExtractionFailed
+)
+from text_analysis_helpers.processors.html import (
+    extract_opengraph_data, extract_page_content, extract_page_data,
+    extract_twitter_card
+)
+from text_analysis_helpers.processors.text import (
+    calculate_readability_scores, create_summary
+)
 
+from tas.analysis.entities import NamedEntityExtractor
 from tas.analysis.exceptions import (
-    InvalidHTMLContent, HtmlContentProcessingError
+    InvalidHTMLContent, HtmlContentProcessingError, InvalidTextContent,
+    InvalidURLContent, PageSkipped, TextContentProcessingError,
+    WebPageFetchError
 )
-from tas.analysis.schemas import WebPageSchema
+from tas.analysis.fetchers import AnalysisCache, CachedAnalysis, WebPageFetcher
+from tas.analysis.metadata import extract_metadata
+from tas.analysis.reports import ProcessingReport
+from tas.analysis.schemas import TextSchema, URLSchema, WebPageSchema
+from tas.analysis.state import AnalyserState
+from tas.analysis.text import calculate_text_statistics
+from tas.analysis.triage import ANALYSE, EXTRACT, METADATA, SKIP
 
 
 logger = logging.getLogger(__name__)
@@ -18,27 +37,175 @@ class ContentProcessor(object):
     __metaclass__ = ABCMeta
 
     @abstractmethod
-    def process_content(self, content):
+    def process_content(self, content, report=None):
         """Process the request content
 
         :param dict content: the request content
+        :param ProcessingReport|None report: the report to update with
+            information about the processing of the content
         :rtype: dict
         :return: the processing result
         """
         pass
 
 
-class HTMLContentProcessor(ContentProcessor):
+class TextContentProcessor(ContentProcessor):
+    """Plain text content processor"""
+
+    def __init__(self, keyword_stop_list=None, analyser_state=None,
+                 named_entity_extractor=None):
+        """Create a new TextContentProcessor object
+
+        :param str keyword_stop_list: the keyword stop list to use
+        :param AnalyserState|None analyser_state: the models to use. A new
+            state is created using the keyword stop list if it is not given
+        :param NamedEntityExtractor|None named_entity_extractor: the named
+            entity extractor. A sequential extractor is used if it is not
+            given
+        """
+        self.keyword_stop_list = keyword_stop_list or "SmartStoplist.txt"
+        self.analyser_state = \
+            analyser_state or AnalyserState(self.keyword_stop_list)
+        self.named_entity_extractor = \
+            named_entity_extractor or NamedEntityExtractor(self.analyser_state)
+
+        self.__text_schema = TextSchema()
+
+    def _deserialize_content(self, content):
+        result = self.__text_schema.load(content)
+        if result.errors:
+            logger.warning("invalid text content: errors=%s", result.errors)
+
+            raise InvalidTextContent(result.errors)
+
+        return result.data
+
+    def _iter_text_sections(self, text, report):
+        # the readability scores, the summary and the named entities are
+        # skipped while the service is overloaded
+        readability_scores = None
+        if not report.skip_stage("readability"):
+            with report.stage("readability"):
+                try:
+                    readability_scores = calculate_readability_scores(text)
+                except (ValueError, ZeroDivisionError) as e:
+                    logger.error("failed to calculate the readability scores")
+
+                    raise TextContentProcessingError() from e
+
+        yield "readability_scores", readability_scores
+
+        with report.stage("keywords"):
+            keywords = {
+                keyword: score
+                for keyword, score in
+                self.analyser_state.keyword_extractor.run(text)
+            }
+
+        yield "keywords", keywords
+
+        with report.stage("tokenization"):
+            sentences = sent_tokenize(text)
+            sentence_words = [
+                word_tokenize(sentence)
+                for sentence in sentences
+            ]
+
+        with report.stage("statistics"):
+            statistics = calculate_text_statistics(sentence_words)
+
+        yield "statistics", statistics
+
+        # gensim can't summarize a text that has only one sentence
+        summary = None
+        if not report.skip_stage("summary"):
+            with report.stage("summary"):
+                try:
+                    summary = create_summary(text)
+                except ValueError as e:
+                    logger.error("failed to create the summary")
+
+                    raise TextContentProcessingError() from e
+
+        yield "summary", summary
+
+        if report.skip_stage("named_entities"):
+            yield "named_entities", None
+            return
+
+        with report.stage("named_entities"):
+            named_entities = self.named_entity_extractor.extract(
+                sentence_words)
+
+        yield "named_entities", {
+            entity_type: sorted(list(items))
+            for entity_type, items in named_entities.items()
+        }
+
+    def _iter_sections(self, text, report):
+        yield "text", text
+
+        for section in self._iter_text_sections(text, report):
+            yield section
+
+    def stream_content(self, content, report=None):
+        """Process the request content and produce the result in sections
+
+        The content is deserialized immediately, so invalid content is
+        detected when this method is called. The analysis is performed while
+        the sections are consumed.
+
+        :param dict content: the request content
+        :param ProcessingReport|None report: the report to update with
+            information about the processing of the content
+        :rtype: collections.Iterator[(str, object)]
+        :return: the names and values of the sections of the result content
+            in the order that they are calculated
+        """
+        report = report or ProcessingReport()
+
+        with report.stage("deserialization"):
+            text = self._deserialize_content(content)["text"]
+
+        report.text_length = len(text)
+
+        return self._iter_sections(text, report)
+
+    def process_content(self, content, report=None):
+        report = report or ProcessingReport()
+
+        result = {
+            "content": dict(self.stream_content(content, report))
+        }
+
+        if report.degraded:
+            result["degraded"] = True
+
+        return result
+
+
+class HTMLContentProcessor(TextContentProcessor):
     """HTML content processor"""
 
-    def __init__(self, keyword_stop_list=None):
+    def __init__(self, keyword_stop_list=None, analyser_state=None,
+                 named_entity_extractor=None, triage=None):
         """Create a new HTMLContentProcessor object
 
         :param str keyword_stop_list: the keyword stop list to use
+        :param AnalyserState|None analyser_state: the models to use. A new
+            state is created using the keyword stop list if it is not given
+        :param NamedEntityExtractor|None named_entity_extractor: the named
+            entity extractor. A sequential extractor is used if it is not
+            given
+        :param PageTriage|None triage: the triage that decides how much of
+            the analysis every web page needs. Every web page is fully
+            analysed if it is not given
         """
-        self.keyword_stop_list = keyword_stop_list or "SmartStoplist.txt"
+        super(HTMLContentProcessor, self).__init__(
+            keyword_stop_list, analyser_state, named_entity_extractor)
+
+        self.triage = triage
 
-        self.__html_analyser = HtmlAnalyser(self.keyword_stop_list)
         self.__web_page_schema = WebPageSchema()
 
     def _deserialize_content(self, content):
@@ -50,55 +217,240 @@ class HTMLContentProcessor(ContentProcessor):
 
         return result.data
 
-    def process_content(self, content):
-        content = self._deserialize_content(content)
+    def _triage_web_page(self, web_page, report):
+        with report.stage("triage"):
+            decision = self.triage.triage(web_page.html)
 
-        try:
-            html_analysis_result = self.__html_analyser.analyse(content)
-        except HtmlAnalysisError as e:
-            logger.error("failed to analyse content using the html analyser")
+        report.triage = decision._asdict()
 
-            raise HtmlContentProcessingError() from e
+        logger.debug(
+            "web page triaged: url=%s action=%s reason=%s language=%s",
+            web_page.url, decision.action, decision.reason, decision.language
+        )
+
+        if decision.action == SKIP:
+            raise PageSkipped(decision.reason, decision.language)
+
+        return decision
+
+    def _iter_metadata_sections(self, web_page, report):
+        with report.stage("metadata"):
+            metadata = extract_metadata(web_page.url, web_page.html)
+
+        yield "title", metadata.title
+        yield "social", {
+            "opengraph": metadata.opengraph,
+            "twitter": metadata.twitter_card
+        }
+        yield "top_image", metadata.top_image
+
+    def _iter_web_page_sections(self, web_page, report):
+        action = ANALYSE
+
+        if self.triage is not None:
+            decision = self._triage_web_page(web_page, report)
+            action = decision.action
+
+            yield "triage", decision._asdict()
+
+            if action == METADATA:
+                for section in self._iter_metadata_sections(web_page, report):
+                    yield section
+
+                return
+
+        # the page metadata is extracted first because it is available much
+        # earlier than the results of the text analysis
+        with report.stage("page_data"):
+            soup = BeautifulSoup(web_page.html, "html.parser")
+            page_data = extract_page_data(soup)
+            twitter_card = extract_twitter_card(soup)
+
+        with report.stage("opengraph"):
+            opengraph = extract_opengraph_data(web_page.html)
 
         # we will remove the "_url" key from the opengraph data in order to
         # remain backwards compatible
-        opengraph = html_analysis_result.social_network_data.opengraph
         if opengraph is not None and "_url" in opengraph:
             del opengraph["_url"]
 
+        yield "title", page_data["title"]
+        yield "social", {
+            "opengraph": opengraph,
+            "twitter": twitter_card
+        }
+
+        with report.stage("content_extraction"):
+            page_content = extract_page_content(web_page.url, web_page.html)
+
+        if not page_content.text:
+            raise ContentExtractionFailed()
+
+        report.text_length = len(page_content.text)
+
+        yield "text", page_content.text
+        yield "html", web_page.html
+        yield "top_image", page_content.top_image
+        yield "images", list(page_content.imgs)
+        yield "movies", page_content.movies
+
+        if action == EXTRACT:
+            return
+
+        for section in self._iter_text_sections(page_content.text, report):
+            yield section
+
+        if self.triage is not None:
+            self.triage.record(report.stage_timings, len(web_page.html))
+
+    def _iter_sections(self, web_page, report):
+        try:
+            for section in self._iter_web_page_sections(web_page, report):
+                yield section
+        except HtmlAnalysisError as e:
+            logger.error("failed to analyse content using the html analyser")
+
+            raise HtmlContentProcessingError() from e
+        except TextContentProcessingError as e:
+            raise HtmlContentProcessingError() from e
+
+    def stream_content(self, content, report=None):
+        report = report or ProcessingReport()
+
+        with report.stage("deserialization"):
+            web_page = self._deserialize_content(content)
+
+        return self._iter_sections(web_page, report)
+
+
+class HTMLMetadataProcessor(ContentProcessor):
+    """Extract only the metadata of a web page
+
+    The result contains the title, the social data and the top image of the
+    web page in the same format as the HTMLContentProcessor result. Only the
+    part of the html that contains the metadata is tokenized and the text of
+    the web page is not analysed.
+    """
+
+    def __init__(self):
+        """Create a new HTMLMetadataProcessor object"""
+        self.__web_page_schema = WebPageSchema()
+
+    def _deserialize_content(self, content):
+        result = self.__web_page_schema.load(content)
+        if result.errors:
+            logger.warning("invalid html content: errors=%s", result.errors)
+
+            raise InvalidHTMLContent(result.errors)
+
+        return result.data
+
+    def process_content(self, content, report=None):
+        report = report or ProcessingReport()
+
+        with report.stage("deserialization"):
+            web_page = self._deserialize_content(content)
+
+        with report.stage("metadata"):
+            metadata = extract_metadata(web_page.url, web_page.html)
+
         return {
             "content": {
-                "text": html_analysis_result.text,
-                "html": html_analysis_result.html,
-                "title": html_analysis_result.title,
-                "keywords": html_analysis_result.keywords,
+                "title": metadata.title,
                 "social": {
-                    "opengraph":
-                        html_analysis_result.social_network_data.opengraph,
-                    "twitter": html_analysis_result.social_network_data.twitter
-                },
-                "summary": html_analysis_result.summary,
-                "readability_scores": html_analysis_result.readability_scores,
-                "statistics": {
-                    # we need to have text-analysis-helpers return these values
-                    # as python types instead of numpy types
-                    "average_sentence_word_count": float(html_analysis_result.statistics.average_sentence_word_count),  # noqa
-                    "max_sentence_word_count": int(html_analysis_result.statistics.max_sentence_word_count),  # noqa
-                    "mean_sentence_word_count": float(html_analysis_result.statistics.mean_sentence_word_count),  # noqa
-                    "median_sentence_word_count": float(html_analysis_result.statistics.median_sentence_word_count),  # noqa
-                    "min_sentence_word_count": int(html_analysis_result.statistics.min_sentence_word_count),  # noqa
-                    "sentence_count": int(html_analysis_result.statistics.sentence_count),  # noqa
-                    "sentence_word_count_std": float(html_analysis_result.statistics.sentence_word_count_std),  # noqa
-                    "sentence_word_count_variance": float(html_analysis_result.statistics.sentence_word_count_variance),  # noqa
-                    "word_count": int(html_analysis_result.statistics.word_count)  # noqa
+                    "opengraph": metadata.opengraph,
+                    "twitter": metadata.twitter_card
                 },
-                "named_entities": {
-                    entity_type: sorted(list(items))
-                    for entity_type, items in
-                    html_analysis_result.named_entities.items()
-                },
-                "top_image": html_analysis_result.top_image,
-                "images": list(html_analysis_result.images),
-                "movies": html_analysis_result.movies,
+                "top_image": metadata.top_image
             }
         }
+
+
+class URLContentProcessor(ContentProcessor):
+    """Download a web page and process its html content
+
+    The analysis of the web pages that have an ETag or a Last-Modified header
+    is cached and the cached analysis is returned when the web page has not
+    been modified since it was last downloaded.
+    """
+
+    def __init__(self, html_content_processor, fetcher=None, cache=None):
+        """Create a new URLContentProcessor object
+
+        :param HTMLContentProcessor html_content_processor: the processor to
+            use for the downloaded web pages
+        :param WebPageFetcher|None fetcher: the web page fetcher
+        :param AnalysisCache|None cache: the analysis cache
+        """
+        self.html_content_processor = html_content_processor
+        self.fetcher = fetcher or WebPageFetcher()
+        self.cache = cache or AnalysisCache()
+
+        self.__url_schema = URLSchema()
+
+    def _deserialize_content(self, content):
+        result = self.__url_schema.load(content)
+        if result.errors:
+            logger.warning("invalid url content: errors=%s", result.errors)
+
+            raise InvalidURLContent(result.errors)
+
+        return result.data
+
+    def process_content(self, content, report=None):
+        report = report or ProcessingReport()
+
+        with report.stage("deserialization"):
+            url = self._deserialize_content(content)["url"]
+
+        cached_analysis = self.cache.get(url)
+
+        with report.stage("fetch"):
+            if cached_analysis is not None:
+                fetch_result = self.fetcher.fetch(
+                    url,
+                    etag=cached_analysis.etag,
+                    last_modified=cached_analysis.last_modified
+                )
+            else:
+                fetch_result = self.fetcher.fetch(url)
+
+        if fetch_result.html is None:
+            if cached_analysis is None:
+                raise WebPageFetchError(
+                    "the web page was not modified but it isn't cached",
+                    url, fetch_result.status_code
+                )
+
+            logger.info("web page has not been modified: url=%s", url)
+            report.cache_hit = True
+
+            return cached_analysis.result
+
+        report.cache_hit = False
+
+        result = self.html_content_processor.process_content(
+            {
+                "url": url,
+                "html": fetch_result.html
+            },
+            report
+        )
+
+        # the analysis that skipped stages because the service was
+        # overloaded is not cached
+        no_validators = \
+            fetch_result.etag is None and fetch_result.last_modified is None
+        if no_validators or report.degraded:
+            self.cache.remove(url)
+        else:
+            self.cache.set(
+                url,
+                CachedAnalysis(
+                    etag=fetch_result.etag,
+                    last_modified=fetch_result.last_modified,
+                    result=result
+                )
+            )
+
+        return result
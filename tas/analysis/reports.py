@@ -0,0 +1,171 @@
+from collections import OrderedDict
+from contextlib import contextmanager
+import resource
+import sys
+import time
+import tracemalloc
+
+
+def get_peak_memory():
+    """Get the peak resident set size of the current process
+
+    This is the high water mark of the process since it started.
+
+    :rtype: int
+    :return: the peak resident set size in bytes
+    """
+    peak_memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # ru_maxrss is in bytes on macOS and in kilobytes everywhere else
+    if sys.platform != "darwin":
+        peak_memory *= 1024
+
+    return peak_memory
+
+
+def _reset_traced_memory_peak():
+    # tracemalloc can only reset the peak since python 3.9. The peak of every
+    # stage is not available in the older versions
+    if not hasattr(tracemalloc, "reset_peak"):
+        return tracemalloc.get_traced_memory()[0], False
+
+    tracemalloc.reset_peak()
+
+    return tracemalloc.get_traced_memory()[0], True
+
+
+class ProcessingReport(object):
+    """Information about the execution of a content processing request"""
+
+    def __init__(self):
+        """Create a new ProcessingReport object"""
+        self.stage_timings = OrderedDict()
+        self.text_length = None
+        self.cache_hit = None
+        self.lane = None
+        self.coalesced = False
+        self.shard = None
+        self.memory = None
+        self.triage = None
+        self.stages_to_skip = frozenset()
+        self.skipped_stages = []
+
+        self._memory_start = None
+
+    @contextmanager
+    def stage(self, name):
+        """Measure the execution time of a processing stage
+
+        The peak and net memory allocations of the stage are measured too if
+        memory tracking has been started.
+
+        :param str name: the stage name
+        """
+        track_memory = self.memory is not None and tracemalloc.is_tracing()
+        if track_memory:
+            stage_memory_start, peak_available = _reset_traced_memory_peak()
+
+        start_time = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            self.stage_timings[name] = time.perf_counter() - start_time
+
+            if track_memory:
+                self._record_stage_memory(
+                    name, stage_memory_start, peak_available)
+
+    def _record_stage_memory(self, name, stage_memory_start, peak_available):
+        current, peak = tracemalloc.get_traced_memory()
+
+        stage_peak = None
+        if peak_available:
+            stage_peak = peak - stage_memory_start
+            self.memory["peak"] = max(
+                self.memory["peak"], peak - self._memory_start)
+
+        self.memory["stages"][name] = {
+            "peak": stage_peak,
+            "net": current - stage_memory_start
+        }
+
+    def skip_stage(self, name):
+        """Check if an optional processing stage must be skipped
+
+        The stage is recorded as skipped if it must be skipped.
+
+        :param str name: the stage name
+        :rtype: bool
+        :return: True if the stage must be skipped
+        """
+        if name not in self.stages_to_skip:
+            return False
+
+        self.skipped_stages.append(name)
+
+        return True
+
+    @property
+    def degraded(self):
+        """True if any of the processing stages was skipped
+
+        :rtype: bool
+        """
+        return bool(self.skipped_stages)
+
+    def start_memory_tracking(self):
+        """Start recording the memory that is allocated by every stage
+
+        tracemalloc must be tracing the memory allocations. The peak of the
+        request is the traced peak since this call on python 3.9 or later
+        and the traced peak since tracing started in the older versions.
+        """
+        self._memory_start, _ = _reset_traced_memory_peak()
+        self.memory = {
+            "peak": 0,
+            "net": 0,
+            "stages": OrderedDict()
+        }
+
+    def stop_memory_tracking(self):
+        """Stop recording the memory that is allocated by every stage"""
+        if self.memory is None or not tracemalloc.is_tracing():
+            return
+
+        current, peak = tracemalloc.get_traced_memory()
+
+        # the stages reset the traced peak when it is supported, so the
+        # peaks of the earlier stages have already been recorded
+        self.memory["net"] = current - self._memory_start
+        self.memory["peak"] = max(
+            self.memory["peak"], peak - self._memory_start,
+            self.memory["net"]
+        )
+
+    def as_dict(self):
+        """Convert the report into a dictionary
+
+        :rtype: dict
+        :return: the report data
+        """
+        return {
+            "text_length": self.text_length,
+            "cache_hit": self.cache_hit,
+            "lane": self.lane,
+            "coalesced": self.coalesced,
+            "shard": self.shard,
+            "triage": self.triage,
+            "skipped_stages": list(self.skipped_stages),
+            "stage_timings": dict(self.stage_timings),
+            "memory": self._memory_as_dict()
+        }
+
+    def _memory_as_dict(self):
+        if self.memory is None:
+            return None
+
+        memory = dict(self.memory)
+        memory["stages"] = dict(self.memory["stages"])
+
+        return memory
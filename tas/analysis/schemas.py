@@ -1,5 +1,6 @@
 from marshmallow import Schema, post_load
 from marshmallow.fields import String, Url
+from marshmallow.validate import Length, Regexp
 from text_analysis_helpers.models import WebPage
 
 
@@ -10,3 +11,17 @@ class WebPageSchema(Schema):
     @post_load()
     def make_web_page(self, data):
         return WebPage(**data)
+
+
+class TextSchema(Schema):
+    text = String(
+        required=True,
+        validate=[
+            Length(min=1),
+            Regexp(r"\s*\S", error="The text must not be blank.")
+        ]
+    )
+
+
+class URLSchema(Schema):
+    url = Url(required=True, allow_none=False)
@@ -0,0 +1,256 @@
+import json
+import logging
+import mmap
+from os import replace
+import pickle
+import platform
+import struct
+from threading import Lock
+
+import nltk
+from nltk.data import load as nltk_data_load
+from nltk.tag.perceptron import PerceptronTagger
+from tas import __VERSION__
+from tas.analysis.keywords import create_keyword_extractor
+from tas.analysis.text import MULTICLASS_NE_CHUNKER
+
+
+logger = logging.getLogger(__name__)
+
+
+SNAPSHOT_MAGIC = b"TASSNAP1"
+SNAPSHOT_HEADER_SIZE = struct.Struct("<Q")
+
+# the out of band buffers are aligned so that numpy can use them directly
+SNAPSHOT_ALIGNMENT = 64
+
+
+def _snapshot_environment(keyword_stop_list, keyword_engine):
+    # a snapshot can only be used by the same versions of the software that
+    # created it
+    return {
+        "tas": __VERSION__,
+        "python": platform.python_version(),
+        "nltk": nltk.__version__,
+        "keyword_stop_list": keyword_stop_list,
+        "keyword_engine": keyword_engine
+    }
+
+
+def _aligned(offset):
+    return (offset + SNAPSHOT_ALIGNMENT - 1) // SNAPSHOT_ALIGNMENT * \
+        SNAPSHOT_ALIGNMENT
+
+
+def _dumps(obj):
+    if pickle.HIGHEST_PROTOCOL < 5:
+        return pickle.dumps(obj, pickle.HIGHEST_PROTOCOL), []
+
+    buffers = []
+    data = pickle.dumps(obj, protocol=5, buffer_callback=buffers.append)
+
+    return data, [buffer.raw() for buffer in buffers]
+
+
+class SnapshotError(Exception):
+    """Exception that is raised when a snapshot can not be used"""
+    pass
+
+
+class AnalyserState(object):
+    """The models and the keyword extractor that the analysers use
+
+    The state is created the first time it is used. It is either built from
+    the nltk data, the keyword engine and the keyword stop list or it is
+    loaded from a snapshot that was created using save_snapshot.
+
+    Snapshots are memory mapped. The large arrays of the models are used
+    directly from the mapped file without being copied when the pickle
+    protocol supports out of band buffers, so the workers that load the same
+    snapshot share them through the page cache.
+    """
+
+    def __init__(self, keyword_stop_list=None, snapshot_file=None,
+                 keyword_engine="rake"):
+        """Create a new AnalyserState object
+
+        :param str|None keyword_stop_list: the keyword stop list to use
+        :param str|None snapshot_file: the snapshot to load the state from
+        :param str keyword_engine: the keyword extraction engine, which is
+            "rake" or "fast_rake"
+        """
+        self.keyword_stop_list = keyword_stop_list or "SmartStoplist.txt"
+        self.snapshot_file = snapshot_file
+        self.keyword_engine = keyword_engine
+
+        self._components = None
+        self._snapshot_mmap = None
+        self._lock = Lock()
+
+    def _build(self):
+        logger.info(
+            "building analyser state: keyword_engine=%s "
+            "keyword_stop_list=%s",
+            self.keyword_engine, self.keyword_stop_list
+        )
+
+        return {
+            "keyword_extractor": create_keyword_extractor(
+                self.keyword_engine, self.keyword_stop_list),
+            "pos_tagger": PerceptronTagger(),
+            "ne_chunker": nltk_data_load(MULTICLASS_NE_CHUNKER)
+        }
+
+    def _load_snapshot(self):
+        logger.info(
+            "loading analyser state snapshot: snapshot_file=%s",
+            self.snapshot_file
+        )
+
+        with open(self.snapshot_file, "rb") as f:
+            snapshot_mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        snapshot = memoryview(snapshot_mmap)
+
+        if snapshot[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+            raise SnapshotError("invalid snapshot file")
+
+        header_start = len(SNAPSHOT_MAGIC) + SNAPSHOT_HEADER_SIZE.size
+        header_size, = SNAPSHOT_HEADER_SIZE.unpack_from(
+            snapshot, len(SNAPSHOT_MAGIC))
+        header = json.loads(
+            bytes(snapshot[header_start:header_start + header_size])
+            .decode("utf8")
+        )
+
+        environment = _snapshot_environment(
+            self.keyword_stop_list, self.keyword_engine)
+        if header["environment"] != environment:
+            raise SnapshotError(
+                "the snapshot was created for a different environment: "
+                "snapshot={} current={}".format(
+                    header["environment"], environment)
+            )
+
+        buffers = [
+            snapshot[offset:offset + length]
+            for offset, length in header["buffers"]
+        ]
+
+        offset, length = header["pickle"]
+        components = pickle.loads(
+            snapshot[offset:offset + length], buffers=buffers) \
+            if buffers else pickle.loads(snapshot[offset:offset + length])
+
+        # the arrays that were loaded from the out of band buffers reference
+        # the mapped file so it must remain open
+        self._snapshot_mmap = snapshot_mmap
+
+        return components
+
+    def _get_components(self):
+        if self._components is None:
+            with self._lock:
+                if self._components is None:
+                    self._components = self._create_components()
+
+        return self._components
+
+    def _create_components(self):
+        if self.snapshot_file is None:
+            return self._build()
+
+        try:
+            return self._load_snapshot()
+        except (OSError, ValueError, KeyError, struct.error, SnapshotError,
+                pickle.UnpicklingError) as e:
+            logger.warning(
+                "failed to load analyser state snapshot, building the state "
+                "instead: snapshot_file=%s error=%s",
+                self.snapshot_file, e
+            )
+
+            return self._build()
+
+    @property
+    def loaded_from_snapshot(self):
+        """True if the state has been loaded from the snapshot file
+
+        :rtype: bool
+        """
+        return self._snapshot_mmap is not None
+
+    @property
+    def keyword_extractor(self):
+        """The keyword extractor
+
+        :rtype: KeywordExtractor
+        """
+        return self._get_components()["keyword_extractor"]
+
+    @property
+    def pos_tagger(self):
+        """The part of speech tagger
+
+        :rtype: PerceptronTagger
+        """
+        return self._get_components()["pos_tagger"]
+
+    @property
+    def ne_chunker(self):
+        """The named entity chunker"""
+        return self._get_components()["ne_chunker"]
+
+    def warm_up(self):
+        """Create the state now instead of when it is first used"""
+        self._get_components()
+
+    def save_snapshot(self, filename):
+        """Save the state to a snapshot file
+
+        :param str filename: the snapshot file
+        """
+        data, buffers = _dumps(self._get_components())
+
+        header = {
+            "environment": _snapshot_environment(
+                self.keyword_stop_list, self.keyword_engine),
+            "buffers": [],
+            "pickle": None
+        }
+
+        # the header contains the buffer offsets so we calculate them using a
+        # generous estimate of the header size
+        offset = _aligned(
+            len(SNAPSHOT_MAGIC) + SNAPSHOT_HEADER_SIZE.size + 4096 +
+            64 * len(buffers)
+        )
+        for buffer in buffers:
+            header["buffers"].append([offset, buffer.nbytes])
+            offset = _aligned(offset + buffer.nbytes)
+        header["pickle"] = [offset, len(data)]
+
+        encoded_header = json.dumps(header).encode("utf8")
+        header_end = \
+            len(SNAPSHOT_MAGIC) + SNAPSHOT_HEADER_SIZE.size + \
+            len(encoded_header)
+        if header["buffers"] and header_end > header["buffers"][0][0]:
+            raise SnapshotError("the snapshot header is too large")
+
+        temporary_filename = "{}.tmp".format(filename)
+
+        with open(temporary_filename, "wb") as f:
+            f.write(SNAPSHOT_MAGIC)
+            f.write(SNAPSHOT_HEADER_SIZE.pack(len(encoded_header)))
+            f.write(encoded_header)
+
+            for (buffer_offset, _), buffer in zip(header["buffers"], buffers):
+                f.seek(buffer_offset)
+                f.write(buffer)
+
+            f.seek(header["pickle"][0])
+            f.write(data)
+
+        replace(temporary_filename, filename)
+
+        logger.info("analyser state snapshot saved: filename=%s", filename)
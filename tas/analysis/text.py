@@ -0,0 +1,144 @@
+from collections import defaultdict
+
+from nltk.tree import Tree
+import numpy as np
+
+
+MULTICLASS_NE_CHUNKER = \
+    "chunkers/maxent_ne_chunker/english_ace_multiclass.pickle"
+
+# the statistics of a text without sentences
+EMPTY_TEXT_STATISTICS = {
+    "average_sentence_word_count": 0.0,
+    "max_sentence_word_count": 0,
+    "mean_sentence_word_count": 0.0,
+    "median_sentence_word_count": 0.0,
+    "min_sentence_word_count": 0,
+    "sentence_count": 0,
+    "sentence_word_count_std": 0.0,
+    "sentence_word_count_variance": 0.0,
+    "word_count": 0
+}
+
+
+def calculate_batch_text_statistics(documents):
+    """Calculate the text statistics of many documents
+
+    The sentence word counts of all the documents are stored in a single
+    array and every statistic is calculated for all the documents at once.
+    The variance is calculated from the integer sums of the word counts and
+    of their squares, so it is exact before it is converted to a float.
+
+    :param list[list[list[str]]] documents: the sentences of every document
+        that have been tokenized into separate words
+    :rtype: list[dict]
+    :return: the statistics of every document using python types
+    """
+    sentence_counts = np.fromiter(
+        (len(sentence_words) for sentence_words in documents),
+        dtype=np.int64, count=len(documents)
+    )
+    sentence_word_counts = np.fromiter(
+        (
+            len(sentence)
+            for sentence_words in documents
+            for sentence in sentence_words
+        ),
+        dtype=np.int64, count=int(sentence_counts.sum())
+    )
+
+    # the documents without sentences are excluded because reduceat can't
+    # reduce an empty segment
+    non_empty = sentence_counts > 0
+    counts = sentence_counts[non_empty]
+    offsets = np.cumsum(sentence_counts)[non_empty] - counts
+
+    statistics = [
+        dict(EMPTY_TEXT_STATISTICS) for _ in range(len(documents))]
+    if len(counts) == 0:
+        return statistics
+
+    word_counts = np.add.reduceat(sentence_word_counts, offsets)
+    square_sums = np.add.reduceat(sentence_word_counts ** 2, offsets)
+    min_counts = np.minimum.reduceat(sentence_word_counts, offsets)
+    max_counts = np.maximum.reduceat(sentence_word_counts, offsets)
+
+    # the word counts are sorted inside every document by sorting them
+    # together with the index of their document
+    document_keys = np.repeat(
+        np.arange(len(counts)) * (int(max_counts.max()) + 1), counts)
+    sorted_counts = \
+        np.sort(document_keys + sentence_word_counts) - document_keys
+    lower_medians = sorted_counts[offsets + (counts - 1) // 2]
+    upper_medians = sorted_counts[offsets + counts // 2]
+
+    means = word_counts / counts
+    variances = (counts * square_sums - word_counts ** 2) / counts ** 2
+
+    results = zip(
+        np.flatnonzero(non_empty).tolist(),
+        counts.tolist(),
+        word_counts.tolist(),
+        means.tolist(),
+        ((lower_medians + upper_medians) / 2).tolist(),
+        min_counts.tolist(),
+        max_counts.tolist(),
+        np.sqrt(variances).tolist(),
+        variances.tolist()
+    )
+
+    for index, sentence_count, word_count, mean, median, min_count, \
+            max_count, std, variance in results:
+        statistics[index] = {
+            "average_sentence_word_count": mean,
+            "max_sentence_word_count": max_count,
+            "mean_sentence_word_count": mean,
+            "median_sentence_word_count": median,
+            "min_sentence_word_count": min_count,
+            "sentence_count": sentence_count,
+            "sentence_word_count_std": std,
+            "sentence_word_count_variance": variance,
+            "word_count": word_count
+        }
+
+    return statistics
+
+
+def calculate_text_statistics(sentence_words):
+    """Calculate the text statistics
+
+    :param list[list[str]] sentence_words: a list with the sentences that
+        have been tokenized into separate words
+    :rtype: dict
+    :return: the calculated text statistics using python types
+    """
+    return calculate_batch_text_statistics([sentence_words])[0]
+
+
+def extract_named_entities(pos_tagger, ne_chunker, sentence_words):
+    """Extract the named entities from the sentences
+
+    :param nltk.tag.perceptron.PerceptronTagger pos_tagger: the part of
+        speech tagger
+    :param nltk.chunk.named_entity.NEChunkParser ne_chunker: the named
+        entity chunker
+    :param list[list[str]] sentence_words: a list with the sentences that
+        have been tokenized into separate words
+    :rtype: dict[str, set[str]]
+    :return: the named entity types and the named entities of every type
+    """
+    named_entities = defaultdict(set)
+
+    for sentence in sentence_words:
+        chunked_sentence = ne_chunker.parse(pos_tagger.tag(sentence))
+
+        for item in chunked_sentence:
+            if isinstance(item, Tree):
+                entity = " ".join(
+                    entity_component[0]
+                    for entity_component in item.leaves()
+                )
+
+                named_entities[item.label()].add(entity)
+
+    return dict(named_entities)
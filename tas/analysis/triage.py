@@ -0,0 +1,371 @@
+from collections import Counter, namedtuple
+from html.parser import HTMLParser
+import logging
+import re
+from threading import Lock
+
+from statsd import StatsClient
+
+
+logger = logging.getLogger(__name__)
+
+
+TRIAGE_ACTION_COUNTER = "topicaxis.tas.triage.{action}"
+TRIAGE_TIME_SAVED = "topicaxis.tas.triage.time_saved"
+
+# the triage actions ordered from the one that performs the least work to the
+# one that performs the full analysis
+SKIP = "skip"
+METADATA = "metadata"
+EXTRACT = "extract"
+ANALYSE = "analyse"
+
+ACTIONS = [SKIP, METADATA, EXTRACT, ANALYSE]
+
+# the processing stages that every action doesn't execute
+SKIPPED_STAGES = {
+    SKIP: [
+        "page_data", "opengraph", "content_extraction", "readability",
+        "keywords", "tokenization", "statistics", "summary", "named_entities"
+    ],
+    METADATA: [
+        "page_data", "opengraph", "content_extraction", "readability",
+        "keywords", "tokenization", "statistics", "summary", "named_entities"
+    ],
+    EXTRACT: [
+        "readability", "keywords", "tokenization", "statistics", "summary",
+        "named_entities"
+    ],
+    ANALYSE: []
+}
+
+# the most frequent words of the languages that are detected. A text is in
+# the language whose words are the largest fraction of its words
+LANGUAGE_WORDS = {
+    "en": {
+        "the", "of", "and", "to", "in", "is", "that", "for", "it", "was",
+        "on", "with", "as", "are", "this", "be", "by", "have", "from", "not"
+    },
+    "de": {
+        "der", "die", "und", "in", "den", "von", "zu", "das", "mit",
+        "sich", "des", "auf", "für", "ist", "im", "dem", "nicht", "ein",
+        "eine", "auch"
+    },
+    "fr": {
+        "le", "de", "la", "et", "les", "des", "en", "un", "du", "une", "que",
+        "est", "pour", "qui", "dans", "par", "pas", "au", "sur", "avec"
+    },
+    "es": {
+        "de", "la", "que", "el", "en", "y", "los", "del", "se", "las", "por",
+        "un", "para", "con", "no", "una", "su", "al", "es", "lo"
+    },
+    "it": {
+        "di", "e", "il", "la", "che", "in", "per", "un", "del", "della",
+        "non", "una", "sono", "le", "si", "con", "dei", "gli", "nel", "alla"
+    },
+    "pt": {
+        "de", "a", "o", "que", "e", "do", "da", "em", "um", "para", "com",
+        "não", "uma", "os", "no", "se", "na", "por", "mais", "as"
+    },
+    "nl": {
+        "de", "van", "een", "het", "en", "in", "is", "dat", "op", "te",
+        "zijn", "voor", "met", "die", "niet", "aan", "er", "om", "ook", "als"
+    }
+}
+
+WORD = re.compile(r"[^\W\d_]+")
+
+IGNORED_TAGS = {"script", "style", "noscript", "template"}
+
+
+TriageDecision = namedtuple(
+    "TriageDecision",
+    ["language", "article", "reason", "action", "time_saved"]
+)
+
+
+class _TriageParser(HTMLParser):
+    """Collect the page features that are used to triage a web page"""
+
+    def __init__(self, sample_size):
+        super(_TriageParser, self).__init__(convert_charrefs=True)
+
+        self.sample_size = sample_size
+
+        self.html_language = None
+        self.password_inputs = 0
+        self.text_length = 0
+        self.link_text_length = 0
+        self.paragraph_text_length = 0
+        self.sample = []
+        self.sample_length = 0
+
+        self._ignored_depth = 0
+        self._link_depth = 0
+        self._paragraph_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in IGNORED_TAGS:
+            self._ignored_depth += 1
+        elif tag == "a":
+            self._link_depth += 1
+        elif tag == "p":
+            self._paragraph_depth += 1
+        elif tag == "html":
+            self.html_language = dict(attrs).get("lang")
+        elif tag == "input":
+            if (dict(attrs).get("type") or "").lower() == "password":
+                self.password_inputs += 1
+
+    def handle_startendtag(self, tag, attrs):
+        # void elements don't have any content
+        if tag not in ("a", "p") and tag not in IGNORED_TAGS:
+            self.handle_starttag(tag, attrs)
+
+    def handle_endtag(self, tag):
+        if tag in IGNORED_TAGS:
+            self._ignored_depth = max(self._ignored_depth - 1, 0)
+        elif tag == "a":
+            self._link_depth = max(self._link_depth - 1, 0)
+        elif tag == "p":
+            self._paragraph_depth = max(self._paragraph_depth - 1, 0)
+
+    def handle_data(self, data):
+        if self._ignored_depth > 0:
+            return
+
+        text = data.strip()
+        if not text:
+            return
+
+        self.text_length += len(text)
+
+        if self._link_depth > 0:
+            self.link_text_length += len(text)
+        elif self._paragraph_depth > 0:
+            self.paragraph_text_length += len(text)
+
+            if self.sample_length < self.sample_size:
+                self.sample.append(text)
+                self.sample_length += len(text)
+
+
+def detect_language(text, min_words=30, min_score=0.1):
+    """Detect the language of a text using the frequencies of the most common
+    words of every language
+
+    :param str text: the text
+    :param int min_words: the minimum number of words that are required to
+        detect the language
+    :param float min_score: the minimum fraction of the words that must be
+        common words of the detected language
+    :rtype: str|None
+    :return: the language code or None if the language couldn't be detected
+    """
+    words = Counter(word.lower() for word in WORD.findall(text))
+
+    word_count = sum(words.values())
+    if word_count < min_words:
+        return None
+
+    scores = {
+        language: sum(words[word] for word in language_words) / word_count
+        for language, language_words in LANGUAGE_WORDS.items()
+    }
+
+    language = max(scores, key=scores.get)
+    if scores[language] < min_score:
+        return None
+
+    return language
+
+
+def _normalize_language(language):
+    if not language:
+        return None
+
+    return language.split("-")[0].split("_")[0].strip().lower() or None
+
+
+class PageTriage(object):
+    """Decide how much of the analysis pipeline a web page needs
+
+    The language and the article-likeness of a web page are detected using a
+    single pass over its html, which is much cheaper than the content
+    extraction. The pages in unsupported languages and the pages that aren't
+    articles, like login walls, listings and error pages, are processed
+    using the configured actions:
+
+    - skip: the page is not processed
+    - metadata: only the page metadata is extracted
+    - extract: the page content is extracted but the text isn't analysed
+    - analyse: the page is fully analysed
+
+    The time that is saved is estimated using the average processing time per
+    html character of every stage of the fully analysed pages.
+    """
+
+    def __init__(self, languages=None, unsupported_language_action=EXTRACT,
+                 non_article_action=METADATA, min_text_length=500,
+                 max_link_density=0.5, sample_size=5000, statsd_client=None):
+        """Create a new PageTriage object
+
+        :param list[str]|None languages: the languages that are fully
+            analysed
+        :param str unsupported_language_action: the action for the pages in
+            the other languages
+        :param str non_article_action: the action for the pages that aren't
+            articles
+        :param int min_text_length: the minimum number of paragraph
+            characters of an article
+        :param float max_link_density: the maximum fraction of the text of an
+            article that is link text
+        :param int sample_size: the number of paragraph characters that are
+            used to detect the language
+        :param StatsClient|None statsd_client: the client to send the triage
+            metrics to
+        """
+        for action in (unsupported_language_action, non_article_action):
+            if action not in ACTIONS:
+                raise ValueError("invalid triage action: {}".format(action))
+
+        self.languages = set(languages or ["en"])
+        self.unsupported_language_action = unsupported_language_action
+        self.non_article_action = non_article_action
+        self.min_text_length = min_text_length
+        self.max_link_density = max_link_density
+        self.sample_size = sample_size
+
+        self._statsd_client = statsd_client
+        self._stage_rates = {}
+        self._lock = Lock()
+
+    @classmethod
+    def from_configuration(cls, configuration):
+        """Create a PageTriage using the application configuration
+
+        :param Configuration configuration: the application configuration
+        :rtype: PageTriage|None
+        :return: the page triage or None if it is disabled
+        """
+        if not configuration["TRIAGE_ENABLED"]:
+            return None
+
+        statsd_client = None
+        if configuration.get("STATSD_HOST") is not None:
+            statsd_client = StatsClient(
+                configuration["STATSD_HOST"],
+                configuration.get("STATSD_PORT", 8125)
+            )
+
+        return cls(
+            languages=configuration["TRIAGE_LANGUAGES"],
+            unsupported_language_action=configuration[
+                "TRIAGE_UNSUPPORTED_LANGUAGE_ACTION"],
+            non_article_action=configuration["TRIAGE_NON_ARTICLE_ACTION"],
+            min_text_length=configuration["TRIAGE_MIN_TEXT_LENGTH"],
+            max_link_density=configuration["TRIAGE_MAX_LINK_DENSITY"],
+            statsd_client=statsd_client
+        )
+
+    def _classify(self, parser):
+        if parser.paragraph_text_length < self.min_text_length:
+            if parser.password_inputs > 0:
+                return False, "login"
+
+            return False, "short"
+
+        link_density = parser.link_text_length / max(parser.text_length, 1)
+        if link_density > self.max_link_density:
+            return False, "listing"
+
+        return True, "article"
+
+    def _estimate_time_saved(self, action, html_length):
+        with self._lock:
+            rates = [
+                self._stage_rates.get(stage)
+                for stage in SKIPPED_STAGES[action]
+            ]
+
+        if not rates:
+            return 0.0
+
+        # the time saved can't be estimated until a page has been analysed
+        if any(rate is None for rate in rates):
+            return None
+
+        return sum(rates) * html_length
+
+    def record(self, stage_timings, html_length, weight=0.1):
+        """Update the average processing time of the stages using a fully
+        analysed page
+
+        :param dict[str, float] stage_timings: the execution time of every
+            stage
+        :param int html_length: the number of html characters of the page
+        :param float weight: the weight of the page in the average
+        """
+        if not html_length:
+            return
+
+        with self._lock:
+            for stage, execution_time in stage_timings.items():
+                rate = execution_time / html_length
+                average_rate = self._stage_rates.get(stage)
+
+                if average_rate is None:
+                    self._stage_rates[stage] = rate
+                else:
+                    self._stage_rates[stage] = \
+                        (1 - weight) * average_rate + weight * rate
+
+    def triage(self, html):
+        """Decide how a web page must be processed
+
+        :param str html: the web page html
+        :rtype: TriageDecision
+        :return: the triage decision
+        """
+        parser = _TriageParser(self.sample_size)
+        parser.feed(html)
+        parser.close()
+
+        language = detect_language(" ".join(parser.sample)) or \
+            _normalize_language(parser.html_language)
+
+        article, reason = self._classify(parser)
+
+        actions = [ANALYSE]
+        if language is not None and language not in self.languages:
+            actions.append(self.unsupported_language_action)
+            reason = "unsupported_language" if article else reason
+
+        if not article:
+            actions.append(self.non_article_action)
+
+        action = min(actions, key=ACTIONS.index)
+
+        decision = TriageDecision(
+            language=language,
+            article=article,
+            reason=reason,
+            action=action,
+            time_saved=self._estimate_time_saved(action, len(html))
+        )
+
+        self._send_metrics(decision)
+
+        return decision
+
+    def _send_metrics(self, decision):
+        if self._statsd_client is None:
+            return
+
+        self._statsd_client.incr(
+            TRIAGE_ACTION_COUNTER.format(action=decision.action))
+
+        if decision.time_saved:
+            # statsd requires the time in milliseconds
+            self._statsd_client.timing(
+                TRIAGE_TIME_SAVED, decision.time_saved * 1000)
@@ -1,9 +1,38 @@
-from os import getcwd
-from argparse import ArgumentParser
+from os import getcwd, kill, path
+from argparse import ArgumentParser, ArgumentTypeError
+import logging.config
+import signal
 
+from tas.analysis.state import AnalyserState
+from tas.configuration.loaders import Configuration
+from tas.corpus import load_corpus
+from tas.exporters import RESULTS_FORMATS
+from tas.loadtest import (
+    LoadGenerator, find_saturation_throughput, format_result
+)
+from tas.profiling import ProfileStore, write_collapsed_stacks
+from tas.spool import SpoolWorker
 from tas.web.servers import TextAnalysisServiceServer
 
 
+def _get_settings_file():
+    return path.join(getcwd(), "settings.py")
+
+
+def _load_configuration():
+    return Configuration.load_from_py(_get_settings_file())
+
+
+def _positive_float(value):
+    number = float(value)
+
+    # nan and infinity are rejected too
+    if not 0 < number < float("inf"):
+        raise ArgumentTypeError("{} is not a positive number".format(value))
+
+    return number
+
+
 def run(args):
     configuration_path = getcwd()
 
@@ -12,6 +41,109 @@ def run(args):
     tas_server.run()
 
 
+def reload(args):
+    configuration = _load_configuration()
+
+    if configuration["PIDFILE"] is None:
+        raise SystemExit(
+            "the PIDFILE setting is required to reload the server")
+
+    try:
+        with open(configuration["PIDFILE"]) as f:
+            pid = int(f.read().strip())
+    except (IOError, ValueError):
+        raise SystemExit(
+            "failed to read the server process id from {}".format(
+                configuration["PIDFILE"]))
+
+    kill(pid, signal.SIGHUP)
+
+    print("requested the reload of the server with process id {}".format(pid))
+
+
+def collapse_profiles(args):
+    directory = args.directory
+    if directory is None:
+        directory = _load_configuration()["PROFILING_DIRECTORY"]
+
+    store = ProfileStore(directory)
+    stacks = store.aggregate()
+
+    write_collapsed_stacks(stacks, args.output)
+
+    print("merged {profile_count} profiles with {sample_count} samples "
+          "into {output}".format(
+              profile_count=len(store.profile_files()),
+              sample_count=sum(stacks.values()),
+              output=args.output
+          ))
+
+
+def create_snapshot(args):
+    configuration = _load_configuration()
+
+    output = args.output or configuration["ANALYSER_SNAPSHOT"]
+    if output is None:
+        raise SystemExit(
+            "the snapshot file must be given using --output or the "
+            "ANALYSER_SNAPSHOT setting"
+        )
+
+    analyser_state = AnalyserState(
+        keyword_stop_list=configuration["KEYWORD_STOP_LIST"],
+        keyword_engine=configuration["KEYWORD_ENGINE"]
+    )
+    analyser_state.save_snapshot(output)
+
+    print("saved the analyser state snapshot to {output}".format(
+        output=output))
+
+
+def loadtest(args):
+    documents = load_corpus(args.corpus)
+    if not documents:
+        raise SystemExit(
+            "the corpus {} doesn't contain any documents".format(args.corpus))
+
+    load_generator = LoadGenerator(
+        url=args.url,
+        documents=documents,
+        concurrency=args.concurrency,
+        timeout=args.timeout
+    )
+
+    results = []
+    for rate in sorted(args.rate):
+        result = load_generator.run(rate, args.duration)
+        results.append(result)
+
+        print(format_result(result))
+
+    print("saturation throughput: {:.2f} requests/second".format(
+        find_saturation_throughput(results)))
+
+
+def worker(args):
+    configuration = _load_configuration()
+
+    if configuration.get("LOGGING") is not None:
+        logging.config.dictConfig(configuration["LOGGING"])
+
+    if args.results_format is not None:
+        configuration["SPOOL_RESULTS_FORMAT"] = args.results_format
+
+    spool_worker = SpoolWorker.from_configuration(
+        configuration, _get_settings_file(), args.spool)
+    if args.processes is not None:
+        spool_worker.processes = args.processes
+        spool_worker.max_pending = args.processes * 2
+
+    # finish the batch that is being processed before stopping
+    signal.signal(signal.SIGTERM, lambda signum, frame: spool_worker.stop())
+
+    spool_worker.run(once=args.once)
+
+
 def get_arguments():
     parser = ArgumentParser(description="Text analysis service cli tool")
 
@@ -20,6 +152,96 @@ def get_arguments():
     run_parser = subparsers.add_parser("server", help="Start the tas server")
     run_parser.set_defaults(func=run)
 
+    reload_parser = subparsers.add_parser(
+        "reload",
+        help="Reload the settings and the models of a running tas server "
+             "without stopping it"
+    )
+    reload_parser.set_defaults(func=reload)
+
+    profiles_parser = subparsers.add_parser(
+        "profiles",
+        help="Merge the request profiles into a collapsed stack file"
+    )
+    profiles_parser.add_argument(
+        "--directory",
+        help="the profiles directory. The PROFILING_DIRECTORY setting is "
+             "used if it is not given"
+    )
+    profiles_parser.add_argument(
+        "--output", default="profiles.collapsed",
+        help="the collapsed stack file to create"
+    )
+    profiles_parser.set_defaults(func=collapse_profiles)
+
+    snapshot_parser = subparsers.add_parser(
+        "snapshot",
+        help="Save the warmed analyser state to a snapshot file"
+    )
+    snapshot_parser.add_argument(
+        "--output",
+        help="the snapshot file to create. The ANALYSER_SNAPSHOT setting is "
+             "used if it is not given"
+    )
+    snapshot_parser.set_defaults(func=create_snapshot)
+
+    loadtest_parser = subparsers.add_parser(
+        "loadtest",
+        help="Replay a corpus against a running tas instance"
+    )
+    loadtest_parser.add_argument(
+        "corpus",
+        help="a folder with html files or a file with a request payload on "
+             "every line"
+    )
+    loadtest_parser.add_argument(
+        "--url", default="http://localhost:8020/api/v2/process/html",
+        help="the process html endpoint url"
+    )
+    loadtest_parser.add_argument(
+        "--rate", type=_positive_float, nargs="+", default=[1.0],
+        help="the request arrival rates in requests per second. The load "
+             "test is executed for every rate"
+    )
+    loadtest_parser.add_argument(
+        "--duration", type=_positive_float, default=60,
+        help="the duration of the load test for every rate in seconds"
+    )
+    loadtest_parser.add_argument(
+        "--concurrency", type=int, default=64,
+        help="the maximum number of requests in flight"
+    )
+    loadtest_parser.add_argument(
+        "--timeout", type=float, default=60,
+        help="the request timeout in seconds"
+    )
+    loadtest_parser.set_defaults(func=loadtest)
+
+    worker_parser = subparsers.add_parser(
+        "worker",
+        help="Process the NDJSON batch files of a spool directory"
+    )
+    worker_parser.add_argument(
+        "--spool",
+        help="the spool directory. The SPOOL_DIRECTORY setting is used if it "
+             "is not given"
+    )
+    worker_parser.add_argument(
+        "--processes", type=int,
+        help="the number of processes that analyse the batch lines. The "
+             "SPOOL_PROCESSES setting is used if it is not given"
+    )
+    worker_parser.add_argument(
+        "--results-format", choices=RESULTS_FORMATS,
+        help="the format of the results files. The SPOOL_RESULTS_FORMAT "
+             "setting is used if it is not given"
+    )
+    worker_parser.add_argument(
+        "--once", action="store_true",
+        help="stop when there aren't any pending batches"
+    )
+    worker_parser.set_defaults(func=worker)
+
     return parser.parse_args()
 
 
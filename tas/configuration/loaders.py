@@ -1,4 +1,5 @@
 from os import path
+from tempfile import gettempdir
 from types import ModuleType
 import logging
 
@@ -21,6 +22,16 @@ class Configuration(dict):
         self["WORKER_MAX_REQUESTS"] = 100
         self["WORKER_MAX_REQUESTS_JITTER"] = 10
         self["WORKERS"] = 2
+        self["WORKERS_MIN"] = 1
+        self["WORKERS_MAX"] = None
+        self["WORKER_MEMORY"] = None
+        self["WORKER_MEMORY_RESERVE"] = 0.2
+        self["WORKER_SCALING_ENABLED"] = False
+        self["WORKER_SCALING_INTERVAL"] = 30.0
+        self["WORKER_SCALE_UP_UTILISATION"] = 0.8
+        self["WORKER_SCALE_DOWN_UTILISATION"] = 0.3
+        self["PIDFILE"] = None
+        self["RELOAD_WORKER_TIMEOUT"] = 120.0
         self["HOST"] = "localhost"
         self["PORT"] = 8020
         self["LOG_LEVEL"] = logging.INFO
@@ -29,8 +40,74 @@ class Configuration(dict):
         self["LOG_FILE_MAX_SIZE"] = 1000000
         self["LOG_HANDLERS"] = []
         self["KEYWORD_STOP_LIST"] = "SmartStoplist.txt"
+        self["KEYWORD_ENGINE"] = "rake"
         self["DEBUG"] = False
         self["TESTING"] = False
+        self["PROFILING_ENABLED"] = False
+        self["PROFILING_SAMPLE_RATE"] = 0.0
+        self["PROFILING_TOKEN"] = None
+        self["PROFILING_INTERVAL"] = 0.005
+        self["PROFILING_DIRECTORY"] = path.join(gettempdir(), "tas-profiles")
+        self["PROFILING_MAX_FILES"] = 100
+        self["SLOW_REQUESTS_COUNT"] = 20
+        self["SLOW_REQUESTS_MAX_AGE"] = 3600
+        self["SLOW_REQUESTS_DIRECTORY"] = path.join(
+            gettempdir(), "tas-slow-requests")
+        self["MAX_REQUEST_BODY_SIZE"] = 20971520
+        self["FETCH_TIMEOUT"] = 10
+        self["FETCH_POOL_CONNECTIONS"] = 10
+        self["FETCH_POOL_MAXSIZE"] = 10
+        self["FETCH_MAX_SIZE"] = 10485760
+        self["FETCH_USER_AGENT"] = None
+        self["FETCH_CACHE_SIZE"] = 100
+        self["FETCH_MAX_REDIRECTS"] = 5
+        self["FETCH_ALLOW_PRIVATE_ADDRESSES"] = False
+        self["ANALYSER_SNAPSHOT"] = None
+        self["ANALYSER_LAZY_LOAD"] = False
+        self["LANES"] = []
+        self["WORKER_THREADS"] = None
+        self["COALESCING_ENABLED"] = False
+        self["COALESCING_DIRECTORY"] = path.join(
+            gettempdir(), "tas-coalescing")
+        self["COALESCING_TIMEOUT"] = 30.0
+        self["MEMORY_TRACKING_SAMPLE_RATE"] = 0.0
+        self["NER_WORKERS"] = 0
+        self["NER_PARALLEL_THRESHOLD"] = 200
+        self["NER_CHUNK_SIZE"] = 50
+        self["SPOOL_DIRECTORY"] = path.join(gettempdir(), "tas-spool")
+        self["SPOOL_PROCESSES"] = 2
+        self["SPOOL_POLL_INTERVAL"] = 1.0
+        self["SPOOL_STALE_TIMEOUT"] = 300.0
+        self["SPOOL_RESULTS_FORMAT"] = "ndjson"
+        self["SPOOL_RESULTS_ROW_GROUP_SIZE"] = 500
+        self["SPOOL_RESULTS_BUFFER_SIZE"] = 67108864
+        self["TRIAGE_ENABLED"] = False
+        self["TRIAGE_LANGUAGES"] = ["en"]
+        self["TRIAGE_UNSUPPORTED_LANGUAGE_ACTION"] = "extract"
+        self["TRIAGE_NON_ARTICLE_ACTION"] = "metadata"
+        self["TRIAGE_MIN_TEXT_LENGTH"] = 500
+        self["TRIAGE_MAX_LINK_DENSITY"] = 0.5
+        self["SHARDING_ENABLED"] = False
+        self["SHARDING_MODE"] = "forward"
+        self["SHARDING_NODE"] = None
+        self["SHARDING_NODES"] = None
+        self["SHARDING_CACHE_SIZE"] = 1000
+        self["SHARDING_CACHE_DIRECTORY"] = path.join(
+            gettempdir(), "tas-shard-cache")
+        self["SHARDING_REPLICAS"] = 100
+        self["SHARDING_CATALOG_REFRESH"] = 10.0
+        self["SHARDING_FORWARD_TIMEOUT"] = 30.0
+        self["SHARDING_FETCH_TIMEOUT"] = 1.0
+        self["SHARDING_TOKEN"] = None
+        self["DEGRADATION_ENABLED"] = False
+        self["DEGRADATION_STAGES"] = [
+            "summary", "named_entities", "readability"]
+        self["DEGRADATION_LATENCY_SLO"] = 2.0
+        self["DEGRADATION_LATENCY_PERCENTILE"] = 95
+        self["DEGRADATION_QUEUE_DEPTH_SLO"] = None
+        self["DEGRADATION_INTERVAL"] = 10.0
+        self["DEGRADATION_RECOVERY_RATIO"] = 0.7
+        self["DEGRADATION_MIN_SAMPLES"] = 20
 
     @classmethod
     def load_from_py(cls, filename):
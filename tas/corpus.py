@@ -0,0 +1,32 @@
+import json
+from os import listdir, path
+
+
+def load_corpus(corpus_path):
+    """Load the documents of a corpus
+
+    The corpus is either a folder with html files or a file that contains a
+    process html request payload on every line. Every html file is loaded as
+    the contents of a web page whose url is created from the file name.
+
+    :param str corpus_path: the path to the corpus
+    :rtype: list[dict]
+    :return: the process html request payloads
+    """
+    if not path.isdir(corpus_path):
+        with open(corpus_path, encoding="utf8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    documents = []
+
+    for filename in sorted(listdir(corpus_path)):
+        if not filename.endswith((".html", ".htm")):
+            continue
+
+        with open(path.join(corpus_path, filename), encoding="utf8") as f:
+            documents.append({
+                "url": "http://corpus.example.com/{}".format(filename),
+                "html": f.read()
+            })
+
+    return documents
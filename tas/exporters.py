@@ -0,0 +1,355 @@
+from abc import ABCMeta, abstractmethod
+import json
+import logging
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+logger = logging.getLogger(__name__)
+
+NDJSON = "ndjson"
+PARQUET = "parquet"
+ARROW = "arrow"
+
+RESULTS_FORMATS = (NDJSON, PARQUET, ARROW)
+
+STATISTICS_FIELDS = [
+    ("average_sentence_word_count", "float64"),
+    ("max_sentence_word_count", "int64"),
+    ("mean_sentence_word_count", "float64"),
+    ("median_sentence_word_count", "float64"),
+    ("min_sentence_word_count", "int64"),
+    ("sentence_count", "int64"),
+    ("sentence_word_count_std", "float64"),
+    ("sentence_word_count_variance", "float64"),
+    ("word_count", "int64")
+]
+
+# the sections whose structure depends on the web page or on the analysis
+# libraries are stored as json strings
+JSON_SECTIONS = ("social", "readability_scores", "triage")
+
+
+def create_results_schema():
+    """Create the schema of the columnar results files
+
+    Every row is a batch line. The keywords and the named entities are list
+    columns and the statistics are a struct column.
+
+    :rtype: pyarrow.Schema
+    :return: the results schema
+    """
+    statistics = pyarrow.struct([
+        (name, pyarrow.type_for_alias(type_name))
+        for name, type_name in STATISTICS_FIELDS
+    ])
+    keywords = pyarrow.list_(pyarrow.struct([
+        ("keyword", pyarrow.string()),
+        ("score", pyarrow.float64())
+    ]))
+    named_entities = pyarrow.list_(pyarrow.struct([
+        ("type", pyarrow.string()),
+        ("entity", pyarrow.string())
+    ]))
+
+    return pyarrow.schema([
+        ("line", pyarrow.int64()),
+        ("id", pyarrow.string()),
+        ("error", pyarrow.string()),
+        ("degraded", pyarrow.bool_()),
+        ("title", pyarrow.string()),
+        ("text", pyarrow.string()),
+        ("html", pyarrow.string()),
+        ("top_image", pyarrow.string()),
+        ("images", pyarrow.list_(pyarrow.string())),
+        ("movies", pyarrow.list_(pyarrow.string())),
+        ("summary", pyarrow.string()),
+        ("keywords", keywords),
+        ("named_entities", named_entities),
+        ("statistics", statistics),
+        ("social", pyarrow.string()),
+        ("readability_scores", pyarrow.string()),
+        ("triage", pyarrow.string())
+    ])
+
+
+def flatten_result_record(record):
+    """Convert a batch line result into a row of the columnar results files
+
+    :param dict record: the line number, the payload id and the result or
+        the error of a batch line
+    :rtype: dict
+    :return: the row
+    """
+    result = record.get("result") or {}
+    content = result.get("content") or {}
+
+    payload_id = record.get("id")
+    keywords = content.get("keywords")
+    named_entities = content.get("named_entities")
+
+    row = {
+        "line": record["line"],
+        "id": str(payload_id) if payload_id is not None else None,
+        "error": record.get("error"),
+        "degraded": result.get("degraded", False),
+        "title": content.get("title"),
+        "text": content.get("text"),
+        "html": content.get("html"),
+        "top_image": content.get("top_image"),
+        "images": content.get("images"),
+        "movies": content.get("movies"),
+        "summary": content.get("summary"),
+        "keywords": [
+            {"keyword": keyword, "score": score}
+            for keyword, score in keywords.items()
+        ] if keywords is not None else None,
+        "named_entities": [
+            {"type": entity_type, "entity": entity}
+            for entity_type, entities in named_entities.items()
+            for entity in entities
+        ] if named_entities is not None else None,
+        "statistics": content.get("statistics")
+    }
+
+    for section in JSON_SECTIONS:
+        value = content.get(section)
+        row[section] = json.dumps(value) if value is not None else None
+
+    return row
+
+
+def estimate_row_size(row):
+    """Estimate the memory that a row uses while it is buffered
+
+    The strings are counted by their length and the other values by the
+    size of a number.
+
+    :param dict|list|str|int|float|bool|None row: the row or one of its values
+    :rtype: int
+    :return: the estimated size in bytes
+    """
+    if row is None:
+        return 0
+
+    if isinstance(row, str):
+        return len(row)
+
+    if isinstance(row, dict):
+        return sum(estimate_row_size(value) for value in row.values())
+
+    if isinstance(row, list):
+        return sum(estimate_row_size(item) for item in row)
+
+    return 8
+
+
+class ResultsWriter(metaclass=ABCMeta):
+    """Base class for the writers of the batch results files"""
+
+    def __init__(self, filename):
+        """Create a new ResultsWriter object
+
+        :param str filename: the results file
+        """
+        self.filename = filename
+
+    @abstractmethod
+    def write(self, record):
+        """Write the result of a batch line
+
+        :param dict record: the line number, the payload id and the result
+            or the error of a batch line
+        """
+        pass
+
+    @abstractmethod
+    def close(self):
+        """Write the remaining results and close the results file"""
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class NDJSONResultsWriter(ResultsWriter):
+    """Write every result as a json line"""
+
+    def __init__(self, filename):
+        super(NDJSONResultsWriter, self).__init__(filename)
+
+        self._file = open(filename, "w", encoding="utf8")
+
+    def write(self, record):
+        self._file.write(json.dumps(record))
+        self._file.write("\n")
+
+    def close(self):
+        self._file.close()
+
+
+class ColumnarResultsWriter(ResultsWriter):
+    """Base class for the writers of the columnar results files
+
+    The rows are buffered until there are `row_group_size` of them, or until
+    their estimated size reaches `max_buffer_size` bytes, and they are then
+    written as a compressed row group. The html of a web page can be large,
+    so the memory that is used depends on neither the batch size nor the
+    size of the pages.
+    """
+
+    def __init__(self, filename, row_group_size=500, compression="zstd",
+                 max_buffer_size=67108864):
+        """Create a new ColumnarResultsWriter object
+
+        :param str filename: the results file
+        :param int row_group_size: the maximum number of rows of every row
+            group
+        :param str compression: the compression codec
+        :param int max_buffer_size: the estimated size in bytes of the
+            buffered rows after which they are written
+        """
+        super(ColumnarResultsWriter, self).__init__(filename)
+
+        self.row_group_size = row_group_size
+        self.compression = compression
+        self.max_buffer_size = max_buffer_size
+        self.schema = create_results_schema()
+
+        self._rows = []
+        self._buffer_size = 0
+        self._writer = self._create_writer()
+
+    @abstractmethod
+    def _create_writer(self):
+        pass
+
+    @abstractmethod
+    def _write_batch(self, batch):
+        pass
+
+    def _create_batch(self):
+        # the columns are built one at a time using the apis that are
+        # available in the pyarrow versions that support python 3.5
+        columns = [
+            pyarrow.array(
+                [row.get(field.name) for row in self._rows], type=field.type)
+            for field in self.schema
+        ]
+
+        return pyarrow.RecordBatch.from_arrays(columns, self.schema.names)
+
+    def _flush(self):
+        if not self._rows:
+            return
+
+        self._write_batch(self._create_batch())
+        self._rows = []
+        self._buffer_size = 0
+
+    def write(self, record):
+        row = flatten_result_record(record)
+
+        self._rows.append(row)
+        self._buffer_size += estimate_row_size(row)
+
+        if len(self._rows) >= self.row_group_size or \
+                self._buffer_size >= self.max_buffer_size:
+            self._flush()
+
+    def close(self):
+        try:
+            self._flush()
+        finally:
+            self._writer.close()
+
+
+class ParquetResultsWriter(ColumnarResultsWriter):
+    """Write the results as a Parquet file"""
+
+    def _create_writer(self):
+        return pyarrow.parquet.ParquetWriter(
+            self.filename, self.schema, compression=self.compression)
+
+    def _write_batch(self, batch):
+        self._writer.write_table(
+            pyarrow.Table.from_batches([batch]),
+            row_group_size=self.row_group_size
+        )
+
+
+class ArrowResultsWriter(ColumnarResultsWriter):
+    """Write the results as an Arrow IPC file
+
+    The record batches are compressed only by pyarrow 2.0 or later, which
+    added the compression of the IPC format.
+    """
+
+    def _create_writer(self):
+        if not hasattr(pyarrow.ipc, "IpcWriteOptions"):
+            logger.warning(
+                "the arrow results are not compressed because pyarrow %s "
+                "doesn't support it", pyarrow.__version__
+            )
+
+            return pyarrow.RecordBatchFileWriter(self.filename, self.schema)
+
+        return pyarrow.RecordBatchFileWriter(
+            self.filename, self.schema,
+            options=pyarrow.ipc.IpcWriteOptions(compression=self.compression)
+        )
+
+    def _write_batch(self, batch):
+        self._writer.write_batch(batch)
+
+
+RESULTS_WRITERS = {
+    NDJSON: NDJSONResultsWriter,
+    PARQUET: ParquetResultsWriter,
+    ARROW: ArrowResultsWriter
+}
+
+
+def check_results_format(results_format):
+    """Check that the results can be written in a format
+
+    :param str results_format: ndjson, parquet or arrow
+    :raises ValueError: if the format is invalid or pyarrow isn't installed
+        for a columnar format
+    """
+    if results_format not in RESULTS_WRITERS:
+        raise ValueError("invalid results format: {}".format(results_format))
+
+    if results_format != NDJSON and pyarrow is None:
+        raise ValueError(
+            "the {} results format requires pyarrow".format(results_format))
+
+
+def create_results_writer(results_format, filename, row_group_size=500,
+                          max_buffer_size=67108864):
+    """Create a results writer
+
+    :param str results_format: ndjson, parquet or arrow
+    :param str filename: the results file
+    :param int row_group_size: the maximum number of rows of every row group
+        of the columnar formats
+    :param int max_buffer_size: the estimated size in bytes of the rows that
+        the columnar formats buffer before they write a row group
+    :rtype: ResultsWriter
+    :return: the results writer
+    """
+    check_results_format(results_format)
+
+    if results_format == NDJSON:
+        return NDJSONResultsWriter(filename)
+
+    return RESULTS_WRITERS[results_format](
+        filename, row_group_size, max_buffer_size=max_buffer_size)
@@ -0,0 +1,355 @@
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from http.client import HTTPConnection, HTTPSConnection, HTTPException
+import json
+import logging
+from math import floor, log10
+import threading
+import time
+from urllib.parse import urlsplit
+
+from tas.web import error_codes
+
+
+logger = logging.getLogger(__name__)
+
+
+CONNECTION_ERROR = "connection_error"
+
+
+def get_error_code_names():
+    """Get the names of the tas error codes
+
+    :rtype: dict[int, str]
+    :return: the error code names indexed by error code
+    """
+    return {
+        value: name
+        for name, value in vars(error_codes).items()
+        if name.isupper()
+    }
+
+
+class LatencyHistogram(object):
+    """A latency histogram with a fixed number of significant digits
+
+    Every value is recorded with the given number of significant digits, like
+    an HDR histogram, so the memory that is used depends on the range of the
+    values and not on their number.
+    """
+
+    def __init__(self, significant_digits=3):
+        """Create a new LatencyHistogram object
+
+        :param int significant_digits: the number of significant digits of
+            the recorded values
+        """
+        self.significant_digits = significant_digits
+
+        self.counts = Counter()
+        self.total_count = 0
+        self.max_value = 0
+
+    def _bucket(self, value):
+        if value == 0:
+            return 0
+
+        magnitude = 10 ** (floor(log10(value)) - self.significant_digits + 1)
+        if magnitude < 1:
+            return value
+
+        return (value // magnitude) * magnitude
+
+    def record(self, latency):
+        """Add a latency to the histogram
+
+        :param float latency: the latency in seconds
+        """
+        value = int(latency * 1000000)
+
+        self.counts[self._bucket(value)] += 1
+        self.total_count += 1
+        self.max_value = max(self.max_value, value)
+
+    def percentile(self, percentile):
+        """Get the latency at the given percentile
+
+        :param float percentile: the percentile from 0 to 100
+        :rtype: float
+        :return: the latency in seconds
+        """
+        if self.total_count == 0:
+            return 0.0
+
+        target_count = max(1, percentile / 100.0 * self.total_count)
+        count = 0
+
+        for value in sorted(self.counts):
+            count += self.counts[value]
+            if count >= target_count:
+                return value / 1000000.0
+
+        return self.max_value / 1000000.0
+
+    def percentile_distribution(self, percentiles=None):
+        """Get the latencies at the most common percentiles
+
+        :param list[float]|None percentiles: the percentiles to calculate
+        :rtype: list[(float, float)]
+        :return: the percentiles and the respective latencies in seconds
+        """
+        percentiles = percentiles or [
+            50.0, 75.0, 90.0, 95.0, 99.0, 99.9, 99.99, 100.0]
+
+        return [
+            (percentile, self.percentile(percentile))
+            for percentile in percentiles
+        ]
+
+
+class LoadTestResult(object):
+    """The result of a load test at a fixed arrival rate"""
+
+    def __init__(self, rate, duration, latencies, errors, request_count):
+        """Create a new LoadTestResult object
+
+        :param float rate: the request arrival rate in requests per second
+        :param float duration: the test duration in seconds
+        :param LatencyHistogram latencies: the request latencies
+        :param Counter errors: the number of errors of every error type
+        :param int request_count: the number of requests sent
+        """
+        self.rate = rate
+        self.duration = duration
+        self.latencies = latencies
+        self.errors = errors
+        self.request_count = request_count
+
+    @property
+    def error_count(self):
+        return sum(self.errors.values())
+
+    @property
+    def throughput(self):
+        """The number of successful requests per second"""
+        if self.duration == 0:
+            return 0.0
+
+        return (self.request_count - self.error_count) / self.duration
+
+    def error_rates(self):
+        """Get the fraction of the requests that failed with every error
+
+        :rtype: dict[str, float]
+        :return: the error rates indexed by error name
+        """
+        if self.request_count == 0:
+            return {}
+
+        return {
+            error: count / self.request_count
+            for error, count in self.errors.items()
+        }
+
+    def is_saturated(self, tolerance=0.9):
+        """Check if the service could not keep up with the arrival rate
+
+        :param float tolerance: the fraction of the arrival rate that the
+            throughput must reach
+        :rtype: bool
+        :return: True if the service was saturated
+        """
+        return self.throughput < self.rate * tolerance
+
+
+class LoadGenerator(object):
+    """Send process html requests at a fixed arrival rate
+
+    The requests are scheduled in an open loop. Every request is sent at its
+    scheduled time whether the previous requests have completed or not and
+    its latency is measured from the scheduled time. This way the time that a
+    request waited because the service or the load generator was busy is
+    included in the latency and coordinated omission is avoided.
+    """
+
+    def __init__(self, url, documents, concurrency=64, timeout=60):
+        """Create a new LoadGenerator object
+
+        :param str url: the process html endpoint url
+        :param list[dict] documents: the request payloads to send
+        :param int concurrency: the maximum number of requests in flight
+        :param float timeout: the request timeout in seconds
+        :raises ValueError: if there aren't any documents
+        """
+        if not documents:
+            raise ValueError("the load test requires at least one document")
+
+        self.url = url
+        self.documents = [
+            json.dumps(document).encode("utf8")
+            for document in documents
+        ]
+        self.concurrency = concurrency
+        self.timeout = timeout
+
+        self._error_code_names = get_error_code_names()
+        self._connections = threading.local()
+
+        url_parts = urlsplit(url)
+        self._connection_class = \
+            HTTPSConnection if url_parts.scheme == "https" else HTTPConnection
+        self._netloc = url_parts.netloc
+        self._path = url_parts.path or "/"
+
+    def _get_connection(self):
+        connection = getattr(self._connections, "connection", None)
+        if connection is None:
+            connection = self._connection_class(
+                self._netloc, timeout=self.timeout)
+            self._connections.connection = connection
+
+        return connection
+
+    def _close_connection(self):
+        connection = getattr(self._connections, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._connections.connection = None
+
+    def _get_error(self, status, body):
+        try:
+            code = json.loads(body.decode("utf8"))["code"]
+        except (ValueError, KeyError, TypeError):
+            return "http_{}".format(status)
+
+        return self._error_code_names.get(code, "tas_error_{}".format(code))
+
+    def send(self, body):
+        """Send a process html request
+
+        :param bytes body: the request body
+        :rtype: str|None
+        :return: the error name or None if the request succeeded
+        """
+        connection = self._get_connection()
+
+        try:
+            connection.request(
+                "POST", self._path, body=body,
+                headers={"Content-Type": "application/json"}
+            )
+            response = connection.getresponse()
+            response_body = response.read()
+        except (HTTPException, OSError):
+            logger.exception("load test request failed")
+            self._close_connection()
+
+            return CONNECTION_ERROR
+
+        if response.status >= 400:
+            return self._get_error(response.status, response_body)
+
+        return None
+
+    def run(self, rate, duration):
+        """Run a load test
+
+        :param float rate: the request arrival rate in requests per second
+        :param float duration: the test duration in seconds
+        :rtype: LoadTestResult
+        :return: the load test result
+        :raises ValueError: if the rate or the duration isn't positive
+        """
+        if not rate > 0:
+            raise ValueError("invalid arrival rate: {}".format(rate))
+
+        if not duration > 0:
+            raise ValueError("invalid duration: {}".format(duration))
+
+        latencies = LatencyHistogram()
+        errors = Counter()
+        lock = threading.Lock()
+
+        def execute(body, scheduled_time):
+            error = self.send(body)
+            latency = time.perf_counter() - scheduled_time
+
+            with lock:
+                latencies.record(latency)
+                if error is not None:
+                    errors[error] += 1
+
+        request_count = int(rate * duration)
+        interval = 1.0 / rate
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            start_time = time.perf_counter()
+
+            for i in range(request_count):
+                scheduled_time = start_time + i * interval
+
+                delay = scheduled_time - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+
+                body = self.documents[i % len(self.documents)]
+                executor.submit(execute, body, scheduled_time)
+
+        elapsed_time = time.perf_counter() - start_time
+
+        return LoadTestResult(
+            rate=rate,
+            duration=elapsed_time,
+            latencies=latencies,
+            errors=errors,
+            request_count=request_count
+        )
+
+
+def find_saturation_throughput(results, tolerance=0.9):
+    """Find the highest throughput before the service became saturated
+
+    :param list[LoadTestResult] results: the results of the load tests in
+        increasing arrival rate order
+    :param float tolerance: the fraction of the arrival rate that the
+        throughput must reach
+    :rtype: float
+    :return: the saturation throughput in requests per second
+    """
+    saturation_throughput = 0.0
+
+    for result in results:
+        saturation_throughput = max(saturation_throughput, result.throughput)
+
+        if result.is_saturated(tolerance):
+            break
+
+    return saturation_throughput
+
+
+def format_result(result):
+    """Create a text report for a load test result
+
+    :param LoadTestResult result: the load test result
+    :rtype: str
+    :return: the report
+    """
+    lines = [
+        "rate={rate:.2f} requests={request_count} duration={duration:.2f}s "
+        "throughput={throughput:.2f} errors={error_count}".format(
+            rate=result.rate,
+            request_count=result.request_count,
+            duration=result.duration,
+            throughput=result.throughput,
+            error_count=result.error_count
+        ),
+        "    {:>10} {:>12}".format("percentile", "latency(ms)")
+    ]
+
+    for percentile, latency in result.latencies.percentile_distribution():
+        lines.append("    {:>10} {:>12.3f}".format(percentile, latency * 1000))
+
+    for error, error_rate in sorted(result.error_rates().items()):
+        lines.append("    error {}: {:.4f}".format(error, error_rate))
+
+    return "\n".join(lines)
@@ -0,0 +1,147 @@
+from contextlib import contextmanager
+import logging
+import random
+from threading import Lock
+import tracemalloc
+
+from statsd import StatsClient
+
+
+logger = logging.getLogger(__name__)
+
+
+REQUEST_MEMORY_PEAK = "topicaxis.tas.{endpoint}.memory.peak"
+REQUEST_MEMORY_NET = "topicaxis.tas.{endpoint}.memory.net"
+STAGE_MEMORY_PEAK = "topicaxis.tas.{endpoint}.stages.{stage}.memory.peak"
+
+
+class MemoryTracker(object):
+    """Track the memory allocations of a sample of the requests
+
+    The allocations are traced using tracemalloc while at least one sampled
+    request is being processed. Only the most recent frame of every
+    allocation is stored in order to keep the overhead low. tracemalloc
+    traces the allocations of the whole process and the peak is reset by
+    every stage, so the requests must not be processed at the same time by
+    other threads of the worker. Tracing is started for every tracked
+    request, so the traced peak is the peak of the request even on the
+    python versions that can't reset it.
+    """
+
+    def __init__(self, sample_rate=0.0, statsd_client=None):
+        """Create a new MemoryTracker object
+
+        :param float sample_rate: the fraction of requests to track
+        :param StatsClient|None statsd_client: the client to send the memory
+            metrics to
+        """
+        self.sample_rate = sample_rate
+
+        self._statsd_client = statsd_client
+        self._tracked_request_count = 0
+        self._started_tracing = False
+        self._lock = Lock()
+
+    @classmethod
+    def from_configuration(cls, configuration):
+        """Create a MemoryTracker using the service configuration
+
+        :param dict configuration: the service configuration
+        :rtype: MemoryTracker
+        :return: the memory tracker
+        """
+        # the workers use threads when the lanes are enabled
+        if configuration["LANES"] and \
+                configuration["MEMORY_TRACKING_SAMPLE_RATE"] > 0:
+            logger.warning(
+                "memory tracking is not available when lanes are enabled")
+            return cls()
+
+        statsd_client = None
+        if configuration.get("STATSD_HOST") is not None:
+            statsd_client = StatsClient(
+                configuration["STATSD_HOST"],
+                configuration.get("STATSD_PORT", 8125)
+            )
+
+        return cls(
+            sample_rate=configuration["MEMORY_TRACKING_SAMPLE_RATE"],
+            statsd_client=statsd_client
+        )
+
+    def should_track(self):
+        """Check if a request must be tracked
+
+        :rtype: bool
+        :return: True if the memory allocations of the request must be
+            tracked
+        """
+        return random.random() < self.sample_rate
+
+    def _start_tracing(self):
+        with self._lock:
+            if self._tracked_request_count == 0 and \
+                    not tracemalloc.is_tracing():
+                tracemalloc.start(1)
+                self._started_tracing = True
+
+            self._tracked_request_count += 1
+
+    def _stop_tracing(self):
+        with self._lock:
+            self._tracked_request_count -= 1
+
+            if self._tracked_request_count == 0 and self._started_tracing:
+                tracemalloc.stop()
+                self._started_tracing = False
+
+    def _send_metrics(self, endpoint, report):
+        if self._statsd_client is None:
+            return
+
+        # the statsd timers are used because they calculate the percentiles
+        # and the maximum of the values
+        self._statsd_client.timing(
+            REQUEST_MEMORY_PEAK.format(endpoint=endpoint),
+            report.memory["peak"]
+        )
+        self._statsd_client.timing(
+            REQUEST_MEMORY_NET.format(endpoint=endpoint),
+            report.memory["net"]
+        )
+
+        for stage, stage_memory in report.memory["stages"].items():
+            if stage_memory["peak"] is not None:
+                self._statsd_client.timing(
+                    STAGE_MEMORY_PEAK.format(endpoint=endpoint, stage=stage),
+                    stage_memory["peak"]
+                )
+
+    @contextmanager
+    def track(self, endpoint, report):
+        """Track the memory allocations in this context if the request is
+        sampled
+
+        :param str endpoint: the endpoint name
+        :param ProcessingReport report: the report of the request
+        """
+        if not self.should_track():
+            yield
+            return
+
+        self._start_tracing()
+
+        try:
+            report.start_memory_tracking()
+
+            yield
+        finally:
+            report.stop_memory_tracking()
+            self._stop_tracing()
+
+            logger.info(
+                "request memory tracked: endpoint=%s peak=%s net=%s",
+                endpoint, report.memory["peak"], report.memory["net"]
+            )
+
+            self._send_metrics(endpoint, report)
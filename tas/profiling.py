@@ -0,0 +1,301 @@
+from collections import Counter
+from contextlib import contextmanager
+from glob import glob
+import hmac
+import logging
+from os import getpid, makedirs, path, remove, replace
+import random
+import sys
+import threading
+import time
+
+
+logger = logging.getLogger(__name__)
+
+
+PROFILE_FILE_EXTENSION = ".collapsed"
+
+
+def _frame_label(frame):
+    code = frame.f_code
+
+    return "{function} ({filename}:{line})".format(
+        function=code.co_name,
+        filename=code.co_filename,
+        line=code.co_firstlineno
+    )
+
+
+def collapse_stack(frame):
+    """Convert a stack frame into a collapsed stack
+
+    :param frame: the innermost frame of the stack
+    :rtype: str
+    :return: the stack functions starting from the outermost one separated
+        by semicolons
+    """
+    labels = []
+
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+
+    return ";".join(reversed(labels))
+
+
+class SamplingProfiler(object):
+    """Sample the call stack of a thread at a fixed interval"""
+
+    def __init__(self, interval=0.005):
+        """Create a new SamplingProfiler object
+
+        :param float interval: the sampling interval in seconds
+        """
+        self.interval = interval
+
+        self._stacks = Counter()
+        self._stop_event = threading.Event()
+        self._sampler = None
+        self._thread_id = None
+
+    def _sample(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is not None:
+                self._stacks[collapse_stack(frame)] += 1
+
+    def start(self, thread_id=None):
+        """Start sampling the given thread
+
+        :param int|None thread_id: the thread to sample. The calling thread
+            is used if a thread id is not given
+        """
+        self._thread_id = thread_id or threading.get_ident()
+        self._stacks = Counter()
+        self._stop_event.clear()
+
+        self._sampler = threading.Thread(target=self._sample, daemon=True)
+        self._sampler.start()
+
+    def stop(self):
+        """Stop sampling
+
+        :rtype: Counter
+        :return: the number of samples of every collapsed stack
+        """
+        self._stop_event.set()
+        self._sampler.join()
+
+        return self._stacks
+
+
+def write_collapsed_stacks(stacks, filename):
+    """Save the stacks in the collapsed stack format used by flame graph tools
+
+    :param Counter stacks: the number of samples of every collapsed stack
+    :param str filename: the output file
+    """
+    temporary_filename = "{}.tmp".format(filename)
+
+    with open(temporary_filename, "w") as f:
+        for stack, count in sorted(stacks.items()):
+            f.write("{} {}\n".format(stack, count))
+
+    replace(temporary_filename, filename)
+
+
+def read_collapsed_stacks(filename):
+    """Load the stacks from a file in the collapsed stack format
+
+    :param str filename: the file to load
+    :rtype: Counter
+    :return: the number of samples of every collapsed stack
+    """
+    stacks = Counter()
+
+    with open(filename) as f:
+        for line in f:
+            stack, _, count = line.rstrip("\n").rpartition(" ")
+            if not stack:
+                continue
+
+            try:
+                stacks[stack] += int(count)
+            except ValueError:
+                logger.warning("invalid collapsed stack line: line=%s", line)
+
+    return stacks
+
+
+class ProfileStore(object):
+    """Store profiles in a directory that keeps only the most recent ones"""
+
+    def __init__(self, directory, max_files=100):
+        """Create a new ProfileStore object
+
+        :param str directory: the directory where the profiles are saved
+        :param int max_files: the maximum number of profiles to keep
+        """
+        self.directory = directory
+        self.max_files = max_files
+
+    def profile_files(self):
+        """Get the stored profiles
+
+        :rtype: list[str]
+        :return: the profile files ordered from the oldest to the newest
+        """
+        profile_files = glob(
+            path.join(self.directory, "*" + PROFILE_FILE_EXTENSION))
+
+        # the profile file names start with the time they were created
+        return sorted(profile_files, key=path.basename)
+
+    def _rotate(self):
+        profile_files = self.profile_files()
+
+        for filename in profile_files[:-self.max_files]:
+            try:
+                remove(filename)
+            except FileNotFoundError:
+                # another worker has already removed this profile
+                pass
+
+    def save(self, stacks, name):
+        """Save a profile
+
+        :param Counter stacks: the number of samples of every collapsed stack
+        :param str name: the name of the profiled operation
+        :rtype: str
+        :return: the profile file
+        """
+        makedirs(self.directory, exist_ok=True)
+
+        filename = path.join(
+            self.directory,
+            "{timestamp:.6f}-{pid}-{name}{extension}".format(
+                timestamp=time.time(),
+                pid=getpid(),
+                name=name,
+                extension=PROFILE_FILE_EXTENSION
+            )
+        )
+
+        write_collapsed_stacks(stacks, filename)
+        self._rotate()
+
+        return filename
+
+    def aggregate(self):
+        """Merge all the stored profiles
+
+        :rtype: Counter
+        :return: the number of samples of every collapsed stack
+        """
+        stacks = Counter()
+
+        for filename in self.profile_files():
+            try:
+                stacks.update(read_collapsed_stacks(filename))
+            except FileNotFoundError:
+                logger.warning("profile was removed: filename=%s", filename)
+
+        return stacks
+
+
+class RequestProfiler(object):
+    """Decide which requests to profile and save their profiles"""
+
+    def __init__(self, store=None, sample_rate=0.0, token=None,
+                 interval=0.005):
+        """Create a new RequestProfiler object
+
+        Profiling is disabled when a profile store is not given.
+
+        :param ProfileStore|None store: the store to save the profiles
+        :param float sample_rate: the fraction of requests to profile
+        :param str|None token: the value of the profiling header that
+            enables profiling for a request
+        :param float interval: the sampling interval in seconds
+        """
+        self.store = store
+        self.sample_rate = sample_rate
+        self.token = token
+        self.interval = interval
+
+    @classmethod
+    def from_configuration(cls, configuration):
+        """Create a RequestProfiler using the service configuration
+
+        :param dict configuration: the service configuration
+        :rtype: RequestProfiler
+        :return: the request profiler
+        """
+        if not configuration["PROFILING_ENABLED"]:
+            return cls()
+
+        # the workers use threads when the lanes are enabled and the profiler
+        # samples only the thread of the request, so the time that it spends
+        # waiting for the other requests would be missing from the profiles
+        if configuration["LANES"]:
+            logger.warning("profiling is not available when lanes are enabled")
+            return cls()
+
+        store = ProfileStore(
+            directory=configuration["PROFILING_DIRECTORY"],
+            max_files=configuration["PROFILING_MAX_FILES"]
+        )
+
+        return cls(
+            store=store,
+            sample_rate=configuration["PROFILING_SAMPLE_RATE"],
+            token=configuration["PROFILING_TOKEN"],
+            interval=configuration["PROFILING_INTERVAL"]
+        )
+
+    def should_profile(self, token=None):
+        """Check if a request must be profiled
+
+        :param str|None token: the value of the profiling header of the
+            request
+        :rtype: bool
+        :return: True if the request must be profiled
+        """
+        if self.store is None:
+            return False
+
+        # compare_digest only accepts ascii strings, so the header is
+        # compared as bytes in order to support any value
+        if token is not None and self.token is not None:
+            if hmac.compare_digest(
+                    token.encode("utf8"), self.token.encode("utf8")):
+                return True
+
+        return random.random() < self.sample_rate
+
+    @contextmanager
+    def profile(self, name, token=None):
+        """Profile the code in this context if the request must be profiled
+
+        :param str name: the name of the profiled operation
+        :param str|None token: the value of the profiling header of the
+            request
+        """
+        if not self.should_profile(token):
+            yield
+            return
+
+        profiler = SamplingProfiler(self.interval)
+        profiler.start()
+
+        try:
+            yield
+        finally:
+            stacks = profiler.stop()
+
+            try:
+                filename = self.store.save(stacks, name)
+            except OSError:
+                logger.exception("failed to save profile")
+            else:
+                logger.info("request profile saved: filename=%s", filename)
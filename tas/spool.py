@@ -0,0 +1,566 @@
+from concurrent.futures import (
+    FIRST_COMPLETED, ProcessPoolExecutor, wait
+)
+from concurrent.futures.process import BrokenProcessPool
+import json
+import logging
+from os import (
+    getpid, listdir, makedirs, path, remove, rename, replace, stat, utime
+)
+import signal
+import socket
+import time
+
+from tas.analysis.entities import NamedEntityExtractor
+from tas.analysis.fetchers import AnalysisCache, WebPageFetcher
+from tas.analysis.processors import (
+    HTMLContentProcessor, TextContentProcessor, URLContentProcessor
+)
+from tas.analysis.state import AnalyserState
+from tas.analysis.triage import PageTriage
+from tas.configuration.loaders import Configuration
+from tas.exceptions import TASError
+from tas.exporters import NDJSON, check_results_format, create_results_writer
+
+
+logger = logging.getLogger(__name__)
+
+
+INCOMING = "incoming"
+PROCESSING = "processing"
+DONE = "done"
+FAILED = "failed"
+
+BATCH_FILE_EXTENSION = ".ndjson"
+RESULTS_FILE_EXTENSION = ".results.{}"
+
+# the separator of the batch file name and the owner of a claimed batch
+CLAIM_SEPARATOR = "@"
+
+
+# the content processors of a pool process
+_pool_processors = None
+
+
+def create_processors(configuration):
+    """Create the content processors of the spool worker
+
+    The named entities are extracted sequentially because the batches are
+    already processed in parallel.
+
+    :param Configuration configuration: the application configuration
+    :rtype: dict[str, ContentProcessor]
+    :return: the content processors indexed by content type
+    """
+    analyser_state = AnalyserState(
+        keyword_stop_list=configuration["KEYWORD_STOP_LIST"],
+        snapshot_file=configuration["ANALYSER_SNAPSHOT"],
+        keyword_engine=configuration["KEYWORD_ENGINE"]
+    )
+    named_entity_extractor = NamedEntityExtractor(analyser_state)
+
+    html_processor = HTMLContentProcessor(
+        configuration["KEYWORD_STOP_LIST"], analyser_state,
+        named_entity_extractor, PageTriage.from_configuration(configuration)
+    )
+
+    return {
+        "html": html_processor,
+        "text": TextContentProcessor(
+            configuration["KEYWORD_STOP_LIST"], analyser_state,
+            named_entity_extractor
+        ),
+        "url": URLContentProcessor(
+            html_content_processor=html_processor,
+            fetcher=WebPageFetcher(
+                timeout=configuration["FETCH_TIMEOUT"],
+                max_size=configuration["FETCH_MAX_SIZE"],
+                user_agent=configuration["FETCH_USER_AGENT"]
+            ),
+            # the pages of a backfill are analysed only once so the
+            # analysis isn't cached
+            cache=AnalysisCache(0)
+        )
+    }
+
+
+def get_content_type(payload):
+    """Get the type of the content of a batch line
+
+    :param dict payload: the batch line payload
+    :rtype: str
+    :return: html, text or url
+    """
+    if "html" in payload:
+        return "html"
+
+    if "text" in payload:
+        return "text"
+
+    return "url"
+
+
+def _load_pool_processors(settings_file):
+    global _pool_processors
+
+    # the process pool initializer requires Python 3.7, so the processors
+    # are loaded when a pool process receives its first line
+    if _pool_processors is not None:
+        return _pool_processors
+
+    configuration = Configuration.load_from_py(settings_file)
+    processors = create_processors(configuration)
+
+    processors["html"].analyser_state.warm_up()
+
+    # the spool worker stops the pool processes when it is interrupted
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    _pool_processors = processors
+
+    return processors
+
+
+def process_payload(settings_file, payload):
+    """Process the payload of a batch line in a pool process
+
+    :param str settings_file: the settings file that is used to create the
+        content processors of the pool process
+    :param dict payload: the batch line payload
+    :rtype: dict
+    :return: the processing result or the processing error
+    """
+    content_type = get_content_type(payload)
+
+    try:
+        processors = _load_pool_processors(settings_file)
+        result = processors[content_type].process_content(payload)
+    except TASError as e:
+        logger.warning("failed to process batch line: error=%s", e)
+
+        return {"error": type(e).__name__}
+    except Exception as e:
+        logger.exception("failed to process batch line")
+
+        return {"error": type(e).__name__}
+
+    return {"result": result}
+
+
+class ClaimedBatch(object):
+    """A batch file that a spool worker has claimed"""
+
+    def __init__(self, name, claim_file):
+        """Create a new ClaimedBatch object
+
+        :param str name: the batch file name
+        :param str claim_file: the path of the claimed batch file
+        """
+        self.name = name
+        self.claim_file = claim_file
+
+        self._last_heartbeat = time.monotonic()
+
+    def heartbeat(self, interval):
+        """Show that the batch is still being processed
+
+        :param float interval: the minimum number of seconds between
+            heartbeats
+        """
+        now = time.monotonic()
+
+        if now - self._last_heartbeat >= interval:
+            utime(self.claim_file)
+            self._last_heartbeat = now
+
+
+class SpoolDirectory(object):
+    """A spool directory that several workers process together
+
+    The batch files are added in the incoming directory. A worker claims a
+    batch by moving it to the processing directory and renaming it to
+    include the worker identity. The rename is atomic, so only one worker
+    can claim a batch even when the workers of several nodes share the
+    directory over a network filesystem. The results are saved in the done
+    directory next to the batch file, which is moved there last. The batches
+    whose claim hasn't been renewed for a while are returned to the incoming
+    directory, so that the batches of the workers that crashed are processed
+    by the others.
+    """
+
+    def __init__(self, directory, owner=None, results_format=NDJSON):
+        """Create a new SpoolDirectory object
+
+        :param str directory: the spool directory
+        :param str|None owner: the identity of the worker. The host name and
+            the process id are used if it is not given
+        :param str results_format: the format of the results files, which is
+            ndjson, parquet or arrow
+        """
+        self.directory = directory
+        self.owner = owner or "{}-{}".format(socket.gethostname(), getpid())
+        self.results_format = results_format
+
+        for subdirectory in (INCOMING, PROCESSING, DONE, FAILED):
+            makedirs(path.join(self.directory, subdirectory), exist_ok=True)
+
+    def _path(self, subdirectory, filename):
+        return path.join(self.directory, subdirectory, filename)
+
+    def pending_batches(self):
+        """Get the batch files that haven't been claimed
+
+        :rtype: list[str]
+        :return: the batch file names ordered by name
+        """
+        return sorted(
+            filename
+            for filename in listdir(path.join(self.directory, INCOMING))
+            if filename.endswith(BATCH_FILE_EXTENSION)
+        )
+
+    def claim(self):
+        """Claim the next batch file
+
+        :rtype: ClaimedBatch|None
+        :return: the claimed batch or None if there aren't any pending
+            batches
+        """
+        for name in self.pending_batches():
+            claim_file = self._path(
+                PROCESSING,
+                "{}{}{}".format(name, CLAIM_SEPARATOR, self.owner)
+            )
+
+            try:
+                rename(self._path(INCOMING, name), claim_file)
+            except FileNotFoundError:
+                # another worker claimed the batch first
+                continue
+
+            # the modification time of the claim is the heartbeat of the
+            # worker
+            utime(claim_file)
+
+            logger.info("claimed batch: name=%s", name)
+
+            return ClaimedBatch(name, claim_file)
+
+        return None
+
+    def results_file(self, batch):
+        """Get the file where the results of a batch are saved
+
+        :param ClaimedBatch batch: the batch
+        :rtype: str
+        :return: the results file
+        """
+        return self._path(
+            DONE, batch.name[:-len(BATCH_FILE_EXTENSION)] +
+            RESULTS_FILE_EXTENSION.format(self.results_format)
+        )
+
+    def temporary_results_file(self, batch):
+        """Get the file where the results of a batch are written while it is
+        processed
+
+        :param ClaimedBatch batch: the batch
+        :rtype: str
+        :return: the temporary results file
+        """
+        return batch.claim_file + ".tmp"
+
+    def complete(self, batch):
+        """Mark a batch as done
+
+        The results are moved first, so a batch is never marked as done
+        without its results.
+
+        :param ClaimedBatch batch: the batch
+        :raises FileNotFoundError: if the claim of the batch expired and
+            another worker recovered it
+        """
+        # make sure that the batch is still claimed by this worker
+        utime(batch.claim_file)
+
+        replace(self.temporary_results_file(batch), self.results_file(batch))
+        rename(batch.claim_file, self._path(DONE, batch.name))
+
+        logger.info("completed batch: name=%s", batch.name)
+
+    def release(self, batch):
+        """Remove the temporary results of a batch that wasn't completed
+
+        :param ClaimedBatch batch: the batch
+        """
+        try:
+            remove(self.temporary_results_file(batch))
+        except FileNotFoundError:
+            pass
+
+    def fail(self, batch):
+        """Mark a batch as failed
+
+        :param ClaimedBatch batch: the batch
+        """
+        self.release(batch)
+        rename(batch.claim_file, self._path(FAILED, batch.name))
+
+        logger.warning("failed batch: name=%s", batch.name)
+
+    def recover_stale_batches(self, timeout):
+        """Return the batches whose claim has expired to the incoming
+        directory
+
+        :param float timeout: the number of seconds after which a claim
+            expires
+        :rtype: list[str]
+        :return: the names of the recovered batches
+        """
+        recovered_batches = []
+        now = time.time()
+
+        for filename in listdir(path.join(self.directory, PROCESSING)):
+            if CLAIM_SEPARATOR not in filename:
+                continue
+
+            claim_file = self._path(PROCESSING, filename)
+            name = filename.rsplit(CLAIM_SEPARATOR, 1)[0]
+
+            try:
+                if now - stat(claim_file).st_mtime <= timeout:
+                    continue
+
+                if filename.endswith(".tmp"):
+                    # the partial results of a batch that was recovered
+                    if not path.exists(claim_file[:-len(".tmp")]):
+                        remove(claim_file)
+
+                    continue
+
+                rename(claim_file, self._path(INCOMING, name))
+            except FileNotFoundError:
+                # the batch was completed or recovered by another worker
+                continue
+
+            logger.warning("recovered stale batch: name=%s", name)
+            recovered_batches.append(name)
+
+        return recovered_batches
+
+
+class SpoolWorker(object):
+    """Process the batch files of a spool directory using a process pool
+
+    Every line of a batch file is the payload of a process html, process text
+    or process url request. The lines are read lazily and at most
+    `max_pending` lines are submitted to the pool at any time, so the memory
+    that is used doesn't depend on the batch size. Every record of the
+    results file contains the line number, the id of the payload if it has
+    one and the processing result or error, in the order the lines complete.
+    The columnar results files are written in row groups of
+    `results_row_group_size` records, or fewer if their estimated size
+    reaches `results_buffer_size` bytes.
+    """
+
+    def __init__(self, spool, settings_file, processes=1, max_pending=None,
+                 poll_interval=1.0, stale_timeout=300.0,
+                 process_function=process_payload,
+                 results_row_group_size=500, results_buffer_size=67108864):
+        """Create a new SpoolWorker object
+
+        :param SpoolDirectory spool: the spool directory
+        :param str settings_file: the settings file that the pool processes
+            use to create the content processors
+        :param int processes: the number of pool processes
+        :param int|None max_pending: the maximum number of lines that are
+            submitted to the pool at the same time. It is twice the number
+            of processes if it is not given
+        :param float poll_interval: the number of seconds to wait when there
+            aren't any pending batches
+        :param float stale_timeout: the number of seconds after which the
+            claim of a batch that isn't processed expires
+        :param callable process_function: the function that processes a line
+            payload in a pool process. It receives the settings file and the
+            payload
+        :param int results_row_group_size: the maximum number of records of
+            every row group of the columnar results files
+        :param int results_buffer_size: the estimated size in bytes of the
+            records that are buffered before a row group is written
+        :raises ValueError: if the results format of the spool directory
+            can't be written
+        """
+        check_results_format(spool.results_format)
+
+        self.spool = spool
+        self.settings_file = settings_file
+        self.processes = processes
+        self.max_pending = max_pending or processes * 2
+        self.poll_interval = poll_interval
+        self.stale_timeout = stale_timeout
+        self.process_function = process_function
+        self.results_row_group_size = results_row_group_size
+        self.results_buffer_size = results_buffer_size
+
+        self._stopped = False
+
+    @classmethod
+    def from_configuration(cls, configuration, settings_file, directory=None):
+        """Create a SpoolWorker using the application configuration
+
+        :param Configuration configuration: the application configuration
+        :param str settings_file: the settings file
+        :param str|None directory: the spool directory. The SPOOL_DIRECTORY
+            setting is used if it is not given
+        :rtype: SpoolWorker
+        :return: the spool worker
+        """
+        return cls(
+            spool=SpoolDirectory(
+                directory or configuration["SPOOL_DIRECTORY"],
+                results_format=configuration["SPOOL_RESULTS_FORMAT"]
+            ),
+            settings_file=settings_file,
+            processes=configuration["SPOOL_PROCESSES"],
+            poll_interval=configuration["SPOOL_POLL_INTERVAL"],
+            stale_timeout=configuration["SPOOL_STALE_TIMEOUT"],
+            results_row_group_size=configuration[
+                "SPOOL_RESULTS_ROW_GROUP_SIZE"],
+            results_buffer_size=configuration["SPOOL_RESULTS_BUFFER_SIZE"]
+        )
+
+    def stop(self):
+        """Stop the worker after the batch that is being processed"""
+        self._stopped = True
+
+    def _write_completed(self, pending, results_writer, batch):
+        heartbeat_interval = self.stale_timeout / 4
+
+        # the claim is renewed while the worker waits, so that it doesn't
+        # expire while a slow line is processed
+        done, _ = wait(
+            pending, timeout=heartbeat_interval, return_when=FIRST_COMPLETED)
+        batch.heartbeat(heartbeat_interval)
+
+        for future in done:
+            line_number, payload_id = pending.pop(future)
+
+            record = {"line": line_number, "id": payload_id}
+            record.update(future.result())
+
+            results_writer.write(record)
+
+    def process_batch(self, executor, batch):
+        """Process the lines of a claimed batch
+
+        :param ProcessPoolExecutor executor: the process pool
+        :param ClaimedBatch batch: the batch
+        :rtype: int
+        :return: the number of processed lines
+        """
+        pending = {}
+        line_count = 0
+
+        temporary_results_file = self.spool.temporary_results_file(batch)
+
+        with open(batch.claim_file, encoding="utf8") as batch_file, \
+                create_results_writer(
+                    self.spool.results_format, temporary_results_file,
+                    self.results_row_group_size,
+                    self.results_buffer_size) as f:
+            for line_number, line in enumerate(batch_file, 1):
+                if not line.strip():
+                    continue
+
+                payload = json.loads(line)
+                payload_id = payload.pop("id", None) \
+                    if isinstance(payload, dict) else None
+
+                # wait for a line to complete before submitting more, so
+                # that the batch isn't loaded in memory
+                while len(pending) >= self.max_pending:
+                    self._write_completed(pending, f, batch)
+
+                future = executor.submit(
+                    self.process_function, self.settings_file, payload)
+                pending[future] = (line_number, payload_id)
+                line_count += 1
+
+            while pending:
+                self._write_completed(pending, f, batch)
+
+        return line_count
+
+    def _process_next_batch(self, executor):
+        self.spool.recover_stale_batches(self.stale_timeout)
+
+        batch = self.spool.claim()
+        if batch is None:
+            return False
+
+        start_time = time.perf_counter()
+
+        try:
+            line_count = self.process_batch(executor, batch)
+            self.spool.complete(batch)
+        except (ValueError, UnicodeDecodeError):
+            logger.exception("invalid batch file: name=%s", batch.name)
+
+            self.spool.fail(batch)
+
+            return True
+        except FileNotFoundError:
+            # the batch will be processed by the worker that recovered it
+            logger.warning("batch claim expired: name=%s", batch.name)
+
+            self.spool.release(batch)
+
+            return True
+        except BrokenProcessPool:
+            # a pool process was killed, usually by the kernel because it ran
+            # out of memory, so the batch is failed instead of waiting for
+            # its claim to expire
+            logger.exception(
+                "a pool process exited while processing batch: name=%s",
+                batch.name
+            )
+
+            try:
+                self.spool.fail(batch)
+            except FileNotFoundError:
+                # the claim expired and another worker recovered the batch
+                pass
+
+            raise
+
+        logger.info(
+            "batch processed: name=%s lines=%s execution_time=%s",
+            batch.name, line_count, time.perf_counter() - start_time
+        )
+
+        return True
+
+    def run(self, once=False):
+        """Process the batches until the worker is stopped
+
+        :param bool once: stop when there aren't any pending batches
+        """
+        executor = ProcessPoolExecutor(max_workers=self.processes)
+
+        try:
+            while not self._stopped:
+                try:
+                    if self._process_next_batch(executor):
+                        continue
+                except BrokenProcessPool:
+                    executor.shutdown(wait=False)
+                    executor = ProcessPoolExecutor(max_workers=self.processes)
+
+                    continue
+
+                if once:
+                    break
+
+                time.sleep(self.poll_interval)
+        finally:
+            executor.shutdown()
@@ -14,10 +14,56 @@ def _setup_logging(configuration):
         logging.config.dictConfig(log_config)
 
 
+class Application(API):
+    """The text analysis service falcon application
+
+    The application keeps the objects that start processes, like the named
+    entity extraction pool. They are started in every worker process after
+    it is forked, and stopped when the worker exits or the application is
+    replaced. The connection pools of the application are closed at the
+    same time.
+    """
+
+    __slots__ = ("_worker_resources", "_connection_pools")
+
+    def __init__(self, *args, **kwargs):
+        super(Application, self).__init__(*args, **kwargs)
+
+        self._worker_resources = []
+        self._connection_pools = []
+
+    def add_worker_resource(self, resource):
+        """Add an object that is started in every worker process
+
+        :param resource: an object with a start and a shutdown method
+        """
+        self._worker_resources.append(resource)
+
+    def add_connection_pool(self, connection_pool):
+        """Add an object whose connections are closed with the application
+
+        :param connection_pool: an object with a close method
+        """
+        self._connection_pools.append(connection_pool)
+
+    def start_worker(self):
+        """Start the worker resources in the current worker process"""
+        for resource in self._worker_resources:
+            resource.start()
+
+    def shutdown(self):
+        """Stop the worker resources and close the connection pools"""
+        for resource in self._worker_resources:
+            resource.shutdown()
+
+        for connection_pool in self._connection_pools:
+            connection_pool.close()
+
+
 def create_app(settings_file):
     configuration = Configuration.load_from_py(settings_file)
 
-    app = API()
+    app = Application()
 
     _setup_logging(configuration)
 
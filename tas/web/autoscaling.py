@@ -0,0 +1,382 @@
+import logging
+import math
+import os
+from os import path
+import signal
+from threading import Event, Thread
+import time
+
+
+logger = logging.getLogger(__name__)
+
+
+AUTO = "auto"
+
+CGROUP_ROOT = "/sys/fs/cgroup"
+
+# the cgroup v1 memory limit of a cgroup without a limit is the largest page
+# aligned 64 bit value, so anything above this is treated as unlimited
+UNLIMITED_MEMORY = 2 ** 60
+
+SCALE_UP = 1
+SCALE_DOWN = -1
+
+
+def _read_file(filename):
+    try:
+        with open(filename) as f:
+            return f.read().strip()
+    except (IOError, OSError):
+        return None
+
+
+def get_cpu_limit(cgroup_root=CGROUP_ROOT):
+    """Get the number of CPUs that the process can use
+
+    The number of CPUs is the smallest of the CPUs that the process is
+    allowed to run on and the CPU quota of its cgroup.
+
+    :param str cgroup_root: the cgroup filesystem mount point
+    :rtype: float
+    :return: the number of CPUs
+    """
+    try:
+        cpu_count = float(len(os.sched_getaffinity(0)))
+    except AttributeError:
+        cpu_count = float(os.cpu_count() or 1)
+
+    quota = None
+    period = None
+
+    # cgroup v2 stores the quota and the period in the same file
+    cpu_max = _read_file(path.join(cgroup_root, "cpu.max"))
+    if cpu_max is not None:
+        cpu_max = cpu_max.split()
+        if len(cpu_max) == 2 and cpu_max[0] != "max":
+            quota, period = cpu_max
+    else:
+        quota = _read_file(path.join(cgroup_root, "cpu", "cpu.cfs_quota_us"))
+        period = _read_file(
+            path.join(cgroup_root, "cpu", "cpu.cfs_period_us"))
+
+    try:
+        quota = int(quota)
+        period = int(period)
+    except (TypeError, ValueError):
+        return cpu_count
+
+    # cgroup v1 uses -1 for the cgroups without a quota
+    if quota <= 0 or period <= 0:
+        return cpu_count
+
+    return min(cpu_count, float(quota) / period)
+
+
+def get_memory_limit(cgroup_root=CGROUP_ROOT):
+    """Get the memory that the process can use
+
+    :param str cgroup_root: the cgroup filesystem mount point
+    :rtype: int|None
+    :return: the memory limit of the cgroup of the process, or the physical
+        memory if it doesn't have one, in bytes
+    """
+    limit = _read_file(path.join(cgroup_root, "memory.max"))
+    if limit is None:
+        limit = _read_file(
+            path.join(cgroup_root, "memory", "memory.limit_in_bytes"))
+
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        # cgroup v2 uses "max" for the cgroups without a limit
+        limit = None
+
+    if limit is not None and limit < UNLIMITED_MEMORY:
+        return limit
+
+    try:
+        return os.sysconf("SC_PHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (ValueError, OSError):
+        return None
+
+
+def get_process_memory(pid="self"):
+    """Get the resident memory of a process
+
+    :param int|str pid: the process id
+    :rtype: int|None
+    :return: the resident memory in bytes or None if it isn't available
+    """
+    status = _read_file("/proc/{}/status".format(pid))
+    if status is None:
+        return None
+
+    for line in status.splitlines():
+        if line.startswith("VmRSS:"):
+            # the value is in kB
+            return int(line.split()[1]) * 1024
+
+    return None
+
+
+def get_process_cpu_time(pid):
+    """Get the CPU time that a process has used
+
+    :param int pid: the process id
+    :rtype: float|None
+    :return: the user and system CPU time in seconds or None if it isn't
+        available
+    """
+    stat = _read_file("/proc/{}/stat".format(pid))
+    if stat is None:
+        return None
+
+    # the process name can contain spaces so the fields are counted from the
+    # end of the name
+    fields = stat[stat.rfind(")") + 2:].split()
+    user_time, system_time = int(fields[11]), int(fields[12])
+
+    return float(user_time + system_time) / os.sysconf("SC_CLK_TCK")
+
+
+def calculate_worker_count(cpu_limit, memory_limit, worker_memory,
+                           min_workers=1, max_workers=None,
+                           memory_reserve=0.2):
+    """Calculate the number of workers that the node can run
+
+    One worker is started for every available CPU as long as the workers fit
+    in the memory limit. The master process is counted as one more worker
+    because it loads the application before the workers are started.
+
+    :param float cpu_limit: the number of CPUs
+    :param int|None memory_limit: the memory limit in bytes
+    :param int|None worker_memory: the resident memory of a worker in bytes
+    :param int min_workers: the minimum number of workers
+    :param int|None max_workers: the maximum number of workers
+    :param float memory_reserve: the fraction of the memory limit that is
+        left free for the memory that the workers allocate while processing
+        requests
+    :rtype: int
+    :return: the number of workers
+    """
+    worker_count = max(int(math.ceil(cpu_limit)), 1)
+
+    if memory_limit is not None and worker_memory:
+        memory_budget = memory_limit * (1.0 - memory_reserve) - worker_memory
+        worker_count = min(worker_count, int(memory_budget // worker_memory))
+
+    if max_workers is not None:
+        worker_count = min(worker_count, max_workers)
+
+    return max(worker_count, min_workers)
+
+
+class WorkerScaler(object):
+    """Scale the gunicorn workers based on their CPU utilisation
+
+    The scaler runs in a thread of the gunicorn master. It measures the CPU
+    utilisation of the workers every `interval` seconds and sends the TTIN
+    signal to the master to add a worker when the utilisation is higher than
+    `scale_up_utilisation`, or the TTOU signal to remove one when it is lower
+    than `scale_down_utilisation`. A worker is only added if the workers,
+    including the new one, fit in the memory budget based on the resident
+    memory of the largest worker.
+    """
+
+    def __init__(self, min_workers=1, max_workers=None, memory_limit=None,
+                 memory_reserve=0.2, interval=30.0, scale_up_utilisation=0.8,
+                 scale_down_utilisation=0.3, enabled=False):
+        """Create a new WorkerScaler object
+
+        :param int min_workers: the minimum number of workers
+        :param int|None max_workers: the maximum number of workers
+        :param int|None memory_limit: the memory limit in bytes
+        :param float memory_reserve: the fraction of the memory limit that
+            is left free
+        :param float interval: the number of seconds between the
+            measurements
+        :param float scale_up_utilisation: the average worker CPU utilisation
+            above which a worker is added
+        :param float scale_down_utilisation: the average worker CPU
+            utilisation below which a worker is removed
+        :param bool enabled: scale the workers
+        """
+        self.min_workers = min_workers
+        self.max_workers = max_workers
+        self.memory_limit = memory_limit
+        self.memory_reserve = memory_reserve
+        self.interval = interval
+        self.scale_up_utilisation = scale_up_utilisation
+        self.scale_down_utilisation = scale_down_utilisation
+
+        # the workers aren't scaled while they are being reloaded
+        self.paused = False
+
+        self._enabled = enabled
+        self._cpu_times = {}
+        self._measurement_time = None
+        self._stopped = Event()
+        self._thread = None
+
+    @property
+    def enabled(self):
+        """Check if the workers are scaled
+
+        :rtype: bool
+        :return: True if the workers are scaled
+        """
+        return self._enabled
+
+    @classmethod
+    def from_configuration(cls, configuration, worker_count):
+        """Create a WorkerScaler using the service configuration
+
+        :param Configuration configuration: the service configuration
+        :param int worker_count: the number of workers that are started,
+            which is the maximum number of workers if WORKERS_MAX isn't set
+        :rtype: WorkerScaler
+        :return: the worker scaler
+        """
+        if configuration["WORKERS"] != AUTO or \
+                not configuration["WORKER_SCALING_ENABLED"]:
+            return cls()
+
+        return cls(
+            min_workers=configuration["WORKERS_MIN"],
+            max_workers=configuration["WORKERS_MAX"] or worker_count,
+            memory_limit=get_memory_limit(),
+            memory_reserve=configuration["WORKER_MEMORY_RESERVE"],
+            interval=configuration["WORKER_SCALING_INTERVAL"],
+            scale_up_utilisation=configuration["WORKER_SCALE_UP_UTILISATION"],
+            scale_down_utilisation=configuration[
+                "WORKER_SCALE_DOWN_UTILISATION"],
+            enabled=True
+        )
+
+    def decide(self, worker_count, utilisation, worker_memory=None):
+        """Decide if a worker must be added or removed
+
+        :param int worker_count: the number of workers
+        :param float utilisation: the average CPU utilisation of the workers
+        :param int|None worker_memory: the resident memory of the largest
+            worker in bytes
+        :rtype: int
+        :return: SCALE_UP, SCALE_DOWN or 0 to keep the workers
+        """
+        if utilisation > self.scale_up_utilisation:
+            if self.max_workers is not None and \
+                    worker_count >= self.max_workers:
+                return 0
+
+            # the master process is counted as one more worker
+            if self.memory_limit is not None and worker_memory:
+                required_memory = (worker_count + 2) * worker_memory
+                memory_budget = self.memory_limit * (1.0 - self.memory_reserve)
+                if required_memory > memory_budget:
+                    return 0
+
+            return SCALE_UP
+
+        if utilisation < self.scale_down_utilisation and \
+                worker_count > self.min_workers:
+            return SCALE_DOWN
+
+        return 0
+
+    def measure(self, pids):
+        """Measure the CPU utilisation of the workers
+
+        :param list[int] pids: the worker process ids
+        :rtype: (float|None, int|None)
+        :return: the average CPU utilisation of the workers since the
+            previous measurement, or None if this is the first measurement,
+            and the resident memory of the largest worker
+        """
+        now = time.monotonic()
+        cpu_times = {}
+        worker_memory = None
+
+        for pid in pids:
+            cpu_time = get_process_cpu_time(pid)
+            if cpu_time is not None:
+                cpu_times[pid] = cpu_time
+
+            memory = get_process_memory(pid)
+            if memory is not None:
+                worker_memory = max(worker_memory or 0, memory)
+
+        utilisation = None
+        # only the workers that were running at the previous measurement
+        # are used, because the CPU time of a new worker includes the time
+        # it needed to load the application
+        previous_pids = [pid for pid in cpu_times if pid in self._cpu_times]
+        if self._measurement_time is not None and previous_pids:
+            elapsed_time = now - self._measurement_time
+            used_cpu_time = sum(
+                cpu_times[pid] - self._cpu_times[pid] for pid in previous_pids)
+            utilisation = used_cpu_time / (elapsed_time * len(previous_pids))
+
+        self._cpu_times = cpu_times
+        self._measurement_time = now
+
+        return utilisation, worker_memory
+
+    def _scale(self, arbiter):
+        if self.paused:
+            return
+
+        pids = list(arbiter.WORKERS.keys())
+        utilisation, worker_memory = self.measure(pids)
+        if utilisation is None:
+            return
+
+        decision = self.decide(len(pids), utilisation, worker_memory)
+        if decision == 0:
+            return
+
+        logger.info(
+            "scaling workers: workers=%s decision=%s utilisation=%.2f "
+            "worker_memory=%s",
+            len(pids), "up" if decision == SCALE_UP else "down", utilisation,
+            worker_memory
+        )
+
+        os.kill(
+            arbiter.pid,
+            signal.SIGTTIN if decision == SCALE_UP else signal.SIGTTOU
+        )
+
+    def _run(self, arbiter):
+        while not self._stopped.wait(self.interval):
+            try:
+                self._scale(arbiter)
+            except Exception:
+                logger.exception("failed to scale the workers")
+
+    def start(self, arbiter):
+        """Start scaling the workers of a gunicorn master
+
+        :param gunicorn.arbiter.Arbiter arbiter: the gunicorn master
+        """
+        if not self.enabled or self._thread is not None:
+            return
+
+        logger.info(
+            "starting worker scaling: min_workers=%s max_workers=%s",
+            self.min_workers, self.max_workers
+        )
+
+        self._thread = Thread(
+            target=self._run, args=(arbiter,), name="worker-scaler",
+            daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Stop scaling the workers"""
+        if self._thread is None:
+            return
+
+        self._stopped.set()
+        self._thread.join()
+        self._thread = None
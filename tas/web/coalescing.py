@@ -0,0 +1,344 @@
+import fcntl
+import hashlib
+import json
+import logging
+import os
+from os import (
+    getpid, listdir, lstat, makedirs, path, remove, replace, stat, utime
+)
+import stat as stat_module
+from threading import Event, get_ident, Lock, Thread
+import time
+
+
+logger = logging.getLogger(__name__)
+
+
+# the number of characters of a string value that are encoded at a time
+# when the request key is created
+KEY_ENCODING_CHUNK_SIZE = 65536
+
+
+def _update_request_hash(request_hash, value):
+    if isinstance(value, dict):
+        request_hash.update("{{{}:".format(len(value)).encode("utf8"))
+
+        for key in sorted(value):
+            _update_request_hash(request_hash, key)
+            _update_request_hash(request_hash, value[key])
+    elif isinstance(value, list):
+        request_hash.update("[{}:".format(len(value)).encode("utf8"))
+
+        for item in value:
+            _update_request_hash(request_hash, item)
+    elif isinstance(value, str):
+        request_hash.update("s{}:".format(len(value)).encode("utf8"))
+
+        # the string is encoded in chunks because the html of a web page can
+        # be very large
+        for i in range(0, len(value), KEY_ENCODING_CHUNK_SIZE):
+            request_hash.update(
+                value[i:i + KEY_ENCODING_CHUNK_SIZE].encode(
+                    "utf8", "surrogatepass")
+            )
+    else:
+        request_hash.update(json.dumps(value).encode("utf8"))
+
+
+def create_request_key(endpoint, content):
+    """Create the key that identifies identical requests
+
+    The request content is hashed without creating a serialized copy of it,
+    so the memory that is used doesn't depend on the content size.
+
+    :param str endpoint: the endpoint name
+    :param dict content: the request content
+    :rtype: str
+    :return: the request key
+    """
+    request_hash = hashlib.sha256()
+    _update_request_hash(request_hash, content)
+
+    return "{}-{}".format(endpoint, request_hash.hexdigest())
+
+
+def create_private_directory(directory, name):
+    """Create a directory that only the current user can access
+
+    :param str directory: the directory path
+    :param str name: the name of the directory that is used in the error
+        message
+    :raises ValueError: if the directory belongs to another user or other
+        users can access it
+    """
+    makedirs(directory, mode=0o700, exist_ok=True)
+
+    # the result files of the other users must never be loaded, so the
+    # directory must be private to the user that runs the service
+    directory_stat = lstat(directory)
+    if not stat_module.S_ISDIR(directory_stat.st_mode) or \
+            directory_stat.st_uid != os.getuid() or \
+            directory_stat.st_mode & 0o077:
+        raise ValueError(
+            "the {} directory must be a directory that is only accessible "
+            "by the current user: {}".format(name, directory)
+        )
+
+
+class _LockWaiter(object):
+    """Wait for a file lock in a separate thread
+
+    flock can't wait for a limited time, so the blocking call is made by a
+    daemon thread. If the caller stops waiting, the thread closes the lock
+    file as soon as it gets the lock, which releases it.
+    """
+
+    def __init__(self, lock_fd):
+        self.lock_fd = lock_fd
+
+        self._locked = Event()
+        self._abandoned = False
+        self._lock = Lock()
+
+    def _acquire(self):
+        fcntl.flock(self.lock_fd, fcntl.LOCK_EX)
+
+        with self._lock:
+            if self._abandoned:
+                os.close(self.lock_fd)
+            else:
+                self._locked.set()
+
+    def wait(self, timeout):
+        """Wait for the lock
+
+        :param float timeout: the number of seconds to wait
+        :rtype: bool
+        :return: True if the lock was acquired. The lock file is closed by
+            the waiting thread otherwise
+        """
+        Thread(target=self._acquire, daemon=True).start()
+
+        if self._locked.wait(timeout):
+            return True
+
+        with self._lock:
+            if self._locked.is_set():
+                return True
+
+            self._abandoned = True
+
+            return False
+
+
+class RequestCoalescer(object):
+    """Share the result of a request with the identical concurrent requests
+
+    The coalescer coordinates the workers of a node using file locks. The
+    first request locks the lock file of its key and computes the result.
+    The identical requests that arrive in the meantime mark that they are
+    waiting and wait for the lock, so the first request saves the result in
+    the result file before releasing the lock only when another request
+    waits for it. A request that waits for longer than the timeout, or that
+    finds no result because the first request failed or completed before it
+    started waiting, computes the result itself.
+    """
+
+    def __init__(self, directory=None, timeout=30.0, result_max_age=60):
+        """Create a new RequestCoalescer object
+
+        :param str|None directory: the directory of the lock and result
+            files. Requests are not coalesced if it is None
+        :param float timeout: the number of seconds to wait for an identical
+            request to complete
+        :param int result_max_age: the number of seconds to keep the result
+            files
+        """
+        self.directory = directory
+        self.timeout = timeout
+        self.result_max_age = result_max_age
+
+        self._last_cleanup_time = 0.0
+        self._cleanup_lock = Lock()
+
+        if self.directory is not None:
+            self._create_directory()
+
+    @property
+    def enabled(self):
+        """Check if the requests are coalesced
+
+        :rtype: bool
+        :return: True if the requests are coalesced
+        """
+        return self.directory is not None
+
+    @classmethod
+    def from_configuration(cls, configuration):
+        """Create a RequestCoalescer using the application configuration
+
+        :param Configuration configuration: the application configuration
+        :rtype: RequestCoalescer
+        :return: the request coalescer
+        """
+        if not configuration["COALESCING_ENABLED"]:
+            return cls()
+
+        return cls(
+            directory=configuration["COALESCING_DIRECTORY"],
+            timeout=configuration["COALESCING_TIMEOUT"]
+        )
+
+    def _create_directory(self):
+        create_private_directory(self.directory, "coalescing")
+
+    def _wait_for_lock(self, lock_fd, waiting_file):
+        try:
+            fcntl.flock(lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True, False
+        except BlockingIOError:
+            pass
+
+        # the request that holds the lock only saves its result if it finds
+        # that another request is waiting for it
+        self._mark_waiting(waiting_file)
+
+        return _LockWaiter(lock_fd).wait(self.timeout), True
+
+    def _mark_waiting(self, waiting_file):
+        try:
+            os.close(os.open(waiting_file, os.O_CREAT | os.O_WRONLY, 0o600))
+            utime(waiting_file)
+        except OSError:
+            logger.exception(
+                "failed to mark the request as waiting: waiting_file=%s",
+                waiting_file
+            )
+
+    def _has_waiting_requests(self, waiting_file, min_modification_time):
+        try:
+            return stat(waiting_file).st_mtime >= min_modification_time
+        except OSError:
+            return False
+
+    def _read_result(self, result_file, min_modification_time):
+        try:
+            if stat(result_file).st_mtime < min_modification_time:
+                return False, None
+
+            with open(result_file, "r", encoding="utf8") as f:
+                return True, json.load(f)
+        except (OSError, ValueError):
+            return False, None
+
+    def _write_result(self, result_file, result):
+        temporary_file = "{}.{}.{}.tmp".format(
+            result_file, getpid(), get_ident())
+
+        try:
+            with open(temporary_file, "w", encoding="utf8") as f:
+                json.dump(result, f)
+
+            replace(temporary_file, result_file)
+        except (OSError, TypeError, ValueError):
+            logger.exception(
+                "failed to save coalesced result: result_file=%s",
+                result_file
+            )
+
+    def _remove_expired_files(self):
+        now = time.time()
+
+        with self._cleanup_lock:
+            if now - self._last_cleanup_time < self.result_max_age:
+                return
+
+            self._last_cleanup_time = now
+
+        for filename in listdir(self.directory):
+            file_path = path.join(self.directory, filename)
+
+            try:
+                if now - stat(file_path).st_mtime <= self.result_max_age:
+                    continue
+
+                if filename.endswith(".lock"):
+                    self._remove_unused_lock_file(file_path)
+                else:
+                    remove(file_path)
+            except OSError:
+                # another worker removed the file first
+                pass
+
+    def _remove_unused_lock_file(self, lock_file):
+        lock_fd = os.open(lock_file, os.O_RDWR)
+
+        try:
+            # the lock file of a request that is still executing must not be
+            # removed
+            fcntl.flock(lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            remove(lock_file)
+        except BlockingIOError:
+            pass
+        finally:
+            os.close(lock_fd)
+
+    def execute(self, key, func):
+        """Execute a function unless an identical request is executing it
+
+        :param str key: the request key
+        :param callable func: the function that computes the result
+        :rtype: (object, bool)
+        :return: the result and True if it was computed by another request
+        """
+        if self.directory is None:
+            return func(), False
+
+        lock_file = path.join(self.directory, "{}.lock".format(key))
+        result_file = path.join(self.directory, "{}.result".format(key))
+        waiting_file = path.join(self.directory, "{}.waiting".format(key))
+
+        # the file modification times have a coarser resolution than the
+        # clock so we accept results and waiting requests from slightly
+        # before we started. They are for identical content anyway
+        start_time = time.time() - 1.0
+        lock_fd = os.open(lock_file, os.O_CREAT | os.O_RDWR)
+
+        try:
+            locked, waited = self._wait_for_lock(lock_fd, waiting_file)
+        except BaseException:
+            os.close(lock_fd)
+            raise
+
+        if not locked:
+            # the thread that waits for the lock closes the lock file
+            logger.warning(
+                "timed out waiting for identical request: key=%s", key)
+
+            try:
+                return func(), False
+            finally:
+                self._remove_expired_files()
+
+        try:
+            if waited:
+                found, result = self._read_result(result_file, start_time)
+                if found:
+                    logger.info("using result of identical request: key=%s",
+                                key)
+
+                    return result, True
+
+            result = func()
+
+            # most requests have no identical request waiting for them, so
+            # the result is only saved when one is
+            if self._has_waiting_requests(waiting_file, start_time):
+                self._write_result(result_file, result)
+
+            return result, False
+        finally:
+            # closing the file releases the lock
+            os.close(lock_fd)
+
+            self._remove_expired_files()
@@ -0,0 +1,270 @@
+from collections import deque
+import logging
+import math
+from threading import Lock
+import time
+
+from statsd import StatsClient
+
+
+logger = logging.getLogger(__name__)
+
+
+DEGRADATION_LEVEL = "topicaxis.tas.degradation.level"
+
+# the analysis stages that can be skipped, which are the most expensive
+# stages whose results are not needed by the rest of the analysis
+OPTIONAL_STAGES = ("summary", "named_entities", "readability")
+
+
+# the header that the reverse proxy sets to the time it received the request
+REQUEST_START_HEADER = "X-Request-Start"
+
+
+def get_queue_time(request_start, now=None):
+    """Calculate the time that a request waited before a worker received it
+
+    The request start time is the value of the X-Request-Start header, which
+    is either "t=<timestamp>" or just the timestamp. The timestamp is the
+    number of seconds, milliseconds or microseconds since the epoch.
+
+    :param str|None request_start: the request start time
+    :param float|None now: the current time since the epoch. The current
+        time is used if it is None
+    :rtype: float
+    :return: the number of seconds the request waited or 0 if the request
+        start time is not available or invalid
+    """
+    if not request_start:
+        return 0.0
+
+    if request_start.startswith("t="):
+        request_start = request_start[2:]
+
+    try:
+        start_time = float(request_start)
+    except ValueError:
+        logger.warning("invalid request start time: %s", request_start)
+        return 0.0
+
+    # the timestamp unit is selected by its magnitude
+    if start_time > 1e14:
+        start_time /= 1e6
+    elif start_time > 1e11:
+        start_time /= 1e3
+
+    if now is None:
+        now = time.time()
+
+    # the clocks of the proxy and of the worker can differ slightly
+    return max(now - start_time, 0.0)
+
+
+def calculate_percentile(values, percentile):
+    """Calculate a percentile using the nearest rank method
+
+    :param list[float] values: the values
+    :param float percentile: the percentile between 0 and 100
+    :rtype: float|None
+    :return: the percentile or None if there are no values
+    """
+    if not values:
+        return None
+
+    values = sorted(values)
+    rank = max(int(math.ceil(percentile / 100.0 * len(values))), 1)
+
+    return values[rank - 1]
+
+
+class DegradationController(object):
+    """Skip the optional analysis stages while the service is overloaded
+
+    The controller watches the latency of the recent requests and the number
+    of queued requests. When the latency percentile or the queue depth
+    exceeds its objective, one more of the optional stages is skipped, in the
+    configured order. A stage is restored when the latency and the queue
+    depth fall below `recovery_ratio` times their objectives. The level
+    changes at most once every `interval` seconds and only the requests that
+    were processed since the last change are considered, so the effect of a
+    change is measured before the next one.
+
+    Every worker has its own controller, which is based on the requests that
+    the worker processes. The latency of a request must include the time it
+    waited in the backlog of the server, which the worker can only know from
+    the X-Request-Start header of the reverse proxy, otherwise the latency
+    doesn't grow while the requests are queued.
+    """
+
+    def __init__(self, stages=None, latency_slo=None, percentile=95,
+                 queue_depth_slo=None, interval=10.0, recovery_ratio=0.7,
+                 min_samples=20, window=200, statsd_client=None):
+        """Create a new DegradationController object
+
+        :param list[str]|None stages: the optional stages in the order they
+            are skipped. The stages are never skipped if it is empty
+        :param float|None latency_slo: the latency objective in seconds
+        :param float percentile: the latency percentile that is compared
+            with the objective
+        :param int|None queue_depth_slo: the maximum number of queued
+            requests
+        :param float interval: the minimum number of seconds between the
+            level changes
+        :param float recovery_ratio: the fraction of the objectives below
+            which a stage is restored
+        :param int min_samples: the minimum number of requests for the
+            latency percentile to be used
+        :param int window: the maximum number of recent requests to use
+        :param StatsClient|None statsd_client: the client to send the
+            degradation level to
+        """
+        self.stages = list(stages or [])
+        for stage in self.stages:
+            if stage not in OPTIONAL_STAGES:
+                raise ValueError(
+                    "the {} stage can not be skipped".format(stage))
+
+        self.latency_slo = latency_slo
+        self.percentile = percentile
+        self.queue_depth_slo = queue_depth_slo
+        self.interval = interval
+        self.recovery_ratio = recovery_ratio
+        self.min_samples = min_samples
+
+        self.level = 0
+
+        self._latencies = deque(maxlen=window)
+        self._level_change_time = time.monotonic()
+        self._statsd_client = statsd_client
+        self._lock = Lock()
+
+    @property
+    def enabled(self):
+        """Check if the stages can be skipped
+
+        :rtype: bool
+        :return: True if the stages can be skipped
+        """
+        return bool(self.stages) and (
+            self.latency_slo is not None or self.queue_depth_slo is not None)
+
+    @classmethod
+    def from_configuration(cls, configuration):
+        """Create a DegradationController using the application configuration
+
+        :param Configuration configuration: the application configuration
+        :rtype: DegradationController
+        :return: the degradation controller
+        """
+        if not configuration["DEGRADATION_ENABLED"]:
+            return cls()
+
+        statsd_client = None
+        if configuration.get("STATSD_HOST") is not None:
+            statsd_client = StatsClient(
+                configuration["STATSD_HOST"],
+                configuration.get("STATSD_PORT", 8125)
+            )
+
+        return cls(
+            stages=configuration["DEGRADATION_STAGES"],
+            latency_slo=configuration["DEGRADATION_LATENCY_SLO"],
+            percentile=configuration["DEGRADATION_LATENCY_PERCENTILE"],
+            queue_depth_slo=configuration["DEGRADATION_QUEUE_DEPTH_SLO"],
+            interval=configuration["DEGRADATION_INTERVAL"],
+            recovery_ratio=configuration["DEGRADATION_RECOVERY_RATIO"],
+            min_samples=configuration["DEGRADATION_MIN_SAMPLES"],
+            statsd_client=statsd_client
+        )
+
+    def stages_to_skip(self):
+        """Get the stages that the requests must skip
+
+        :rtype: frozenset[str]
+        :return: the stage names
+        """
+        return frozenset(self.stages[:self.level])
+
+    def _is_overloaded(self, latency, queue_depth):
+        if self.latency_slo is not None and latency is not None and \
+                latency > self.latency_slo:
+            return True
+
+        return self.queue_depth_slo is not None and \
+            queue_depth > self.queue_depth_slo
+
+    def _has_recovered(self, latency, queue_depth):
+        # a stage is only restored after enough requests were processed at
+        # the current level to measure its latency
+        if self.latency_slo is not None and (
+                latency is None or
+                latency >= self.latency_slo * self.recovery_ratio):
+            return False
+
+        return self.queue_depth_slo is None or \
+            queue_depth <= self.queue_depth_slo * self.recovery_ratio
+
+    def _change_level(self, level, now, latency, queue_depth):
+        log = logger.warning if level > self.level else logger.info
+        log(
+            "degradation level changed: level=%s skipped_stages=%s "
+            "latency=%s queue_depth=%s",
+            level, ",".join(self.stages[:level]), latency, queue_depth
+        )
+
+        self.level = level
+        self._level_change_time = now
+        self._latencies.clear()
+
+        if self._statsd_client is not None:
+            self._statsd_client.gauge(DEGRADATION_LEVEL, level)
+
+    def record(self, latency, queue_depth=0):
+        """Record a processed request and update the degradation level
+
+        :param float latency: the request queue and execution time in
+            seconds
+        :param int queue_depth: the number of queued requests
+        """
+        if not self.enabled:
+            return
+
+        now = time.monotonic()
+
+        with self._lock:
+            self._latencies.append(latency)
+
+            if now - self._level_change_time < self.interval:
+                return
+
+            percentile_latency = None
+            if len(self._latencies) >= self.min_samples:
+                percentile_latency = calculate_percentile(
+                    list(self._latencies), self.percentile)
+
+            if self._is_overloaded(percentile_latency, queue_depth):
+                if self.level < len(self.stages):
+                    self._change_level(
+                        self.level + 1, now, percentile_latency, queue_depth)
+            elif self._has_recovered(percentile_latency, queue_depth):
+                if self.level > 0:
+                    self._change_level(
+                        self.level - 1, now, percentile_latency, queue_depth)
+
+    def as_dict(self):
+        """Get the settings and the state of the controller
+
+        :rtype: dict
+        :return: the controller data
+        """
+        with self._lock:
+            latencies = list(self._latencies)
+
+        return {
+            "level": self.level,
+            "skipped_stages": self.stages[:self.level],
+            "latency_slo": self.latency_slo,
+            "percentile": self.percentile,
+            "queue_depth_slo": self.queue_depth_slo,
+            "latency": calculate_percentile(latencies, self.percentile)
+        }
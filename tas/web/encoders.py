@@ -0,0 +1,148 @@
+from abc import ABCMeta, abstractmethod
+import json
+import logging
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:
+    cbor2 = None
+
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseEncoder(metaclass=ABCMeta):
+    """Base class for all the response body encoders"""
+
+    media_type = None
+
+    @abstractmethod
+    def encode(self, data):
+        """Encode the response data
+
+        :param dict data: the data to encode
+        :rtype: bytes
+        :return: the encoded data
+        """
+        pass
+
+
+class JSONEncoder(ResponseEncoder):
+    """JSON response encoder"""
+
+    media_type = "application/json"
+
+    def encode(self, data):
+        return json.dumps(data).encode("utf8")
+
+
+class MessagePackEncoder(ResponseEncoder):
+    """MessagePack response encoder"""
+
+    media_type = "application/msgpack"
+
+    def encode(self, data):
+        return msgpack.packb(data, use_bin_type=True)
+
+
+class CBOREncoder(ResponseEncoder):
+    """CBOR response encoder"""
+
+    media_type = "application/cbor"
+
+    def encode(self, data):
+        return cbor2.dumps(data)
+
+
+def get_available_encoders():
+    """Get the encoders that can be used in this environment
+
+    MessagePack and CBOR are optional and are only available when the msgpack
+    and cbor2 packages are installed.
+
+    :rtype: dict[str, ResponseEncoder]
+    :return: the encoders indexed by the media type they produce
+    """
+    encoders = [JSONEncoder()]
+
+    if msgpack is not None:
+        encoders.append(MessagePackEncoder())
+
+    if cbor2 is not None:
+        encoders.append(CBOREncoder())
+
+    available_encoders = {
+        encoder.media_type: encoder
+        for encoder in encoders
+    }
+
+    # some clients still use the unregistered msgpack media type
+    if msgpack is not None:
+        available_encoders["application/x-msgpack"] = \
+            available_encoders[MessagePackEncoder.media_type]
+
+    return available_encoders
+
+
+class ResponseEncoders(object):
+    """Select the response encoder using the Accept header of a request"""
+
+    def __init__(self, encoders=None, default_media_type=None):
+        """Create a new ResponseEncoders object
+
+        :param dict[str, ResponseEncoder]|None encoders: the supported
+            encoders indexed by media type
+        :param str|None default_media_type: the media type to use when the
+            client doesn't accept any of the supported media types
+        """
+        self.encoders = encoders or get_available_encoders()
+        self.default_media_type = \
+            default_media_type or JSONEncoder.media_type
+
+        # mimeparse will select the last of the supported media types when
+        # more than one of them match the Accept header equally well, for
+        # example when the header is missing or it is */*, so the default
+        # media type must be the last item in this list
+        self._media_types = [
+            media_type
+            for media_type in sorted(self.encoders)
+            if media_type != self.default_media_type
+        ]
+        self._media_types.append(self.default_media_type)
+
+    def select(self, request):
+        """Select the encoder for this request
+
+        :param falcon.Request request: the request object
+        :rtype: ResponseEncoder
+        :return: the encoder to use
+        """
+        media_type = request.client_prefers(self._media_types)
+
+        if media_type is None:
+            logger.debug(
+                "client doesn't accept any supported media type: accept=%s",
+                request.accept
+            )
+
+            media_type = self.default_media_type
+
+        return self.encoders[media_type]
+
+    def encode_response(self, request, response, data):
+        """Encode the data into the response body
+
+        :param falcon.Request request: the request object
+        :param falcon.Response response: the response object
+        :param dict data: the response data
+        """
+        encoder = self.select(request)
+
+        response.content_type = encoder.media_type
+        response.append_header("Vary", "Accept")
+        response.data = encoder.encode(data)
@@ -3,3 +3,11 @@ TAS_ERROR = 1003
 INVALID_REQUEST_BODY = 1004
 INVALID_HTML_CONTENT = 1005
 HTML_CONTENT_PROCESSING_ERROR = 1006
+INVALID_TEXT_CONTENT = 1007
+TEXT_CONTENT_PROCESSING_ERROR = 1008
+INVALID_URL_CONTENT = 1009
+WEB_PAGE_FETCH_ERROR = 1010
+LANE_QUEUE_FULL = 1011
+PAGE_SKIPPED = 1012
+INVALID_SHARD_TOKEN = 1013
+REQUEST_BODY_TOO_LARGE = 1014
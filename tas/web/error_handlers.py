@@ -3,15 +3,33 @@ import logging
 
 from tas.web import error_codes
 from tas.analysis.exceptions import (
-    HTMLContentProcessorError, InvalidHTMLContent
+    HTMLContentProcessorError, InvalidHTMLContent, HtmlContentProcessingError,
+    TextContentProcessorError, InvalidTextContent, TextContentProcessingError,
+    URLContentProcessorError, InvalidURLContent, PageSkipped,
+    WebPageFetchError
 )
 
-from falcon import HTTPBadRequest, HTTPNotFound
+from falcon import (
+    HTTPBadRequest, HTTPNotFound, HTTPBadGateway, HTTPUnprocessableEntity
+)
 
 
 logger = logging.getLogger(__name__)
 
 
+def handle_page_skipped_error(exception):
+    logger.info(
+        "web page skipped: reason=%s language=%s",
+        exception.reason, exception.language
+    )
+
+    return HTTPUnprocessableEntity(
+        title="Page skipped",
+        description="The web page is not analysed by this service",
+        code=error_codes.PAGE_SKIPPED
+    )
+
+
 class ErrorHandlerBase(metaclass=ABCMeta):
     """Base class for all REST API error handlers"""
 
@@ -55,7 +73,8 @@ class ProcessHTMLErrorHandler(ErrorHandlerBase):
         error_handlers = {
             HTMLContentProcessorError:
                 self._handle_html_content_processor_error,
-            InvalidHTMLContent: self._handle_invalid_html_content_error
+            InvalidHTMLContent: self._handle_invalid_html_content_error,
+            PageSkipped: handle_page_skipped_error
         }
 
         super(ProcessHTMLErrorHandler, self).__init__(error_handlers)
@@ -86,3 +105,112 @@ class ProcessHTMLErrorHandler(ErrorHandlerBase):
             description="Failed to process content",
             code=error_codes.TAS_ERROR
         )
+
+
+class ProcessTextErrorHandler(ErrorHandlerBase):
+    """Error handler for the process text endpoint"""
+
+    def __init__(self):
+        error_handlers = {
+            TextContentProcessorError:
+                self._handle_text_content_processor_error,
+            TextContentProcessingError:
+                self._handle_text_content_processor_error,
+            InvalidTextContent: self._handle_invalid_text_content_error
+        }
+
+        super(ProcessTextErrorHandler, self).__init__(error_handlers)
+
+    def _handle_invalid_text_content_error(self, exception):
+        logger.warning("invalid text content: errors=%s", exception.errors)
+
+        return HTTPBadRequest(
+            title='Invalid request body',
+            description="The text analysis request contained invalid data",
+            code=error_codes.INVALID_TEXT_CONTENT
+        )
+
+    def _handle_text_content_processor_error(self, exception):
+        logger.warning("failed to process text content")
+
+        return HTTPNotFound(
+            title="Processing error",
+            description="Failed to process content",
+            code=error_codes.TEXT_CONTENT_PROCESSING_ERROR
+        )
+
+    def handle_unknown_exception(self, exception):
+        logger.error("failed to process content: exception=%s", exception)
+
+        return HTTPNotFound(
+            title="Processing error",
+            description="Failed to process content",
+            code=error_codes.TAS_ERROR
+        )
+
+
+class ProcessURLErrorHandler(ErrorHandlerBase):
+    """Error handler for the process url endpoint"""
+
+    def __init__(self):
+        error_handlers = {
+            URLContentProcessorError:
+                self._handle_url_content_processor_error,
+            InvalidURLContent: self._handle_invalid_url_content_error,
+            WebPageFetchError: self._handle_web_page_fetch_error,
+            HTMLContentProcessorError:
+                self._handle_html_content_processor_error,
+            HtmlContentProcessingError:
+                self._handle_html_content_processor_error,
+            PageSkipped: handle_page_skipped_error
+        }
+
+        super(ProcessURLErrorHandler, self).__init__(error_handlers)
+
+    def _handle_invalid_url_content_error(self, exception):
+        logger.warning("invalid url content: errors=%s", exception.errors)
+
+        return HTTPBadRequest(
+            title='Invalid request body',
+            description="The url analysis request contained invalid data",
+            code=error_codes.INVALID_URL_CONTENT
+        )
+
+    def _handle_web_page_fetch_error(self, exception):
+        logger.warning(
+            "failed to download web page: url=%s status_code=%s",
+            exception.url, exception.status_code
+        )
+
+        return HTTPBadGateway(
+            title="Download error",
+            description="Failed to download the web page",
+            code=error_codes.WEB_PAGE_FETCH_ERROR
+        )
+
+    def _handle_url_content_processor_error(self, exception):
+        logger.warning("failed to process url content")
+
+        return HTTPNotFound(
+            title="Processing error",
+            description="Failed to process content",
+            code=error_codes.TAS_ERROR
+        )
+
+    def _handle_html_content_processor_error(self, exception):
+        logger.warning("failed to extract content from the web page")
+
+        return HTTPNotFound(
+            title="Processing error",
+            description="Failed to process content",
+            code=error_codes.HTML_CONTENT_PROCESSING_ERROR
+        )
+
+    def handle_unknown_exception(self, exception):
+        logger.error("failed to process content: exception=%s", exception)
+
+        return HTTPNotFound(
+            title="Processing error",
+            description="Failed to process content",
+            code=error_codes.TAS_ERROR
+        )
@@ -0,0 +1,86 @@
+import json
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+
+READ_CHUNK_SIZE = 262144
+
+
+class RequestBodyTooLarge(Exception):
+    """The request body is larger than the maximum request body size"""
+
+    def __init__(self, size, max_size):
+        super(RequestBodyTooLarge, self).__init__(size, max_size)
+
+        self.size = size
+        self.max_size = max_size
+
+
+def read_request_body(stream, content_length=None, chunk_size=READ_CHUNK_SIZE,
+                      max_size=None):
+    """Read the request body into a single buffer
+
+    The body is read in chunks that are appended to the buffer, so only one
+    chunk exists besides the buffer at any time. The buffer grows as the
+    chunks arrive, so a content length that is larger than the body doesn't
+    allocate any memory.
+
+    :param stream: the request body stream
+    :param int|None content_length: the size of the request body in bytes
+    :param int chunk_size: the number of bytes to read at a time
+    :param int|None max_size: the maximum size of the request body in bytes
+    :rtype: bytearray
+    :return: the request body
+    :raises RequestBodyTooLarge: if the content length or the body is larger
+        than the maximum size
+    """
+    if max_size is not None and content_length and content_length > max_size:
+        raise RequestBodyTooLarge(content_length, max_size)
+
+    body = bytearray()
+
+    while content_length is None or len(body) < content_length:
+        read_size = chunk_size
+        if content_length is not None:
+            read_size = min(chunk_size, content_length - len(body))
+
+        chunk = stream.read(read_size)
+        if not chunk:
+            break
+
+        body += chunk
+
+        if max_size is not None and len(body) > max_size:
+            raise RequestBodyTooLarge(len(body), max_size)
+
+    if content_length is not None and len(body) < content_length:
+        logger.warning(
+            "request body is shorter than its content length: "
+            "content_length=%s body_size=%s", content_length, len(body)
+        )
+
+    return body
+
+
+def load_json_body(body):
+    """Decode a json request body
+
+    The body buffer is emptied as soon as it has been decoded into text, so
+    while the json document is parsed the text is the only copy of the body.
+    The text is released when the document has been parsed, so afterwards
+    the parsed document is the only copy.
+
+    :param bytearray body: the request body. It is empty when this function
+        returns
+    :rtype: object
+    :return: the json document
+    :raises ValueError: if the body is not a valid utf8 encoded json document
+    """
+    try:
+        text = body.decode("utf8")
+    finally:
+        body.clear()
+
+    return json.loads(text)
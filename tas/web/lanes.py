@@ -0,0 +1,277 @@
+from contextlib import contextmanager
+import logging
+from threading import Condition
+import time
+
+from statsd import StatsClient
+
+from tas.exceptions import TASError
+
+
+logger = logging.getLogger(__name__)
+
+
+PRIORITY_HEADER = "X-TAS-Priority"
+
+LANE_WAIT_TIME = "topicaxis.tas.lanes.{lane}.wait"
+LANE_EXECUTION_TIME = "topicaxis.tas.lanes.{lane}.execution"
+LANE_QUEUE_DEPTH = "topicaxis.tas.lanes.{lane}.queue"
+LANE_ACTIVE_COUNT = "topicaxis.tas.lanes.{lane}.active"
+LANE_REJECTED_COUNTER = "topicaxis.tas.lanes.{lane}.rejected"
+
+
+class LaneQueueFull(TASError):
+    """Exception that is raised when the queue of a lane is full"""
+
+    def __init__(self, lane):
+        super(LaneQueueFull, self).__init__(
+            "the queue of lane {} is full".format(lane))
+
+        self.lane = lane
+
+
+class Lane(object):
+    """An execution lane with a fixed number of workers and a bounded queue
+
+    At most `workers` requests are processed in the lane at the same time.
+    The requests that arrive while all the workers are busy wait in the queue
+    and the requests that arrive while the queue is full are rejected.
+    """
+
+    def __init__(self, name, max_payload_size=None, workers=1, queue_size=0,
+                 statsd_client=None):
+        """Create a new Lane object
+
+        :param str name: the lane name
+        :param int|None max_payload_size: the size of the largest payload in
+            bytes that is processed in the lane. There is no limit if it is
+            None
+        :param int workers: the number of requests that are processed at the
+            same time
+        :param int queue_size: the number of requests that can wait for a
+            worker
+        :param StatsClient|None statsd_client: the client to send the lane
+            metrics to
+        """
+        self.name = name
+        self.max_payload_size = max_payload_size
+        self.workers = workers
+        self.queue_size = queue_size
+
+        self.active_count = 0
+        self.queue_depth = 0
+        self.processed_count = 0
+        self.rejected_count = 0
+        self.total_wait_time = 0.0
+        self.total_execution_time = 0.0
+
+        self._statsd_client = statsd_client
+        self._condition = Condition()
+
+    def accepts(self, payload_size):
+        """Check if a payload can be processed in this lane
+
+        :param int|None payload_size: the payload size in bytes
+        :rtype: bool
+        :return: True if the payload can be processed in this lane
+        """
+        if self.max_payload_size is None:
+            return True
+
+        return payload_size is not None and \
+            payload_size <= self.max_payload_size
+
+    def _change_gauge(self, metric, change):
+        # every worker of every node changes the same gauges, so the changes
+        # are sent and statsd adds them up instead of the workers overwriting
+        # each other's values
+        if self._statsd_client is not None:
+            self._statsd_client.gauge(
+                metric.format(lane=self.name), change, delta=True)
+
+    def _timing(self, metric, value):
+        if self._statsd_client is not None:
+            # statsd requires the time in milliseconds
+            self._statsd_client.timing(
+                metric.format(lane=self.name), value * 1000)
+
+    def _acquire(self):
+        with self._condition:
+            if self.active_count >= self.workers and \
+                    self.queue_depth >= self.queue_size:
+                self.rejected_count += 1
+
+                if self._statsd_client is not None:
+                    self._statsd_client.incr(
+                        LANE_REJECTED_COUNTER.format(lane=self.name))
+
+                raise LaneQueueFull(self.name)
+
+            self.queue_depth += 1
+            self._change_gauge(LANE_QUEUE_DEPTH, 1)
+
+            while self.active_count >= self.workers:
+                self._condition.wait()
+
+            self.queue_depth -= 1
+            self.active_count += 1
+            self._change_gauge(LANE_QUEUE_DEPTH, -1)
+            self._change_gauge(LANE_ACTIVE_COUNT, 1)
+
+    def _release(self):
+        with self._condition:
+            self.active_count -= 1
+            self._change_gauge(LANE_ACTIVE_COUNT, -1)
+
+            self._condition.notify()
+
+    @contextmanager
+    def execute(self):
+        """Wait for a worker of the lane and occupy it until the context
+        manager exits
+
+        :raises LaneQueueFull: if the queue of the lane is full
+        """
+        wait_start_time = time.perf_counter()
+        self._acquire()
+        wait_time = time.perf_counter() - wait_start_time
+
+        execution_start_time = time.perf_counter()
+
+        try:
+            yield self
+        finally:
+            execution_time = time.perf_counter() - execution_start_time
+
+            self._release()
+
+            with self._condition:
+                self.processed_count += 1
+                self.total_wait_time += wait_time
+                self.total_execution_time += execution_time
+
+            self._timing(LANE_WAIT_TIME, wait_time)
+            self._timing(LANE_EXECUTION_TIME, execution_time)
+
+    def as_dict(self):
+        """Get the lane settings and statistics
+
+        :rtype: dict
+        :return: the lane data
+        """
+        with self._condition:
+            return {
+                "name": self.name,
+                "max_payload_size": self.max_payload_size,
+                "workers": self.workers,
+                "queue_size": self.queue_size,
+                "active_count": self.active_count,
+                "queue_depth": self.queue_depth,
+                "processed_count": self.processed_count,
+                "rejected_count": self.rejected_count,
+                "total_wait_time": self.total_wait_time,
+                "total_execution_time": self.total_execution_time
+            }
+
+
+class LaneScheduler(object):
+    """Select the lane in which a request is processed
+
+    A request is processed in the lane that the client requested using the
+    priority header. Otherwise it is processed in the first lane that accepts
+    its payload size, so small payloads never wait behind large ones. Every
+    request is processed immediately if no lanes have been configured.
+    """
+
+    def __init__(self, lanes=None):
+        """Create a new LaneScheduler object
+
+        :param list[Lane]|None lanes: the lanes in the order they are checked
+        """
+        self.lanes = lanes or []
+
+        self._lanes_by_name = {lane.name: lane for lane in self.lanes}
+
+    @classmethod
+    def from_configuration(cls, configuration):
+        """Create a LaneScheduler using the application configuration
+
+        :param Configuration configuration: the application configuration
+        :rtype: LaneScheduler
+        :return: the lane scheduler
+        """
+        statsd_client = None
+        if configuration.get("STATSD_HOST") is not None:
+            statsd_client = StatsClient(
+                configuration["STATSD_HOST"],
+                configuration.get("STATSD_PORT", 8125)
+            )
+
+        lanes = [
+            Lane(
+                name=lane["name"],
+                max_payload_size=lane.get("max_payload_size"),
+                workers=lane.get("workers", 1),
+                queue_size=lane.get("queue_size", 0),
+                statsd_client=statsd_client
+            )
+            for lane in configuration["LANES"]
+        ]
+
+        return cls(lanes)
+
+    def select(self, payload_size, priority=None):
+        """Select the lane to use for a request
+
+        :param int|None payload_size: the payload size in bytes
+        :param str|None priority: the lane that the client requested
+        :rtype: Lane|None
+        :return: the selected lane or None if no lanes have been configured
+        """
+        if not self.lanes:
+            return None
+
+        lane = self._lanes_by_name.get(priority)
+        if lane is not None:
+            return lane
+
+        for lane in self.lanes:
+            if lane.accepts(payload_size):
+                return lane
+
+        return self.lanes[-1]
+
+    @contextmanager
+    def execute(self, payload_size, priority=None):
+        """Process a request in the appropriate lane
+
+        :param int|None payload_size: the payload size in bytes
+        :param str|None priority: the lane that the client requested
+        :raises LaneQueueFull: if the queue of the selected lane is full
+        """
+        lane = self.select(payload_size, priority)
+
+        if lane is None:
+            yield None
+            return
+
+        with lane.execute():
+            yield lane
+
+    @property
+    def queue_depth(self):
+        """The number of requests that are waiting in all the lanes
+
+        :rtype: int
+        """
+        return sum(lane.queue_depth for lane in self.lanes)
+
+    def as_dict(self):
+        """Get the settings and statistics of the lanes
+
+        :rtype: dict
+        :return: the lane data
+        """
+        return {
+            "lanes": [lane.as_dict() for lane in self.lanes]
+        }
@@ -0,0 +1,321 @@
+import logging
+import os
+from os import path
+from shutil import rmtree
+import signal
+from tempfile import mkdtemp
+from threading import Lock, Thread
+import time
+
+from statsd import StatsClient
+
+
+logger = logging.getLogger(__name__)
+
+
+RELOAD_DURATION = "topicaxis.tas.reload.duration"
+RELOAD_LOAD_DURATION = "topicaxis.tas.reload.load_duration"
+RELOAD_CAPACITY_DIP = "topicaxis.tas.reload.capacity_dip"
+
+
+class RollingReloader(object):
+    """Replace the gunicorn workers one at a time with workers that use a
+    newly loaded application
+
+    The reloader loads the new application in the main thread of the
+    gunicorn master, while the old workers keep serving requests, so the
+    workers that are forked afterwards start with warm analyser state. The
+    workers are then replaced in a thread of the master, because the master
+    must keep handling the signals that add and remove the workers. For
+    every old worker it adds a new worker using the TTIN signal,
+    waits until the new worker has loaded the application and then retires
+    the oldest worker using the TTOU signal. The number of workers that
+    serve requests never drops below the number of workers before the
+    reload, unless a new worker fails to start.
+
+    The workers report that they are ready by creating a file named after
+    their process id in the ready directory.
+    """
+
+    def __init__(self, load_application, ready_timeout=120.0,
+                 poll_interval=0.05, statsd_client=None):
+        """Create a new RollingReloader object
+
+        :param callable load_application: the function that loads the new
+            application in the master. The reload is cancelled if it raises
+            an exception
+        :param float ready_timeout: the number of seconds that a new worker
+            has to become ready
+        :param float poll_interval: the number of seconds between the
+            checks of the new worker
+        :param StatsClient|None statsd_client: the client to send the reload
+            metrics to
+        """
+        self.load_application = load_application
+        self.ready_timeout = ready_timeout
+        self.poll_interval = poll_interval
+        self.ready_directory = mkdtemp(prefix="tas-reload-")
+
+        self._statsd_client = statsd_client
+        self._lock = Lock()
+
+    @classmethod
+    def from_configuration(cls, configuration, load_application):
+        """Create a RollingReloader using the service configuration
+
+        :param Configuration configuration: the service configuration
+        :param callable load_application: the function that loads the new
+            application in the master
+        :rtype: RollingReloader
+        :return: the rolling reloader
+        """
+        statsd_client = None
+        if configuration.get("STATSD_HOST") is not None:
+            statsd_client = StatsClient(
+                configuration["STATSD_HOST"],
+                configuration.get("STATSD_PORT", 8125)
+            )
+
+        return cls(
+            load_application=load_application,
+            ready_timeout=configuration["RELOAD_WORKER_TIMEOUT"],
+            statsd_client=statsd_client
+        )
+
+    @property
+    def reloading(self):
+        """Check if a reload is in progress
+
+        :rtype: bool
+        """
+        return self._lock.locked()
+
+    def mark_ready(self, pid):
+        """Report that a worker has loaded the application
+
+        This is called in the worker process.
+
+        :param int pid: the worker process id
+        """
+        with open(path.join(self.ready_directory, str(pid)), "w"):
+            pass
+
+    def is_ready(self, pid):
+        """Check if a worker has loaded the application
+
+        :param int pid: the worker process id
+        :rtype: bool
+        """
+        return path.exists(path.join(self.ready_directory, str(pid)))
+
+    def _remove_marker(self, pid):
+        try:
+            os.remove(path.join(self.ready_directory, str(pid)))
+        except FileNotFoundError:
+            pass
+
+    def _remove_stale_markers(self, arbiter):
+        # the process id of a worker that exited can be reused by a new
+        # worker, which must not be considered ready before it reports it
+        for filename in os.listdir(self.ready_directory):
+            if int(filename) not in arbiter.WORKERS:
+                self._remove_marker(filename)
+
+    def _signal_master(self, arbiter, signum):
+        os.kill(arbiter.pid, signum)
+
+    def _count_serving_workers(self, arbiter, old_pids, retired_pids):
+        return sum(
+            1
+            for pid in list(arbiter.WORKERS)
+            if (pid in old_pids and pid not in retired_pids) or
+            (pid not in old_pids and self.is_ready(pid))
+        )
+
+    def _wait_for_new_worker(self, arbiter, known_pids, old_pids,
+                             retired_pids, capacity):
+        deadline = time.monotonic() + self.ready_timeout
+
+        while time.monotonic() < deadline:
+            workers = list(arbiter.WORKERS)
+            capacity.append(
+                self._count_serving_workers(arbiter, old_pids, retired_pids))
+
+            for pid in workers:
+                if pid not in known_pids and self.is_ready(pid):
+                    return pid
+
+            time.sleep(self.poll_interval)
+
+        return None
+
+    def _report(self, result):
+        logger.info(
+            "reload completed: succeeded=%s workers=%s duration=%.3f "
+            "load_duration=%.3f min_capacity=%s capacity_dip=%.3f",
+            result["succeeded"], result["workers"], result["duration"],
+            result["load_duration"], result["min_capacity"],
+            result["capacity_dip"]
+        )
+
+        if self._statsd_client is not None:
+            self._statsd_client.timing(
+                RELOAD_DURATION, result["duration"] * 1000)
+            self._statsd_client.timing(
+                RELOAD_LOAD_DURATION, result["load_duration"] * 1000)
+            self._statsd_client.gauge(
+                RELOAD_CAPACITY_DIP, result["capacity_dip"])
+
+    def _replace_workers(self, arbiter, old_pids):
+        retired_pids = set()
+        known_pids = set(old_pids)
+        capacity = [len(old_pids)]
+
+        for old_pid in old_pids:
+            # the workers that exited while the reload is in progress are
+            # replaced by gunicorn using the new application
+            if old_pid not in arbiter.WORKERS:
+                retired_pids.add(old_pid)
+                self._remove_marker(old_pid)
+                continue
+
+            self._signal_master(arbiter, signal.SIGTTIN)
+
+            new_pid = self._wait_for_new_worker(
+                arbiter, known_pids, old_pids, retired_pids, capacity)
+            if new_pid is None:
+                logger.error(
+                    "new worker didn't become ready: timeout=%s",
+                    self.ready_timeout
+                )
+
+                # remove the extra worker so that the number of workers is
+                # the same as before the reload
+                self._signal_master(arbiter, signal.SIGTTOU)
+
+                return False, min(capacity)
+
+            known_pids.add(new_pid)
+
+            # gunicorn retires the oldest worker, which is one of the workers
+            # that use the old application
+            self._signal_master(arbiter, signal.SIGTTOU)
+            retired_pids.add(old_pid)
+            self._remove_marker(old_pid)
+
+            capacity.append(
+                self._count_serving_workers(arbiter, old_pids, retired_pids))
+
+        return True, min(capacity)
+
+    def _load(self, arbiter):
+        if not self._lock.acquire(blocking=False):
+            logger.warning("a reload is already in progress")
+
+            return None
+
+        try:
+            start_time = time.monotonic()
+
+            self._remove_stale_markers(arbiter)
+            old_pids = sorted(
+                arbiter.WORKERS, key=lambda pid: arbiter.WORKERS[pid].age)
+
+            logger.info("reloading workers: workers=%s", len(old_pids))
+
+            self.load_application()
+        except Exception:
+            logger.exception(
+                "failed to load the application, the workers will not be "
+                "reloaded"
+            )
+
+            self._lock.release()
+
+            return None
+
+        return start_time, time.monotonic() - start_time, old_pids
+
+    def _complete(self, arbiter, reload_state):
+        start_time, load_duration, old_pids = reload_state
+        worker_count = len(old_pids)
+
+        try:
+            succeeded, min_capacity = self._replace_workers(
+                arbiter, old_pids)
+
+            result = {
+                "succeeded": succeeded,
+                "workers": worker_count,
+                "duration": time.monotonic() - start_time,
+                "load_duration": load_duration,
+                "min_capacity": min_capacity,
+                "capacity_dip":
+                    1.0 - float(min_capacity) / worker_count
+                    if worker_count else 0.0
+            }
+
+            self._report(result)
+
+            return result
+        finally:
+            self._lock.release()
+
+    def reload(self, arbiter):
+        """Load the application and replace the workers of a gunicorn master
+
+        Both steps run in the calling thread.
+
+        :param gunicorn.arbiter.Arbiter arbiter: the gunicorn master
+        :rtype: dict|None
+        :return: the reload duration in seconds, the time it took to load
+            the application, the minimum number of workers that served
+            requests and the capacity dip as a fraction of the workers, or
+            None if a reload was already in progress or the application
+            failed to load
+        """
+        reload_state = self._load(arbiter)
+        if reload_state is None:
+            return None
+
+        return self._complete(arbiter, reload_state)
+
+    def start_reload(self, arbiter, callback=None):
+        """Load the application and replace the workers in a thread
+
+        This must be called in the main thread of the gunicorn master, which
+        is the thread that forks the workers. A process that is forked while
+        another thread holds a lock, like the import lock or a logging lock,
+        inherits the lock locked, so the application must not be loaded in
+        another thread.
+
+        :param gunicorn.arbiter.Arbiter arbiter: the gunicorn master
+        :param callable|None callback: the function that is called after the
+            workers have been replaced with the reload result, or None if
+            the workers could not be replaced
+        :rtype: Thread|None
+        :return: the thread that replaces the workers, or None if a reload
+            was already in progress or the application failed to load
+        """
+        reload_state = self._load(arbiter)
+        if reload_state is None:
+            return None
+
+        def replace_workers():
+            result = None
+
+            try:
+                result = self._complete(arbiter, reload_state)
+            finally:
+                if callback is not None:
+                    callback(result)
+
+        thread = Thread(
+            target=replace_workers, name="rolling-reload", daemon=True)
+        thread.start()
+
+        return thread
+
+    def close(self):
+        """Remove the ready directory"""
+        rmtree(self.ready_directory, ignore_errors=True)
@@ -1,16 +1,43 @@
+from contextlib import ExitStack
+import hmac
 import logging
 import json
 import time
 
-from falcon import HTTP_200, HTTPBadRequest, HTTPNotFound
+from falcon import (
+    HTTP_200, HTTP_204, HTTPBadRequest, HTTPForbidden, HTTPNotFound,
+    HTTPRequestEntityTooLarge, HTTPServiceUnavailable
+)
 import jsonschema
 from metricslib.decorators import capture_metrics
 
 from tas import __VERSION__
+from tas.analysis.reports import ProcessingReport, get_peak_memory
+from tas.profiling import RequestProfiler
 from tas.web import error_codes
-from tas.web.error_handlers import ProcessHTMLErrorHandler
+from tas.web.coalescing import RequestCoalescer, create_request_key
+from tas.web.degradation import (
+    REQUEST_START_HEADER, DegradationController, get_queue_time
+)
+from tas.web.encoders import ResponseEncoders
+from tas.web.error_handlers import (
+    ProcessHTMLErrorHandler, ProcessTextErrorHandler, ProcessURLErrorHandler
+)
+from tas.web.ingestion import (
+    RequestBodyTooLarge, load_json_body, read_request_body
+)
+from tas.web.lanes import PRIORITY_HEADER, LaneQueueFull, LaneScheduler
 from tas.exceptions import TASError
-from tas.web.schemas import process_html_payload_schema
+from tas.memory import MemoryTracker
+from tas.web.schemas import (
+    process_html_payload_schema, process_text_payload_schema,
+    process_url_payload_schema
+)
+from tas.web.sharding import (
+    SHARD_FORWARDED_HEADER, SHARD_TOKEN_HEADER, ResultSharding
+)
+from tas.web.slow_requests import SlowRequestLog
+from tas.web.streaming import ResponseStream, get_deadline, get_stream_format
 
 
 PROCESS_HTML_REQUEST_COUNTER = "topicaxis.tas.processhtml.request"
@@ -18,39 +45,117 @@ PROCESS_HTML_ERROR_COUNTER = "topicaxis.tas.processhtml.error"
 PROCESS_HTML_SUCCESS_COUNTER = "topicaxis.tas.processhtml.success"
 PROCESS_HTML_EXECUTION_TIME = "topicaxis.tas.processhtml.execution"
 
+PROCESS_TEXT_REQUEST_COUNTER = "topicaxis.tas.processtext.request"
+PROCESS_TEXT_ERROR_COUNTER = "topicaxis.tas.processtext.error"
+PROCESS_TEXT_SUCCESS_COUNTER = "topicaxis.tas.processtext.success"
+PROCESS_TEXT_EXECUTION_TIME = "topicaxis.tas.processtext.execution"
 
-logger = logging.getLogger(__name__)
+PROCESS_URL_REQUEST_COUNTER = "topicaxis.tas.processurl.request"
+PROCESS_URL_ERROR_COUNTER = "topicaxis.tas.processurl.error"
+PROCESS_URL_SUCCESS_COUNTER = "topicaxis.tas.processurl.success"
+PROCESS_URL_EXECUTION_TIME = "topicaxis.tas.processurl.execution"
 
+PROCESS_METADATA_REQUEST_COUNTER = "topicaxis.tas.processmetadata.request"
+PROCESS_METADATA_ERROR_COUNTER = "topicaxis.tas.processmetadata.error"
+PROCESS_METADATA_SUCCESS_COUNTER = "topicaxis.tas.processmetadata.success"
+PROCESS_METADATA_EXECUTION_TIME = "topicaxis.tas.processmetadata.execution"
 
-class ProcessHTML(object):
-    def __init__(self, content_analyser):
-        self.content_analyser = content_analyser
+PROFILING_HEADER = "X-TAS-Profile"
+
+
+logger = logging.getLogger(__name__)
 
-        self._error_handler = ProcessHTMLErrorHandler()
 
-    @staticmethod
-    def _is_valid_request_body(request_body):
+def _read_request_body(req, max_body_size):
+    try:
+        return read_request_body(
+            req.stream, req.content_length, max_size=max_body_size)
+    except RequestBodyTooLarge as e:
+        logger.warning(
+            "request body is too large: size=%s max_size=%s",
+            e.size, e.max_size
+        )
+
+        raise HTTPRequestEntityTooLarge(
+            title="Request body too large",
+            description="The request body must not be larger than {} "
+                        "bytes".format(e.max_size),
+            code=error_codes.REQUEST_BODY_TOO_LARGE
+        )
+
+
+class ContentProcessingResource(object):
+    """Base class for the resources that process the request content"""
+
+    name = None
+    payload_schema = None
+    error_handler_class = None
+    empty_request_body_description = "The request content must be provided"
+
+    request_metric = None
+    error_metric = None
+    success_metric = None
+    execution_time_metric = None
+
+    processing_log_message = None
+    executed_log_message = None
+
+    def __init__(self, content_analyser, response_encoders=None,
+                 profiler=None, slow_request_log=None, lane_scheduler=None,
+                 request_coalescer=None, memory_tracker=None,
+                 result_sharding=None, degradation_controller=None,
+                 max_body_size=None):
+        self.content_analyser = content_analyser
+        self.response_encoders = response_encoders or ResponseEncoders()
+        self.profiler = profiler or RequestProfiler()
+        self.slow_request_log = slow_request_log or SlowRequestLog()
+        self.lane_scheduler = lane_scheduler or LaneScheduler()
+        self.request_coalescer = request_coalescer or RequestCoalescer()
+        self.memory_tracker = memory_tracker or MemoryTracker()
+        self.result_sharding = result_sharding or ResultSharding()
+        self.degradation_controller = \
+            degradation_controller or DegradationController()
+        self.max_body_size = max_body_size
+
+        self._error_handler = self.error_handler_class()
+
+        # the metric names are different for every endpoint, so the metrics
+        # are captured by a wrapper that is created for every resource
+        self._execute_post = capture_metrics(
+            request_metric=self.request_metric,
+            error_metric=self.error_metric,
+            success_metric=self.success_metric,
+            execution_time_metric=self.execution_time_metric
+        )(self._execute_post)
+
+    def _is_valid_request_body(self, request_body):
         try:
-            jsonschema.validate(request_body, process_html_payload_schema)
+            jsonschema.validate(request_body, self.payload_schema)
         except jsonschema.ValidationError:
-            logger.exception("invalid process_html request payload")
+            logger.exception("invalid %s request payload", self.name)
             return False
 
         return True
 
+    def _create_report(self):
+        report = ProcessingReport()
+        report.stages_to_skip = self.degradation_controller.stages_to_skip()
+
+        return report
+
     def _extract_content_from_request(self, request):
-        content = request.stream.read()
-        if not content:
+        body = _read_request_body(request, self.max_body_size)
+        if not body:
             logger.warning("Empty request body")
 
             raise HTTPBadRequest(
                 title='Empty request body',
-                description='The contents of a web page must be provided',
+                description=self.empty_request_body_description,
                 code=error_codes.EMPTY_REQUEST_BODY
             )
 
         try:
-            content = json.loads(content.decode("utf8"))
+            content = load_json_body(body)
         except ValueError:
             logger.exception("failed to decode request body")
 
@@ -73,45 +178,308 @@ class ProcessHTML(object):
 
         return content
 
-    @capture_metrics(
-        request_metric=PROCESS_HTML_REQUEST_COUNTER,
-        error_metric=PROCESS_HTML_ERROR_COUNTER,
-        success_metric=PROCESS_HTML_SUCCESS_COUNTER,
-        execution_time_metric=PROCESS_HTML_EXECUTION_TIME
-    )
-    def on_post(self, req, resp):
-        request_start_time = time.perf_counter()
+    def _analyse_content(self, req, content, report):
+        profiling_token = req.get_header(PROFILING_HEADER)
+        priority = req.get_header(PRIORITY_HEADER)
 
-        logger.info("processing html content")
+        with self.lane_scheduler.execute(req.content_length, priority) as lane:
+            report.lane = lane.name if lane is not None else None
 
-        content = self._extract_content_from_request(req)
+            with self.profiler.profile(self.name, profiling_token):
+                return self.content_analyser.process_content(content, report)
 
-        try:
-            processing_result = self.content_analyser.process_content(content)
-        except TASError as e:
+    def _convert_processing_error(self, exception):
+        if isinstance(exception, LaneQueueFull):
+            logger.warning("lane queue is full: lane=%s", exception.lane)
+
+            return HTTPServiceUnavailable(
+                title="Service busy",
+                description="Too many requests are waiting to be processed",
+                retry_after=1,
+                code=error_codes.LANE_QUEUE_FULL
+            )
+
+        if isinstance(exception, TASError):
             logger.warning("TAS failed to failed to process content")
 
-            raise self._error_handler.handle_exception(e) from e
+            return self._error_handler.handle_exception(exception)
+
+        logger.exception("failed to process content")
+
+        return HTTPNotFound(
+            title="Processing error",
+            description="Failed to process content",
+            code=error_codes.TAS_ERROR
+        )
+
+    def _coalesce_content_analysis(self, req, content, report, key):
+        if not self.request_coalescer.enabled:
+            return self._analyse_content(req, content, report)
+
+        result, report.coalesced = self.request_coalescer.execute(
+            key, lambda: self._analyse_content(req, content, report))
+
+        return result
+
+    def _process_content(self, req, content, report):
+        try:
+            if not self.request_coalescer.enabled and \
+                    not self.result_sharding.enabled:
+                return self._analyse_content(req, content, report)
+
+            key = create_request_key(self.name, content)
+
+            if not self.result_sharding.enabled:
+                return self._coalesce_content_analysis(
+                    req, content, report, key)
+
+            result, report.shard = self.result_sharding.execute(
+                key, req.path, content,
+                req.get_header(SHARD_FORWARDED_HEADER) is not None,
+                lambda: self._coalesce_content_analysis(
+                    req, content, report, key)
+            )
+
+            return result
         except Exception as e:
-            logger.exception("failed to process content")
+            raise self._convert_processing_error(e) from e
+
+    def _record_request(self, req, content, report, request_start_time,
+                        succeeded):
+        request = report.as_dict()
+        request.update({
+            "endpoint": self.name,
+            "url": content.get("url"),
+            "payload_size": req.content_length,
+            "execution_time": time.perf_counter() - request_start_time,
+            "queue_time": get_queue_time(
+                req.get_header(REQUEST_START_HEADER)),
+            # the high water mark of the worker since it started, which
+            # isn't the memory of this request
+            "process_peak_memory": get_peak_memory(),
+            "succeeded": succeeded
+        })
+
+        self.slow_request_log.record(request)
+
+        # the requests that wait in the backlog of the server are not queued
+        # in the lanes, so their wait is only known from the proxy header
+        self.degradation_controller.record(
+            request["queue_time"] + request["execution_time"],
+            self.lane_scheduler.queue_depth
+        )
+
+    def _set_response_headers(self, resp, report):
+        pass
+
+    def _iter_stream_records(self, stream_format, sections, report,
+                             deadline, request_start_time, outcome):
+        partial = False
 
-            raise HTTPNotFound(
-                title="Processing error",
-                description="Failed to process content",
-                code=error_codes.TAS_ERROR
-            ) from e
+        try:
+            while True:
+                # the deadline is checked between the stages because a stage
+                # can't be interrupted while it is executing
+                elapsed_time = time.perf_counter() - request_start_time
+                if deadline is not None and elapsed_time >= deadline:
+                    logger.info(
+                        "streamed request deadline expired: endpoint=%s "
+                        "deadline=%s", self.name, deadline
+                    )
+
+                    partial = True
+                    sections.close()
+                    break
+
+                try:
+                    name, value = next(sections)
+                except StopIteration:
+                    break
+
+                yield stream_format.section(name, value)
+
+            outcome["succeeded"] = True
+
+            yield stream_format.complete(
+                partial,
+                time.perf_counter() - request_start_time,
+                dict(report.stage_timings),
+                report.degraded
+            )
+        except Exception as e:
+            # the response status has already been sent so the error is
+            # reported in the last record of the stream
+            error = self._convert_processing_error(e)
+
+            yield stream_format.error(
+                error.title, error.description, error.code)
+
+    def _stream_request(self, req, resp, content, stream_format,
+                        request_start_time):
+        report = self._create_report()
+        outcome = {"succeeded": False}
+        request_resources = ExitStack()
+
+        def close_request():
+            request_resources.close()
+
+            self._record_request(
+                req, content, report, request_start_time,
+                outcome["succeeded"]
+            )
+
+        # the lane is occupied and the content is validated before the
+        # response starts, so the clients receive the usual error responses
+        # when the service is busy or the content is invalid
+        try:
+            request_resources.enter_context(
+                self.memory_tracker.track(self.name, report))
+
+            lane = request_resources.enter_context(
+                self.lane_scheduler.execute(
+                    req.content_length, req.get_header(PRIORITY_HEADER))
+            )
+            report.lane = lane.name if lane is not None else None
+
+            request_resources.enter_context(
+                self.profiler.profile(
+                    self.name, req.get_header(PROFILING_HEADER))
+            )
+
+            sections = self.content_analyser.stream_content(content, report)
+        except Exception as e:
+            close_request()
+
+            raise self._convert_processing_error(e) from e
+
+        records = self._iter_stream_records(
+            stream_format, sections, report, get_deadline(req),
+            request_start_time, outcome
+        )
 
         resp.status = HTTP_200
-        resp.content_type = "application/json"
-        resp.body = json.dumps(processing_result)
+        resp.content_type = stream_format.media_type
+        resp.append_header("Vary", "Accept")
+        resp.set_header("Cache-Control", "no-cache")
+        # disable the response buffering of nginx
+        resp.set_header("X-Accel-Buffering", "no")
+        resp.stream = ResponseStream(records, close_request)
+
+    def _process_request(self, req, resp, request_start_time):
+        content = self._extract_content_from_request(req)
+
+        stream_format = get_stream_format(req)
+        if stream_format is not None and \
+                hasattr(self.content_analyser, "stream_content"):
+            # the streamed requests are not coalesced because their results
+            # are sent while they are calculated
+            self._stream_request(
+                req, resp, content, stream_format, request_start_time)
+
+            return
+
+        report = self._create_report()
+        succeeded = False
+
+        try:
+            with self.memory_tracker.track(self.name, report):
+                processing_result = self._process_content(
+                    req, content, report)
+
+                resp.status = HTTP_200
+                with report.stage("encoding"):
+                    self.response_encoders.encode_response(
+                        req, resp, processing_result)
+
+            self._set_response_headers(resp, report)
+
+            succeeded = True
+        finally:
+            self._record_request(
+                req, content, report, request_start_time, succeeded)
+
+    def _execute_post(self, req, resp):
+        request_start_time = time.perf_counter()
+
+        logger.info(self.processing_log_message)
+
+        self._process_request(req, resp, request_start_time)
 
         execution_time = time.perf_counter() - request_start_time
-        log_msg = "page processing request executed: " \
-                  "execution_time({execution_time})"
+        log_msg = "{message}: execution_time({execution_time})"
         logger.info(log_msg.format(
+            message=self.executed_log_message,
             execution_time=execution_time
         ))
 
+    def on_post(self, req, resp):
+        self._execute_post(req, resp)
+
+
+class ProcessHTML(ContentProcessingResource):
+    name = "processhtml"
+    payload_schema = process_html_payload_schema
+    error_handler_class = ProcessHTMLErrorHandler
+    empty_request_body_description = \
+        "The contents of a web page must be provided"
+
+    request_metric = PROCESS_HTML_REQUEST_COUNTER
+    error_metric = PROCESS_HTML_ERROR_COUNTER
+    success_metric = PROCESS_HTML_SUCCESS_COUNTER
+    execution_time_metric = PROCESS_HTML_EXECUTION_TIME
+
+    processing_log_message = "processing html content"
+    executed_log_message = "page processing request executed"
+
+
+class ProcessMetadata(ContentProcessingResource):
+    name = "processmetadata"
+    payload_schema = process_html_payload_schema
+    error_handler_class = ProcessHTMLErrorHandler
+    empty_request_body_description = \
+        "The contents of a web page must be provided"
+
+    request_metric = PROCESS_METADATA_REQUEST_COUNTER
+    error_metric = PROCESS_METADATA_ERROR_COUNTER
+    success_metric = PROCESS_METADATA_SUCCESS_COUNTER
+    execution_time_metric = PROCESS_METADATA_EXECUTION_TIME
+
+    processing_log_message = "processing html metadata"
+    executed_log_message = "metadata processing request executed"
+
+
+class ProcessText(ContentProcessingResource):
+    name = "processtext"
+    payload_schema = process_text_payload_schema
+    error_handler_class = ProcessTextErrorHandler
+    empty_request_body_description = "The text must be provided"
+
+    request_metric = PROCESS_TEXT_REQUEST_COUNTER
+    error_metric = PROCESS_TEXT_ERROR_COUNTER
+    success_metric = PROCESS_TEXT_SUCCESS_COUNTER
+    execution_time_metric = PROCESS_TEXT_EXECUTION_TIME
+
+    processing_log_message = "processing text content"
+    executed_log_message = "text processing request executed"
+
+
+class ProcessURL(ContentProcessingResource):
+    name = "processurl"
+    payload_schema = process_url_payload_schema
+    error_handler_class = ProcessURLErrorHandler
+    empty_request_body_description = "The web page url must be provided"
+
+    request_metric = PROCESS_URL_REQUEST_COUNTER
+    error_metric = PROCESS_URL_ERROR_COUNTER
+    success_metric = PROCESS_URL_SUCCESS_COUNTER
+    execution_time_metric = PROCESS_URL_EXECUTION_TIME
+
+    processing_log_message = "processing url content"
+    executed_log_message = "url processing request executed"
+
+    def _set_response_headers(self, resp, report):
+        resp.set_header("X-TAS-Cache", "hit" if report.cache_hit else "miss")
+
 
 class Health(object):
     def on_get(self, req, resp):
@@ -122,15 +490,126 @@ class Health(object):
         resp.body = json.dumps({"result": "ok"})
 
 
+class SlowRequests(object):
+    def __init__(self, slow_request_log, response_encoders=None):
+        self.slow_request_log = slow_request_log
+        self.response_encoders = response_encoders or ResponseEncoders()
+
+    def on_get(self, req, resp):
+        logger.info("slow requests requested")
+
+        resp.status = HTTP_200
+
+        response = {
+            "requests": self.slow_request_log.requests()
+        }
+
+        self.response_encoders.encode_response(req, resp, response)
+
+
+class Lanes(object):
+    def __init__(self, lane_scheduler, response_encoders=None):
+        self.lane_scheduler = lane_scheduler
+        self.response_encoders = response_encoders or ResponseEncoders()
+
+    def on_get(self, req, resp):
+        logger.info("lane statistics requested")
+
+        resp.status = HTTP_200
+
+        self.response_encoders.encode_response(
+            req, resp, self.lane_scheduler.as_dict())
+
+
+class ShardCache(object):
+    """The cache of the results that are owned by this node
+
+    The requests that don't have the shard token are rejected, so the cache
+    can't be used if the token isn't set.
+    """
+
+    def __init__(self, result_sharding, token, max_body_size=None):
+        self.result_sharding = result_sharding
+        self.token = token
+        self.max_body_size = max_body_size
+
+    def _is_valid_token(self, token):
+        if not self.token or token is None:
+            return False
+
+        return hmac.compare_digest(
+            token.encode("utf8"), self.token.encode("utf8"))
+
+    def _check_token(self, req):
+        if not self._is_valid_token(req.get_header(SHARD_TOKEN_HEADER)):
+            logger.warning("invalid shard token")
+
+            raise HTTPForbidden(
+                title="Forbidden",
+                description="The shard token is invalid",
+                code=error_codes.INVALID_SHARD_TOKEN
+            )
+
+    def on_get(self, req, resp, key):
+        self._check_token(req)
+
+        result = self.result_sharding.get_result(key)
+        if result is None:
+            raise HTTPNotFound(
+                title="Result not found",
+                description="The result is not cached"
+            )
+
+        resp.status = HTTP_200
+        resp.content_type = "application/json"
+        resp.body = json.dumps({"result": result})
+
+    def on_put(self, req, resp, key):
+        self._check_token(req)
+
+        body = _read_request_body(req, self.max_body_size)
+
+        try:
+            content = load_json_body(body)
+        except ValueError:
+            content = None
+
+        if not isinstance(content, dict) or \
+                not isinstance(content.get("result"), dict):
+            raise HTTPBadRequest(
+                title='Invalid request body',
+                description='The cached result must be provided',
+                code=error_codes.INVALID_REQUEST_BODY
+            )
+
+        self.result_sharding.set_result(key, content["result"])
+
+        resp.status = HTTP_204
+
+
+class Degradation(object):
+    def __init__(self, degradation_controller, response_encoders=None):
+        self.degradation_controller = degradation_controller
+        self.response_encoders = response_encoders or ResponseEncoders()
+
+    def on_get(self, req, resp):
+        logger.info("degradation state requested")
+
+        resp.status = HTTP_200
+
+        self.response_encoders.encode_response(
+            req, resp, self.degradation_controller.as_dict())
+
+
 class Information(object):
-    def __init__(self, configuration):
+    def __init__(self, configuration, response_encoders=None):
         self.configuration = configuration
+        self.response_encoders = response_encoders or ResponseEncoders()
 
     def on_get(self, req, resp):
         logger.info("service information requested")
 
         resp.status = HTTP_200
-        resp.content_type = "application/json"
 
         response = {
             "service": "tas",
@@ -139,4 +618,4 @@ class Information(object):
             "port": self.configuration.get("PORT")
         }
 
-        resp.body = json.dumps(response)
+        self.response_encoders.encode_response(req, resp, response)
@@ -1,7 +1,25 @@
 import logging
 
-from tas.analysis.processors import HTMLContentProcessor
-from tas.web.resources import ProcessHTML, Health, Information
+from tas.analysis.entities import NamedEntityExtractor
+from tas.analysis.fetchers import AnalysisCache, WebPageFetcher
+from tas.analysis.processors import (
+    HTMLContentProcessor, HTMLMetadataProcessor, TextContentProcessor,
+    URLContentProcessor
+)
+from tas.analysis.state import AnalyserState
+from tas.analysis.triage import PageTriage
+from tas.memory import MemoryTracker
+from tas.profiling import RequestProfiler
+from tas.web.coalescing import RequestCoalescer
+from tas.web.degradation import DegradationController
+from tas.web.encoders import ResponseEncoders
+from tas.web.lanes import LaneScheduler
+from tas.web.resources import (
+    ProcessHTML, ProcessMetadata, ProcessText, ProcessURL, Degradation,
+    Health, Information, Lanes, ShardCache, SlowRequests
+)
+from tas.web.sharding import ResultSharding
+from tas.web.slow_requests import SlowRequestLog
 
 
 logger = logging.getLogger(__name__)
@@ -10,9 +28,141 @@ logger = logging.getLogger(__name__)
 def load_resources(configuration, app):
     logger.debug("loading endpoint routes")
 
-    content_analyser = HTMLContentProcessor(configuration["KEYWORD_STOP_LIST"])
-    process_html_resource = ProcessHTML(content_analyser)
+    response_encoders = ResponseEncoders()
+    slow_request_log = SlowRequestLog(
+        directory=configuration["SLOW_REQUESTS_DIRECTORY"],
+        size=configuration["SLOW_REQUESTS_COUNT"],
+        max_age=configuration["SLOW_REQUESTS_MAX_AGE"]
+    )
+
+    profiler = RequestProfiler.from_configuration(configuration)
+    lane_scheduler = LaneScheduler.from_configuration(configuration)
+    request_coalescer = RequestCoalescer.from_configuration(configuration)
+    memory_tracker = MemoryTracker.from_configuration(configuration)
+    result_sharding = ResultSharding.from_configuration(configuration)
+    app.add_connection_pool(result_sharding.client)
+    degradation_controller = \
+        DegradationController.from_configuration(configuration)
+
+    analyser_state = AnalyserState(
+        keyword_stop_list=configuration["KEYWORD_STOP_LIST"],
+        snapshot_file=configuration["ANALYSER_SNAPSHOT"],
+        keyword_engine=configuration["KEYWORD_ENGINE"]
+    )
+    named_entity_extractor = NamedEntityExtractor(
+        analyser_state=analyser_state,
+        workers=configuration["NER_WORKERS"],
+        parallel_threshold=configuration["NER_PARALLEL_THRESHOLD"],
+        chunk_size=configuration["NER_CHUNK_SIZE"]
+    )
+    if not configuration["ANALYSER_LAZY_LOAD"]:
+        analyser_state.warm_up()
+
+    # the application can be loaded in the gunicorn master, so the process
+    # pool is started in every worker after it is forked
+    app.add_worker_resource(named_entity_extractor)
+
+    content_analyser = HTMLContentProcessor(
+        configuration["KEYWORD_STOP_LIST"], analyser_state,
+        named_entity_extractor, PageTriage.from_configuration(configuration)
+    )
+    process_html_resource = ProcessHTML(
+        content_analyser=content_analyser,
+        response_encoders=response_encoders,
+        profiler=profiler,
+        slow_request_log=slow_request_log,
+        lane_scheduler=lane_scheduler,
+        request_coalescer=request_coalescer,
+        memory_tracker=memory_tracker,
+        result_sharding=result_sharding,
+        degradation_controller=degradation_controller,
+        max_body_size=configuration["MAX_REQUEST_BODY_SIZE"]
+    )
+
+    process_metadata_resource = ProcessMetadata(
+        content_analyser=HTMLMetadataProcessor(),
+        response_encoders=response_encoders,
+        profiler=profiler,
+        slow_request_log=slow_request_log,
+        lane_scheduler=lane_scheduler,
+        request_coalescer=request_coalescer,
+        memory_tracker=memory_tracker,
+        max_body_size=configuration["MAX_REQUEST_BODY_SIZE"]
+    )
+
+    text_analyser = TextContentProcessor(
+        configuration["KEYWORD_STOP_LIST"], analyser_state,
+        named_entity_extractor
+    )
+    process_text_resource = ProcessText(
+        content_analyser=text_analyser,
+        response_encoders=response_encoders,
+        profiler=profiler,
+        slow_request_log=slow_request_log,
+        lane_scheduler=lane_scheduler,
+        request_coalescer=request_coalescer,
+        memory_tracker=memory_tracker,
+        result_sharding=result_sharding,
+        degradation_controller=degradation_controller,
+        max_body_size=configuration["MAX_REQUEST_BODY_SIZE"]
+    )
+
+    fetcher = WebPageFetcher(
+        timeout=configuration["FETCH_TIMEOUT"],
+        pool_connections=configuration["FETCH_POOL_CONNECTIONS"],
+        pool_maxsize=configuration["FETCH_POOL_MAXSIZE"],
+        max_size=configuration["FETCH_MAX_SIZE"],
+        user_agent=configuration["FETCH_USER_AGENT"],
+        max_redirects=configuration["FETCH_MAX_REDIRECTS"],
+        allow_private_addresses=configuration[
+            "FETCH_ALLOW_PRIVATE_ADDRESSES"]
+    )
+    app.add_connection_pool(fetcher)
+
+    url_analyser = URLContentProcessor(
+        html_content_processor=content_analyser,
+        fetcher=fetcher,
+        cache=AnalysisCache(configuration["FETCH_CACHE_SIZE"])
+    )
+    process_url_resource = ProcessURL(
+        content_analyser=url_analyser,
+        response_encoders=response_encoders,
+        profiler=profiler,
+        slow_request_log=slow_request_log,
+        lane_scheduler=lane_scheduler,
+        request_coalescer=request_coalescer,
+        memory_tracker=memory_tracker,
+        degradation_controller=degradation_controller,
+        max_body_size=configuration["MAX_REQUEST_BODY_SIZE"]
+    )
 
     app.add_route("/api/v2/process/html", process_html_resource)
+    app.add_route("/api/v2/process/metadata", process_metadata_resource)
+    app.add_route("/api/v2/process/url", process_url_resource)
+    app.add_route("/api/v2/process/text", process_text_resource)
     app.add_route("/service/health", Health())
-    app.add_route("/service/information", Information(configuration))
+    app.add_route(
+        "/service/slow",
+        SlowRequests(slow_request_log, response_encoders)
+    )
+    app.add_route(
+        "/service/lanes",
+        Lanes(lane_scheduler, response_encoders)
+    )
+    app.add_route(
+        "/service/degradation",
+        Degradation(degradation_controller, response_encoders)
+    )
+    app.add_route(
+        "/service/information",
+        Information(configuration, response_encoders)
+    )
+
+    if result_sharding.enabled:
+        app.add_route(
+            "/service/cache/{key}",
+            ShardCache(
+                result_sharding, configuration["SHARDING_TOKEN"],
+                configuration["MAX_REQUEST_BODY_SIZE"]
+            )
+        )
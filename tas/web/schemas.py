@@ -11,3 +11,28 @@ process_html_payload_schema = {
     },
     "required": ["url", "html"]
 }
+
+process_text_payload_schema = {
+    "title": "ProcessText",
+    "type": "object",
+    "properties": {
+        "text": {
+            "type": "string",
+            "minLength": 1,
+            "pattern": "\\S"
+        }
+    },
+    "required": ["text"]
+}
+
+process_url_payload_schema = {
+    "title": "ProcessURL",
+    "type": "object",
+    "properties": {
+        "url": {
+            "type": "string",
+            "pattern": "^https?://"
+        }
+    },
+    "required": ["url"]
+}
@@ -7,6 +7,11 @@ from consul import Consul, Check
 
 from tas.configuration.loaders import Configuration
 from tas.web.application import create_app
+from tas.web.autoscaling import (
+    AUTO, WorkerScaler, calculate_worker_count, get_cpu_limit,
+    get_memory_limit, get_process_memory
+)
+from tas.web.reloading import RollingReloader
 
 
 logger = logging.getLogger(__name__)
@@ -26,20 +31,66 @@ def generate_service_id(service_name, host, port):
     return "{}".format(hashlib.md5(service_info).hexdigest())
 
 
-def _extract_gunicorn_options(configuration):
+def _calculate_worker_threads(configuration):
+    if configuration["WORKER_THREADS"] is not None:
+        return configuration["WORKER_THREADS"]
+
+    # every request that is processed or queued in a lane occupies a thread
+    # and we need a couple more for the health checks and the requests that
+    # are rejected
+    return sum(
+        lane.get("workers", 1) + lane.get("queue_size", 0)
+        for lane in configuration["LANES"]
+    ) + 2
+
+
+def _calculate_worker_count(configuration, worker_memory=None):
+    if configuration["WORKERS"] != AUTO:
+        return configuration["WORKERS"]
+
+    if configuration["WORKER_MEMORY"] is not None:
+        worker_memory = configuration["WORKER_MEMORY"]
+
+    cpu_limit = get_cpu_limit()
+    memory_limit = get_memory_limit()
+
+    worker_count = calculate_worker_count(
+        cpu_limit=cpu_limit,
+        memory_limit=memory_limit,
+        worker_memory=worker_memory,
+        min_workers=configuration["WORKERS_MIN"],
+        max_workers=configuration["WORKERS_MAX"],
+        memory_reserve=configuration["WORKER_MEMORY_RESERVE"]
+    )
+
+    logger.info(
+        "calculated worker count: workers=%s cpu_limit=%s memory_limit=%s "
+        "worker_memory=%s",
+        worker_count, cpu_limit, memory_limit, worker_memory
+    )
+
+    return worker_count
+
+
+def _extract_gunicorn_options(configuration, worker_memory=None):
     options = {
         "preload_app": False,
         "bind": "{host}:{port}".format(
             host=configuration["HOST"],
             port=configuration["PORT"]
         ),
-        "workers": configuration["WORKERS"],
+        "workers": _calculate_worker_count(configuration, worker_memory),
         "worker_class": "sync",
         "max_requests": configuration["WORKER_MAX_REQUESTS"],
         "max_requests_jitter":
             configuration["WORKER_MAX_REQUESTS_JITTER"],
+        "pidfile": configuration["PIDFILE"]
     }
 
+    if configuration["LANES"]:
+        options["worker_class"] = "gthread"
+        options["threads"] = _calculate_worker_threads(configuration)
+
     return options
 
 
@@ -80,11 +131,20 @@ class TextAnalysisServiceServer(Server):
             configuration file
         """
         settings_file = path.join(getcwd(), "settings.py")
+        self.settings_file = settings_file
         self.configuration = Configuration.load_from_py(settings_file)
 
-        options = _extract_gunicorn_options(self.configuration)
         app = create_app(settings_file)
 
+        # the workers are forked after the application is loaded, so the
+        # memory of this process is used as the memory of a worker
+        options = _extract_gunicorn_options(
+            self.configuration, get_process_memory())
+        self.worker_scaler = WorkerScaler.from_configuration(
+            self.configuration, options["workers"])
+        self.rolling_reloader = RollingReloader.from_configuration(
+            self.configuration, self._load_application)
+
         super(TextAnalysisServiceServer, self).__init__(app, options)
 
     def _register_service(self):
@@ -151,6 +211,84 @@ class TextAnalysisServiceServer(Server):
         if self.configuration["CONSUL_HOST"] is not None:
             self._register_service()
 
+    def _load_application(self):
+        """Load the application using the current settings file
+
+        The workers that are started afterwards use the new application.
+        The gunicorn settings, like the address and the number of workers,
+        are not changed.
+        """
+        configuration = Configuration.load_from_py(self.settings_file)
+        app = create_app(self.settings_file)
+
+        old_app = self.application
+
+        self.configuration = configuration
+        self.application = app
+
+        # gunicorn caches the application that the workers serve
+        self.callable = None
+
+        # the old workers have their own copy of the application, so the
+        # resources of the master copy are no longer used
+        old_app.shutdown()
+
+    def _reload_completed(self, result):
+        self.worker_scaler.paused = False
+
+    def _handle_hup(self, server):
+        """Reload the application without reducing the serving capacity
+
+        gunicorn calls the signal handlers in the main loop of the master,
+        so the application is loaded in the thread that forks the workers.
+        The workers are replaced in a thread because the master must keep
+        handling the signals that add and remove the workers.
+
+        :param server: the server object
+        """
+        logger.info("reload requested")
+
+        if self.rolling_reloader.reloading:
+            logger.warning("a reload is already in progress")
+            return
+
+        self.worker_scaler.paused = True
+
+        reload_thread = self.rolling_reloader.start_reload(
+            server, self._reload_completed)
+        if reload_thread is None:
+            self.worker_scaler.paused = False
+
+    def _when_ready(self, server):
+        """Server is ready to accept requests
+
+        :param server: the server object
+        """
+        # replace the gunicorn reload, which starts all the new workers at
+        # once with the application that was loaded when the server started
+        server.handle_hup = lambda: self._handle_hup(server)
+
+        self.worker_scaler.start(server)
+
+    def _post_worker_init(self, worker):
+        """Worker has loaded the application
+
+        :param worker: the worker object
+        """
+        # the worker threads have not been started yet, so the process pools
+        # can be forked safely
+        worker.wsgi.start_worker()
+
+        self.rolling_reloader.mark_ready(worker.pid)
+
+    def _worker_exit(self, server, worker):
+        """Worker is exiting
+
+        :param server: the server object
+        :param worker: the worker object
+        """
+        worker.wsgi.shutdown()
+
     def _on_exit(self, server):
         """Server is shutting down
 
@@ -158,6 +296,9 @@ class TextAnalysisServiceServer(Server):
         """
         logger.info("server stopped")
 
+        self.worker_scaler.stop()
+        self.rolling_reloader.close()
+
         if self.configuration["CONSUL_HOST"] is not None:
             self._deregister_service()
 
@@ -167,4 +308,11 @@ class TextAnalysisServiceServer(Server):
         # we have to setup the hooks using lambdas in order to avoid the
         # function arity checks of gunicorn
         self.cfg.set("on_starting", lambda server: self._on_starting(server))
+        self.cfg.set("when_ready", lambda server: self._when_ready(server))
+        self.cfg.set(
+            "post_worker_init", lambda worker: self._post_worker_init(worker))
+        self.cfg.set(
+            "worker_exit",
+            lambda server, worker: self._worker_exit(server, worker)
+        )
         self.cfg.set("on_exit", lambda server: self._on_exit(server))
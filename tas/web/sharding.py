@@ -0,0 +1,618 @@
+from bisect import bisect
+import hashlib
+import json
+import logging
+from os import getpid, listdir, path, remove, replace, stat, utime
+from threading import get_ident, Lock
+import time
+
+from consul import Consul, ConsulException
+import requests
+from requests.adapters import HTTPAdapter
+
+from tas.analysis.fetchers import AnalysisCache
+from tas.exceptions import TASError
+from tas.web.coalescing import create_private_directory
+
+
+logger = logging.getLogger(__name__)
+
+
+SHARD_FORWARDED_HEADER = "X-TAS-Shard-Forwarded"
+SHARD_TOKEN_HEADER = "X-TAS-Shard-Token"
+
+FORWARD = "forward"
+FETCH = "fetch"
+SHARDING_MODES = (FORWARD, FETCH)
+
+# where the result of a sharded request came from
+SOURCE_LOCAL = "local"
+SOURCE_CACHE = "cache"
+SOURCE_OWNER = "owner"
+
+
+def _hash(value):
+    return int(hashlib.md5(value.encode("utf8")).hexdigest()[:16], 16)
+
+
+class ShardRequestError(TASError):
+    """Exception that is raised when a request to another node fails"""
+
+    def __init__(self, message, node, status_code=None):
+        super(ShardRequestError, self).__init__(message)
+
+        self.node = node
+        self.status_code = status_code
+
+
+class HashRing(object):
+    """A consistent hash ring of the service nodes
+
+    Every node is placed on the ring `replicas` times, so the keys are spread
+    evenly and only the keys of a node that joins or leaves the cluster
+    change owner.
+    """
+
+    def __init__(self, nodes=(), replicas=100):
+        """Create a new HashRing object
+
+        :param list[str] nodes: the node addresses
+        :param int replicas: the number of points of every node on the ring
+        """
+        self.nodes = tuple(sorted(set(nodes)))
+        self.replicas = replicas
+
+        points = sorted(
+            (_hash("{}-{}".format(node, i)), node)
+            for node in self.nodes
+            for i in range(replicas)
+        )
+
+        self._hashes = [point_hash for point_hash, _ in points]
+        self._nodes = [node for _, node in points]
+
+    def owner(self, key):
+        """Get the node that owns a key
+
+        :param str key: the key
+        :rtype: str|None
+        :return: the node address or None if the ring is empty
+        """
+        if not self._nodes:
+            return None
+
+        index = bisect(self._hashes, _hash(key)) % len(self._hashes)
+
+        return self._nodes[index]
+
+
+class StaticCatalog(object):
+    """A service catalog with a fixed list of nodes"""
+
+    def __init__(self, nodes):
+        """Create a new StaticCatalog object
+
+        :param list[str] nodes: the node addresses in the host:port format
+        """
+        self._nodes = list(nodes)
+
+    def nodes(self):
+        """Get the service nodes
+
+        :rtype: list[str]
+        :return: the node addresses
+        """
+        return list(self._nodes)
+
+
+class ConsulCatalog(object):
+    """The nodes of the service that are registered in consul
+
+    Only the nodes whose health checks pass are used. The node list is
+    refreshed at most every `refresh_interval` seconds and the last known
+    list is used while consul is unavailable.
+    """
+
+    def __init__(self, client, service_name, refresh_interval=10.0):
+        """Create a new ConsulCatalog object
+
+        :param consul.Consul client: the consul client
+        :param str service_name: the name of the service
+        :param float refresh_interval: the number of seconds between the
+            node list updates
+        """
+        self.client = client
+        self.service_name = service_name
+        self.refresh_interval = refresh_interval
+
+        self._nodes = []
+        self._refresh_time = None
+        self._lock = Lock()
+
+    def _load_nodes(self):
+        _, services = self.client.health.service(
+            self.service_name, passing=True)
+
+        return sorted(
+            "{}:{}".format(
+                service["Service"]["Address"] or service["Node"]["Address"],
+                service["Service"]["Port"]
+            )
+            for service in services
+        )
+
+    def nodes(self):
+        """Get the healthy service nodes
+
+        :rtype: list[str]
+        :return: the node addresses
+        """
+        now = time.monotonic()
+
+        with self._lock:
+            if self._refresh_time is not None and \
+                    now - self._refresh_time < self.refresh_interval:
+                return list(self._nodes)
+
+            # the other threads use the current nodes while this one loads
+            # the new ones
+            self._refresh_time = now
+
+        try:
+            nodes = self._load_nodes()
+        except (ConsulException, requests.RequestException) as e:
+            logger.warning(
+                "failed to load the service nodes from consul: error=%s", e)
+
+            return list(self._nodes)
+
+        self._nodes = nodes
+
+        return list(nodes)
+
+
+class ShardClient(object):
+    """Send the sharded requests to the other nodes"""
+
+    def __init__(self, forward_timeout=30.0, fetch_timeout=1.0, token=None,
+                 pool_maxsize=10):
+        """Create a new ShardClient object
+
+        :param float forward_timeout: the timeout in seconds of the requests
+            that are forwarded to the owner node
+        :param float fetch_timeout: the timeout in seconds of the cache
+            requests
+        :param str|None token: the token that the nodes share
+        :param int pool_maxsize: the maximum number of connections to keep
+            for every node
+        """
+        self.forward_timeout = forward_timeout
+        self.fetch_timeout = fetch_timeout
+        self.token = token
+
+        adapter = HTTPAdapter(pool_maxsize=pool_maxsize)
+
+        self._session = requests.Session()
+        self._session.mount("http://", adapter)
+
+    def _headers(self):
+        headers = {
+            "Content-Type": "application/json",
+            "Accept": "application/json"
+        }
+
+        if self.token is not None:
+            headers[SHARD_TOKEN_HEADER] = self.token
+
+        return headers
+
+    def _request(self, method, node, request_path, timeout, body=None):
+        url = "http://{}{}".format(node, request_path)
+        headers = self._headers()
+        if method == "POST":
+            headers[SHARD_FORWARDED_HEADER] = "1"
+
+        try:
+            return self._session.request(
+                method, url, data=body, headers=headers, timeout=timeout)
+        except requests.RequestException as e:
+            raise ShardRequestError(
+                "failed to send the request to node {}".format(node),
+                node
+            ) from e
+
+    def forward(self, node, request_path, content):
+        """Process a request on another node
+
+        :param str node: the node address
+        :param str request_path: the path of the processing endpoint
+        :param dict content: the request content
+        :rtype: dict
+        :return: the processing result
+        """
+        response = self._request(
+            "POST", node, request_path, self.forward_timeout,
+            json.dumps(content).encode("utf8")
+        )
+
+        if response.status_code != 200:
+            raise ShardRequestError(
+                "node {} failed to process the request".format(node),
+                node, response.status_code
+            )
+
+        try:
+            return response.json()
+        except ValueError as e:
+            raise ShardRequestError(
+                "node {} returned an invalid result".format(node),
+                node, response.status_code
+            ) from e
+
+    def fetch(self, node, key):
+        """Get a cached result from another node
+
+        :param str node: the node address
+        :param str key: the request key
+        :rtype: (bool, dict|None)
+        :return: True and the result if the node has cached it
+        """
+        response = self._request(
+            "GET", node, "/service/cache/{}".format(key), self.fetch_timeout)
+
+        if response.status_code == 404:
+            return False, None
+
+        if response.status_code != 200:
+            raise ShardRequestError(
+                "failed to get the cached result from node {}".format(node),
+                node, response.status_code
+            )
+
+        try:
+            return True, response.json()["result"]
+        except (ValueError, KeyError) as e:
+            raise ShardRequestError(
+                "node {} returned an invalid result".format(node),
+                node, response.status_code
+            ) from e
+
+    def store(self, node, key, result):
+        """Add a result to the cache of another node
+
+        :param str node: the node address
+        :param str key: the request key
+        :param dict result: the processing result
+        """
+        response = self._request(
+            "PUT", node, "/service/cache/{}".format(key), self.fetch_timeout,
+            json.dumps({"result": result}).encode("utf8")
+        )
+
+        if response.status_code not in (200, 204):
+            raise ShardRequestError(
+                "failed to cache the result on node {}".format(node),
+                node, response.status_code
+            )
+
+    def close(self):
+        """Close the pooled connections"""
+        self._session.close()
+
+
+class NodeResultCache(object):
+    """A result cache that is shared by the workers of a node
+
+    Every result is saved in a json file of a private directory, so the
+    result that one worker saved is found by the other workers of the node.
+    The least recently used results are removed when more than `size`
+    results are saved.
+    """
+
+    def __init__(self, directory, size=1000):
+        """Create a new NodeResultCache object
+
+        :param str directory: the directory of the result files
+        :param int size: the maximum number of cached results
+        """
+        self.directory = directory
+        self.size = size
+
+        create_private_directory(self.directory, "sharding cache")
+
+    def _result_file(self, key):
+        # the keys are received from the other nodes, so they are hashed
+        # before they are used as file names
+        return path.join(
+            self.directory,
+            "{}.json".format(hashlib.sha256(key.encode("utf8")).hexdigest())
+        )
+
+    def get(self, key):
+        """Get a cached result
+
+        :param str key: the request key
+        :rtype: dict|None
+        :return: the result or None if it isn't cached
+        """
+        result_file = self._result_file(key)
+
+        try:
+            with open(result_file, "r", encoding="utf8") as f:
+                result = json.load(f)
+
+            # the modification time is used to find the least recently used
+            # results
+            utime(result_file)
+        except (OSError, ValueError):
+            return None
+
+        return result
+
+    def set(self, key, result):
+        """Add a result to the cache
+
+        :param str key: the request key
+        :param dict result: the result
+        """
+        result_file = self._result_file(key)
+        temporary_file = "{}.{}.{}.tmp".format(
+            result_file, getpid(), get_ident())
+
+        try:
+            with open(temporary_file, "w", encoding="utf8") as f:
+                json.dump(result, f)
+
+            replace(temporary_file, result_file)
+        except (OSError, TypeError, ValueError):
+            logger.exception(
+                "failed to save shard result: result_file=%s", result_file)
+
+            return
+
+        self._remove_least_recently_used()
+
+    def _remove_least_recently_used(self):
+        filenames = [
+            filename for filename in listdir(self.directory)
+            if filename.endswith(".json")
+        ]
+
+        if len(filenames) <= self.size:
+            return
+
+        modification_times = []
+        for filename in filenames:
+            file_path = path.join(self.directory, filename)
+
+            try:
+                modification_times.append((stat(file_path).st_mtime,
+                                           file_path))
+            except OSError:
+                # another worker removed the file first
+                pass
+
+        modification_times.sort()
+
+        for _, file_path in modification_times[:-self.size]:
+            try:
+                remove(file_path)
+            except OSError:
+                pass
+
+
+class ResultSharding(object):
+    """Share the processing results between the nodes of the cluster
+
+    Every request key is owned by one of the service nodes, which is selected
+    using a consistent hash ring. The owner caches the results of its keys.
+    The other nodes either forward the requests to the owner or get the
+    cached result from it and store the result that they computed in its
+    cache. A request is processed locally if the owner is unavailable.
+    """
+
+    def __init__(self, node=None, catalog=None, client=None, mode=FORWARD,
+                 cache_size=1000, replicas=100, cache_directory=None):
+        """Create a new ResultSharding object
+
+        :param str|None node: the address of this node. The results are not
+            shared if it is None
+        :param StaticCatalog|ConsulCatalog|None catalog: the catalog of the
+            service nodes
+        :param ShardClient|None client: the client that sends the requests
+            to the other nodes
+        :param str mode: "forward" to forward the requests to the owner or
+            "fetch" to get the cached results from it
+        :param int cache_size: the maximum number of cached results
+        :param int replicas: the number of points of every node on the hash
+            ring
+        :param str|None cache_directory: the directory of the result cache
+            that is shared by the workers of this node. Every worker has its
+            own cache if it is None
+        """
+        if mode not in SHARDING_MODES:
+            raise ValueError("invalid sharding mode: {}".format(mode))
+
+        self.node = node
+        self.catalog = catalog
+        self.client = client or ShardClient()
+        self.mode = mode
+        self.replicas = replicas
+
+        self._ring = HashRing(replicas=replicas)
+
+        # the cache requests and the forwarded requests are received by any
+        # of the workers of the owner, so the cache must be shared by them
+        if cache_directory is not None:
+            self.cache = NodeResultCache(cache_directory, cache_size)
+        else:
+            self.cache = AnalysisCache(cache_size)
+
+    @property
+    def enabled(self):
+        """Check if the results are shared between the nodes
+
+        :rtype: bool
+        :return: True if the results are shared
+        """
+        return self.node is not None and self.catalog is not None
+
+    @classmethod
+    def from_configuration(cls, configuration):
+        """Create a ResultSharding using the application configuration
+
+        :param Configuration configuration: the application configuration
+        :rtype: ResultSharding
+        :return: the result sharding
+        """
+        if not configuration["SHARDING_ENABLED"]:
+            return cls()
+
+        # the cache of every node can be read and written by the other
+        # nodes, so it must not be exposed without a token
+        if not configuration["SHARDING_TOKEN"]:
+            logger.error(
+                "sharding is disabled because the sharding token is not set")
+
+            return cls()
+
+        if configuration["SHARDING_NODES"]:
+            catalog = StaticCatalog(configuration["SHARDING_NODES"])
+        elif configuration["CONSUL_HOST"] is not None:
+            catalog = ConsulCatalog(
+                client=Consul(
+                    host=configuration["CONSUL_HOST"],
+                    port=configuration["CONSUL_PORT"],
+                    scheme=configuration["CONSUL_SCHEME"],
+                    verify=configuration["CONSUL_VERIFY_SSL"]
+                ),
+                service_name=configuration["SERVICE_NAME"],
+                refresh_interval=configuration["SHARDING_CATALOG_REFRESH"]
+            )
+        else:
+            logger.warning(
+                "sharding is disabled because neither the sharding nodes "
+                "nor the consul host are set"
+            )
+
+            return cls()
+
+        node = configuration["SHARDING_NODE"] or "{}:{}".format(
+            configuration["HOST"], configuration["PORT"])
+
+        return cls(
+            node=node,
+            catalog=catalog,
+            client=ShardClient(
+                forward_timeout=configuration["SHARDING_FORWARD_TIMEOUT"],
+                fetch_timeout=configuration["SHARDING_FETCH_TIMEOUT"],
+                token=configuration["SHARDING_TOKEN"]
+            ),
+            mode=configuration["SHARDING_MODE"],
+            cache_size=configuration["SHARDING_CACHE_SIZE"],
+            replicas=configuration["SHARDING_REPLICAS"],
+            cache_directory=configuration["SHARDING_CACHE_DIRECTORY"]
+        )
+
+    def owner(self, key):
+        """Get the node that owns a request key
+
+        :param str key: the request key
+        :rtype: str
+        :return: the node address
+        """
+        # this node is always on the ring so that the keys are processed
+        # locally when the catalog is empty or unavailable
+        nodes = tuple(sorted(set(self.catalog.nodes()) | {self.node}))
+
+        ring = self._ring
+        if ring.nodes != nodes:
+            logger.info("service nodes changed: nodes=%s", ",".join(nodes))
+
+            ring = HashRing(nodes, self.replicas)
+            self._ring = ring
+
+        return ring.owner(key)
+
+    def get_result(self, key):
+        """Get a cached result of this node
+
+        :param str key: the request key
+        :rtype: dict|None
+        :return: the result or None if it isn't cached
+        """
+        return self.cache.get(key)
+
+    def set_result(self, key, result):
+        """Add a result to the cache of this node
+
+        :param str key: the request key
+        :param dict result: the processing result
+        """
+        self.cache.set(key, result)
+
+    def _execute_locally(self, key, func):
+        result = self.cache.get(key)
+        if result is not None:
+            return result, SOURCE_CACHE
+
+        result = func()
+
+        # the results that are missing stages because the node was
+        # overloaded are not cached
+        if not result.get("degraded"):
+            self.cache.set(key, result)
+
+        return result, SOURCE_LOCAL
+
+    def _execute_remotely(self, owner, key, request_path, content, func):
+        if self.mode == FORWARD:
+            return self.client.forward(owner, request_path, content), \
+                SOURCE_OWNER
+
+        found, result = self.client.fetch(owner, key)
+        if found:
+            return result, SOURCE_OWNER
+
+        result = func()
+        if result.get("degraded"):
+            return result, SOURCE_LOCAL
+
+        try:
+            self.client.store(owner, key, result)
+        except ShardRequestError as e:
+            logger.warning(
+                "failed to cache result on owner node: node=%s key=%s "
+                "error=%s", owner, key, e
+            )
+
+        return result, SOURCE_LOCAL
+
+    def execute(self, key, request_path, content, forwarded, func):
+        """Get the result of a request from the node that owns its key
+
+        :param str key: the request key
+        :param str request_path: the path of the processing endpoint
+        :param dict content: the request content
+        :param bool forwarded: True if another node forwarded the request
+        :param callable func: the function that computes the result
+        :rtype: (dict, str)
+        :return: the result and where it came from, which is "local",
+            "cache" or "owner"
+        """
+        # a forwarded request is always processed here even if the nodes
+        # disagree about the owner, so requests are never forwarded twice
+        owner = self.node if forwarded else self.owner(key)
+        if owner == self.node:
+            return self._execute_locally(key, func)
+
+        try:
+            return self._execute_remotely(
+                owner, key, request_path, content, func)
+        except ShardRequestError as e:
+            logger.warning(
+                "owner node is unavailable, processing request locally: "
+                "node=%s key=%s error=%s", owner, key, e
+            )
+
+        return func(), SOURCE_LOCAL
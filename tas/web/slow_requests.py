@@ -0,0 +1,161 @@
+from glob import glob
+import heapq
+from itertools import count
+import json
+import logging
+from os import getpid, makedirs, path, remove, replace
+from threading import Lock
+import time
+
+
+logger = logging.getLogger(__name__)
+
+
+class SlowRequestLog(object):
+    """Keep the slowest recent requests of the worker
+
+    Every worker saves its slowest requests in a file in the given directory
+    so that the slowest requests of all the workers can be retrieved from any
+    of them. The log can be used by the threads of a worker at the same time.
+    """
+
+    def __init__(self, directory=None, size=20, max_age=3600):
+        """Create a new SlowRequestLog object
+
+        :param str|None directory: the directory where the workers save their
+            slowest requests. The requests of other workers will not be
+            available if a directory is not given
+        :param int size: the number of requests to keep
+        :param int max_age: the number of seconds to keep a request
+        """
+        self.directory = directory
+        self.size = size
+        self.max_age = max_age
+
+        self._requests = []
+        self._sequence = count()
+        self._lock = Lock()
+
+    def _worker_file(self):
+        return path.join(self.directory, "{}.json".format(getpid()))
+
+    def _is_recent(self, request, now):
+        return now - request["timestamp"] <= self.max_age
+
+    def _remove_old_requests(self, now):
+        recent_requests = [
+            item
+            for item in self._requests
+            if self._is_recent(item[2], now)
+        ]
+
+        if len(recent_requests) != len(self._requests):
+            heapq.heapify(recent_requests)
+            self._requests = recent_requests
+
+    def _sorted_requests(self):
+        return [
+            request
+            for _, _, request in sorted(self._requests, reverse=True)
+        ]
+
+    def _save(self):
+        makedirs(self.directory, exist_ok=True)
+
+        worker_file = self._worker_file()
+        temporary_file = "{}.tmp".format(worker_file)
+
+        with open(temporary_file, "w") as f:
+            json.dump(self._sorted_requests(), f)
+
+        replace(temporary_file, worker_file)
+
+    def record(self, request):
+        """Add a request to the log if it is one of the slowest
+
+        :param dict request: the request information. It must contain the
+            request execution time in seconds in the execution_time key
+        :rtype: bool
+        :return: True if the request was added to the log
+        """
+        now = time.time()
+        request.setdefault("timestamp", now)
+        request.setdefault("pid", getpid())
+
+        # the worker file is saved while the lock is held, so that an older
+        # list of requests never replaces a newer one
+        with self._lock:
+            self._remove_old_requests(now)
+
+            item = (request["execution_time"], next(self._sequence), request)
+
+            if len(self._requests) < self.size:
+                heapq.heappush(self._requests, item)
+            elif item[0] > self._requests[0][0]:
+                heapq.heapreplace(self._requests, item)
+            else:
+                return False
+
+            if self.directory is not None:
+                try:
+                    self._save()
+                except OSError:
+                    logger.exception("failed to save the slow requests")
+
+        return True
+
+    def local_requests(self):
+        """Get the slowest requests of this worker
+
+        :rtype: list[dict]
+        :return: the requests ordered from the slowest to the fastest
+        """
+        with self._lock:
+            self._remove_old_requests(time.time())
+
+            return self._sorted_requests()
+
+    def _load_worker_requests(self, filename):
+        try:
+            with open(filename) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            # the file was replaced while we were loading it
+            return []
+        except ValueError:
+            logger.warning("invalid slow request file: filename=%s", filename)
+            return []
+
+    def requests(self):
+        """Get the slowest recent requests of all the workers
+
+        :rtype: list[dict]
+        :return: the requests ordered from the slowest to the fastest
+        """
+        if self.directory is None:
+            return self.local_requests()
+
+        now = time.time()
+        requests = []
+
+        for filename in glob(path.join(self.directory, "*.json")):
+            worker_requests = [
+                request
+                for request in self._load_worker_requests(filename)
+                if self._is_recent(request, now)
+            ]
+
+            # the workers that were restarted leave their files behind so
+            # we will remove them once all of their requests have expired
+            if not worker_requests and filename != self._worker_file():
+                try:
+                    remove(filename)
+                except FileNotFoundError:
+                    pass
+
+            requests.extend(worker_requests)
+
+        requests.sort(key=lambda request: request["execution_time"],
+                      reverse=True)
+
+        return requests[:self.size]
@@ -0,0 +1,195 @@
+from abc import ABCMeta, abstractmethod
+import json
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+
+DEADLINE_HEADER = "X-TAS-Deadline"
+
+
+class StreamFormat(metaclass=ABCMeta):
+    """Base class for the formats of the progressive responses"""
+
+    media_type = None
+
+    @abstractmethod
+    def encode_record(self, record_type, data):
+        """Encode a record of the response stream
+
+        :param str record_type: the record type
+        :param dict data: the record data
+        :rtype: bytes
+        :return: the encoded record
+        """
+        pass
+
+    def section(self, name, value):
+        """Encode a section of the processing result
+
+        :param str name: the section name
+        :param object value: the section value
+        :rtype: bytes
+        :return: the encoded record
+        """
+        return self.encode_record(
+            "section",
+            {"type": "section", "section": name, "value": value}
+        )
+
+    def complete(self, partial, execution_time, stage_timings,
+                 degraded=False):
+        """Encode the record that ends a response stream
+
+        :param bool partial: True if the processing stopped before all the
+            sections were produced
+        :param float execution_time: the processing time in seconds
+        :param dict[str, float] stage_timings: the execution time of every
+            processing stage
+        :param bool degraded: True if optional stages were skipped because
+            the service was overloaded
+        :rtype: bytes
+        :return: the encoded record
+        """
+        data = {
+            "type": "complete",
+            "partial": partial,
+            "execution_time": execution_time,
+            "stage_timings": stage_timings
+        }
+
+        if degraded:
+            data["degraded"] = True
+
+        return self.encode_record("complete", data)
+
+    def error(self, title, description, code):
+        """Encode the record that ends a failed response stream
+
+        :param str title: the error title
+        :param str description: the error description
+        :param int code: the TAS error code
+        :rtype: bytes
+        :return: the encoded record
+        """
+        return self.encode_record(
+            "error",
+            {
+                "type": "error",
+                "title": title,
+                "description": description,
+                "code": code
+            }
+        )
+
+
+class NDJSONFormat(StreamFormat):
+    """Newline delimited JSON stream format"""
+
+    media_type = "application/x-ndjson"
+
+    def encode_record(self, record_type, data):
+        return json.dumps(data).encode("utf8") + b"\n"
+
+
+class ServerSentEventsFormat(StreamFormat):
+    """Server-sent events stream format"""
+
+    media_type = "text/event-stream"
+
+    def encode_record(self, record_type, data):
+        return "event: {}\ndata: {}\n\n".format(
+            record_type, json.dumps(data)).encode("utf8")
+
+
+STREAM_FORMATS = {
+    stream_format.media_type: stream_format
+    for stream_format in [NDJSONFormat(), ServerSentEventsFormat()]
+}
+
+
+def get_stream_format(request):
+    """Get the stream format that the client requested
+
+    A progressive response is only produced when the Accept header lists one
+    of the stream media types explicitly. The clients that accept any media
+    type receive the usual response.
+
+    :param falcon.Request request: the request object
+    :rtype: StreamFormat|None
+    :return: the stream format or None if the client didn't request a
+        progressive response
+    """
+    accept = request.get_header("Accept")
+    if not accept:
+        return None
+
+    for media_range in accept.split(","):
+        media_type = media_range.split(";")[0].strip().lower()
+
+        stream_format = STREAM_FORMATS.get(media_type)
+        if stream_format is not None:
+            return stream_format
+
+    return None
+
+
+def get_deadline(request):
+    """Get the number of seconds the client is willing to wait for the
+    processing result
+
+    :param falcon.Request request: the request object
+    :rtype: float|None
+    :return: the deadline in seconds or None if the client didn't set one
+    """
+    deadline = request.get_header(DEADLINE_HEADER)
+    if deadline is None:
+        return None
+
+    try:
+        deadline = float(deadline)
+    except ValueError:
+        logger.warning("invalid deadline header: deadline=%s", deadline)
+
+        return None
+
+    return deadline if deadline > 0 else None
+
+
+class ResponseStream(object):
+    """The body of a progressive response
+
+    The WSGI server closes the response body when the response has been sent
+    or the client has disconnected. The close callback is executed exactly
+    once in both cases, even if the body was never iterated.
+    """
+
+    def __init__(self, records, close_callback):
+        """Create a new ResponseStream object
+
+        :param collections.Iterator[bytes] records: the encoded records
+        :param callable close_callback: the function to call when the
+            response body is closed
+        """
+        self._records = records
+        self._close_callback = close_callback
+        self._closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._records)
+
+    def close(self):
+        """Stop producing records and release the request resources"""
+        if self._closed:
+            return
+
+        self._closed = True
+
+        try:
+            self._records.close()
+        finally:
+            self._close_callback()
@@ -0,0 +1,9 @@
+TESTING = True
+
+SLOW_REQUESTS_DIRECTORY = None
+
+DEGRADATION_ENABLED = True
+DEGRADATION_STAGES = ["summary", "named_entities"]
+DEGRADATION_LATENCY_SLO = 0.0
+DEGRADATION_INTERVAL = 0.0
+DEGRADATION_MIN_SAMPLES = 1
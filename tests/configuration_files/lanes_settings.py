@@ -0,0 +1,20 @@
+TESTING = True
+
+HOST = "127.0.0.1"
+PORT = 8000
+
+SLOW_REQUESTS_DIRECTORY = None
+
+LANES = [
+    {
+        "name": "small",
+        "max_payload_size": 100000,
+        "workers": 1,
+        "queue_size": 1
+    },
+    {
+        "name": "large",
+        "workers": 1,
+        "queue_size": 1
+    }
+]
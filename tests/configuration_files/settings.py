@@ -2,3 +2,8 @@ TESTING = True
 
 HOST = "127.0.0.1"
 PORT = 8000
+
+SLOW_REQUESTS_DIRECTORY = None
+
+# the test web pages are served from the local host
+FETCH_ALLOW_PRIVATE_ADDRESSES = True
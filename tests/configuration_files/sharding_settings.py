@@ -0,0 +1,11 @@
+TESTING = True
+
+HOST = "127.0.0.1"
+PORT = 8000
+
+SLOW_REQUESTS_DIRECTORY = None
+
+SHARDING_ENABLED = True
+SHARDING_NODES = ["127.0.0.1:8000"]
+SHARDING_TOKEN = "secret"
+SHARDING_CACHE_DIRECTORY = None
@@ -0,0 +1,175 @@
+import os
+import signal
+import time
+from unittest import TestCase, main, skipUnless
+
+from nltk.tree import Tree
+
+from tas.analysis import entities
+from tas.analysis.entities import NamedEntityExtractor
+from tas.analysis.state import AnalyserState
+
+
+class StubPosTagger(object):
+    def tag(self, words):
+        return [
+            (word, "NNP" if word[0].isupper() else "NN")
+            for word in words
+        ]
+
+
+class StubNEChunker(object):
+    def parse(self, tagged_words):
+        return Tree("S", [
+            Tree("PERSON", [(word, tag)]) if tag == "NNP" else (word, tag)
+            for word, tag in tagged_words
+        ])
+
+
+class StubAnalyserState(object):
+    keyword_stop_list = "SmartStoplist.txt"
+    snapshot_file = None
+    keyword_engine = "rake"
+    pos_tagger = StubPosTagger()
+    ne_chunker = StubNEChunker()
+
+    def warm_up(self):
+        pass
+
+
+sentence_words = [
+    ["Person{}".format(i), "met", "Person{}".format(i + 1), "today"]
+    for i in range(100)
+]
+
+
+class NamedEntityExtractorTests(TestCase):
+    def test_sequential_extraction(self):
+        extractor = NamedEntityExtractor(StubAnalyserState())
+
+        named_entities = extractor.extract(sentence_words)
+
+        self.assertEqual(
+            named_entities,
+            {"PERSON": {"Person{}".format(i) for i in range(101)}}
+        )
+
+    def test_pool_processes_use_the_same_analyser_state_settings(self):
+        analyser_state = AnalyserState(
+            keyword_stop_list="FoxStoplist.txt", snapshot_file="state.pkl",
+            keyword_engine="fast_rake"
+        )
+        extractor = NamedEntityExtractor(analyser_state)
+
+        pool_analyser_state = AnalyserState(*extractor._state_arguments)
+
+        self.assertEqual(pool_analyser_state.keyword_stop_list,
+                         "FoxStoplist.txt")
+        self.assertEqual(pool_analyser_state.snapshot_file, "state.pkl")
+        self.assertEqual(pool_analyser_state.keyword_engine, "fast_rake")
+
+    def test_parallel_extraction_has_the_same_result(self):
+        sequential_extractor = NamedEntityExtractor(StubAnalyserState())
+        parallel_extractor = NamedEntityExtractor(
+            StubAnalyserState(), workers=2, parallel_threshold=10,
+            chunk_size=7
+        )
+
+        try:
+            self.assertEqual(
+                parallel_extractor.extract(sentence_words),
+                sequential_extractor.extract(sentence_words)
+            )
+        finally:
+            parallel_extractor.shutdown()
+
+    def test_short_texts_are_processed_sequentially(self):
+        extractor = NamedEntityExtractor(
+            StubAnalyserState(), workers=2, parallel_threshold=1000)
+
+        extractor.extract(sentence_words)
+
+        self.assertIsNone(extractor._executor)
+
+    def test_forked_process_starts_its_own_pool(self):
+        extractor = NamedEntityExtractor(
+            StubAnalyserState(), workers=2, parallel_threshold=10)
+        extractor.start()
+
+        try:
+            pid = os.fork()
+            if pid == 0:
+                try:
+                    named_entities = extractor.extract(sentence_words)
+                    extractor.shutdown()
+                    os._exit(0 if len(named_entities["PERSON"]) == 101 else 1)
+                finally:
+                    os._exit(1)
+
+            self.assertEqual(_wait_for_process(pid, 30.0), 0)
+        finally:
+            extractor.shutdown()
+
+    @skipUnless(entities._prctl is not None, "prctl is not available")
+    def test_pool_processes_exit_when_the_worker_is_killed(self):
+        read_fd, write_fd = os.pipe()
+
+        pid = os.fork()
+        if pid == 0:
+            try:
+                os.close(read_fd)
+                extractor = NamedEntityExtractor(
+                    StubAnalyserState(), workers=2, parallel_threshold=10)
+                executor = extractor.start()
+                pool_pids = " ".join(str(p) for p in executor._processes)
+                os.write(write_fd, "{}\n".format(pool_pids).encode("ascii"))
+                time.sleep(60)
+            finally:
+                os._exit(1)
+
+        # the pool processes inherit the write end of the pipe, so only the
+        # first line is read
+        os.close(write_fd)
+        with os.fdopen(read_fd, "rb") as f:
+            pool_pids = [int(p) for p in f.readline().split()]
+
+        self.assertEqual(len(pool_pids), 2)
+
+        os.kill(pid, signal.SIGKILL)
+        os.waitpid(pid, 0)
+
+        deadline = time.monotonic() + 10.0
+        while time.monotonic() < deadline and \
+                any(_process_exists(p) for p in pool_pids):
+            time.sleep(0.05)
+
+        self.assertFalse(any(_process_exists(p) for p in pool_pids))
+
+
+def _wait_for_process(pid, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        finished_pid, status = os.waitpid(pid, os.WNOHANG)
+        if finished_pid == pid:
+            return os.WEXITSTATUS(status)
+
+        time.sleep(0.05)
+
+    os.kill(pid, signal.SIGKILL)
+    os.waitpid(pid, 0)
+
+    return None
+
+
+def _process_exists(pid):
+    # the pool processes are reparented, so they are checked using /proc in
+    # order to ignore the ones that have exited but not been reaped yet
+    try:
+        with open("/proc/{}/stat".format(pid)) as f:
+            return f.read().split(")")[-1].split()[0] != "Z"
+    except (IOError, OSError):
+        return False
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+from unittest import TestCase, main
+
+from requests.adapters import HTTPAdapter
+
+from tas.analysis.exceptions import WebPageFetchError
+from tas.analysis.fetchers import (
+    AnalysisCache, CachedAnalysis, WebPageFetcher, detect_encoding,
+    is_public_address
+)
+
+from web_page_server import StubWebPageServer
+
+
+class RedirectingHostFetcher(WebPageFetcher):
+    """A fetcher that trusts the local host only for the first request"""
+
+    def __init__(self):
+        super(RedirectingHostFetcher, self).__init__()
+
+        # only the urls are checked
+        self._session.mount("http://", HTTPAdapter())
+
+    def _check_url(self, url):
+        if not url.endswith("/redirect"):
+            super(RedirectingHostFetcher, self)._check_url(url)
+
+
+class RebindingHostFetcher(WebPageFetcher):
+    """A fetcher whose host resolves to a public address when it is checked
+    and to the local host when it is connected to"""
+
+    def _check_url(self, url):
+        pass
+
+
+class WebPageFetcherTests(TestCase):
+    def setUp(self):
+        super(WebPageFetcherTests, self).setUp()
+
+        self.server = StubWebPageServer({
+            "/page": {
+                "html": "<html><body>hello world</body></html>",
+                "etag": '"v1"'
+            },
+            "/large_page": {
+                "html": "<html><body>{}</body></html>".format("a" * 1000)
+            },
+            "/without_charset": {
+                "html": "<html><body>Caf\u00e9</body></html>",
+                "content_type": "text/html"
+            },
+            "/without_content_type": {
+                "html": "<html><body>Caf\u00e9</body></html>",
+                "content_type": None
+            },
+            "/meta_charset": {
+                "html": '<html><head><meta charset="iso-8859-7"></head>'
+                        '<body>\u03b3\u03b5\u03b9\u03b1</body></html>',
+                "encoding": "iso-8859-7",
+                "content_type": "application/xhtml+xml"
+            },
+            "/redirect": {
+                "redirect": "/page"
+            },
+            "/redirect_loop": {
+                "redirect": "/redirect_loop"
+            }
+        })
+        self.server.start()
+
+        self.fetcher = WebPageFetcher(
+            max_size=500, allow_private_addresses=True)
+
+    def tearDown(self):
+        self.fetcher.close()
+        self.server.stop()
+
+        super(WebPageFetcherTests, self).tearDown()
+
+    def test_fetch(self):
+        result = self.fetcher.fetch(self.server.url("/page"))
+
+        self.assertEqual(result.status_code, 200)
+        self.assertEqual(result.html, "<html><body>hello world</body></html>")
+        self.assertEqual(result.etag, '"v1"')
+        self.assertIsNone(result.last_modified)
+
+    def test_fetch_page_that_has_not_been_modified(self):
+        result = self.fetcher.fetch(self.server.url("/page"), etag='"v1"')
+
+        self.assertEqual(result.status_code, 304)
+        self.assertIsNone(result.html)
+        self.assertEqual(self.server.requests[0]["If-None-Match"], '"v1"')
+
+    def test_connections_are_reused(self):
+        self.fetcher.fetch(self.server.url("/page"))
+        self.fetcher.fetch(self.server.url("/page"))
+
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertEqual(self.server.requests[1]["Connection"], "keep-alive")
+
+    def test_fetch_missing_page(self):
+        with self.assertRaises(WebPageFetchError) as context:
+            self.fetcher.fetch(self.server.url("/missing"))
+
+        self.assertEqual(context.exception.status_code, 404)
+
+    def test_fetch_page_that_is_too_large(self):
+        with self.assertRaises(WebPageFetchError):
+            self.fetcher.fetch(self.server.url("/large_page"))
+
+    def test_page_without_charset_is_decoded_as_utf8(self):
+        for page in ("/without_charset", "/without_content_type"):
+            result = self.fetcher.fetch(self.server.url(page))
+
+            self.assertEqual(
+                result.html, "<html><body>Caf\u00e9</body></html>")
+
+    def test_page_is_decoded_using_the_meta_charset(self):
+        result = self.fetcher.fetch(self.server.url("/meta_charset"))
+
+        self.assertIn("\u03b3\u03b5\u03b9\u03b1", result.html)
+
+    def test_redirects_are_followed(self):
+        result = self.fetcher.fetch(self.server.url("/redirect"))
+
+        self.assertEqual(result.html, "<html><body>hello world</body></html>")
+
+    def test_redirects_are_limited(self):
+        with self.assertRaises(WebPageFetchError):
+            self.fetcher.fetch(self.server.url("/redirect_loop"))
+
+        self.assertEqual(len(self.server.requests), 6)
+
+    def test_private_addresses_are_rejected(self):
+        fetcher = WebPageFetcher()
+
+        try:
+            for page in ("/page", "/redirect"):
+                with self.assertRaises(WebPageFetchError):
+                    fetcher.fetch(self.server.url(page))
+        finally:
+            fetcher.close()
+
+        self.assertEqual(len(self.server.requests), 0)
+
+    def test_redirect_to_private_address_is_rejected(self):
+        fetcher = RedirectingHostFetcher()
+
+        try:
+            with self.assertRaises(WebPageFetchError):
+                fetcher.fetch(self.server.url("/redirect"))
+        finally:
+            fetcher.close()
+
+        self.assertEqual(len(self.server.requests), 1)
+
+
+    def test_connection_to_private_address_is_rejected(self):
+        fetcher = RebindingHostFetcher()
+
+        try:
+            with self.assertRaises(WebPageFetchError):
+                fetcher.fetch(self.server.url("/page"))
+        finally:
+            fetcher.close()
+
+        self.assertEqual(len(self.server.requests), 0)
+
+
+class EncodingDetectionTests(TestCase):
+    def test_header_charset_is_used(self):
+        self.assertEqual(
+            detect_encoding(
+                "text/html; charset=ISO-8859-7",
+                b'<meta charset="utf-8">'
+            ),
+            "iso8859-7"
+        )
+
+    def test_invalid_header_charset_is_ignored(self):
+        self.assertEqual(
+            detect_encoding(
+                "text/html; charset=invalid", b'<meta charset="utf-8">'),
+            "utf-8"
+        )
+
+    def test_http_equiv_meta_tag_is_used(self):
+        content = b'<meta http-equiv="Content-Type" ' \
+                  b'content="text/html; charset=windows-1253">'
+
+        self.assertEqual(detect_encoding(None, content), "cp1253")
+
+    def test_empty_page(self):
+        self.assertEqual(detect_encoding(None, b""), "utf8")
+
+
+class PublicAddressTests(TestCase):
+    def test_public_addresses(self):
+        for address in ("93.184.216.34", "2606:2800:220:1::248"):
+            self.assertTrue(is_public_address(address))
+
+    def test_internal_addresses(self):
+        addresses = (
+            "127.0.0.1", "10.0.0.1", "172.16.0.1", "192.168.1.1",
+            "169.254.169.254", "0.0.0.0", "::1", "fe80::1", "fd00::1",
+            "::ffff:127.0.0.1"
+        )
+
+        for address in addresses:
+            self.assertFalse(is_public_address(address), address)
+
+
+class AnalysisCacheTests(TestCase):
+    def test_least_recently_used_items_are_removed(self):
+        cache = AnalysisCache(size=2)
+
+        cache.set("a", CachedAnalysis('"a"', None, {"content": "a"}))
+        cache.set("b", CachedAnalysis('"b"', None, {"content": "b"}))
+        cache.get("a")
+        cache.set("c", CachedAnalysis('"c"', None, {"content": "c"}))
+
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("c"))
+
+    def test_remove(self):
+        cache = AnalysisCache()
+
+        cache.set("a", CachedAnalysis('"a"', None, {"content": "a"}))
+        cache.remove("a")
+
+        self.assertIsNone(cache.get("a"))
+
+
+if __name__ == "__main__":
+    main()
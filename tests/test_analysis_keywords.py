@@ -0,0 +1,90 @@
+from unittest import TestCase, main
+
+from tas.analysis.keywords import (
+    FastRakeKeywordExtractor, RakeKeywordExtractor, create_keyword_extractor,
+    create_stop_word_pattern
+)
+
+
+reference_texts = [
+    "",
+    "the and of",
+    "123 456 and 7.5",
+    """Compatibility of systems of linear constraints over the set of
+    natural numbers. Criteria of compatibility of a system of linear
+    Diophantine equations, strict inequations, and nonstrict inequations are
+    considered. Upper bounds for components of a minimal set of solutions and
+    algorithms of construction of minimal generating sets of solutions for all
+    types of systems are given. These criteria and the corresponding
+    algorithms for constructing a minimal supporting set of solutions can be
+    used in solving all the considered types of systems and systems of mixed
+    types.""",
+    "Data-driven analysis - of data, data and more DATA! The data|analysis "
+    "pipeline (non-a thing) isn't co-operative; it's x-the the-x a-b.",
+    "It’s fine – the café serves crème brûlée "
+    "at 10/12 for +5 or -3 euros: 1_000 people\tagree \\ disagree \"quoted\"",
+    "Python 3 and python 3 are the same Python, but PYTHON isn't python2.",
+    "The quick brown fox jumps over the lazy dog. The quick brown fox. "
+    "A lazy dog sleeps. Foxes and dogs, foxes and cats, cats and dogs."
+]
+
+
+class FastRakeKeywordExtractorTests(TestCase):
+    def test_keywords_are_identical_to_rake(self):
+        for stop_list in ("SmartStoplist.txt", "FoxStoplist.txt"):
+            rake = RakeKeywordExtractor(stop_list)
+            fast_rake = FastRakeKeywordExtractor(stop_list)
+
+            for text in reference_texts:
+                expected = rake.run(text)
+                keywords = fast_rake.run(text)
+
+                self.assertEqual(keywords, expected)
+                self.assertEqual(
+                    [type(score) for _, score in keywords],
+                    [type(score) for _, score in expected]
+                )
+
+    def test_keywords(self):
+        keywords = FastRakeKeywordExtractor().run(
+            "Minimal generating sets of solutions. Linear constraints.")
+
+        self.assertEqual(
+            keywords,
+            [
+                ("minimal generating sets", 9.0),
+                ("linear constraints", 4.0),
+                ("solutions", 1.0)
+            ]
+        )
+
+
+class StopWordPatternTests(TestCase):
+    def test_split_on_stop_words_and_sentence_delimiters(self):
+        pattern = create_stop_word_pattern(["a", "able", "the"])
+
+        self.assertEqual(
+            pattern.split("The table is able, a-b. Enable a"),
+            ["", " table is ", "", " a-b", " Enable ", ""]
+        )
+
+    def test_stop_words_with_sentence_delimiters_are_ignored(self):
+        pattern = create_stop_word_pattern(["it's", "the"])
+
+        self.assertEqual(pattern.split("it's the"), ["it", "s ", ""])
+
+
+class CreateKeywordExtractorTests(TestCase):
+    def test_create_keyword_extractor(self):
+        self.assertIsInstance(
+            create_keyword_extractor("rake"), RakeKeywordExtractor)
+        self.assertIsInstance(
+            create_keyword_extractor("fast_rake"), FastRakeKeywordExtractor)
+
+    def test_invalid_engine(self):
+        with self.assertRaises(ValueError):
+            create_keyword_extractor("tfidf")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+from unittest import TestCase, main
+
+from tas.analysis.metadata import extract_metadata
+
+
+page_head = """
+<html>
+    <head>
+        <meta property="og:title" content="test page title">
+        <meta property="og:type" content="article">
+        <meta property="og:image" content="/image.png">
+        <meta property="og:url" content="http://example.com/test_page">
+        <meta property="og:description" content="test page description">
+        <meta name="twitter:card" content="summary_large_image">
+        <meta name="twitter:image:src" content="http://example.com/image.png">
+        <title>test &amp; page</title>
+    </head>
+"""
+
+
+class ExtractMetadataTests(TestCase):
+    def test_extract_metadata(self):
+        metadata = extract_metadata(
+            "http://example.com/test_page",
+            page_head + "<body><p>content</p></body></html>"
+        )
+
+        self.assertEqual(metadata.title, "test & page")
+        self.assertEqual(
+            metadata.opengraph,
+            {
+                "title": "test page title",
+                "type": "article",
+                "image": "/image.png",
+                "url": "http://example.com/test_page",
+                "description": "test page description",
+                "scrape": False
+            }
+        )
+        self.assertEqual(
+            metadata.twitter_card,
+            {
+                "card": "summary_large_image",
+                "image:src": "http://example.com/image.png"
+            }
+        )
+        self.assertEqual(metadata.top_image, "http://example.com/image.png")
+
+    def test_parsing_stops_at_the_end_of_the_head(self):
+        metadata = extract_metadata(
+            "http://example.com/test_page",
+            page_head + '<body><meta name="twitter:site" content="@user">',
+            chunk_size=16
+        )
+
+        self.assertNotIn("site", metadata.twitter_card)
+
+    def test_missing_metadata(self):
+        metadata = extract_metadata(
+            "http://example.com/test_page",
+            "<html><head></head><body><p>content</p></body></html>"
+        )
+
+        self.assertIsNone(metadata.title)
+        self.assertIsNone(metadata.opengraph)
+        self.assertIsNone(metadata.twitter_card)
+        self.assertEqual(metadata.top_image, "")
+
+    def test_incomplete_opengraph_data(self):
+        metadata = extract_metadata(
+            "http://example.com/test_page",
+            '<html><head><meta property="og:title" content="title">'
+            '</head></html>'
+        )
+
+        self.assertIsNone(metadata.opengraph)
+
+    def test_opengraph_data_without_description(self):
+        metadata = extract_metadata(
+            "http://example.com/test_page",
+            page_head.replace("og:description", "og:site_name")
+        )
+
+        self.assertIsNone(metadata.opengraph)
+
+    def test_opengraph_data_with_empty_attribute(self):
+        metadata = extract_metadata(
+            "http://example.com/test_page",
+            page_head.replace('content="article"', 'content=""')
+        )
+
+        self.assertIsNone(metadata.opengraph)
+
+    def test_top_image_from_image_source_link(self):
+        metadata = extract_metadata(
+            "http://example.com/test_page",
+            '<html><head><link rel="image_src" href="/link.png">'
+            '<link rel="icon" href="/icon.png"></head></html>'
+        )
+
+        self.assertEqual(metadata.top_image, "http://example.com/link.png")
+
+    def test_top_image_from_first_body_image(self):
+        metadata = extract_metadata(
+            "http://example.com/test_page",
+            '<html><head><title>page</title></head><body><p>text</p>'
+            '<img src="/first.png"><img src="/second.png"></body></html>'
+        )
+
+        self.assertEqual(metadata.title, "page")
+        self.assertEqual(metadata.top_image, "http://example.com/first.png")
+
+
+if __name__ == "__main__":
+    main()
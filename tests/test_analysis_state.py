@@ -0,0 +1,95 @@
+from os import path
+import re
+from tempfile import TemporaryDirectory
+from unittest import TestCase, main
+
+import numpy as np
+
+from tas.analysis.state import AnalyserState
+
+
+class StubAnalyserState(AnalyserState):
+    build_count = 0
+
+    def _build(self):
+        StubAnalyserState.build_count += 1
+
+        return {
+            "keyword_extractor": re.compile(r"\bthe\b|\ba\b", re.IGNORECASE),
+            "pos_tagger": {"weights": np.arange(1000, dtype=np.float64)},
+            "ne_chunker": ["PERSON", "ORGANIZATION"]
+        }
+
+
+class AnalyserStateTests(TestCase):
+    def setUp(self):
+        super(AnalyserStateTests, self).setUp()
+
+        StubAnalyserState.build_count = 0
+
+        self.directory = TemporaryDirectory()
+        self.snapshot_file = path.join(self.directory.name, "state.snapshot")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+        super(AnalyserStateTests, self).tearDown()
+
+    def test_state_is_created_when_it_is_first_used(self):
+        analyser_state = StubAnalyserState()
+
+        self.assertEqual(StubAnalyserState.build_count, 0)
+
+        analyser_state.ne_chunker
+        analyser_state.pos_tagger
+
+        self.assertEqual(StubAnalyserState.build_count, 1)
+        self.assertFalse(analyser_state.loaded_from_snapshot)
+
+    def test_load_snapshot(self):
+        StubAnalyserState().save_snapshot(self.snapshot_file)
+
+        analyser_state = StubAnalyserState(snapshot_file=self.snapshot_file)
+        analyser_state.warm_up()
+
+        self.assertEqual(StubAnalyserState.build_count, 1)
+        self.assertTrue(analyser_state.loaded_from_snapshot)
+        self.assertEqual(
+            analyser_state.keyword_extractor.pattern, r"\bthe\b|\ba\b")
+        self.assertEqual(
+            analyser_state.ne_chunker, ["PERSON", "ORGANIZATION"])
+        np.testing.assert_array_equal(
+            analyser_state.pos_tagger["weights"],
+            np.arange(1000, dtype=np.float64)
+        )
+
+    def test_state_is_built_when_the_snapshot_is_missing(self):
+        analyser_state = StubAnalyserState(snapshot_file=self.snapshot_file)
+        analyser_state.warm_up()
+
+        self.assertEqual(StubAnalyserState.build_count, 1)
+        self.assertFalse(analyser_state.loaded_from_snapshot)
+
+    def test_state_is_built_when_the_snapshot_is_invalid(self):
+        with open(self.snapshot_file, "wb") as f:
+            f.write(b"not a snapshot")
+
+        analyser_state = StubAnalyserState(snapshot_file=self.snapshot_file)
+        analyser_state.warm_up()
+
+        self.assertEqual(StubAnalyserState.build_count, 1)
+        self.assertFalse(analyser_state.loaded_from_snapshot)
+
+    def test_snapshot_of_a_different_keyword_stop_list_is_not_used(self):
+        StubAnalyserState("FoxStoplist.txt").save_snapshot(self.snapshot_file)
+
+        analyser_state = StubAnalyserState(
+            "SmartStoplist.txt", snapshot_file=self.snapshot_file)
+        analyser_state.warm_up()
+
+        self.assertEqual(StubAnalyserState.build_count, 2)
+        self.assertFalse(analyser_state.loaded_from_snapshot)
+
+
+if __name__ == "__main__":
+    main()
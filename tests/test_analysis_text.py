@@ -0,0 +1,105 @@
+from unittest import TestCase, main
+
+import numpy as np
+
+from tas.analysis.text import (
+    EMPTY_TEXT_STATISTICS, calculate_batch_text_statistics,
+    calculate_text_statistics
+)
+
+
+def create_sentences(*word_counts):
+    return [["word"] * word_count for word_count in word_counts]
+
+
+class CalculateTextStatisticsTests(TestCase):
+    def test_calculate_text_statistics(self):
+        statistics = calculate_text_statistics(create_sentences(3, 8, 1, 4))
+
+        self.assertEqual(
+            statistics,
+            {
+                "average_sentence_word_count": 4.0,
+                "max_sentence_word_count": 8,
+                "mean_sentence_word_count": 4.0,
+                "median_sentence_word_count": 3.5,
+                "min_sentence_word_count": 1,
+                "sentence_count": 4,
+                "sentence_word_count_std": 2.5495097567963922,
+                "sentence_word_count_variance": 6.5,
+                "word_count": 16
+            }
+        )
+
+    def test_statistics_use_python_types(self):
+        statistics = calculate_text_statistics(create_sentences(3, 8, 5))
+
+        for name, value in statistics.items():
+            self.assertIn(type(value), (int, float), name)
+
+        self.assertEqual(statistics["median_sentence_word_count"], 5.0)
+
+    def test_text_without_sentences(self):
+        self.assertEqual(
+            calculate_text_statistics([]), EMPTY_TEXT_STATISTICS)
+
+
+class CalculateBatchTextStatisticsTests(TestCase):
+    def test_statistics_are_identical_to_the_numpy_statistics(self):
+        random_state = np.random.RandomState(42)
+        documents = [
+            create_sentences(
+                *random_state.randint(0, 50, random_state.randint(1, 30)))
+            for _ in range(50)
+        ]
+
+        statistics = calculate_batch_text_statistics(documents)
+
+        self.assertEqual(len(statistics), 50)
+        for document, document_statistics in zip(documents, statistics):
+            word_counts = np.array([len(sentence) for sentence in document])
+
+            self.assertEqual(
+                document_statistics["sentence_count"], len(document))
+            self.assertEqual(
+                document_statistics["word_count"], word_counts.sum())
+            self.assertEqual(
+                document_statistics["min_sentence_word_count"],
+                word_counts.min()
+            )
+            self.assertEqual(
+                document_statistics["max_sentence_word_count"],
+                word_counts.max()
+            )
+            self.assertEqual(
+                document_statistics["median_sentence_word_count"],
+                np.median(word_counts)
+            )
+            self.assertAlmostEqual(
+                document_statistics["mean_sentence_word_count"],
+                word_counts.mean()
+            )
+            self.assertAlmostEqual(
+                document_statistics["sentence_word_count_variance"],
+                word_counts.var()
+            )
+            self.assertAlmostEqual(
+                document_statistics["sentence_word_count_std"],
+                word_counts.std()
+            )
+
+    def test_documents_without_sentences(self):
+        statistics = calculate_batch_text_statistics(
+            [[], create_sentences(2, 4), []])
+
+        self.assertEqual(statistics[0], EMPTY_TEXT_STATISTICS)
+        self.assertEqual(statistics[1]["word_count"], 6)
+        self.assertEqual(statistics[1]["median_sentence_word_count"], 3.0)
+        self.assertEqual(statistics[2], EMPTY_TEXT_STATISTICS)
+
+    def test_no_documents(self):
+        self.assertEqual(calculate_batch_text_statistics([]), [])
+
+
+if __name__ == "__main__":
+    main()
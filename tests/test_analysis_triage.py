@@ -0,0 +1,146 @@
+from unittest import TestCase, main
+
+from tas.analysis.triage import (
+    ANALYSE, EXTRACT, METADATA, SKIP, PageTriage, detect_language
+)
+
+
+english_text = """
+The service analyses the content of web pages and extracts the keywords, the
+summary and the named entities of the text. It is used by the crawler of the
+platform in order to index the articles that are published every day, and the
+results are stored in the database for the search engine. The text of every
+page is tokenized into sentences and words before it is analysed.
+"""
+
+german_text = """
+Der Dienst analysiert den Inhalt von Webseiten und extrahiert die
+Schlüsselwörter, die Zusammenfassung und die Namen aus dem Text. Er wird von
+dem Crawler der Plattform verwendet, um die Artikel zu indexieren, die jeden
+Tag veröffentlicht werden, und die Ergebnisse werden in der Datenbank für die
+Suchmaschine gespeichert. Das ist auch nicht für alle Seiten so.
+"""
+
+
+def create_page(paragraphs, language="en", body_extra=""):
+    return """
+    <html lang="{language}">
+        <head><title>test page</title></head>
+        <body>
+            <script>var text = "this is not part of the page text";</script>
+            {body_extra}
+            {paragraphs}
+        </body>
+    </html>
+    """.format(
+        language=language,
+        body_extra=body_extra,
+        paragraphs="".join(
+            "<p>{}</p>".format(paragraph) for paragraph in paragraphs)
+    )
+
+
+class DetectLanguageTests(TestCase):
+    def test_detect_language(self):
+        self.assertEqual(detect_language(english_text), "en")
+        self.assertEqual(detect_language(german_text), "de")
+
+    def test_language_of_short_text_is_not_detected(self):
+        self.assertIsNone(detect_language("the page was not found"))
+
+
+class PageTriageTests(TestCase):
+    def test_english_article_is_analysed(self):
+        triage = PageTriage()
+
+        decision = triage.triage(create_page([english_text, english_text]))
+
+        self.assertEqual(decision.language, "en")
+        self.assertTrue(decision.article)
+        self.assertEqual(decision.reason, "article")
+        self.assertEqual(decision.action, ANALYSE)
+        self.assertEqual(decision.time_saved, 0.0)
+
+    def test_unsupported_language(self):
+        triage = PageTriage(unsupported_language_action=EXTRACT)
+
+        # the language of the text is used instead of the declared language
+        decision = triage.triage(create_page([german_text, german_text]))
+
+        self.assertEqual(decision.language, "de")
+        self.assertTrue(decision.article)
+        self.assertEqual(decision.reason, "unsupported_language")
+        self.assertEqual(decision.action, EXTRACT)
+
+    def test_declared_language_is_used_for_short_pages(self):
+        triage = PageTriage(non_article_action=ANALYSE)
+
+        decision = triage.triage(
+            create_page(["Seite nicht gefunden"], language="de-DE"))
+
+        self.assertEqual(decision.language, "de")
+        self.assertEqual(decision.action, EXTRACT)
+
+    def test_login_wall(self):
+        triage = PageTriage(non_article_action=SKIP)
+
+        decision = triage.triage(create_page(
+            ["Please log in to continue reading"],
+            body_extra='<form><input type="password" name="password"></form>'
+        ))
+
+        self.assertFalse(decision.article)
+        self.assertEqual(decision.reason, "login")
+        self.assertEqual(decision.action, SKIP)
+
+    def test_listing(self):
+        triage = PageTriage()
+
+        links = "".join(
+            '<a href="/article/{0}">{1} {0}</a>'.format(i, english_text)
+            for i in range(5)
+        )
+
+        decision = triage.triage(
+            create_page([english_text, english_text], body_extra=links))
+
+        self.assertFalse(decision.article)
+        self.assertEqual(decision.reason, "listing")
+        self.assertEqual(decision.action, METADATA)
+
+    def test_least_expensive_action_is_used(self):
+        triage = PageTriage(
+            unsupported_language_action=SKIP, non_article_action=METADATA)
+
+        decision = triage.triage(create_page(["Seite nicht gefunden"] * 10))
+
+        self.assertFalse(decision.article)
+        self.assertEqual(decision.reason, "short")
+        self.assertEqual(decision.action, SKIP)
+
+    def test_time_saved_is_estimated_using_analysed_pages(self):
+        triage = PageTriage()
+
+        page = create_page([german_text, german_text])
+
+        self.assertIsNone(triage.triage(page).time_saved)
+
+        stage_timings = {
+            "readability": 0.1,
+            "keywords": 0.1,
+            "tokenization": 0.1,
+            "statistics": 0.1,
+            "summary": 0.1,
+            "named_entities": 0.5
+        }
+        triage.record(stage_timings, len(page))
+
+        self.assertAlmostEqual(triage.triage(page).time_saved, 1.0)
+
+    def test_invalid_action(self):
+        with self.assertRaises(ValueError):
+            PageTriage(non_article_action="ignore")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import json
+from os import path
+from tempfile import TemporaryDirectory
+from unittest import TestCase, main
+
+from tas.corpus import load_corpus
+
+
+class LoadCorpusTests(TestCase):
+    def test_load_html_folder(self):
+        with TemporaryDirectory() as directory:
+            files = {
+                "b.html": "<p>b</p>", "a.htm": "<p>a</p>", "notes.txt": ""
+            }
+            for filename, contents in files.items():
+                with open(path.join(directory, filename), "w") as f:
+                    f.write(contents)
+
+            self.assertEqual(
+                load_corpus(directory),
+                [
+                    {
+                        "url": "http://corpus.example.com/a.htm",
+                        "html": "<p>a</p>"
+                    },
+                    {
+                        "url": "http://corpus.example.com/b.html",
+                        "html": "<p>b</p>"
+                    }
+                ]
+            )
+
+    def test_load_payload_file(self):
+        payloads = [
+            {"url": "http://www.example.com/1", "html": "<p>1</p>"},
+            {"url": "http://www.example.com/2", "html": "<p>2</p>"}
+        ]
+
+        with TemporaryDirectory() as directory:
+            filename = path.join(directory, "corpus.ndjson")
+            with open(filename, "w") as f:
+                for payload in payloads:
+                    f.write(json.dumps(payload))
+                    f.write("\n\n")
+
+            self.assertEqual(load_corpus(filename), payloads)
+
+
+if __name__ == "__main__":
+    main()
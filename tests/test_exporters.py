@@ -0,0 +1,206 @@
+import json
+from os import path
+from tempfile import TemporaryDirectory
+from unittest import TestCase, main, skipIf
+from unittest.mock import patch
+
+from tas.exporters import (
+    ARROW, NDJSON, PARQUET, check_results_format, create_results_writer,
+    estimate_row_size, flatten_result_record, pyarrow
+)
+
+
+RECORDS = [
+    {
+        "line": 1,
+        "id": 10,
+        "result": {
+            "content": {
+                "title": "page",
+                "text": "some text",
+                "images": ["http://www.example.com/image.png"],
+                "keywords": {"some text": 4.0, "page": 1.0},
+                "named_entities": {"GPE": ["Athens", "Greece"]},
+                "statistics": {
+                    "average_sentence_word_count": 2.0,
+                    "max_sentence_word_count": 2,
+                    "mean_sentence_word_count": 2.0,
+                    "median_sentence_word_count": 2.0,
+                    "min_sentence_word_count": 2,
+                    "sentence_count": 1,
+                    "sentence_word_count_std": 0.0,
+                    "sentence_word_count_variance": 0.0,
+                    "word_count": 2
+                },
+                "readability_scores": {"text_standard": "1st grade"}
+            }
+        }
+    },
+    {
+        "line": 2,
+        "id": None,
+        "error": "HtmlContentProcessingError"
+    }
+]
+
+
+class FlattenResultRecordTests(TestCase):
+    def test_flatten_result(self):
+        row = flatten_result_record(RECORDS[0])
+
+        self.assertEqual(row["line"], 1)
+        self.assertEqual(row["id"], "10")
+        self.assertIsNone(row["error"])
+        self.assertFalse(row["degraded"])
+        self.assertEqual(row["title"], "page")
+        self.assertEqual(
+            row["keywords"],
+            [
+                {"keyword": "some text", "score": 4.0},
+                {"keyword": "page", "score": 1.0}
+            ]
+        )
+        self.assertEqual(
+            row["named_entities"],
+            [
+                {"type": "GPE", "entity": "Athens"},
+                {"type": "GPE", "entity": "Greece"}
+            ]
+        )
+        self.assertEqual(row["statistics"]["word_count"], 2)
+        self.assertEqual(
+            json.loads(row["readability_scores"]),
+            {"text_standard": "1st grade"}
+        )
+        self.assertIsNone(row["social"])
+
+    def test_flatten_error(self):
+        row = flatten_result_record(RECORDS[1])
+
+        self.assertEqual(row["error"], "HtmlContentProcessingError")
+        self.assertIsNone(row["id"])
+        self.assertIsNone(row["keywords"])
+        self.assertIsNone(row["statistics"])
+
+
+class EstimateRowSizeTests(TestCase):
+    def test_estimate_row_size(self):
+        row = {
+            "line": 1,
+            "id": None,
+            "html": "<p>text</p>",
+            "keywords": [{"keyword": "text", "score": 1.0}],
+            "statistics": {"word_count": 1}
+        }
+
+        self.assertEqual(estimate_row_size(row), 8 + 11 + 4 + 8 + 8)
+
+
+class ResultsWriterTests(TestCase):
+    def setUp(self):
+        super(ResultsWriterTests, self).setUp()
+
+        self.directory = TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+        super(ResultsWriterTests, self).tearDown()
+
+    def write_records(self, results_format, records, row_group_size=500,
+                      max_buffer_size=67108864):
+        filename = path.join(self.directory.name, "results")
+
+        with create_results_writer(
+                results_format, filename, row_group_size,
+                max_buffer_size) as writer:
+            for record in records:
+                writer.write(record)
+
+        return filename
+
+    def test_invalid_results_format(self):
+        with self.assertRaises(ValueError):
+            check_results_format("csv")
+
+    def test_ndjson(self):
+        filename = self.write_records(NDJSON, RECORDS)
+
+        with open(filename) as f:
+            self.assertEqual([json.loads(line) for line in f], RECORDS)
+
+    @skipIf(pyarrow is None, "pyarrow is not installed")
+    def test_parquet(self):
+        records = [dict(RECORDS[0], line=line) for line in range(1, 11)]
+        filename = self.write_records(PARQUET, records, row_group_size=4)
+
+        parquet_file = pyarrow.parquet.ParquetFile(filename)
+        self.assertEqual(parquet_file.metadata.num_row_groups, 3)
+
+        table = parquet_file.read()
+        self.assertEqual(table.column("line").to_pylist(), list(range(1, 11)))
+        self.assertEqual(
+            table.column("keywords").to_pylist()[0],
+            [
+                {"keyword": "some text", "score": 4.0},
+                {"keyword": "page", "score": 1.0}
+            ]
+        )
+        self.assertEqual(
+            table.column("statistics").to_pylist()[0]["word_count"], 2)
+
+    @skipIf(pyarrow is None, "pyarrow is not installed")
+    def test_row_group_is_written_when_the_buffer_is_full(self):
+        records = [
+            {
+                "line": line,
+                "id": None,
+                "result": {"content": {"html": "<p>{}</p>".format("a" * 1000)}}
+            }
+            for line in range(1, 11)
+        ]
+        filename = self.write_records(
+            PARQUET, records, row_group_size=500, max_buffer_size=2500)
+
+        parquet_file = pyarrow.parquet.ParquetFile(filename)
+        self.assertEqual(parquet_file.metadata.num_row_groups, 4)
+        self.assertEqual(
+            parquet_file.read().column("line").to_pylist(),
+            list(range(1, 11))
+        )
+
+    @skipIf(pyarrow is None, "pyarrow is not installed")
+    def test_arrow(self):
+        filename = self.write_records(ARROW, RECORDS)
+
+        table = pyarrow.ipc.open_file(filename).read_all()
+
+        self.assertEqual(
+            table.column("error").to_pylist(),
+            [None, "HtmlContentProcessingError"]
+        )
+        self.assertEqual(
+            table.column("named_entities").to_pylist(),
+            [
+                [
+                    {"type": "GPE", "entity": "Athens"},
+                    {"type": "GPE", "entity": "Greece"}
+                ],
+                None
+            ]
+        )
+
+
+    @skipIf(pyarrow is None, "pyarrow is not installed")
+    def test_arrow_without_compression_support(self):
+        # pyarrow versions before 2.0 can't compress the ipc files
+        with patch("tas.exporters.pyarrow.ipc", spec=[]):
+            filename = self.write_records(ARROW, RECORDS)
+
+        table = pyarrow.ipc.open_file(filename).read_all()
+
+        self.assertEqual(table.column("line").to_pylist(), [1, 2])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+from collections import Counter
+from os import path
+from socketserver import ThreadingMixIn
+from threading import Thread
+from unittest import TestCase, main
+from unittest.mock import patch
+from wsgiref.simple_server import WSGIServer, WSGIRequestHandler, make_server
+
+from tas.loadtest import (
+    LatencyHistogram, LoadGenerator, LoadTestResult,
+    find_saturation_throughput
+)
+from tas.web.application import create_app
+
+
+class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class QuietWSGIRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class LatencyHistogramTests(TestCase):
+    def test_percentiles(self):
+        histogram = LatencyHistogram()
+
+        for i in range(1, 101):
+            histogram.record(i / 1000.0)
+
+        self.assertEqual(histogram.total_count, 100)
+        self.assertAlmostEqual(histogram.percentile(50), 0.05)
+        self.assertAlmostEqual(histogram.percentile(99), 0.099)
+        self.assertAlmostEqual(histogram.percentile(100), 0.1)
+
+    def test_values_are_recorded_with_the_significant_digits(self):
+        histogram = LatencyHistogram(significant_digits=2)
+
+        histogram.record(1.234)
+        histogram.record(1.239)
+
+        self.assertEqual(histogram.counts, Counter({1200000: 2}))
+
+    def test_empty_histogram(self):
+        self.assertEqual(LatencyHistogram().percentile(99), 0.0)
+
+
+class SaturationThroughputTests(TestCase):
+    def _create_result(self, rate, request_count):
+        return LoadTestResult(
+            rate=rate,
+            duration=1.0,
+            latencies=LatencyHistogram(),
+            errors=Counter(),
+            request_count=request_count
+        )
+
+    def test_find_saturation_throughput(self):
+        results = [
+            self._create_result(10, 10),
+            self._create_result(20, 20),
+            self._create_result(40, 25),
+            self._create_result(80, 24)
+        ]
+
+        self.assertEqual(find_saturation_throughput(results), 25)
+
+    def test_error_rates_without_requests(self):
+        self.assertEqual(self._create_result(10, 0).error_rates(), {})
+
+
+class LoadGeneratorValidationTests(TestCase):
+    def test_documents_are_required(self):
+        with self.assertRaises(ValueError):
+            LoadGenerator(url="http://127.0.0.1/", documents=[])
+
+    def test_rate_and_duration_must_be_positive(self):
+        load_generator = LoadGenerator(
+            url="http://127.0.0.1/",
+            documents=[{"url": "http://www.example.com", "html": ""}]
+        )
+
+        for rate, duration in ((0, 1.0), (-1.0, 1.0), (1.0, 0)):
+            with self.assertRaises(ValueError):
+                load_generator.run(rate, duration)
+
+
+class LoadGeneratorTests(TestCase):
+    def setUp(self):
+        super(LoadGeneratorTests, self).setUp()
+
+        settings_file = path.join(
+            path.dirname(
+                path.abspath(__file__)), "configuration_files", "settings.py")
+
+        self.server = make_server(
+            "127.0.0.1", 0, create_app(settings_file),
+            server_class=ThreadingWSGIServer,
+            handler_class=QuietWSGIRequestHandler
+        )
+
+        self.server_thread = Thread(target=self.server.serve_forever)
+        self.server_thread.start()
+
+        self.load_generator = LoadGenerator(
+            url="http://127.0.0.1:{}/api/v2/process/html".format(
+                self.server.server_port),
+            documents=[
+                {
+                    "url": "http://www.example.com",
+                    "html": "<html><body><p>hello world</p></body></html>"
+                }
+            ]
+        )
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.server_thread.join()
+
+        super(LoadGeneratorTests, self).tearDown()
+
+    @patch("tas.web.routes.HTMLContentProcessor.process_content")
+    def test_run_load_test(self, process_content_mock):
+        process_content_mock.return_value = {"content": {}}
+
+        result = self.load_generator.run(rate=20, duration=0.5)
+
+        self.assertEqual(result.request_count, 10)
+        self.assertEqual(result.latencies.total_count, 10)
+        self.assertEqual(result.error_count, 0)
+        self.assertTrue(result.throughput > 0)
+        self.assertTrue(result.latencies.percentile(99) > 0)
+
+    @patch("tas.web.routes.HTMLContentProcessor.process_content")
+    def test_errors_are_grouped_by_error_code(self, process_content_mock):
+        process_content_mock.side_effect = Exception
+
+        result = self.load_generator.run(rate=20, duration=0.5)
+
+        self.assertEqual(result.errors, Counter({"TAS_ERROR": 10}))
+        self.assertEqual(result.error_rates(), {"TAS_ERROR": 1.0})
+        self.assertEqual(result.throughput, 0.0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import sys
+import tracemalloc
+from unittest import TestCase, main, skipIf
+from unittest.mock import patch
+
+from tas.analysis.reports import ProcessingReport
+from tas.configuration.loaders import Configuration
+from tas.memory import MemoryTracker
+
+
+class MemoryTrackerTests(TestCase):
+    def test_request_is_not_tracked(self):
+        tracker = MemoryTracker(sample_rate=0.0)
+        report = ProcessingReport()
+
+        with tracker.track("processhtml", report):
+            with report.stage("keywords"):
+                pass
+
+        self.assertIsNone(report.memory)
+        self.assertIsNone(report.as_dict()["memory"])
+
+    @skipIf(sys.version_info < (3, 9), "tracemalloc can not reset the peak")
+    def test_track_request(self):
+        tracker = MemoryTracker(sample_rate=1.0)
+        report = ProcessingReport()
+
+        with tracker.track("processhtml", report):
+            with report.stage("allocation"):
+                data = [bytearray(1024) for _ in range(1000)]
+                del data
+
+            with report.stage("retention"):
+                retained = bytearray(1024 * 1024)
+
+        memory = report.as_dict()["memory"]
+
+        allocation = memory["stages"]["allocation"]
+        self.assertGreaterEqual(allocation["peak"], 1000000)
+        self.assertLess(allocation["net"], 100000)
+        self.assertGreaterEqual(
+            memory["stages"]["retention"]["net"], 1048576)
+        self.assertGreaterEqual(memory["peak"], 1048576)
+        self.assertGreaterEqual(memory["net"], 1048576)
+
+        self.assertFalse(tracemalloc.is_tracing())
+
+        del retained
+
+    @patch("tas.analysis.reports._reset_traced_memory_peak")
+    def test_request_peak_without_peak_reset(self, reset_peak_mock):
+        # python versions before 3.9 can't reset the traced peak
+        reset_peak_mock.side_effect = \
+            lambda: (tracemalloc.get_traced_memory()[0], False)
+
+        tracker = MemoryTracker(sample_rate=1.0)
+        report = ProcessingReport()
+
+        with tracker.track("processhtml", report):
+            with report.stage("allocation"):
+                data = [bytearray(1024) for _ in range(1000)]
+                del data
+
+        memory = report.as_dict()["memory"]
+
+        self.assertIsNone(memory["stages"]["allocation"]["peak"])
+        self.assertLess(memory["stages"]["allocation"]["net"], 100000)
+        self.assertGreaterEqual(memory["peak"], 1000000)
+        self.assertLess(memory["net"], 100000)
+
+    def test_tracing_is_stopped_after_the_last_tracked_request(self):
+        tracker = MemoryTracker(sample_rate=1.0)
+
+        with tracker.track("processhtml", ProcessingReport()):
+            with tracker.track("processhtml", ProcessingReport()):
+                pass
+
+            self.assertTrue(tracemalloc.is_tracing())
+
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_tracking_is_disabled_when_lanes_are_enabled(self):
+        configuration = Configuration()
+        configuration["MEMORY_TRACKING_SAMPLE_RATE"] = 1.0
+        configuration["LANES"] = [{"name": "default"}]
+
+        tracker = MemoryTracker.from_configuration(configuration)
+
+        self.assertFalse(tracker.should_track())
+
+
+if __name__ == "__main__":
+    main()
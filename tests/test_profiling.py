@@ -0,0 +1,110 @@
+from collections import Counter
+from os import listdir
+from tempfile import TemporaryDirectory
+from unittest import TestCase, main
+import time
+
+from tas.configuration.loaders import Configuration
+from tas.profiling import (
+    SamplingProfiler, ProfileStore, RequestProfiler, read_collapsed_stacks,
+    write_collapsed_stacks
+)
+
+
+def busy_function(duration):
+    end_time = time.perf_counter() + duration
+    while time.perf_counter() < end_time:
+        pass
+
+
+class SamplingProfilerTests(TestCase):
+    def test_sample_calling_thread(self):
+        profiler = SamplingProfiler(interval=0.001)
+
+        profiler.start()
+        busy_function(0.2)
+        stacks = profiler.stop()
+
+        self.assertTrue(len(stacks) > 0)
+        self.assertTrue(
+            any("busy_function" in stack.split(";")[-1] for stack in stacks))
+
+
+class ProfileStoreTests(TestCase):
+    def test_save_and_aggregate(self):
+        with TemporaryDirectory() as directory:
+            store = ProfileStore(directory)
+
+            store.save(Counter({"main;a": 2, "main;b": 1}), "test")
+            store.save(Counter({"main;a": 3}), "test")
+
+            self.assertEqual(len(store.profile_files()), 2)
+            self.assertEqual(
+                store.aggregate(),
+                Counter({"main;a": 5, "main;b": 1})
+            )
+
+    def test_keep_only_the_most_recent_profiles(self):
+        with TemporaryDirectory() as directory:
+            store = ProfileStore(directory, max_files=2)
+
+            for i in range(4):
+                store.save(Counter({"main;f{}".format(i): 1}), "test")
+
+            self.assertEqual(len(listdir(directory)), 2)
+            self.assertEqual(
+                store.aggregate(),
+                Counter({"main;f2": 1, "main;f3": 1})
+            )
+
+    def test_collapsed_stack_file_round_trip(self):
+        with TemporaryDirectory() as directory:
+            filename = "{}/profile.collapsed".format(directory)
+            stacks = Counter({"main (a.py:1);run (b.py:10)": 7})
+
+            write_collapsed_stacks(stacks, filename)
+
+            self.assertEqual(read_collapsed_stacks(filename), stacks)
+
+
+class RequestProfilerTests(TestCase):
+    def test_profiling_is_disabled_without_a_store(self):
+        profiler = RequestProfiler(sample_rate=1.0, token="secret")
+
+        self.assertFalse(profiler.should_profile("secret"))
+
+    def test_profile_requests_with_the_profiling_token(self):
+        with TemporaryDirectory() as directory:
+            profiler = RequestProfiler(
+                store=ProfileStore(directory), token="secret")
+
+            self.assertTrue(profiler.should_profile("secret"))
+            self.assertFalse(profiler.should_profile("invalid"))
+            self.assertFalse(profiler.should_profile("sécret"))
+            self.assertFalse(profiler.should_profile())
+
+    def test_profile_sampled_requests(self):
+        with TemporaryDirectory() as directory:
+            profiler = RequestProfiler(
+                store=ProfileStore(directory), sample_rate=1.0,
+                interval=0.001
+            )
+
+            with profiler.profile("test"):
+                busy_function(0.05)
+
+            self.assertEqual(len(profiler.store.profile_files()), 1)
+
+    def test_profiling_is_disabled_when_lanes_are_enabled(self):
+        configuration = Configuration()
+        configuration["PROFILING_ENABLED"] = True
+        configuration["PROFILING_SAMPLE_RATE"] = 1.0
+        configuration["LANES"] = [{"name": "default"}]
+
+        profiler = RequestProfiler.from_configuration(configuration)
+
+        self.assertFalse(profiler.should_profile())
+
+
+if __name__ == "__main__":
+    main()
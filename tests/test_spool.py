@@ -0,0 +1,250 @@
+from concurrent.futures import ThreadPoolExecutor
+import json
+import os
+from os import listdir, path, utime
+from tempfile import TemporaryDirectory
+import time
+from unittest import TestCase, main, skipIf
+
+from tas.exporters import PARQUET, pyarrow
+from tas.spool import SpoolDirectory, SpoolWorker
+
+
+def _process_stub_payload(settings_file, payload):
+    if payload.get("crash"):
+        os._exit(1)
+
+    if payload.get("fail"):
+        return {"error": "TextContentProcessorError"}
+
+    return {"result": {"content": {"text": payload["text"].upper()}}}
+
+
+class SpoolTestCase(TestCase):
+    def setUp(self):
+        super(SpoolTestCase, self).setUp()
+
+        self.directory = TemporaryDirectory()
+        self.spool = SpoolDirectory(self.directory.name, owner="node1-1")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+        super(SpoolTestCase, self).tearDown()
+
+    def add_batch(self, name, payloads):
+        batch_file = path.join(self.directory.name, "incoming", name)
+
+        with open(batch_file, "w") as f:
+            for payload in payloads:
+                f.write(json.dumps(payload) + "\n")
+
+    def list_files(self, subdirectory):
+        return sorted(listdir(path.join(self.directory.name, subdirectory)))
+
+
+class SpoolDirectoryTests(SpoolTestCase):
+    def test_claim_batches_in_order(self):
+        self.add_batch("batch-2.ndjson", [{"text": "b"}])
+        self.add_batch("batch-1.ndjson", [{"text": "a"}])
+
+        batch = self.spool.claim()
+
+        self.assertEqual(batch.name, "batch-1.ndjson")
+        self.assertEqual(self.list_files("incoming"), ["batch-2.ndjson"])
+        self.assertEqual(
+            self.list_files("processing"), ["batch-1.ndjson@node1-1"])
+
+        self.assertEqual(self.spool.claim().name, "batch-2.ndjson")
+        self.assertIsNone(self.spool.claim())
+
+    def test_every_batch_is_claimed_by_one_worker(self):
+        for i in range(50):
+            self.add_batch("batch-{:02d}.ndjson".format(i), [{"text": "a"}])
+
+        spools = [
+            SpoolDirectory(self.directory.name, owner="node{}".format(i))
+            for i in range(4)
+        ]
+
+        def claim_all(spool):
+            names = []
+
+            batch = spool.claim()
+            while batch is not None:
+                names.append(batch.name)
+                batch = spool.claim()
+
+            return names
+
+        with ThreadPoolExecutor(max_workers=len(spools)) as executor:
+            claimed_names = [
+                name
+                for names in executor.map(claim_all, spools)
+                for name in names
+            ]
+
+        self.assertEqual(len(claimed_names), 50)
+        self.assertEqual(len(set(claimed_names)), 50)
+
+    def test_stale_batches_are_recovered(self):
+        self.add_batch("batch-1.ndjson", [{"text": "a"}])
+        self.add_batch("batch-2.ndjson", [{"text": "b"}])
+
+        stale_batch = self.spool.claim()
+        self.spool.claim()
+
+        stale_time = time.time() - 60
+        utime(stale_batch.claim_file, (stale_time, stale_time))
+
+        recovered_batches = self.spool.recover_stale_batches(timeout=30)
+
+        self.assertEqual(recovered_batches, ["batch-1.ndjson"])
+        self.assertEqual(self.list_files("incoming"), ["batch-1.ndjson"])
+        self.assertEqual(
+            self.list_files("processing"), ["batch-2.ndjson@node1-1"])
+
+    def test_expired_claim_is_not_completed(self):
+        self.add_batch("batch-1.ndjson", [{"text": "a"}])
+
+        batch = self.spool.claim()
+        with open(self.spool.temporary_results_file(batch), "w") as f:
+            f.write("{}\n")
+
+        stale_time = time.time() - 60
+        utime(batch.claim_file, (stale_time, stale_time))
+        self.spool.recover_stale_batches(timeout=30)
+
+        with self.assertRaises(FileNotFoundError):
+            self.spool.complete(batch)
+
+        self.assertEqual(self.list_files("done"), [])
+
+
+class SpoolWorkerTests(SpoolTestCase):
+    def create_worker(self):
+        return SpoolWorker(
+            self.spool,
+            settings_file="settings.py",
+            processes=2,
+            max_pending=2,
+            process_function=_process_stub_payload
+        )
+
+    def test_process_batches(self):
+        self.add_batch(
+            "batch-1.ndjson",
+            [
+                {"id": "first", "text": "a"},
+                {"text": "b"},
+                {"id": "third", "text": "c", "fail": True}
+            ]
+        )
+        self.add_batch(
+            "batch-2.ndjson",
+            [{"id": i, "text": str(i)} for i in range(10)]
+        )
+
+        self.create_worker().run(once=True)
+
+        self.assertEqual(self.list_files("incoming"), [])
+        self.assertEqual(self.list_files("processing"), [])
+        self.assertEqual(
+            self.list_files("done"),
+            [
+                "batch-1.ndjson", "batch-1.results.ndjson",
+                "batch-2.ndjson", "batch-2.results.ndjson"
+            ]
+        )
+
+        results_file = path.join(
+            self.directory.name, "done", "batch-1.results.ndjson")
+        with open(results_file) as f:
+            results = sorted(
+                (json.loads(line) for line in f),
+                key=lambda result: result["line"]
+            )
+
+        self.assertEqual(
+            results,
+            [
+                {
+                    "line": 1,
+                    "id": "first",
+                    "result": {"content": {"text": "A"}}
+                },
+                {
+                    "line": 2,
+                    "id": None,
+                    "result": {"content": {"text": "B"}}
+                },
+                {
+                    "line": 3,
+                    "id": "third",
+                    "error": "TextContentProcessorError"
+                }
+            ]
+        )
+
+        results_file = path.join(
+            self.directory.name, "done", "batch-2.results.ndjson")
+        with open(results_file) as f:
+            self.assertEqual(len(f.readlines()), 10)
+
+    @skipIf(pyarrow is None, "pyarrow is not installed")
+    def test_write_parquet_results(self):
+        self.spool.results_format = PARQUET
+        self.add_batch(
+            "batch-1.ndjson",
+            [{"id": i, "text": str(i)} for i in range(10)]
+        )
+
+        self.create_worker().run(once=True)
+
+        self.assertEqual(
+            self.list_files("done"),
+            ["batch-1.ndjson", "batch-1.results.parquet"]
+        )
+
+        table = pyarrow.parquet.read_table(
+            path.join(self.directory.name, "done", "batch-1.results.parquet"))
+
+        self.assertEqual(
+            sorted(table.column("text").to_pylist(), key=int),
+            [str(i) for i in range(10)]
+        )
+
+    def test_batch_that_kills_a_pool_process_is_moved_to_failed(self):
+        self.add_batch("batch-1.ndjson", [{"text": "a", "crash": True}])
+        self.add_batch("batch-2.ndjson", [{"text": "b"}])
+
+        self.create_worker().run(once=True)
+
+        self.assertEqual(self.list_files("failed"), ["batch-1.ndjson"])
+        self.assertEqual(self.list_files("processing"), [])
+        self.assertEqual(
+            self.list_files("done"),
+            ["batch-2.ndjson", "batch-2.results.ndjson"]
+        )
+
+    def test_invalid_results_format(self):
+        self.spool.results_format = "csv"
+
+        with self.assertRaises(ValueError):
+            self.create_worker()
+
+    def test_invalid_batch_is_moved_to_failed(self):
+        batch_file = path.join(
+            self.directory.name, "incoming", "batch-1.ndjson")
+        with open(batch_file, "w") as f:
+            f.write("not json\n")
+
+        self.create_worker().run(once=True)
+
+        self.assertEqual(self.list_files("failed"), ["batch-1.ndjson"])
+        self.assertEqual(self.list_files("processing"), [])
+        self.assertEqual(self.list_files("done"), [])
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 from os import path
 from unittest import TestCase, main
+from unittest.mock import patch
 
 from falcon import API
 
@@ -17,6 +18,20 @@ class ApplicationCreationTests(TestCase):
         self.assertIsNotNone(app)
         self.assertIsInstance(app, API)
 
+    @patch("tas.analysis.fetchers.WebPageFetcher.close")
+    @patch("tas.analysis.entities.NamedEntityExtractor.shutdown")
+    def test_shutdown_releases_the_application_resources(
+            self, shutdown_mock, close_mock):
+        settings_file = path.join(
+            path.dirname(
+                path.abspath(__file__)), "configuration_files", "settings.py")
+
+        app = create_app(settings_file)
+        app.shutdown()
+
+        shutdown_mock.assert_called_once_with()
+        close_mock.assert_called_once_with()
+
 
 if __name__ == "__main__":
     main()
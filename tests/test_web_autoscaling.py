@@ -0,0 +1,193 @@
+import os
+from os import path
+from shutil import rmtree
+from tempfile import mkdtemp
+from unittest import TestCase, main
+
+from tas.configuration.loaders import Configuration
+from tas.web.autoscaling import (
+    SCALE_DOWN, SCALE_UP, WorkerScaler, calculate_worker_count,
+    get_cpu_limit, get_memory_limit, get_process_cpu_time, get_process_memory
+)
+
+
+GB = 1024 ** 3
+
+
+class CgroupTestCase(TestCase):
+    def setUp(self):
+        super(CgroupTestCase, self).setUp()
+
+        self.cgroup_root = mkdtemp()
+
+    def tearDown(self):
+        rmtree(self.cgroup_root)
+
+        super(CgroupTestCase, self).tearDown()
+
+    def write_file(self, filename, contents):
+        filename = path.join(self.cgroup_root, filename)
+        if not path.exists(path.dirname(filename)):
+            os.makedirs(path.dirname(filename))
+
+        with open(filename, "w") as f:
+            f.write(contents)
+
+
+class GetCpuLimitTests(CgroupTestCase):
+    def setUp(self):
+        super(GetCpuLimitTests, self).setUp()
+
+        self.cpu_count = len(os.sched_getaffinity(0))
+
+    def test_without_cgroup(self):
+        self.assertEqual(get_cpu_limit(self.cgroup_root), self.cpu_count)
+
+    def test_cgroup_v2_quota(self):
+        self.write_file("cpu.max", "50000 100000\n")
+
+        self.assertEqual(get_cpu_limit(self.cgroup_root), 0.5)
+
+    def test_cgroup_v2_without_quota(self):
+        self.write_file("cpu.max", "max 100000\n")
+
+        self.assertEqual(get_cpu_limit(self.cgroup_root), self.cpu_count)
+
+    def test_cgroup_v1_quota(self):
+        self.write_file("cpu/cpu.cfs_quota_us", "25000\n")
+        self.write_file("cpu/cpu.cfs_period_us", "100000\n")
+
+        self.assertEqual(get_cpu_limit(self.cgroup_root), 0.25)
+
+    def test_cgroup_v1_without_quota(self):
+        self.write_file("cpu/cpu.cfs_quota_us", "-1\n")
+        self.write_file("cpu/cpu.cfs_period_us", "100000\n")
+
+        self.assertEqual(get_cpu_limit(self.cgroup_root), self.cpu_count)
+
+
+class GetMemoryLimitTests(CgroupTestCase):
+    def setUp(self):
+        super(GetMemoryLimitTests, self).setUp()
+
+        self.physical_memory = \
+            os.sysconf("SC_PHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+
+    def test_without_cgroup(self):
+        self.assertEqual(
+            get_memory_limit(self.cgroup_root), self.physical_memory)
+
+    def test_cgroup_v2_limit(self):
+        self.write_file("memory.max", "2147483648\n")
+
+        self.assertEqual(get_memory_limit(self.cgroup_root), 2 * GB)
+
+    def test_cgroup_v2_without_limit(self):
+        self.write_file("memory.max", "max\n")
+
+        self.assertEqual(
+            get_memory_limit(self.cgroup_root), self.physical_memory)
+
+    def test_cgroup_v1_limit(self):
+        self.write_file("memory/memory.limit_in_bytes", "1073741824\n")
+
+        self.assertEqual(get_memory_limit(self.cgroup_root), GB)
+
+    def test_cgroup_v1_without_limit(self):
+        self.write_file(
+            "memory/memory.limit_in_bytes", "9223372036854771712\n")
+
+        self.assertEqual(
+            get_memory_limit(self.cgroup_root), self.physical_memory)
+
+
+class ProcessMeasurementTests(TestCase):
+    def test_process_memory(self):
+        self.assertGreater(get_process_memory(), 0)
+        self.assertGreater(get_process_memory(os.getpid()), 0)
+
+    def test_process_cpu_time(self):
+        self.assertGreater(get_process_cpu_time(os.getpid()), 0.0)
+
+    def test_process_that_does_not_exist(self):
+        self.assertIsNone(get_process_memory(2 ** 30))
+        self.assertIsNone(get_process_cpu_time(2 ** 30))
+
+
+class CalculateWorkerCountTests(TestCase):
+    def test_one_worker_per_cpu(self):
+        self.assertEqual(calculate_worker_count(8, 64 * GB, GB), 8)
+
+    def test_partial_cpus_are_rounded_up(self):
+        self.assertEqual(calculate_worker_count(1.5, 64 * GB, GB), 2)
+        self.assertEqual(calculate_worker_count(0.25, 64 * GB, GB), 1)
+
+    def test_workers_fit_in_the_memory_limit(self):
+        # 8GB minus the reserve and the master leave room for 5 workers
+        self.assertEqual(calculate_worker_count(16, 8 * GB, GB), 5)
+
+    def test_unknown_memory(self):
+        self.assertEqual(calculate_worker_count(4, None, GB), 4)
+        self.assertEqual(calculate_worker_count(4, 8 * GB, None), 4)
+
+    def test_min_and_max_workers(self):
+        self.assertEqual(
+            calculate_worker_count(16, 64 * GB, GB, max_workers=6), 6)
+        self.assertEqual(
+            calculate_worker_count(16, GB, GB, min_workers=2), 2)
+
+
+class WorkerScalerTests(TestCase):
+    def setUp(self):
+        super(WorkerScalerTests, self).setUp()
+
+        self.scaler = WorkerScaler(
+            min_workers=2, max_workers=6, memory_limit=8 * GB,
+            memory_reserve=0.2, enabled=True
+        )
+
+    def test_scale_up_when_the_workers_are_busy(self):
+        self.assertEqual(self.scaler.decide(4, 0.9, GB), SCALE_UP)
+
+    def test_do_not_scale_above_the_maximum_workers(self):
+        self.assertEqual(self.scaler.decide(6, 0.9, GB), 0)
+
+    def test_do_not_scale_up_when_the_memory_is_not_enough(self):
+        self.assertEqual(self.scaler.decide(4, 0.9, 2 * GB), 0)
+
+    def test_scale_down_when_the_workers_are_idle(self):
+        self.assertEqual(self.scaler.decide(4, 0.1, GB), SCALE_DOWN)
+        self.assertEqual(self.scaler.decide(2, 0.1, GB), 0)
+
+    def test_keep_the_workers(self):
+        self.assertEqual(self.scaler.decide(4, 0.5, GB), 0)
+
+    def test_measure(self):
+        pids = [os.getpid()]
+
+        utilisation, worker_memory = self.scaler.measure(pids)
+        self.assertIsNone(utilisation)
+        self.assertGreater(worker_memory, 0)
+
+        sum(range(1000000))
+
+        utilisation, worker_memory = self.scaler.measure(pids)
+        self.assertGreaterEqual(utilisation, 0.0)
+
+    def test_from_configuration(self):
+        configuration = Configuration()
+        configuration["WORKER_SCALING_ENABLED"] = True
+
+        self.assertFalse(
+            WorkerScaler.from_configuration(configuration, 4).enabled)
+
+        configuration["WORKERS"] = "auto"
+        scaler = WorkerScaler.from_configuration(configuration, 4)
+
+        self.assertTrue(scaler.enabled)
+        self.assertEqual(scaler.min_workers, 1)
+        self.assertEqual(scaler.max_workers, 4)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+import json
+import os
+from os import path
+import pickle
+from tempfile import TemporaryDirectory
+from threading import Event, Thread
+import time
+from unittest import TestCase, main
+
+from tas.web.coalescing import RequestCoalescer, create_request_key
+
+
+class CreateRequestKeyTests(TestCase):
+    def test_identical_requests_have_the_same_key(self):
+        self.assertEqual(
+            create_request_key("processhtml", {"url": "a", "html": "b"}),
+            create_request_key("processhtml", {"html": "b", "url": "a"})
+        )
+
+    def test_different_requests_have_different_keys(self):
+        self.assertNotEqual(
+            create_request_key("processhtml", {"url": "a", "html": "b"}),
+            create_request_key("processhtml", {"url": "a", "html": "c"})
+        )
+        self.assertNotEqual(
+            create_request_key("processhtml", {"text": "a"}),
+            create_request_key("processtext", {"text": "a"})
+        )
+
+
+class RequestCoalescerTests(TestCase):
+    def setUp(self):
+        super(RequestCoalescerTests, self).setUp()
+
+        self.directory = TemporaryDirectory()
+        self.coalescer = RequestCoalescer(self.directory.name, timeout=5)
+
+        self.leader_started = Event()
+        self.leader_finish = Event()
+        self.leader_results = []
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+        super(RequestCoalescerTests, self).tearDown()
+
+    def start_leader(self, result=None, error=None):
+        def compute():
+            self.leader_started.set()
+            self.leader_finish.wait(5)
+
+            if error is not None:
+                raise error
+
+            return result
+
+        def execute():
+            try:
+                self.leader_results.append(
+                    self.coalescer.execute("key", compute))
+            except Exception as e:
+                self.leader_results.append(e)
+
+        leader = Thread(target=execute)
+        leader.start()
+        self.leader_started.wait(5)
+
+        return leader
+
+    def execute_follower(self, result):
+        follower_results = []
+
+        def execute():
+            follower_results.append(
+                self.coalescer.execute("key", lambda: result))
+
+        follower = Thread(target=execute)
+        follower.start()
+
+        # give the follower enough time to start waiting for the leader
+        time.sleep(0.2)
+
+        return follower, follower_results
+
+    def test_execute_without_directory(self):
+        coalescer = RequestCoalescer()
+
+        self.assertEqual(coalescer.execute("key", lambda: 1), (1, False))
+
+    def test_identical_requests_share_the_result(self):
+        leader = self.start_leader(result={"value": 1})
+        follower, follower_results = self.execute_follower({"value": 2})
+
+        self.leader_finish.set()
+        leader.join(5)
+        follower.join(5)
+
+        self.assertEqual(self.leader_results, [({"value": 1}, False)])
+        self.assertEqual(follower_results, [({"value": 1}, True)])
+
+    def test_request_is_computed_after_the_timeout(self):
+        self.coalescer.timeout = 0.05
+
+        leader = self.start_leader(result={"value": 1})
+        follower, follower_results = self.execute_follower({"value": 2})
+        follower.join(5)
+
+        self.leader_finish.set()
+        leader.join(5)
+
+        self.assertEqual(follower_results, [({"value": 2}, False)])
+
+    def test_request_is_computed_when_the_identical_request_fails(self):
+        leader = self.start_leader(error=ValueError())
+        follower, follower_results = self.execute_follower({"value": 2})
+
+        self.leader_finish.set()
+        leader.join(5)
+        follower.join(5)
+
+        self.assertIsInstance(self.leader_results[0], ValueError)
+        self.assertEqual(follower_results, [({"value": 2}, False)])
+
+    def test_results_are_saved_as_json(self):
+        leader = self.start_leader(result={"value": 1})
+        follower, _ = self.execute_follower({"value": 2})
+
+        self.leader_finish.set()
+        leader.join(5)
+        follower.join(5)
+
+        with open(path.join(self.directory.name, "key.result")) as f:
+            self.assertEqual(json.load(f), {"value": 1})
+
+    def test_result_is_not_saved_without_waiting_requests(self):
+        self.assertEqual(
+            self.coalescer.execute("key", lambda: {"value": 1}),
+            ({"value": 1}, False)
+        )
+
+        self.assertFalse(
+            path.exists(path.join(self.directory.name, "key.result")))
+
+    def test_result_files_that_are_not_json_are_ignored(self):
+        result_file = path.join(self.directory.name, "key.result")
+        with open(result_file, "wb") as f:
+            pickle.dump({"value": 1}, f)
+
+        self.assertEqual(
+            self.coalescer._read_result(result_file, 0), (False, None))
+
+    def test_created_directory_is_private(self):
+        directory = path.join(self.directory.name, "coalescing")
+
+        RequestCoalescer(directory)
+
+        self.assertEqual(os.stat(directory).st_mode & 0o777, 0o700)
+
+    def test_shared_directory_is_rejected(self):
+        directory = path.join(self.directory.name, "shared")
+        os.mkdir(directory)
+        os.chmod(directory, 0o777)
+
+        with self.assertRaises(ValueError):
+            RequestCoalescer(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+from unittest import TestCase, main
+
+from tas.analysis.reports import ProcessingReport
+from tas.configuration.loaders import Configuration
+from tas.web.degradation import (
+    DegradationController, calculate_percentile, get_queue_time
+)
+
+
+class CalculatePercentileTests(TestCase):
+    def test_calculate_percentile(self):
+        values = [float(value) for value in range(1, 101)]
+
+        self.assertEqual(calculate_percentile(values, 50), 50.0)
+        self.assertEqual(calculate_percentile(values, 95), 95.0)
+        self.assertEqual(calculate_percentile(values, 100), 100.0)
+        self.assertEqual(calculate_percentile([3.0], 95), 3.0)
+
+    def test_no_values(self):
+        self.assertIsNone(calculate_percentile([], 95))
+
+
+class GetQueueTimeTests(TestCase):
+    now = 1500000010.5
+
+    def test_timestamp_units(self):
+        for request_start in ("t=1500000010.25", "t=1500000010250",
+                              "1500000010250000"):
+            self.assertAlmostEqual(
+                get_queue_time(request_start, self.now), 0.25)
+
+    def test_missing_or_invalid_request_start(self):
+        for request_start in (None, "", "t=abc"):
+            self.assertEqual(get_queue_time(request_start, self.now), 0.0)
+
+    def test_request_start_after_the_current_time(self):
+        self.assertEqual(get_queue_time("t=1500000011", self.now), 0.0)
+
+
+class DegradationControllerTests(TestCase):
+    stages = ["summary", "named_entities", "readability"]
+
+    def _create_controller(self, **kwargs):
+        options = {
+            "stages": self.stages,
+            "latency_slo": 1.0,
+            "interval": 0.0,
+            "min_samples": 2
+        }
+        options.update(kwargs)
+
+        return DegradationController(**options)
+
+    def test_controller_is_disabled_by_default(self):
+        controller = DegradationController()
+
+        self.assertFalse(controller.enabled)
+
+        controller.record(100.0, 100)
+        self.assertEqual(controller.stages_to_skip(), frozenset())
+
+    def test_controller_is_disabled_without_an_objective(self):
+        self.assertFalse(DegradationController(stages=self.stages).enabled)
+        self.assertTrue(
+            DegradationController(stages=self.stages, latency_slo=1.0).enabled)
+        self.assertTrue(
+            DegradationController(stages=self.stages, queue_depth_slo=5)
+            .enabled
+        )
+
+    def test_invalid_stage(self):
+        with self.assertRaises(ValueError):
+            DegradationController(stages=["keywords"], latency_slo=1.0)
+
+    def test_stages_are_skipped_in_order_while_overloaded(self):
+        controller = self._create_controller()
+
+        # the percentile isn't used before there are enough samples
+        controller.record(5.0)
+        self.assertEqual(controller.level, 0)
+
+        controller.record(5.0)
+        self.assertEqual(controller.stages_to_skip(), frozenset(["summary"]))
+
+        # the samples of the previous level are discarded
+        controller.record(5.0)
+        self.assertEqual(controller.level, 1)
+
+        for _ in range(10):
+            controller.record(5.0)
+
+        self.assertEqual(controller.stages_to_skip(), frozenset(self.stages))
+
+    def test_stages_are_restored_when_the_load_drops(self):
+        controller = self._create_controller()
+        controller.level = 3
+
+        # the latency is below the objective but above the recovery threshold
+        for _ in range(10):
+            controller.record(0.8)
+
+        self.assertEqual(controller.level, 3)
+
+        controller = self._create_controller()
+        controller.level = 3
+
+        for _ in range(10):
+            controller.record(0.1)
+
+        self.assertEqual(controller.level, 0)
+        self.assertEqual(controller.stages_to_skip(), frozenset())
+
+    def test_level_changes_are_rate_limited(self):
+        controller = self._create_controller(interval=3600.0)
+
+        for _ in range(10):
+            controller.record(5.0)
+
+        self.assertEqual(controller.level, 0)
+
+    def test_queue_depth_objective(self):
+        controller = self._create_controller(
+            latency_slo=None, queue_depth_slo=10)
+
+        controller.record(100.0, 11)
+        self.assertEqual(controller.level, 1)
+
+        controller.record(100.0, 8)
+        self.assertEqual(controller.level, 1)
+
+        controller.record(100.0, 7)
+        self.assertEqual(controller.level, 0)
+
+    def test_as_dict(self):
+        controller = self._create_controller()
+        controller.record(5.0)
+
+        self.assertEqual(
+            controller.as_dict(),
+            {
+                "level": 0,
+                "skipped_stages": [],
+                "latency_slo": 1.0,
+                "percentile": 95,
+                "queue_depth_slo": None,
+                "latency": 5.0
+            }
+        )
+
+    def test_from_configuration(self):
+        configuration = Configuration()
+
+        self.assertFalse(
+            DegradationController.from_configuration(configuration).enabled)
+
+        configuration["DEGRADATION_ENABLED"] = True
+        controller = DegradationController.from_configuration(configuration)
+
+        self.assertTrue(controller.enabled)
+        self.assertEqual(controller.stages, self.stages)
+        self.assertEqual(controller.latency_slo, 2.0)
+
+
+class ProcessingReportTests(TestCase):
+    def test_skip_stage(self):
+        report = ProcessingReport()
+        report.stages_to_skip = frozenset(["summary"])
+
+        self.assertFalse(report.skip_stage("readability"))
+        self.assertFalse(report.degraded)
+
+        self.assertTrue(report.skip_stage("summary"))
+        self.assertTrue(report.degraded)
+        self.assertEqual(report.as_dict()["skipped_stages"], ["summary"])
+
+
+if __name__ == "__main__":
+    main()
@@ -2,9 +2,16 @@ from unittest import TestCase, main
 
 from falcon import HTTPNotFound
 
-from tas.analysis.exceptions import HTMLContentProcessorError
-from tas.web.error_codes import TAS_ERROR, HTML_CONTENT_PROCESSING_ERROR
-from tas.web.error_handlers import ProcessHTMLErrorHandler
+from tas.analysis.exceptions import (
+    HTMLContentProcessorError, TextContentProcessorError,
+    TextContentProcessingError
+)
+from tas.web.error_codes import (
+    TAS_ERROR, HTML_CONTENT_PROCESSING_ERROR, TEXT_CONTENT_PROCESSING_ERROR
+)
+from tas.web.error_handlers import (
+    ProcessHTMLErrorHandler, ProcessTextErrorHandler
+)
 
 
 class ProcessHTMLErrorHandlerTests(TestCase):
@@ -27,5 +34,34 @@ class ProcessHTMLErrorHandlerTests(TestCase):
         self.assertEqual(exception.description, "Failed to process content")
 
 
+class ProcessTextErrorHandlerTests(TestCase):
+    def test_handle_unknown_error(self):
+        error_handler = ProcessTextErrorHandler()
+
+        exception = error_handler.handle_exception(Exception())
+
+        self.assertIsInstance(exception, HTTPNotFound)
+        self.assertEqual(exception.code, TAS_ERROR)
+        self.assertEqual(exception.description, "Failed to process content")
+
+    def test_handle_text_content_processor_error(self):
+        error_handler = ProcessTextErrorHandler()
+
+        exception = error_handler.handle_exception(TextContentProcessorError())
+
+        self.assertIsInstance(exception, HTTPNotFound)
+        self.assertEqual(exception.code, TEXT_CONTENT_PROCESSING_ERROR)
+        self.assertEqual(exception.description, "Failed to process content")
+
+    def test_handle_text_content_processing_error(self):
+        error_handler = ProcessTextErrorHandler()
+
+        exception = error_handler.handle_exception(
+            TextContentProcessingError())
+
+        self.assertIsInstance(exception, HTTPNotFound)
+        self.assertEqual(exception.code, TEXT_CONTENT_PROCESSING_ERROR)
+
+
 if __name__ == "__main__":
     main()
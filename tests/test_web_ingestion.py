@@ -0,0 +1,89 @@
+from io import BytesIO
+import json
+from unittest import TestCase, main
+
+from tas.web.ingestion import (
+    RequestBodyTooLarge, load_json_body, read_request_body
+)
+
+
+class ReadRequestBodyTests(TestCase):
+    def test_read_body_in_chunks(self):
+        content = b"0123456789" * 100
+
+        body = read_request_body(
+            BytesIO(content), len(content), chunk_size=64)
+
+        self.assertIsInstance(body, bytearray)
+        self.assertEqual(body, content)
+
+    def test_read_body_without_content_length(self):
+        body = read_request_body(BytesIO(b'{"text": "a"}'), None)
+
+        self.assertEqual(body, b'{"text": "a"}')
+
+    def test_read_body_that_is_shorter_than_the_content_length(self):
+        body = read_request_body(BytesIO(b"0123"), 10, chunk_size=3)
+
+        self.assertEqual(body, b"0123")
+
+    def test_read_empty_body(self):
+        self.assertEqual(read_request_body(BytesIO(b""), 0), b"")
+
+    def test_buffer_is_not_allocated_using_the_content_length(self):
+        body = read_request_body(BytesIO(b"{}"), 500000000)
+
+        self.assertEqual(body, b"{}")
+        self.assertLess(len(body), 1000)
+
+    def test_content_length_is_larger_than_the_max_size(self):
+        stream = BytesIO(b"0123456789")
+
+        with self.assertRaises(RequestBodyTooLarge) as context:
+            read_request_body(stream, 500000000, max_size=100)
+
+        self.assertEqual(context.exception.size, 500000000)
+        self.assertEqual(context.exception.max_size, 100)
+
+        # the body is rejected before it is read
+        self.assertEqual(stream.tell(), 0)
+
+    def test_body_without_content_length_is_larger_than_the_max_size(self):
+        with self.assertRaises(RequestBodyTooLarge):
+            read_request_body(
+                BytesIO(b"0123456789" * 10), None, chunk_size=16,
+                max_size=50
+            )
+
+    def test_body_of_the_max_size(self):
+        body = read_request_body(
+            BytesIO(b"0123456789"), 10, chunk_size=3, max_size=10)
+
+        self.assertEqual(body, b"0123456789")
+
+
+class LoadJsonBodyTests(TestCase):
+    def test_load_json_body(self):
+        document = {"url": "http://www.example.com", "html": "<p>é</p>"}
+        body = bytearray(json.dumps(document, ensure_ascii=False), "utf8")
+
+        self.assertEqual(load_json_body(body), document)
+
+        # the body buffer is released once it has been decoded
+        self.assertEqual(len(body), 0)
+
+    def test_invalid_utf8(self):
+        body = bytearray(b'{"text": "\xff"}')
+
+        with self.assertRaises(ValueError):
+            load_json_body(body)
+
+        self.assertEqual(len(body), 0)
+
+    def test_invalid_json(self):
+        with self.assertRaises(ValueError):
+            load_json_body(bytearray(b"not json"))
+
+
+if __name__ == "__main__":
+    main()
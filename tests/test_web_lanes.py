@@ -0,0 +1,119 @@
+from threading import Event, Thread
+from unittest import TestCase, main
+from unittest.mock import MagicMock, call
+
+from tas.web.lanes import Lane, LaneQueueFull, LaneScheduler
+
+
+class LaneTests(TestCase):
+    def test_accepts(self):
+        lane = Lane("small", max_payload_size=100)
+
+        self.assertTrue(lane.accepts(100))
+        self.assertFalse(lane.accepts(101))
+        self.assertFalse(lane.accepts(None))
+        self.assertTrue(Lane("large").accepts(None))
+
+    def test_execute(self):
+        lane = Lane("small")
+
+        with lane.execute():
+            self.assertEqual(lane.active_count, 1)
+
+        lane_data = lane.as_dict()
+        self.assertEqual(lane_data["active_count"], 0)
+        self.assertEqual(lane_data["processed_count"], 1)
+        self.assertEqual(lane_data["rejected_count"], 0)
+
+    def test_gauges_are_sent_as_changes(self):
+        statsd_client = MagicMock()
+        lane = Lane("small", statsd_client=statsd_client)
+
+        with lane.execute():
+            pass
+
+        self.assertEqual(
+            statsd_client.gauge.call_args_list,
+            [
+                call("topicaxis.tas.lanes.small.queue", 1, delta=True),
+                call("topicaxis.tas.lanes.small.queue", -1, delta=True),
+                call("topicaxis.tas.lanes.small.active", 1, delta=True),
+                call("topicaxis.tas.lanes.small.active", -1, delta=True)
+            ]
+        )
+
+    def test_requests_wait_in_the_queue(self):
+        lane = Lane("small", workers=1, queue_size=1)
+
+        started = Event()
+        finish = Event()
+
+        def occupy_worker():
+            with lane.execute():
+                started.set()
+                finish.wait(5)
+
+        def wait_in_queue():
+            with lane.execute():
+                pass
+
+        worker_thread = Thread(target=occupy_worker)
+        worker_thread.start()
+        started.wait(5)
+
+        queued_thread = Thread(target=wait_in_queue)
+        queued_thread.start()
+
+        for _ in range(500):
+            if lane.queue_depth == 1:
+                break
+            finish.wait(0.01)
+
+        self.assertEqual(lane.queue_depth, 1)
+
+        with self.assertRaises(LaneQueueFull):
+            with lane.execute():
+                pass
+
+        finish.set()
+        worker_thread.join(5)
+        queued_thread.join(5)
+
+        lane_data = lane.as_dict()
+        self.assertEqual(lane_data["queue_depth"], 0)
+        self.assertEqual(lane_data["processed_count"], 2)
+        self.assertEqual(lane_data["rejected_count"], 1)
+
+
+class LaneSchedulerTests(TestCase):
+    def setUp(self):
+        super(LaneSchedulerTests, self).setUp()
+
+        self.small_lane = Lane("small", max_payload_size=100)
+        self.large_lane = Lane("large")
+        self.scheduler = LaneScheduler([self.small_lane, self.large_lane])
+
+    def test_select_by_payload_size(self):
+        self.assertIs(self.scheduler.select(10), self.small_lane)
+        self.assertIs(self.scheduler.select(1000), self.large_lane)
+        self.assertIs(self.scheduler.select(None), self.large_lane)
+
+    def test_select_by_priority(self):
+        self.assertIs(self.scheduler.select(1000, "small"), self.small_lane)
+        self.assertIs(self.scheduler.select(10, "large"), self.large_lane)
+        self.assertIs(self.scheduler.select(10, "unknown"), self.small_lane)
+
+    def test_last_lane_is_used_when_no_lane_accepts_the_payload(self):
+        scheduler = LaneScheduler([Lane("small", max_payload_size=100)])
+
+        self.assertEqual(scheduler.select(1000).name, "small")
+
+    def test_requests_are_processed_immediately_without_lanes(self):
+        scheduler = LaneScheduler()
+
+        with scheduler.execute(1000) as lane:
+            self.assertIsNone(lane)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+import signal
+from threading import Thread, current_thread
+import time
+from unittest import TestCase, main
+
+from tas.web.reloading import RollingReloader
+
+
+class FakeWorker(object):
+    def __init__(self, age):
+        self.age = age
+
+
+class FakeArbiter(object):
+    """A gunicorn master that adds and retires workers like gunicorn does
+    when it receives the TTIN and TTOU signals"""
+
+    def __init__(self, reloader, worker_count, start_delay=0.01):
+        self.reloader = reloader
+        self.start_delay = start_delay
+        self.pid = 1
+        self.WORKERS = {}
+        self.retired = []
+        self.started = []
+
+        self._next_pid = 100
+        self._age = 0
+
+        for _ in range(worker_count):
+            self.reloader.mark_ready(self.spawn_worker())
+
+    def spawn_worker(self):
+        self._age += 1
+        self._next_pid += 1
+        self.WORKERS[self._next_pid] = FakeWorker(self._age)
+
+        return self._next_pid
+
+    def start_worker(self):
+        pid = self.spawn_worker()
+        self.started.append(pid)
+
+        # the worker reports that it is ready after it loads the application
+        if self.start_delay is not None:
+            def mark_ready():
+                time.sleep(self.start_delay)
+                self.reloader.mark_ready(pid)
+
+            Thread(target=mark_ready).start()
+
+    def retire_oldest_worker(self):
+        pid = min(self.WORKERS, key=lambda pid: self.WORKERS[pid].age)
+        del self.WORKERS[pid]
+        self.retired.append(pid)
+
+
+class FakeMasterReloader(RollingReloader):
+    def _signal_master(self, arbiter, signum):
+        if signum == signal.SIGTTIN:
+            arbiter.start_worker()
+        elif signum == signal.SIGTTOU:
+            arbiter.retire_oldest_worker()
+
+
+class RollingReloaderTests(TestCase):
+    def setUp(self):
+        super(RollingReloaderTests, self).setUp()
+
+        self.loaded = []
+        self.reloader = FakeMasterReloader(
+            load_application=lambda: self.loaded.append(True),
+            ready_timeout=1.0,
+            poll_interval=0.001
+        )
+
+    def tearDown(self):
+        self.reloader.close()
+
+        super(RollingReloaderTests, self).tearDown()
+
+    def test_workers_are_replaced_one_at_a_time(self):
+        arbiter = FakeArbiter(self.reloader, 3)
+        old_pids = sorted(arbiter.WORKERS)
+
+        result = self.reloader.reload(arbiter)
+
+        self.assertEqual(self.loaded, [True])
+        self.assertEqual(arbiter.retired, old_pids)
+        self.assertEqual(sorted(arbiter.WORKERS), arbiter.started)
+        self.assertEqual(len(arbiter.WORKERS), 3)
+
+        self.assertTrue(result["succeeded"])
+        self.assertEqual(result["workers"], 3)
+        self.assertEqual(result["min_capacity"], 3)
+        self.assertEqual(result["capacity_dip"], 0.0)
+        self.assertGreaterEqual(result["duration"], result["load_duration"])
+
+    def test_workers_are_kept_when_the_application_fails_to_load(self):
+        def load_application():
+            raise ValueError("invalid stop list")
+
+        self.reloader.load_application = load_application
+        arbiter = FakeArbiter(self.reloader, 2)
+        old_pids = sorted(arbiter.WORKERS)
+
+        self.assertIsNone(self.reloader.reload(arbiter))
+        self.assertEqual(sorted(arbiter.WORKERS), old_pids)
+        self.assertEqual(arbiter.started, [])
+
+    def test_reload_stops_when_a_worker_does_not_become_ready(self):
+        self.reloader.ready_timeout = 0.05
+        arbiter = FakeArbiter(self.reloader, 2, start_delay=None)
+
+        result = self.reloader.reload(arbiter)
+
+        self.assertFalse(result["succeeded"])
+        self.assertEqual(len(arbiter.started), 1)
+        self.assertEqual(len(arbiter.WORKERS), 2)
+
+    def test_reused_process_id_is_not_ready(self):
+        arbiter = FakeArbiter(self.reloader, 1)
+
+        # a worker that exited before the reload
+        self.reloader.mark_ready(102)
+
+        self.reloader.reload(arbiter)
+
+        self.assertEqual(arbiter.started, [102])
+        self.assertEqual(list(arbiter.WORKERS), [102])
+
+    def test_application_is_loaded_in_the_calling_thread(self):
+        arbiter = FakeArbiter(self.reloader, 2)
+        old_pids = sorted(arbiter.WORKERS)
+        results = []
+
+        self.reloader.load_application = \
+            lambda: self.loaded.append(current_thread())
+
+        reload_thread = self.reloader.start_reload(arbiter, results.append)
+
+        self.assertEqual(self.loaded, [current_thread()])
+
+        reload_thread.join(5.0)
+
+        self.assertEqual(len(results), 1)
+        self.assertTrue(results[0]["succeeded"])
+        self.assertEqual(arbiter.retired, old_pids)
+        self.assertFalse(self.reloader.reloading)
+
+    def test_reload_is_not_started_when_the_application_fails_to_load(self):
+        def load_application():
+            raise ValueError("invalid stop list")
+
+        self.reloader.load_application = load_application
+        arbiter = FakeArbiter(self.reloader, 1)
+
+        self.assertIsNone(self.reloader.start_reload(arbiter))
+        self.assertEqual(arbiter.started, [])
+        self.assertFalse(self.reloader.reloading)
+
+    def test_only_one_reload_at_a_time(self):
+        arbiter = FakeArbiter(self.reloader, 1)
+
+        def load_application():
+            self.loaded.append(self.reloader.reload(arbiter))
+
+        self.reloader.load_application = load_application
+        self.reloader.reload(arbiter)
+
+        self.assertEqual(self.loaded, [None])
+        self.assertFalse(self.reloader.reloading)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,8 @@
 from os import path
-from unittest import main
+from unittest import main, skipIf
 from unittest.mock import patch
 import json
+import time
 
 from falcon.testing import TestCase
 from text_analysis_helpers.exceptions import HtmlAnalysisError
@@ -9,6 +10,9 @@ from text_analysis_helpers.exceptions import HtmlAnalysisError
 from tas import __VERSION__
 from tas.web.application import create_app
 from tas.web import error_codes
+from tas.web.encoders import msgpack, cbor2
+
+from web_page_server import StubWebPageServer
 
 
 page_contents = """
@@ -50,6 +54,20 @@ request_body = {
     "html": page_contents
 }
 
+text_contents = """\
+Lorem ipsum dolor sit amet, consectetur adipiscing elit. Nullam
+eget imperdiet ex. Morbi facilisis neque et leo lacinia pulvinar. Duis egestas
+augue a ornare consectetur. Aenean consequat a enim et tincidunt. Pellentesque
+habitant morbi tristique senectus et netus et malesuada fames ac turpis
+egestas. Vestibulum posuere sodales massa, vitae lacinia tellus sodales ut.
+Vivamus rhoncus viverra ante, et malesuada lorem. In varius vehicula leo, sit
+amet lacinia massa ultrices vel. Suspendisse nec felis ullamcorper,
+pellentesque arcu ut, elementum erat. Pellentesque habitant morbi tristique
+senectus et netus et malesuada fames ac turpis egestas. Cras rutrum magna eu
+arcu euismod condimentum. Donec pellentesque lectus malesuada arcu feugiat, et
+condimentum mauris tincidunt. Aliquam nec urna felis. Nullam viverra ex nec
+ipsum luctus porta."""
+
 
 class ResourceTestCase(TestCase):
     def setUp(self):
@@ -207,9 +225,9 @@ class ProcessHtmlTests(ResourceTestCase):
             }
         )
 
-    @patch("tas.analysis.processors.HtmlAnalyser.analyse")
-    def test_html_analyser_raised_exception(self, analyse_mock):
-        analyse_mock.side_effect = HtmlAnalysisError
+    @patch("tas.analysis.processors.extract_page_content")
+    def test_html_analyser_raised_exception(self, extract_page_content_mock):
+        extract_page_content_mock.side_effect = HtmlAnalysisError
 
         response = self.simulate_post(
             "/api/v2/process/html",
@@ -284,6 +302,656 @@ class ProcessHtmlTests(ResourceTestCase):
         )
 
 
+class ProcessMetadataTests(ResourceTestCase):
+    def test_process_metadata(self):
+        response = self.simulate_post(
+            "/api/v2/process/metadata",
+            body=json.dumps(request_body),
+            headers={
+                "Content-Type": "application/json"
+            }
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            set(response.json["content"]), {"title", "social", "top_image"})
+
+    def test_metadata_is_the_same_as_the_full_analysis_metadata(self):
+        full_response = self.simulate_post(
+            "/api/v2/process/html",
+            body=json.dumps(request_body),
+            headers={
+                "Content-Type": "application/json"
+            }
+        )
+        response = self.simulate_post(
+            "/api/v2/process/metadata",
+            body=json.dumps(request_body),
+            headers={
+                "Content-Type": "application/json"
+            }
+        )
+
+        for field in ["title", "social", "top_image"]:
+            self.assertEqual(
+                response.json["content"][field],
+                full_response.json["content"][field]
+            )
+
+    def test_invalid_html_content(self):
+        response = self.simulate_post(
+            "/api/v2/process/metadata",
+            body=json.dumps({"url": "invalid url", "html": page_contents}),
+            headers={
+                "Content-Type": "application/json"
+            }
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.json["code"], error_codes.INVALID_HTML_CONTENT)
+
+
+class ProcessTextTests(ResourceTestCase):
+    def test_process_text(self):
+        response = self.simulate_post(
+            "/api/v2/process/text",
+            body=json.dumps({"text": text_contents}),
+            headers={
+                "Content-Type": "application/json"
+            }
+        )
+
+        self.assertEqual(response.status_code, 200)
+
+        content = response.json["content"]
+        self.assertEqual(content["text"], text_contents)
+        self.assertIsInstance(content["keywords"], dict)
+        self.assertTrue(len(content["keywords"]) > 0)
+        self.assertIn("summary", content)
+        self.assertIn("readability_scores", content)
+        self.assertEqual(content["statistics"]["sentence_count"], 15)
+        self.assertEqual(content["statistics"]["word_count"], 142)
+        self.assertIn("GPE", content["named_entities"])
+
+        self.assertNotIn("html", content)
+        self.assertNotIn("title", content)
+
+    @patch("tas.web.routes.TextContentProcessor.process_content")
+    def test_text_processor_raised_exception(self, process_content_mock):
+        process_content_mock.side_effect = Exception
+
+        response = self.simulate_post(
+            "/api/v2/process/text",
+            body=json.dumps({"text": text_contents}),
+            headers={
+                "Content-Type": "application/json"
+            }
+        )
+
+        self.assertEqual(response.status_code, 404)
+        self.assertDictEqual(
+            response.json,
+            {
+                'code': error_codes.TAS_ERROR,
+                'description': 'Failed to process content',
+                'title': 'Processing error'
+            }
+        )
+
+    def test_text_analysis_request_content_is_invalid(self):
+        response = self.simulate_post(
+            "/api/v2/process/text",
+            body=json.dumps({"text": ""}),
+            headers={
+                "Content-Type": "application/json"
+            }
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertDictEqual(
+            response.json,
+            {
+                'code': error_codes.INVALID_REQUEST_BODY,
+                "description": "The contents of the request are not in the "
+                               "appropriate format",
+                "title": "Invalid request body"
+            }
+        )
+
+    def test_text_analysis_request_text_is_blank(self):
+        response = self.simulate_post(
+            "/api/v2/process/text",
+            body=json.dumps({"text": " \n\t "}),
+            headers={
+                "Content-Type": "application/json"
+            }
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.json["code"], error_codes.INVALID_REQUEST_BODY)
+
+    def test_single_sentence_text_can_not_be_summarized(self):
+        response = self.simulate_post(
+            "/api/v2/process/text",
+            body=json.dumps({"text": "This text has only one sentence."}),
+            headers={
+                "Content-Type": "application/json"
+            }
+        )
+
+        self.assertEqual(response.status_code, 404)
+        self.assertDictEqual(
+            response.json,
+            {
+                "code": error_codes.TEXT_CONTENT_PROCESSING_ERROR,
+                "description": "Failed to process content",
+                "title": "Processing error"
+            }
+        )
+
+    def test_request_body_does_not_have_any_content(self):
+        response = self.simulate_post(
+            "/api/v2/process/text", body="")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertDictEqual(
+            response.json,
+            {
+                "code": error_codes.EMPTY_REQUEST_BODY,
+                "description": "The text must be provided",
+                "title": "Empty request body"
+            }
+        )
+
+
+class StreamingTests(ResourceTestCase):
+    def _parse_ndjson(self, response):
+        return [
+            json.loads(line)
+            for line in response.text.splitlines()
+        ]
+
+    def test_stream_text_analysis(self):
+        response = self.simulate_post(
+            "/api/v2/process/text",
+            body=json.dumps({"text": text_contents}),
+            headers={
+                "Content-Type": "application/json",
+                "Accept": "application/x-ndjson"
+            }
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.headers["content-type"], "application/x-ndjson")
+
+        records = self._parse_ndjson(response)
+
+        sections = [
+            record["section"]
+            for record in records
+            if record["type"] == "section"
+        ]
+        self.assertEqual(
+            sections,
+            ["text", "readability_scores", "keywords", "statistics",
+             "summary", "named_entities"]
+        )
+
+        self.assertEqual(records[0]["value"], text_contents)
+        self.assertEqual(records[-1]["type"], "complete")
+        self.assertFalse(records[-1]["partial"])
+        self.assertIn("named_entities", records[-1]["stage_timings"])
+
+    def test_streamed_result_is_the_same_as_the_full_result(self):
+        response = self.simulate_post(
+            "/api/v2/process/html",
+            body=json.dumps(request_body),
+            headers={
+                "Content-Type": "application/json"
+            }
+        )
+        content = response.json["content"]
+
+        response = self.simulate_post(
+            "/api/v2/process/html",
+            body=json.dumps(request_body),
+            headers={
+                "Content-Type": "application/json",
+                "Accept": "application/x-ndjson"
+            }
+        )
+
+        records = self._parse_ndjson(response)
+
+        # the page metadata is sent before the text analysis results
+        self.assertEqual(records[0]["section"], "title")
+        self.assertEqual(records[1]["section"], "social")
+
+        streamed_content = {
+            record["section"]: record["value"]
+            for record in records
+            if record["type"] == "section"
+        }
+        self.assertEqual(streamed_content, content)
+
+    def test_stream_server_sent_events(self):
+        response = self.simulate_post(
+            "/api/v2/process/text",
+            body=json.dumps({"text": text_contents}),
+            headers={
+                "Content-Type": "application/json",
+                "Accept": "text/event-stream"
+            }
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.headers["content-type"], "text/event-stream")
+
+        events = response.text.strip().split("\n\n")
+        self.assertEqual(len(events), 7)
+
+        event_type, data = events[0].split("\n")
+        self.assertEqual(event_type, "event: section")
+        self.assertEqual(
+            json.loads(data[len("data: "):]),
+            {"type": "section", "section": "text", "value": text_contents}
+        )
+
+        self.assertTrue(events[-1].startswith("event: complete\n"))
+
+    def test_stream_stops_when_the_deadline_expires(self):
+        response = self.simulate_post(
+            "/api/v2/process/text",
+            body=json.dumps({"text": text_contents}),
+            headers={
+                "Content-Type": "application/json",
+                "Accept": "application/x-ndjson",
+                "X-TAS-Deadline": "0.000001"
+            }
+        )
+
+        self.assertEqual(response.status_code, 200)
+
+        records = self._parse_ndjson(response)
+
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0]["type"], "complete")
+        self.assertTrue(records[0]["partial"])
+
+    def test_invalid_content_is_rejected_before_streaming(self):
+        response = self.simulate_post(
+            "/api/v2/process/html",
+            body=json.dumps({"url": "invalid url", "html": page_contents}),
+            headers={
+                "Content-Type": "application/json",
+                "Accept": "application/x-ndjson"
+            }
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.json["code"], error_codes.INVALID_HTML_CONTENT)
+
+    @patch("tas.analysis.processors.extract_page_content")
+    def test_processing_error_is_streamed(self, extract_page_content_mock):
+        extract_page_content_mock.side_effect = HtmlAnalysisError
+
+        response = self.simulate_post(
+            "/api/v2/process/html",
+            body=json.dumps(request_body),
+            headers={
+                "Content-Type": "application/json",
+                "Accept": "application/x-ndjson"
+            }
+        )
+
+        self.assertEqual(response.status_code, 200)
+
+        records = self._parse_ndjson(response)
+
+        self.assertEqual(records[0]["section"], "title")
+        self.assertDictEqual(
+            records[-1],
+            {
+                "type": "error",
+                "code": error_codes.TAS_ERROR,
+                "description": "Failed to process content",
+                "title": "Processing error"
+            }
+        )
+
+    def test_streamed_request_is_recorded(self):
+        self.simulate_post(
+            "/api/v2/process/text",
+            body=json.dumps({"text": text_contents}),
+            headers={
+                "Content-Type": "application/json",
+                "Accept": "application/x-ndjson"
+            }
+        )
+
+        response = self.simulate_get("/service/slow")
+        request = response.json["requests"][0]
+
+        self.assertEqual(request["endpoint"], "processtext")
+        self.assertTrue(request["succeeded"])
+        self.assertIn("named_entities", request["stage_timings"])
+
+
+class ProcessURLTests(ResourceTestCase):
+    def setUp(self):
+        super(ProcessURLTests, self).setUp()
+
+        self.web_page_server = StubWebPageServer({
+            "/test_page": {
+                "html": page_contents,
+                "etag": '"v1"'
+            }
+        })
+        self.web_page_server.start()
+
+    def tearDown(self):
+        self.web_page_server.stop()
+
+        super(ProcessURLTests, self).tearDown()
+
+    def _process_url(self, url):
+        return self.simulate_post(
+            "/api/v2/process/url",
+            body=json.dumps({"url": url}),
+            headers={
+                "Content-Type": "application/json"
+            }
+        )
+
+    def test_process_url(self):
+        response = self._process_url(self.web_page_server.url("/test_page"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["x-tas-cache"], "miss")
+        self.assertEqual(response.json["content"]["title"], "test page")
+        self.assertEqual(response.json["content"]["html"], page_contents)
+
+    def test_unmodified_web_page_analysis_is_cached(self):
+        url = self.web_page_server.url("/test_page")
+
+        first_response = self._process_url(url)
+        second_response = self._process_url(url)
+
+        self.assertEqual(second_response.status_code, 200)
+        self.assertEqual(second_response.headers["x-tas-cache"], "hit")
+        self.assertDictEqual(second_response.json, first_response.json)
+
+        self.assertEqual(len(self.web_page_server.requests), 2)
+        self.assertEqual(
+            self.web_page_server.requests[1]["If-None-Match"], '"v1"')
+
+    def test_web_page_download_failed(self):
+        response = self._process_url(self.web_page_server.url("/missing"))
+
+        self.assertEqual(response.status_code, 502)
+        self.assertDictEqual(
+            response.json,
+            {
+                "code": error_codes.WEB_PAGE_FETCH_ERROR,
+                "description": "Failed to download the web page",
+                "title": "Download error"
+            }
+        )
+
+    def test_url_is_not_http(self):
+        response = self._process_url("ftp://example.com/test_page")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.json["code"], error_codes.INVALID_REQUEST_BODY)
+
+
+class SlowRequestsTests(ResourceTestCase):
+    def test_slow_requests(self):
+        self.simulate_post(
+            "/api/v2/process/html",
+            body=json.dumps(request_body),
+            headers={
+                "Content-Type": "application/json"
+            }
+        )
+
+        response = self.simulate_get("/service/slow")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json["requests"]), 1)
+
+        request = response.json["requests"][0]
+        self.assertEqual(request["url"], "http://www.example.com")
+        self.assertTrue(request["succeeded"])
+        self.assertEqual(
+            request["payload_size"], len(json.dumps(request_body)))
+        self.assertTrue(request["text_length"] > 0)
+        self.assertTrue(request["process_peak_memory"] > 0)
+        self.assertTrue(request["execution_time"] > 0)
+        self.assertIn("keywords", request["stage_timings"])
+        self.assertIn("named_entities", request["stage_timings"])
+
+
+class LanesTests(TestCase):
+    def setUp(self):
+        super(LanesTests, self).setUp()
+
+        settings_file = path.join(
+            path.dirname(path.abspath(__file__)),
+            "configuration_files", "lanes_settings.py"
+        )
+
+        self.app = create_app(settings_file)
+
+    def test_lanes(self):
+        self.simulate_post(
+            "/api/v2/process/html",
+            body=json.dumps(request_body),
+            headers={
+                "Content-Type": "application/json"
+            }
+        )
+        self.simulate_post(
+            "/api/v2/process/text",
+            body=json.dumps({"text": text_contents}),
+            headers={
+                "Content-Type": "application/json",
+                "X-TAS-Priority": "large"
+            }
+        )
+
+        response = self.simulate_get("/service/lanes")
+
+        self.assertEqual(response.status_code, 200)
+
+        lanes = {lane["name"]: lane for lane in response.json["lanes"]}
+        self.assertEqual(lanes["small"]["processed_count"], 1)
+        self.assertEqual(lanes["small"]["queue_depth"], 0)
+        self.assertEqual(lanes["large"]["processed_count"], 1)
+        self.assertEqual(lanes["large"]["active_count"], 0)
+
+    def test_lane_is_recorded_in_slow_requests(self):
+        self.simulate_post(
+            "/api/v2/process/html",
+            body=json.dumps(request_body),
+            headers={
+                "Content-Type": "application/json"
+            }
+        )
+
+        response = self.simulate_get("/service/slow")
+
+        self.assertEqual(response.json["requests"][0]["lane"], "small")
+
+    def test_streamed_request_leaves_the_lane(self):
+        self.simulate_post(
+            "/api/v2/process/text",
+            body=json.dumps({"text": text_contents}),
+            headers={
+                "Content-Type": "application/json",
+                "Accept": "application/x-ndjson"
+            }
+        )
+
+        response = self.simulate_get("/service/lanes")
+
+        lanes = {lane["name"]: lane for lane in response.json["lanes"]}
+        self.assertEqual(lanes["small"]["processed_count"], 1)
+        self.assertEqual(lanes["small"]["active_count"], 0)
+
+
+class ShardingTests(TestCase):
+    def setUp(self):
+        super(ShardingTests, self).setUp()
+
+        settings_file = path.join(
+            path.dirname(path.abspath(__file__)),
+            "configuration_files", "sharding_settings.py"
+        )
+
+        self.app = create_app(settings_file)
+
+    @patch("tas.web.routes.HTMLContentProcessor.process_content")
+    def test_owner_caches_the_results(self, process_content_mock):
+        process_content_mock.return_value = {"content": {"title": "page"}}
+
+        for _ in range(2):
+            response = self.simulate_post(
+                "/api/v2/process/html",
+                body=json.dumps(request_body),
+                headers={
+                    "Content-Type": "application/json"
+                }
+            )
+
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json, {"content": {"title": "page"}})
+
+        self.assertEqual(process_content_mock.call_count, 1)
+
+        response = self.simulate_get("/service/slow")
+
+        self.assertEqual(
+            sorted(request["shard"] for request in response.json["requests"]),
+            ["cache", "local"]
+        )
+
+    def test_cache(self):
+        response = self.simulate_get(
+            "/service/cache/processhtml-1234",
+            headers={"X-TAS-Shard-Token": "secret"}
+        )
+        self.assertEqual(response.status_code, 404)
+
+        response = self.simulate_put(
+            "/service/cache/processhtml-1234",
+            body=json.dumps({"result": {"content": {"title": "page"}}}),
+            headers={
+                "Content-Type": "application/json",
+                "X-TAS-Shard-Token": "secret"
+            }
+        )
+        self.assertEqual(response.status_code, 204)
+
+        response = self.simulate_get(
+            "/service/cache/processhtml-1234",
+            headers={"X-TAS-Shard-Token": "secret"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json, {"result": {"content": {"title": "page"}}})
+
+    def test_cache_requires_the_shard_token(self):
+        for headers in ({}, {"X-TAS-Shard-Token": "invalid"}):
+            response = self.simulate_get(
+                "/service/cache/processhtml-1234", headers=headers)
+
+            self.assertEqual(response.status_code, 403)
+            self.assertEqual(
+                response.json["code"], error_codes.INVALID_SHARD_TOKEN)
+
+        response = self.simulate_put(
+            "/service/cache/processhtml-1234",
+            body=json.dumps({"result": {"content": {"title": "forged"}}}),
+            headers={"Content-Type": "application/json"}
+        )
+
+        self.assertEqual(response.status_code, 403)
+
+
+class DegradationTests(TestCase):
+    def setUp(self):
+        super(DegradationTests, self).setUp()
+
+        settings_file = path.join(
+            path.dirname(path.abspath(__file__)),
+            "configuration_files", "degradation_settings.py"
+        )
+
+        self.app = create_app(settings_file)
+
+    def _process_text(self):
+        return self.simulate_post(
+            "/api/v2/process/text",
+            body=json.dumps({"text": text_contents}),
+            headers={
+                "Content-Type": "application/json"
+            }
+        )
+
+    def test_stages_are_skipped_when_the_latency_is_too_high(self):
+        response = self._process_text()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("degraded", response.json)
+        self.assertIsNotNone(response.json["content"]["summary"])
+
+        response = self._process_text()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json["degraded"])
+        self.assertIsNone(response.json["content"]["summary"])
+        self.assertIn("GPE", response.json["content"]["named_entities"])
+
+        response = self.simulate_get("/service/degradation")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json["level"], 2)
+        self.assertEqual(
+            response.json["skipped_stages"], ["summary", "named_entities"])
+
+        response = self.simulate_get("/service/slow")
+
+        self.assertEqual(
+            sorted(
+                request["skipped_stages"]
+                for request in response.json["requests"]
+            ),
+            [[], ["summary"]]
+        )
+
+    def test_latency_includes_the_queue_time(self):
+        response = self.simulate_post(
+            "/api/v2/process/text",
+            body=json.dumps({"text": text_contents}),
+            headers={
+                "Content-Type": "application/json",
+                "X-Request-Start": "t={}".format(time.time() - 5.0)
+            }
+        )
+        self.assertEqual(response.status_code, 200)
+
+        response = self.simulate_get("/service/slow")
+        self.assertGreaterEqual(
+            response.json["requests"][0]["queue_time"], 5.0)
+
+
 class HealthCheckTests(ResourceTestCase):
     def test_health(self):
         response = self.simulate_get("/service/health", body=page_contents)
@@ -315,6 +983,63 @@ class InformationEndpointTests(ResourceTestCase):
             }
         )
 
+    def test_information_defaults_to_json(self):
+        response = self.simulate_get(
+            "/service/information",
+            headers={
+                "Accept": "text/html"
+            }
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["content-type"], "application/json")
+        self.assertEqual(response.json["service"], "tas")
+
+    @skipIf(msgpack is None, "msgpack is not installed")
+    def test_information_encoded_with_msgpack(self):
+        response = self.simulate_get(
+            "/service/information",
+            headers={
+                "Accept": "application/msgpack"
+            }
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.headers["content-type"], "application/msgpack")
+
+        self.assertDictEqual(
+            msgpack.unpackb(response.content, raw=False),
+            {
+                "host": "127.0.0.1",
+                "port": 8000,
+                "service": "tas",
+                "version": __VERSION__
+            }
+        )
+
+    @skipIf(cbor2 is None, "cbor2 is not installed")
+    def test_information_encoded_with_cbor(self):
+        response = self.simulate_get(
+            "/service/information",
+            headers={
+                "Accept": "application/cbor"
+            }
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["content-type"], "application/cbor")
+
+        self.assertDictEqual(
+            cbor2.loads(response.content),
+            {
+                "host": "127.0.0.1",
+                "port": 8000,
+                "service": "tas",
+                "version": __VERSION__
+            }
+        )
+
 
 if __name__ == "__main__":
     main()
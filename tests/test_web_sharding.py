@@ -0,0 +1,476 @@
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import json
+from os import chmod, listdir, path, utime
+from socketserver import ThreadingMixIn
+from tempfile import TemporaryDirectory
+from threading import Thread
+from unittest import TestCase, main
+
+from consul import ConsulException
+
+from tas.configuration.loaders import Configuration
+from tas.web.coalescing import create_request_key
+from tas.web.sharding import (
+    FETCH, FORWARD, SHARD_FORWARDED_HEADER, SHARD_TOKEN_HEADER,
+    SOURCE_CACHE, SOURCE_LOCAL, SOURCE_OWNER, ConsulCatalog, HashRing,
+    NodeResultCache, ResultSharding, ShardClient, ShardRequestError,
+    StaticCatalog
+)
+
+
+NODES = ["10.0.0.1:8020", "10.0.0.2:8020", "10.0.0.3:8020"]
+
+REQUEST_PATH = "/api/v2/process/html"
+
+
+class HashRingTests(TestCase):
+    def test_empty_ring_has_no_owner(self):
+        self.assertIsNone(HashRing().owner("key"))
+
+    def test_owner_does_not_depend_on_the_node_order(self):
+        ring = HashRing(NODES)
+        reversed_ring = HashRing(list(reversed(NODES)))
+
+        for i in range(100):
+            key = "key-{}".format(i)
+            self.assertEqual(ring.owner(key), reversed_ring.owner(key))
+
+    def test_keys_are_spread_over_the_nodes(self):
+        ring = HashRing(NODES)
+
+        owners = [ring.owner("key-{}".format(i)) for i in range(3000)]
+
+        for node in NODES:
+            self.assertGreater(owners.count(node), 700)
+
+    def test_only_the_keys_of_a_removed_node_change_owner(self):
+        ring = HashRing(NODES)
+        smaller_ring = HashRing(NODES[:2])
+
+        for i in range(1000):
+            key = "key-{}".format(i)
+            if ring.owner(key) != NODES[2]:
+                self.assertEqual(ring.owner(key), smaller_ring.owner(key))
+
+
+class FakeHealthEndpoint(object):
+    def __init__(self, services):
+        self.services = services
+        self.calls = 0
+
+    def service(self, service, passing=False):
+        self.calls += 1
+
+        if isinstance(self.services, Exception):
+            raise self.services
+
+        return 1, self.services
+
+
+class FakeConsul(object):
+    def __init__(self, services):
+        self.health = FakeHealthEndpoint(services)
+
+
+class ConsulCatalogTests(TestCase):
+    services = [
+        {"Node": {"Address": "10.0.0.2"},
+         "Service": {"Address": "", "Port": 8020}},
+        {"Node": {"Address": "10.0.0.5"},
+         "Service": {"Address": "10.0.0.1", "Port": 8020}}
+    ]
+
+    def test_load_healthy_nodes(self):
+        catalog = ConsulCatalog(FakeConsul(self.services), "tas")
+
+        self.assertEqual(catalog.nodes(), ["10.0.0.1:8020", "10.0.0.2:8020"])
+
+    def test_nodes_are_refreshed_after_the_refresh_interval(self):
+        client = FakeConsul(self.services)
+
+        catalog = ConsulCatalog(client, "tas", refresh_interval=60)
+        catalog.nodes()
+        catalog.nodes()
+        self.assertEqual(client.health.calls, 1)
+
+        catalog.refresh_interval = 0
+        catalog.nodes()
+        self.assertEqual(client.health.calls, 2)
+
+    def test_last_known_nodes_are_used_when_consul_fails(self):
+        client = FakeConsul(self.services)
+        catalog = ConsulCatalog(client, "tas", refresh_interval=0)
+        catalog.nodes()
+
+        client.health.services = ConsulException("consul is unavailable")
+
+        self.assertEqual(catalog.nodes(), ["10.0.0.1:8020", "10.0.0.2:8020"])
+
+
+class InProcessShardClient(object):
+    """A shard client that sends the requests to in-process nodes"""
+
+    def __init__(self, cluster):
+        self.cluster = cluster
+        self.unavailable = set()
+
+    def _get_node(self, node):
+        if node in self.unavailable:
+            raise ShardRequestError("node is unavailable", node)
+
+        return self.cluster.worker(node)
+
+    def forward(self, node, request_path, content):
+        return self.cluster.process(
+            self._get_node(node), content, forwarded=True)[0]
+
+    def fetch(self, node, key):
+        result = self._get_node(node).get_result(key)
+
+        return result is not None, result
+
+    def store(self, node, key, result):
+        self._get_node(node).set_result(key, result)
+
+
+class InProcessCluster(object):
+    def __init__(self, mode, workers=1, cache_directory=None):
+        self.client = InProcessShardClient(self)
+        self.catalog = StaticCatalog(NODES)
+        self.workers = {
+            node: [
+                ResultSharding(
+                    node=node, catalog=self.catalog, client=self.client,
+                    mode=mode,
+                    cache_directory=(
+                        path.join(cache_directory, node.replace(":", "-"))
+                        if cache_directory is not None else None
+                    )
+                )
+                for _ in range(workers)
+            ]
+            for node in NODES
+        }
+        self.nodes = {
+            node: workers[0] for node, workers in self.workers.items()
+        }
+        self.analysed = []
+
+        self._request_count = 0
+
+    def worker(self, node):
+        # the requests are received by any of the workers of the node
+        self._request_count += 1
+        workers = self.workers[node]
+
+        return workers[self._request_count % len(workers)]
+
+    def process(self, sharding, content, forwarded=False):
+        def analyse():
+            self.analysed.append(sharding.node)
+
+            return {"title": content["html"].upper()}
+
+        return sharding.execute(
+            create_request_key("processhtml", content), REQUEST_PATH,
+            content, forwarded, analyse
+        )
+
+    def owner(self, content):
+        return HashRing(NODES).owner(
+            create_request_key("processhtml", content))
+
+
+class ResultShardingTests(TestCase):
+    content = {"url": "http://www.example.com", "html": "page"}
+
+    def test_sharding_is_disabled_without_a_node(self):
+        self.assertFalse(ResultSharding().enabled)
+        self.assertTrue(
+            ResultSharding(node=NODES[0], catalog=StaticCatalog([])).enabled)
+
+    def test_invalid_mode(self):
+        with self.assertRaises(ValueError):
+            ResultSharding(mode="broadcast")
+
+    def test_sharding_is_disabled_without_a_token(self):
+        configuration = Configuration()
+        configuration["SHARDING_ENABLED"] = True
+        configuration["SHARDING_NODES"] = NODES
+
+        sharding = ResultSharding.from_configuration(configuration)
+        self.assertFalse(sharding.enabled)
+
+        configuration["SHARDING_TOKEN"] = "secret"
+
+        sharding = ResultSharding.from_configuration(configuration)
+        self.assertTrue(sharding.enabled)
+
+    def test_forward_requests_to_the_owner(self):
+        cluster = InProcessCluster(FORWARD)
+        owner = cluster.owner(self.content)
+
+        for node in NODES:
+            result, source = cluster.process(cluster.nodes[node], self.content)
+
+            self.assertEqual(result, {"title": "PAGE"})
+            if node != owner:
+                self.assertEqual(source, SOURCE_OWNER)
+
+        self.assertEqual(cluster.analysed, [owner])
+
+        result, source = cluster.process(cluster.nodes[owner], self.content)
+        self.assertEqual(source, SOURCE_CACHE)
+        self.assertEqual(cluster.analysed, [owner])
+
+    def test_fetch_cached_results_from_the_owner(self):
+        cluster = InProcessCluster(FETCH)
+        owner = cluster.owner(self.content)
+        first_node, second_node = [node for node in NODES if node != owner]
+
+        result, source = cluster.process(
+            cluster.nodes[first_node], self.content)
+        self.assertEqual(result, {"title": "PAGE"})
+        self.assertEqual(source, SOURCE_LOCAL)
+
+        result, source = cluster.process(
+            cluster.nodes[second_node], self.content)
+        self.assertEqual(result, {"title": "PAGE"})
+        self.assertEqual(source, SOURCE_OWNER)
+
+        result, source = cluster.process(cluster.nodes[owner], self.content)
+        self.assertEqual(source, SOURCE_CACHE)
+
+        self.assertEqual(cluster.analysed, [first_node])
+
+    def test_process_locally_when_the_owner_is_unavailable(self):
+        for mode in (FORWARD, FETCH):
+            cluster = InProcessCluster(mode)
+            owner = cluster.owner(self.content)
+            node = [node for node in NODES if node != owner][0]
+            cluster.client.unavailable.add(owner)
+
+            result, source = cluster.process(
+                cluster.nodes[node], self.content)
+
+            self.assertEqual(result, {"title": "PAGE"})
+            self.assertEqual(source, SOURCE_LOCAL)
+            self.assertEqual(cluster.analysed, [node])
+
+    def test_forwarded_requests_are_processed_locally(self):
+        cluster = InProcessCluster(FORWARD)
+        owner = cluster.owner(self.content)
+        node = [node for node in NODES if node != owner][0]
+
+        result, source = cluster.process(
+            cluster.nodes[node], self.content, forwarded=True)
+
+        self.assertEqual(source, SOURCE_LOCAL)
+        self.assertEqual(cluster.analysed, [node])
+
+    def test_this_node_owns_every_key_when_the_catalog_is_empty(self):
+        sharding = ResultSharding(
+            node=NODES[0], catalog=StaticCatalog([]),
+            client=InProcessShardClient(None)
+        )
+
+        self.assertEqual(sharding.owner("key"), NODES[0])
+
+
+class NodeResultCacheTests(TestCase):
+    def setUp(self):
+        super(NodeResultCacheTests, self).setUp()
+
+        self.directory = TemporaryDirectory()
+        self.cache_directory = path.join(self.directory.name, "cache")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+        super(NodeResultCacheTests, self).tearDown()
+
+    def test_results_are_shared_by_the_caches_of_a_directory(self):
+        first_cache = NodeResultCache(self.cache_directory)
+        second_cache = NodeResultCache(self.cache_directory)
+
+        self.assertIsNone(second_cache.get("processhtml-1234"))
+
+        first_cache.set("processhtml-1234", {"title": "page"})
+
+        self.assertEqual(
+            second_cache.get("processhtml-1234"), {"title": "page"})
+
+    def test_keys_are_not_used_as_file_names(self):
+        cache = NodeResultCache(self.cache_directory)
+
+        cache.set("../processhtml-1234", {"title": "page"})
+
+        self.assertEqual(listdir(self.directory.name), ["cache"])
+        self.assertEqual(
+            cache.get("../processhtml-1234"), {"title": "page"})
+
+    def test_least_recently_used_results_are_removed(self):
+        cache = NodeResultCache(self.cache_directory, size=2)
+
+        cache.set("first", {"title": "first"})
+        cache.set("second", {"title": "second"})
+
+        # the modification times are set explicitly because the resolution
+        # of the file system times can be coarse
+        for key, modification_time in (("first", 1), ("second", 2)):
+            utime(cache._result_file(key),
+                  (modification_time, modification_time))
+
+        cache.set("third", {"title": "third"})
+
+        self.assertIsNone(cache.get("first"))
+        self.assertEqual(cache.get("second"), {"title": "second"})
+        self.assertEqual(cache.get("third"), {"title": "third"})
+
+    def test_directory_must_be_private(self):
+        NodeResultCache(self.cache_directory)
+        chmod(self.cache_directory, 0o755)
+
+        with self.assertRaises(ValueError):
+            NodeResultCache(self.cache_directory)
+
+
+class MultipleWorkerTests(TestCase):
+    content = {"url": "http://www.example.com", "html": "page"}
+
+    def setUp(self):
+        super(MultipleWorkerTests, self).setUp()
+
+        self.directory = TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+        super(MultipleWorkerTests, self).tearDown()
+
+    def _process_on_every_worker(self, cluster):
+        for node in NODES:
+            for _ in cluster.workers[node]:
+                result, source = cluster.process(
+                    cluster.worker(node), self.content)
+
+                self.assertEqual(result, {"title": "PAGE"})
+
+    def test_workers_of_the_owner_share_the_cached_results(self):
+        for mode in (FORWARD, FETCH):
+            cluster = InProcessCluster(
+                mode, workers=3,
+                cache_directory=path.join(self.directory.name, mode)
+            )
+
+            self._process_on_every_worker(cluster)
+
+            self.assertEqual(len(cluster.analysed), 1)
+
+    def test_workers_without_a_cache_directory_have_their_own_cache(self):
+        cluster = InProcessCluster(FORWARD, workers=3)
+
+        self._process_on_every_worker(cluster)
+
+        self.assertGreater(len(cluster.analysed), 1)
+
+
+class ShardRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, data):
+        content = json.dumps(data).encode("utf8")
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+
+        return json.loads(self.rfile.read(length).decode("utf8"))
+
+    def do_POST(self):
+        self.server.requests.append(dict(self.headers))
+        content = self._read_json()
+
+        self._send_json(200, {"title": content["html"].upper()})
+
+    def do_GET(self):
+        self.server.requests.append(dict(self.headers))
+        key = self.path.rsplit("/", 1)[-1]
+
+        if key not in self.server.cache:
+            self._send_json(404, {"title": "Result not found"})
+            return
+
+        self._send_json(200, {"result": self.server.cache[key]})
+
+    def do_PUT(self):
+        self.server.requests.append(dict(self.headers))
+        key = self.path.rsplit("/", 1)[-1]
+        self.server.cache[key] = self._read_json()["result"]
+
+        self.send_response(204)
+        self.end_headers()
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class ShardClientTests(TestCase):
+    def setUp(self):
+        super(ShardClientTests, self).setUp()
+
+        self.server = ThreadingHTTPServer(
+            ("127.0.0.1", 0), ShardRequestHandler)
+        self.server.requests = []
+        self.server.cache = {}
+        self.node = "127.0.0.1:{}".format(self.server.server_port)
+
+        self.thread = Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+        self.client = ShardClient(token="secret")
+
+    def tearDown(self):
+        self.client.close()
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+        super(ShardClientTests, self).tearDown()
+
+    def test_forward(self):
+        result = self.client.forward(
+            self.node, REQUEST_PATH, {"url": "http://a", "html": "page"})
+
+        self.assertEqual(result, {"title": "PAGE"})
+        self.assertEqual(
+            self.server.requests[0][SHARD_FORWARDED_HEADER], "1")
+        self.assertEqual(self.server.requests[0][SHARD_TOKEN_HEADER], "secret")
+
+    def test_fetch_and_store(self):
+        self.assertEqual(self.client.fetch(self.node, "key"), (False, None))
+
+        self.client.store(self.node, "key", {"title": "PAGE"})
+
+        self.assertEqual(
+            self.client.fetch(self.node, "key"), (True, {"title": "PAGE"}))
+
+    def test_unavailable_node(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+        with self.assertRaises(ShardRequestError):
+            self.client.fetch(self.node, "key")
+
+
+if __name__ == "__main__":
+    main()
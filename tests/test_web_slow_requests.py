@@ -0,0 +1,108 @@
+from os import listdir
+from tempfile import TemporaryDirectory
+from threading import Thread
+from unittest import TestCase, main
+import json
+import time
+
+from tas.web.slow_requests import SlowRequestLog
+
+
+class SlowRequestLogTests(TestCase):
+    def test_keep_the_slowest_requests(self):
+        slow_request_log = SlowRequestLog(size=2)
+
+        self.assertTrue(slow_request_log.record({"execution_time": 1.0}))
+        self.assertTrue(slow_request_log.record({"execution_time": 3.0}))
+        self.assertTrue(slow_request_log.record({"execution_time": 2.0}))
+        self.assertFalse(slow_request_log.record({"execution_time": 0.5}))
+
+        self.assertEqual(
+            [request["execution_time"]
+             for request in slow_request_log.requests()],
+            [3.0, 2.0]
+        )
+
+    def test_record_from_multiple_threads(self):
+        with TemporaryDirectory() as directory:
+            slow_request_log = SlowRequestLog(directory=directory, size=10)
+
+            def record_requests(offset):
+                for i in range(100):
+                    slow_request_log.record(
+                        {"execution_time": float(offset + i)})
+
+            threads = [
+                Thread(target=record_requests, args=(offset,))
+                for offset in range(0, 400, 100)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            expected_times = [float(t) for t in range(399, 389, -1)]
+
+            self.assertEqual(
+                [request["execution_time"]
+                 for request in slow_request_log.local_requests()],
+                expected_times
+            )
+
+            with open(slow_request_log._worker_file()) as f:
+                self.assertEqual(
+                    [request["execution_time"] for request in json.load(f)],
+                    expected_times
+                )
+
+    def test_old_requests_are_removed(self):
+        slow_request_log = SlowRequestLog(size=2, max_age=60)
+
+        slow_request_log.record(
+            {"execution_time": 5.0, "timestamp": time.time() - 120})
+        slow_request_log.record({"execution_time": 1.0})
+
+        self.assertEqual(
+            [request["execution_time"]
+             for request in slow_request_log.requests()],
+            [1.0]
+        )
+
+    def test_merge_the_requests_of_all_workers(self):
+        with TemporaryDirectory() as directory:
+            with open("{}/1.json".format(directory), "w") as f:
+                json.dump(
+                    [
+                        {"execution_time": 4.0, "timestamp": time.time()},
+                        {"execution_time": 0.5, "timestamp": time.time()}
+                    ],
+                    f
+                )
+
+            slow_request_log = SlowRequestLog(directory=directory, size=2)
+            slow_request_log.record({"execution_time": 2.0})
+
+            self.assertEqual(len(listdir(directory)), 2)
+            self.assertEqual(
+                [request["execution_time"]
+                 for request in slow_request_log.requests()],
+                [4.0, 2.0]
+            )
+
+    def test_remove_files_with_expired_requests(self):
+        with TemporaryDirectory() as directory:
+            with open("{}/1.json".format(directory), "w") as f:
+                json.dump(
+                    [{"execution_time": 4.0, "timestamp": time.time() - 120}],
+                    f
+                )
+
+            slow_request_log = SlowRequestLog(
+                directory=directory, max_age=60)
+
+            self.assertEqual(slow_request_log.requests(), [])
+            self.assertEqual(listdir(directory), [])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from threading import Thread
+
+
+class WebPageRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append(dict(self.headers))
+
+        page = server.pages.get(self.path)
+        if page is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        redirect = page.get("redirect")
+        if redirect is not None:
+            self.send_response(302)
+            self.send_header("Location", redirect)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        etag = page.get("etag")
+        if etag is not None and self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        content = page["html"].encode(page.get("encoding", "utf8"))
+        content_type = page.get("content_type", "text/html; charset=utf-8")
+
+        self.send_response(200)
+        if content_type is not None:
+            self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(content)))
+        if etag is not None:
+            self.send_header("ETag", etag)
+        self.end_headers()
+
+        self.wfile.write(content)
+
+
+class StubWebPageServer(HTTPServer):
+    """A local http server that serves the given web pages"""
+
+    def __init__(self, pages):
+        """Create a new StubWebPageServer object
+
+        :param dict[str, dict] pages: the web page html, etag, content type,
+            encoding and redirect location indexed by path
+        """
+        super(StubWebPageServer, self).__init__(
+            ("127.0.0.1", 0), WebPageRequestHandler)
+
+        self.pages = pages
+        self.requests = []
+
+        self._thread = None
+
+    def url(self, page_path):
+        return "http://127.0.0.1:{}{}".format(self.server_port, page_path)
+
+    def start(self):
+        self._thread = Thread(target=self.serve_forever)
+        self._thread.start()
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        self._thread.join()